@@ -1,7 +1,31 @@
 from django.contrib import admin
 
-from .models import FreelanceTuitionTransactionRecord, PurchasedHoursModificationRecord
+from .models import (
+    EmailOutboxMessage,
+    FreelanceTuitionTransactionRecord,
+    LowBalanceNotificationRecord,
+    PurchasedHoursCheckpoint,
+    PurchasedHoursModificationRecord
+)
 
 admin.site.register(FreelanceTuitionTransactionRecord)
 
-admin.site.register(PurchasedHoursModificationRecord)
\ No newline at end of file
+admin.site.register(PurchasedHoursModificationRecord)
+
+admin.site.register(PurchasedHoursCheckpoint)
+
+admin.site.register(LowBalanceNotificationRecord)
+
+
+class EmailOutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject', 'recipient', 'delivery_status',
+        'attempts', 'next_attempt_at', 'sent_at', 'time_stamp'
+    )
+    list_filter = ('delivery_status',)
+    search_fields = ('recipient', 'subject')
+    exclude = ('attachment_content',)
+    readonly_fields = ('last_error', 'sent_at', 'time_stamp')
+
+
+admin.site.register(EmailOutboxMessage, EmailOutboxMessageAdmin)
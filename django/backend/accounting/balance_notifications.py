@@ -0,0 +1,149 @@
+from datetime import date
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from class_scheduling.models import ScheduledClass
+from class_scheduling.utils import determine_duration_of_class_time
+from student_account.models import StudentOrClass
+from .models import EmailOutboxMessage, LowBalanceNotificationRecord
+
+LOW_BALANCE_HOURS = 2
+
+LOW_BALANCE_ACCOUNT_VALUES = (
+    'teacher_id',
+    'teacher__given_name',
+    'teacher__contact_email',
+    'id',
+    'student_or_class_name',
+    'purchased_class_hours',
+)
+
+
+def get_low_balance_accounts_to_notify(hours=LOW_BALANCE_HOURS):
+    """
+    Pulls the low balance freelance accounts of every teacher in one query,
+    ordered by teacher. Accounts whose teacher was already notified about
+    the current balance are left out.
+    """
+    already_notified = LowBalanceNotificationRecord.objects.filter(
+        student_or_class=OuterRef('pk'),
+        notified_purchased_class_hours=OuterRef('purchased_class_hours'),
+    )
+    return StudentOrClass.custom_query.low_balance(hours).filter(
+        ~Exists(already_notified),
+        teacher__contact_email__isnull=False,
+    ).exclude(
+        teacher__contact_email=''
+    ).order_by(
+        'teacher_id', 'student_or_class_name'
+    ).values_list(*LOW_BALANCE_ACCOUNT_VALUES)
+
+
+def get_scheduled_future_hours(student_or_class_ids, today=None):
+    """
+    Returns the hours of the classes still scheduled from today on, keyed by
+    account id. The classes are counted per (account, start, finish) in the
+    database, so only the distinct class times are converted to hours.
+    """
+    if today is None:
+        today = date.today()
+    scheduled_future_hours = {}
+    class_time_counts = ScheduledClass.objects.filter(
+        student_or_class_id__in=student_or_class_ids,
+        class_status='scheduled',
+        date__gte=today,
+    ).order_by().values_list(
+        'student_or_class_id', 'start_time', 'finish_time'
+    ).annotate(number_of_classes=Count('id'))
+    for student_or_class_id, start_time, finish_time, number_of_classes in class_time_counts:
+        scheduled_future_hours[student_or_class_id] = (
+            scheduled_future_hours.get(student_or_class_id, 0)
+            + determine_duration_of_class_time(start_time, finish_time) * number_of_classes
+        )
+    return scheduled_future_hours
+
+
+def group_low_balance_accounts_by_teacher(account_values, scheduled_future_hours):
+    """
+    Splits the rows of get_low_balance_accounts_to_notify into one digest
+    per teacher, keeping the query ordering.
+    """
+    digests = []
+    for (teacher_id, teacher_name, email_address), rows in groupby(
+            account_values, key=lambda values: values[:3]
+    ):
+        digests.append({
+            'teacher_id': teacher_id,
+            'teacher_name': teacher_name,
+            'email_address': email_address,
+            'students': [
+                {
+                    'id': student_or_class_id,
+                    'name': name,
+                    'purchased_class_hours': purchased_class_hours,
+                    'scheduled_future_hours': round(
+                        scheduled_future_hours.get(student_or_class_id, 0), 2
+                    ),
+                } for _, _, _, student_or_class_id, name, purchased_class_hours in rows
+            ],
+        })
+    return digests
+
+
+def build_low_balance_digest_outbox_message(digest):
+    student_lines = "\n".join(
+        "        - {}: {} hours left, {} hours scheduled".format(
+            str(student['name']).title(),
+            student['purchased_class_hours'],
+            student['scheduled_future_hours'],
+        ) for student in digest['students']
+    )
+    return EmailOutboxMessage(
+        requested_by_id=digest['teacher_id'],
+        recipient=digest['email_address'],
+        subject=f"Low Balance: {len(digest['students'])} Freelance Students",
+        body=f"""Dear {digest['teacher_name']},
+
+        The following freelance students are running low on purchased
+        class hours:
+
+{student_lines}
+
+        Best,
+        -Teacher's Assistant""",
+    )
+
+
+def queue_low_balance_digests(digests, hours=LOW_BALANCE_HOURS):
+    """
+    Stores one digest email per teacher in the outbox and records the
+    balances they were notified about, in one transaction. Accounts which
+    are no longer low lose their record, so that they are notified again
+    the next time they run low. Returns the ids of the outbox messages.
+    """
+    notified_ids = [
+        student['id'] for digest in digests for student in digest['students']
+    ]
+    with transaction.atomic():
+        # saved one by one, as bulk_create does not return the ids on MySQL
+        outbox_ids = []
+        for digest in digests:
+            outbox_message = build_low_balance_digest_outbox_message(digest)
+            outbox_message.save()
+            outbox_ids.append(outbox_message.id)
+        LowBalanceNotificationRecord.objects.filter(
+            ~Q(student_or_class__in=StudentOrClass.custom_query.low_balance(hours))
+            | Q(student_or_class_id__in=notified_ids)
+        ).delete()
+        LowBalanceNotificationRecord.objects.bulk_create(
+            [
+                LowBalanceNotificationRecord(
+                    student_or_class_id=student['id'],
+                    notified_purchased_class_hours=student['purchased_class_hours'],
+                ) for digest in digests for student in digest['students']
+            ],
+            batch_size=500
+        )
+    return outbox_ids
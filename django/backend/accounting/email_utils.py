@@ -1,81 +1,209 @@
-import io
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
-from django.core.mail import EmailMessage
+import logging
+from datetime import timedelta
 
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
-def send_class_data_excel_via_email(
-        data, month, year, email_address, 
-        teacher_name, school_name
+from .models import EmailOutboxMessage
+from .report_export import EXCEL_CONTENT_TYPE, build_school_report_workbook_file
+
+logger = logging.getLogger(__name__)
+
+# retry delays double after every failed attempt: 1, 2, 4, 8 ... minutes
+RETRY_BACKOFF_BASE = timedelta(minutes=1)
+MAX_DELIVERY_ATTEMPTS = 5
+# claimed messages are not picked up by another worker until the lease
+# runs out, which only happens if the worker stopped before recording them
+DELIVERY_LEASE = timedelta(minutes=15)
+
+
+def get_class_data_excel_file_name(teacher_name, school_name, month, year):
+    # also identifies the teacher's report for the school and month in the
+    # outbox, together with the recipient
+    return F'{teacher_name}_{school_name}_{month}/{year}.xlsx'
+
+
+def create_class_data_excel_outbox_message(
+        attachment_content, month, year, email_address,
+        teacher_name, school_name, requested_by=None
     ):
-    # Create workbook in memory
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "10"
     date_string = F'{month}/{year}'
-    file_name = F'{teacher_name}_{school_name}_{date_string}.xlsx'
-
-    # write date, teacher's name, and email address
-    ws.cell(1, column=1, value=date_string)
-    ws.cell(1, column=2, value=teacher_name)
-    ws.cell(1, column=9, value=email_address)
-
-    # Set column B width
-    ws.column_dimensions['B'].width = 32.5
-
-    # Write headers
-    headers = [
-        "", "Class", "HR per times(H)", "Times(T)",
-        "Total Hrs(TH=T*H)", "Pay per HR(P)", "Taxi(A)", "Total Pay(TP=TH*P+A*T)"
-    ]
-    for col_num, header in enumerate(headers, start=1):
-        cell = ws.cell(row=2, column=col_num, value=header)
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    total_pay = 0
-    total_hours = 0
-    last_row = 0
-
-    # Write data rows
-    for row_num, entry in enumerate(data, start=3):
-        ws.cell(row=row_num, column=2, value=f"{entry['student_or_class_name']} {entry['scheduled_classes']}")
-        ws.cell(row=row_num, column=3, value=entry['class_duration'])
-        ws.cell(row=row_num, column=4, value=entry['number_of_classes'])
-        ws.cell(row=row_num, column=5, value=entry['total_hours'])
-        ws.cell(row=row_num, column=6, value=entry['pay rate'])
-        ws.cell(row=row_num, column=7, value=0)  # Taxi(A)
-        ws.cell(row=row_num, column=8, value=entry['payment'])
-        total_pay += entry['payment']
-        total_hours += entry['total_hours']
-        last_row = row_num
-
-    ws.cell(row=last_row + 1, column=1, value="FS")
-    ws.cell(row=last_row + 1, column=5, value=total_hours)
-    ws.cell(row=last_row + 1, column=8, value=total_pay)
-
-
-    # Save to BytesIO buffer
-    excel_stream = io.BytesIO()
-    wb.save(excel_stream)
-    excel_stream.seek(0)
-
-    # Send email using Django's default from_email
-    try:
-        email = EmailMessage(
-            subject=f'{school_name} Monthly Report: {month}/{year}',
-            body=f"""Dear {teacher_name},
+    file_name = get_class_data_excel_file_name(teacher_name, school_name, month, year)
 
-        Please find the attached file with your monthly hours payment 
+    # the email is only stored here; the deliver_outbox_emails
+    # command sends it in the background
+    return EmailOutboxMessage.objects.create(
+        requested_by=requested_by,
+        recipient=email_address,
+        subject=f'{school_name} Monthly Report: {month}/{year}',
+        body=f"""Dear {teacher_name},
+
+        Please find the attached file with your monthly hours payment
         information at {school_name} in {date_string}
 
         Best,
         -Teacher's Assistant""",
-            to=[email_address]
-        )
+        attachment_name=file_name,
+        attachment_content=attachment_content,
+        attachment_mimetype=EXCEL_CONTENT_TYPE,
+    )
+
+
+def queue_class_data_excel_email(
+        data, month, year, email_address,
+        teacher_name, school_name, requested_by=None
+    ):
+    # data can be a list or a lazily streamed iterator of report rows;
+    # the workbook is written in write-only mode to a temporary file
+    report_file = build_school_report_workbook_file(
+        rows=data, month=month, year=year,
+        teacher_name=teacher_name, email_address=email_address
+    )
+    with report_file:
+        attachment_content = report_file.read()
+
+    return create_class_data_excel_outbox_message(
+        attachment_content, month, year, email_address,
+        teacher_name, school_name, requested_by=requested_by
+    )
+
+
+def build_email_message_from_outbox(outbox_message, connection=None):
+    email = EmailMessage(
+        subject=outbox_message.subject,
+        body=outbox_message.body,
+        to=[outbox_message.recipient],
+        connection=connection
+    )
+    if outbox_message.attachment_name:
         email.attach(
-            file_name, excel_stream.read(),
-            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            outbox_message.attachment_name,
+            bytes(outbox_message.attachment_content),
+            outbox_message.attachment_mimetype
+        )
+    return email
+
+
+def calculate_next_attempt_time(attempts, now=None):
+    if now is None:
+        now = timezone.now()
+    return now + RETRY_BACKOFF_BASE * (2 ** (attempts - 1))
+
+
+def get_outbox_messages_due_for_delivery(batch_size, outbox_ids=None, now=None):
+    if now is None:
+        now = timezone.now()
+    queryset = EmailOutboxMessage.objects.filter(
+        delivery_status='pending',
+        next_attempt_at__lte=now,
+    )
+    if outbox_ids is not None:
+        queryset = queryset.filter(id__in=outbox_ids)
+    return queryset.order_by('next_attempt_at', 'id')[:batch_size]
+
+
+def record_failed_delivery_attempt(outbox_message, error, max_attempts):
+    outbox_message.last_error = str(error)
+    if outbox_message.attempts >= max_attempts:
+        outbox_message.delivery_status = 'failed'
+        return 'failed'
+    outbox_message.next_attempt_at = calculate_next_attempt_time(
+        outbox_message.attempts
+    )
+    return 'retried'
+
+
+def claim_outbox_messages_for_delivery(batch_size, outbox_ids=None):
+    """
+    Claims a batch of due outbox messages by counting the attempt and
+    leasing them, and commits before anything is sent. skip_locked lets
+    several workers claim batches without claiming a message twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        outbox_messages = list(
+            get_outbox_messages_due_for_delivery(
+                batch_size, outbox_ids=outbox_ids, now=now
+            ).select_for_update(
+                skip_locked=True
+            )
         )
-        email.send()
+        if outbox_messages:
+            EmailOutboxMessage.objects.filter(
+                id__in=[outbox_message.id for outbox_message in outbox_messages]
+            ).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + DELIVERY_LEASE
+            )
+    for outbox_message in outbox_messages:
+        outbox_message.attempts += 1
+        outbox_message.next_attempt_at = now + DELIVERY_LEASE
+    return outbox_messages
+
+
+def save_delivery_result(outbox_message):
+    outbox_message.save(update_fields=[
+        'delivery_status', 'next_attempt_at', 'last_error', 'sent_at'
+    ])
+
+
+def deliver_outbox_messages(
+        batch_size=50, max_attempts=MAX_DELIVERY_ATTEMPTS,
+        connection=None, outbox_ids=None
+    ):
+    """
+    Sends a batch of pending outbox messages over a single mail connection.
+    Pass outbox_ids to only deliver those messages.
+
+    The batch is claimed before sending, and the result of every message
+    is saved as soon as it is sent, so a worker which stops part way
+    through never sends the messages it already delivered again.
+    Failed messages are rescheduled with exponential backoff until
+    max_attempts is reached, after which they are marked as failed.
+    Returns a dict with the number of sent, retried and failed messages.
+    """
+    delivery_counts = {'sent': 0, 'retried': 0, 'failed': 0}
+    outbox_messages = claim_outbox_messages_for_delivery(
+        batch_size, outbox_ids=outbox_ids
+    )
+    if not outbox_messages:
+        return delivery_counts
+    if connection is None:
+        connection = get_connection()
+
+    try:
+        connection.open()
     except Exception as e:
-        print("Email send error:", e)
+        logger.warning("Email outbox connection error: %s", e)
+        for outbox_message in outbox_messages:
+            delivery_counts[record_failed_delivery_attempt(
+                outbox_message, e, max_attempts
+            )] += 1
+            save_delivery_result(outbox_message)
+        return delivery_counts
+
+    try:
+        for outbox_message in outbox_messages:
+            try:
+                build_email_message_from_outbox(
+                    outbox_message, connection=connection
+                ).send()
+            except Exception as e:
+                logger.warning(
+                    "Email outbox delivery error for message %s: %s",
+                    outbox_message.id, e
+                )
+                delivery_counts[record_failed_delivery_attempt(
+                    outbox_message, e, max_attempts
+                )] += 1
+            else:
+                outbox_message.delivery_status = 'sent'
+                outbox_message.sent_at = timezone.now()
+                outbox_message.last_error = ''
+                delivery_counts['sent'] += 1
+            save_delivery_result(outbox_message)
+    finally:
+        connection.close()
+    return delivery_counts
@@ -0,0 +1,134 @@
+import time
+import tracemalloc
+import uuid
+from datetime import date, time as class_time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounting.report_builder import build_estimated_earnings_report
+from accounting.utils import generate_estimated_earnings_report
+from class_scheduling.models import ScheduledClass
+from school.models import School
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+CLASS_STATUSES = ('completed', 'completed', 'same_day_cancellation', 'cancelled')
+CLASS_TIMES = (
+    (class_time(9, 0), class_time(9, 59)),
+    (class_time(10, 0), class_time(11, 29)),
+    (class_time(13, 0), class_time(14, 59)),
+)
+
+
+class BenchmarkRollback(Exception):
+    pass
+
+
+def create_benchmark_data(number_of_classes, number_of_schools, number_of_students):
+    suffix = uuid.uuid4().hex[:8]
+    user = User.objects.create_user(f'benchmark_{suffix}', uuid.uuid4().hex)
+    teacher = UserProfile.objects.create(
+        user=user,
+        contact_email=f'benchmark_{suffix}@example.com',
+        surname='Benchmark',
+        given_name='Teacher'
+    )
+    schools = [
+        School.objects.create(
+            school_name=f'Benchmark School {index}',
+            address_line_1='1 Benchmark Road',
+            address_line_2='',
+            contact_phone='0000000000',
+            scheduling_teacher=teacher
+        ) for index in range(number_of_schools)
+    ]
+    students = []
+    for index in range(number_of_students):
+        # every fifth student is a freelance student
+        school = None if index % 5 == 0 else schools[index % number_of_schools]
+        students.append(StudentOrClass.objects.create(
+            student_or_class_name=f'Benchmark Student {index}',
+            account_type='school' if school else 'freelance',
+            school=school,
+            teacher=teacher,
+            purchased_class_hours=None if school else 100,
+            tuition_per_hour=500 + index % 10 * 50,
+        ))
+
+    ScheduledClass.objects.bulk_create(
+        (
+            ScheduledClass(
+                teacher=teacher,
+                student_or_class=students[index % number_of_students],
+                date=date(2024, 11, index % 30 + 1),
+                start_time=CLASS_TIMES[index % len(CLASS_TIMES)][0],
+                finish_time=CLASS_TIMES[index % len(CLASS_TIMES)][1],
+                class_status=CLASS_STATUSES[index % len(CLASS_STATUSES)],
+            ) for index in range(number_of_classes)
+        ),
+        batch_size=2000
+    )
+    return teacher
+
+
+def measure(report_function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    report = report_function(*args)
+    seconds = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return report, seconds, peak_memory
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the time and peak memory of the single pass earnings report "
+        "builder with the original report pipeline. The generated data is "
+        "rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--classes', type=int, nargs='+', default=[10000, 100000]
+        )
+        parser.add_argument('--schools', type=int, default=10)
+        parser.add_argument('--students', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for number_of_classes in options['classes']:
+            try:
+                with transaction.atomic():
+                    teacher = create_benchmark_data(
+                        number_of_classes, options['schools'], options['students']
+                    )
+                    self.run_benchmark(teacher, number_of_classes)
+                    raise BenchmarkRollback
+            except BenchmarkRollback:
+                pass
+
+    def run_benchmark(self, teacher, number_of_classes):
+        legacy_report, legacy_seconds, legacy_memory = measure(
+            generate_estimated_earnings_report, teacher, 11, 2024
+        )
+        report, seconds, memory = measure(
+            build_estimated_earnings_report, teacher, 11, 2024
+        )
+        matches = (
+            report['overall_monthly_total'] == legacy_report['overall_monthly_total']
+        )
+
+        self.stdout.write(f"{number_of_classes} classes:")
+        self.stdout.write(
+            f"  original pipeline: {legacy_seconds:.3f}s, "
+            f"peak memory {legacy_memory / 1024:.0f} KiB"
+        )
+        self.stdout.write(
+            f"  single pass builder: {seconds:.3f}s, "
+            f"peak memory {memory / 1024:.0f} KiB"
+        )
+        self.stdout.write(f"  totals match: {matches}")
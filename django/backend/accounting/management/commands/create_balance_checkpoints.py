@@ -0,0 +1,44 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import get_current_timezone, make_aware
+
+from accounting.utils import create_purchased_hours_checkpoints
+from client_school_transactions.utils import create_cs_purchased_hours_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes purchased hours checkpoints for the freelance and client school "
+        "student accounts, so that historical balances only need the "
+        "modifications made after the latest checkpoint. Meant to run monthly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help=(
+                'YYYY-MM-DD; the checkpoint holds the balances at the start '
+                'of this day. Defaults to the first day of the current month'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                checkpoint_date = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("The date must be in the YYYY-MM-DD format")
+        else:
+            checkpoint_date = date.today().replace(day=1)
+        as_of = make_aware(
+            datetime(checkpoint_date.year, checkpoint_date.month, checkpoint_date.day),
+            get_current_timezone()
+        )
+
+        freelance_count = create_purchased_hours_checkpoints(as_of)
+        client_school_count = create_cs_purchased_hours_checkpoints(as_of)
+        self.stdout.write(
+            f"Checkpoints as of {as_of:%Y-%m-%d %H:%M}: "
+            f"{freelance_count} freelance, {client_school_count} client school"
+        )
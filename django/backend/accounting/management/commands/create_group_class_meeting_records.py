@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from client_school_group_attendance.utils import (
+    create_group_class_meeting_records_ahead,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the meeting and attendance records of the scheduled group "
+        "classes in a date range ahead of their confirmation, so known "
+        "absences can be marked in advance. Classes which already have a "
+        "meeting record are skipped, so it is safe to run daily from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            help='YYYY-MM-DD; defaults to today'
+        )
+        parser.add_argument(
+            '--days', type=int, default=14,
+            help='Number of days from the start date, inclusive'
+        )
+
+    def handle(self, *args, **options):
+        if options['start_date']:
+            try:
+                start_date = date.fromisoformat(options['start_date'])
+            except ValueError:
+                raise CommandError("The start date must be in the YYYY-MM-DD format")
+        else:
+            start_date = date.today()
+        if options['days'] < 1:
+            raise CommandError("The number of days must be at least 1")
+        finish_date = start_date + timedelta(days=options['days'] - 1)
+
+        created_records = create_group_class_meeting_records_ahead(
+            start_date, finish_date
+        )
+        self.stdout.write(
+            f"{start_date} to {finish_date}: "
+            f"{created_records['meeting_records']} meeting records and "
+            f"{created_records['attendance_records']} attendance records created"
+        )
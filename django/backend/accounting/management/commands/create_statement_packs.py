@@ -0,0 +1,72 @@
+import os
+import shutil
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from client_school.models import ClientSchool
+from client_school_transactions.statement_packs import (
+    STATEMENT_PACK_FILE_TYPES,
+    build_statement_pack_workbook_file,
+    build_statement_pack_zip_file,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a pack of the monthly statements of every student of each "
+        "client school, as a ZIP of JSON files or as an XLSX workbook with "
+        "one sheet per student"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='YYYY-MM; defaults to the previous month'
+        )
+        parser.add_argument(
+            '--school', type=int,
+            help='Id of a single client school; defaults to every client school'
+        )
+        parser.add_argument(
+            '--file-type', choices=STATEMENT_PACK_FILE_TYPES, default='zip'
+        )
+        parser.add_argument(
+            '--output-dir', default='.',
+            help='Directory the packs are written to'
+        )
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                first_day = date.fromisoformat(f"{options['month']}-01")
+            except ValueError:
+                raise CommandError("The month must be in the YYYY-MM format")
+        else:
+            this_month = date.today().replace(day=1)
+            first_day = date(
+                this_month.year - (this_month.month == 1),
+                this_month.month - 1 or 12,
+                1
+            )
+        if not os.path.isdir(options['output_dir']):
+            raise CommandError(f"{options['output_dir']} is not a directory")
+
+        client_schools = ClientSchool.objects.order_by('school_name')
+        if options['school'] is not None:
+            client_schools = client_schools.filter(id=options['school'])
+        if options['file_type'] == 'xlsx':
+            build_pack_file = build_statement_pack_workbook_file
+        else:
+            build_pack_file = build_statement_pack_zip_file
+
+        for client_school in client_schools:
+            path = os.path.join(
+                options['output_dir'],
+                f"{client_school.id}_statements_{first_day:%Y-%m}.{options['file_type']}"
+            )
+            with build_pack_file(
+                    client_school, first_day.year, first_day.month
+            ) as pack_file, open(path, 'wb') as output_file:
+                shutil.copyfileobj(pack_file, output_file)
+            self.stdout.write(f"{client_school.school_name}: {path}")
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounting.email_utils import MAX_DELIVERY_ATTEMPTS, deliver_outbox_messages
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends pending email outbox messages in batches over a reused "
+        "mail connection, retrying failed messages with backoff"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--max-attempts', type=int, default=MAX_DELIVERY_ATTEMPTS
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting once it is empty'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=10,
+            help='Seconds to wait between polls when running with --loop'
+        )
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        while True:
+            delivery_counts = deliver_outbox_messages(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            for key, count in delivery_counts.items():
+                totals[key] += count
+            if sum(delivery_counts.values()) == 0:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(
+            "Outbox delivery finished: {sent} sent, {retried} "
+            "scheduled for retry, {failed} failed".format(**totals)
+        )
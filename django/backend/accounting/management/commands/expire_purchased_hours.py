@@ -0,0 +1,60 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+
+from client_school_transactions.models import PURCHASED_HOURS_BALANCES
+from client_school_transactions.utils import (
+    expire_cs_purchased_hours,
+    get_expired_cs_purchased_hours,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets the client school purchased hours whose expiration date has "
+        "passed to zero and records an expired hours modification for each "
+        "balance. Balances already swept are skipped, so it is safe to run "
+        "daily from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help=(
+                'YYYY-MM-DD; hours expiring before this day are swept. '
+                'Defaults to today'
+            )
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the expired balances without changing them'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Balances zeroed per update query'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("The date must be in the YYYY-MM-DD format")
+        else:
+            today = date.today()
+
+        if options['dry_run']:
+            for balance, label in PURCHASED_HOURS_BALANCES:
+                expired = get_expired_cs_purchased_hours(balance, today).aggregate(
+                    accounts=Count('id'), hours=Sum(balance)
+                )
+                self.stdout.write(
+                    f"{label}: {expired['accounts']} expired balances, "
+                    f"{expired['hours'] or 0} hours"
+                )
+            return
+
+        expired_counts = expire_cs_purchased_hours(today, options['chunk_size'])
+        for balance, label in PURCHASED_HOURS_BALANCES:
+            self.stdout.write(f"{label}: {expired_counts[balance]} balances expired")
@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounting.models import PurchasedHoursModificationRecord
+from accounting.utils import (
+    create_purchased_hours_reconciliation_adjustments,
+    get_purchased_hours_drift,
+)
+from client_school_transactions.models import CSPurchasedHoursModification
+from client_school_transactions.utils import (
+    create_cs_purchased_hours_reconciliation_adjustments,
+    get_cs_purchased_hours_drift,
+)
+
+
+def split_into_chunks(ids, chunk_size):
+    return [ids[index:index + chunk_size] for index in range(0, len(ids), chunk_size)]
+
+
+def get_drift_in_thread(get_drift, ids):
+    # every thread opens its own database connection, which is not
+    # closed by the request cycle, so it is closed once the chunk is done
+    try:
+        return get_drift(ids)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the stored purchased hours of the freelance and client school "
+        "student accounts with the balances expected from their modification "
+        "histories and reports the accounts which drifted. With --fix a "
+        "reconciliation adjustment from the expected to the stored hours is "
+        "appended to the history of each of them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Write reconciliation adjustments for the drifted balances'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Accounts compared per query'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Threads used to compare the chunks; 1 compares them inline'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ledgers = (
+            (
+                'freelance', 'student_or_class_id',
+                PurchasedHoursModificationRecord.objects.values_list(
+                    'student_or_class_id', flat=True
+                ),
+                get_purchased_hours_drift,
+                create_purchased_hours_reconciliation_adjustments,
+            ),
+            (
+                'client school', 'student_account_id',
+                CSPurchasedHoursModification.objects.values_list(
+                    'student_account_id', flat=True
+                ),
+                get_cs_purchased_hours_drift,
+                create_cs_purchased_hours_reconciliation_adjustments,
+            ),
+        )
+        for ledger, id_field, account_ids, get_drift, create_adjustments in ledgers:
+            chunks = split_into_chunks(
+                sorted(account_ids.order_by().distinct()), options['chunk_size']
+            )
+            if options['workers'] == 1 or len(chunks) < 2:
+                drift_chunks = [get_drift(chunk) for chunk in chunks]
+            else:
+                with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                    drift_chunks = list(executor.map(
+                        get_drift_in_thread, [get_drift] * len(chunks), chunks
+                    ))
+            drift = [account_drift for chunk in drift_chunks for account_drift in chunk]
+
+            self.stdout.write(
+                f"{ledger.capitalize()} ledger: "
+                f"{sum(len(chunk) for chunk in chunks)} accounts, "
+                f"{len(drift)} drifted"
+            )
+            for account_drift in drift:
+                balance = account_drift.get('balance')
+                self.stdout.write(
+                    "  account {}{}: stored {}, expected {}, {} chain breaks".format(
+                        account_drift[id_field],
+                        f" ({balance})" if balance else "",
+                        account_drift['stored_hours'],
+                        account_drift['expected_hours'],
+                        account_drift['chain_breaks'],
+                    )
+                )
+            if options['fix'] and drift:
+                with transaction.atomic():
+                    adjustment_count = create_adjustments(drift)
+                self.stdout.write(f"  {adjustment_count} adjustments written")
+
+        self.stdout.write(f"Finished in {time.perf_counter() - start:.3f}s")
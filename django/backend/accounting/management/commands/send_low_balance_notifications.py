@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from accounting.balance_notifications import (
+    LOW_BALANCE_HOURS,
+    get_low_balance_accounts_to_notify,
+    get_scheduled_future_hours,
+    group_low_balance_accounts_by_teacher,
+    queue_low_balance_digests,
+)
+from accounting.email_utils import deliver_outbox_messages
+
+
+class Command(BaseCommand):
+    help = (
+        "Emails every teacher one digest of their freelance students who are "
+        "running low on purchased class hours. A student is not included "
+        "again until the balance changes. Meant to run nightly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=Decimal, default=LOW_BALANCE_HOURS,
+            help='Balances at or below this number of hours are low'
+        )
+
+    def handle(self, *args, **options):
+        # 1. one query for the low balance accounts of all teachers
+        account_values = list(get_low_balance_accounts_to_notify(options['hours']))
+
+        # 2. one grouped query for the hours still scheduled for them
+        scheduled_future_hours = get_scheduled_future_hours(
+            {values[3] for values in account_values}
+        )
+        digests = group_low_balance_accounts_by_teacher(
+            account_values, scheduled_future_hours
+        )
+
+        # 3. store the digests in the outbox and deliver all of them over a
+        # single mail connection; messages that fail stay in the outbox
+        # for the deliver_outbox_emails command
+        outbox_ids = queue_low_balance_digests(digests, options['hours'])
+        delivery_counts = {'sent': 0, 'retried': 0, 'failed': 0}
+        if outbox_ids:
+            delivery_counts = deliver_outbox_messages(
+                batch_size=len(outbox_ids), outbox_ids=outbox_ids
+            )
+
+        self.stdout.write(
+            f"Low balance digests: {len(account_values)} students, "
+            f"{len(digests)} teachers"
+        )
+        self.stdout.write(
+            "Outbox delivery finished: {sent} sent, {retried} "
+            "scheduled for retry, {failed} failed".format(**delivery_counts)
+        )
@@ -0,0 +1,143 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import django
+from django.core.management.base import BaseCommand
+
+from accounting.email_utils import (
+    create_class_data_excel_outbox_message,
+    deliver_outbox_messages,
+    get_class_data_excel_file_name,
+)
+from accounting.models import EmailOutboxMessage
+from accounting.report_export import (
+    get_class_values_for_all_teachers_during_month,
+    partition_class_values_by_teacher_and_school,
+    render_school_report_workbook,
+)
+
+
+def get_previous_month_and_year(today=None):
+    if today is None:
+        today = date.today()
+    if today.month == 1:
+        return 12, today.year - 1
+    return today.month - 1, today.year
+
+
+class Command(BaseCommand):
+    help = (
+        "Emails every teacher a monthly report for each school "
+        "where they had paid classes during the month"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month', type=int, choices=range(1, 13),
+            help='Defaults to the previous month'
+        )
+        parser.add_argument('--year', type=int)
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Processes used to render the workbooks; 0 renders them inline'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Also queue the reports already in the outbox for the month'
+        )
+
+    def handle(self, *args, **options):
+        month, year = get_previous_month_and_year()
+        month = options['month'] or month
+        year = options['year'] or year
+        timings = {}
+
+        # 1. one query for the classes of all teachers at all schools
+        stage_start = time.perf_counter()
+        class_values = list(
+            get_class_values_for_all_teachers_during_month(month, year)
+        )
+        timings['query'] = time.perf_counter() - stage_start
+
+        # 2. split the classes into one report per (teacher, school) pair
+        stage_start = time.perf_counter()
+        report_jobs = [
+            report_job for report_job in
+            partition_class_values_by_teacher_and_school(class_values)
+            if report_job['email_address']
+        ]
+        for report_job in report_jobs:
+            report_job['file_name'] = get_class_data_excel_file_name(
+                report_job['teacher_name'], report_job['school_name'], month, year
+            )
+        # a second run for the month leaves out the reports it already
+        # queued, whatever their delivery status, unless --force is given
+        already_queued = set()
+        if not options['force'] and report_jobs:
+            already_queued = set(EmailOutboxMessage.objects.filter(
+                attachment_name__in={
+                    report_job['file_name'] for report_job in report_jobs
+                }
+            ).values_list('recipient', 'attachment_name').order_by())
+        number_of_skipped_reports = len(report_jobs)
+        report_jobs = [
+            report_job for report_job in report_jobs
+            if (report_job['email_address'], report_job['file_name']) not in already_queued
+        ]
+        number_of_skipped_reports -= len(report_jobs)
+        timings['partition'] = time.perf_counter() - stage_start
+
+        # 3. render the workbooks; this is cpu bound, so it runs in processes
+        stage_start = time.perf_counter()
+        render_arguments = [
+            (
+                report_job['class_values'], month, year,
+                report_job['teacher_name'], report_job['email_address']
+            ) for report_job in report_jobs
+        ]
+        if options['workers'] == 0 or len(report_jobs) < 2:
+            workbooks = [
+                render_school_report_workbook(*arguments)
+                for arguments in render_arguments
+            ]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=django.setup
+            ) as executor:
+                workbooks = list(executor.map(
+                    render_school_report_workbook, *zip(*render_arguments)
+                ))
+        timings['render'] = time.perf_counter() - stage_start
+
+        # 4. store the emails in the outbox
+        stage_start = time.perf_counter()
+        outbox_ids = [
+            create_class_data_excel_outbox_message(
+                workbook, month, year, report_job['email_address'],
+                report_job['teacher_name'], report_job['school_name']
+            ).id for report_job, workbook in zip(report_jobs, workbooks)
+        ]
+        timings['queue'] = time.perf_counter() - stage_start
+
+        # 5. deliver all of them over a single mail connection; messages
+        # that fail stay in the outbox for the deliver_outbox_emails command
+        stage_start = time.perf_counter()
+        delivery_counts = {'sent': 0, 'retried': 0, 'failed': 0}
+        if outbox_ids:
+            delivery_counts = deliver_outbox_messages(
+                batch_size=len(outbox_ids), outbox_ids=outbox_ids
+            )
+        timings['deliver'] = time.perf_counter() - stage_start
+
+        self.stdout.write(
+            f"Monthly school reports for {month}/{year}: "
+            f"{len(class_values)} classes, {len(report_jobs)} reports, "
+            f"{number_of_skipped_reports} already in the outbox"
+        )
+        self.stdout.write(
+            "Outbox delivery finished: {sent} sent, {retried} "
+            "scheduled for retry, {failed} failed".format(**delivery_counts)
+        )
+        for stage, seconds in timings.items():
+            self.stdout.write(f"  {stage}: {seconds:.3f}s")
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profiles', '0003_alter_userprofile_account_type'),
+        ('accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=200)),
+                ('subject', models.CharField(max_length=300)),
+                ('body', models.TextField()),
+                ('attachment_name', models.CharField(blank=True, default='', max_length=300)),
+                ('attachment_content', models.BinaryField(blank=True, null=True)),
+                ('attachment_mimetype', models.CharField(blank=True, default='', max_length=200)),
+                ('delivery_status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=200)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('time_stamp', models.DateTimeField(auto_now_add=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='email_outbox_messages', to='user_profiles.userprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Email Outbox Messages',
+                'ordering': ('-time_stamp',),
+                'indexes': [models.Index(fields=['delivery_status', 'next_attempt_at'], name='outbox_status_next_attempt_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_emailoutboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='freelancetuitiontransactionrecord',
+            index=models.Index(fields=['student_or_class', 'time_stamp'], name='tuition_student_time_idx'),
+        ),
+    ]
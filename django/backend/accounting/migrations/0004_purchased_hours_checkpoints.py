@@ -0,0 +1,40 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_account', '0009_alter_studentorclass_options'),
+        ('accounting', '0003_freelancetuitiontransactionrecord_time_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchasedHoursCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+                ('purchased_class_hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('time_stamp', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('student_or_class', '-as_of'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='purchasedhoursmodificationrecord',
+            index=models.Index(fields=['student_or_class', 'time_stamp'], name='hours_mod_student_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='purchasedhourscheckpoint',
+            name='student_or_class',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchased_hours_checkpoints', to='student_account.studentorclass'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='purchasedhourscheckpoint',
+            unique_together={('student_or_class', 'as_of')},
+        ),
+    ]
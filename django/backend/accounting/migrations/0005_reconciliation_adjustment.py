@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_purchased_hours_checkpoints'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='purchasedhoursmodificationrecord',
+            name='tuition_transaction_modified_scheduled_class_null_check',
+        ),
+        migrations.AlterField(
+            model_name='purchasedhoursmodificationrecord',
+            name='modification_type',
+            field=models.CharField(choices=[('tuition_payment_add', 'Tuition Payment'), ('tuition_refund_deduct', 'Tuition Refund'), ('class_status_modification_add', 'Class Status Modification: Hours Added'), ('class_status_modification_deduct', 'Class Status Modification: Hours Deducted'), ('reconciliation_adjustment', 'Reconciliation Adjustment')], default='class_status_modification_deduct', max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='purchasedhoursmodificationrecord',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('tuition_transaction__isnull', True), models.Q(('modification_type', 'class_status_modification_add'), ('modification_type', 'class_status_modification_deduct'), _connector='OR'), ('modified_scheduled_class__isnull', False)), models.Q(('modified_scheduled_class__isnull', True), models.Q(('modification_type', 'tuition_payment_add'), ('modification_type', 'tuition_refund_deduct'), _connector='OR'), ('tuition_transaction__isnull', False)), models.Q(('modification_type', 'reconciliation_adjustment'), ('tuition_transaction__isnull', True), ('modified_scheduled_class__isnull', True)), _connector='OR'), name='tuition_transaction_modified_scheduled_class_null_check'),
+        ),
+    ]
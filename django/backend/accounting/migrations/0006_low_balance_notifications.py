@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_account', '0010_studentorclass_type_hours_idx'),
+        ('accounting', '0005_reconciliation_adjustment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowBalanceNotificationRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notified_purchased_class_hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('time_stamp', models.DateTimeField(auto_now=True)),
+                ('student_or_class', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='low_balance_notification', to='student_account.studentorclass')),
+            ],
+            options={
+                'verbose_name_plural': 'Low Balance Notification Records',
+                'ordering': ('-time_stamp',),
+            },
+        ),
+    ]
@@ -1,8 +1,10 @@
 from django.db import models
 from decimal import Decimal
 from django.db.models import CheckConstraint, Q
+from django.utils import timezone
 from class_scheduling.models import ScheduledClass
 from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
 from .validation import validate_number_of_hours_purchased
 
 
@@ -16,6 +18,13 @@ ACCOUNT_BALANCE_ALTERATION_TYPE = (
     ('tuition_refund_deduct', 'Tuition Refund'),
     ('class_status_modification_add', "Class Status Modification: Hours Added"),
     ('class_status_modification_deduct', "Class Status Modification: Hours Deducted"),
+    ('reconciliation_adjustment', "Reconciliation Adjustment"),
+)
+
+DELIVERY_STATUS = (
+    ('pending', 'Pending'),
+    ('sent', 'Sent'),
+    ('failed', 'Failed'),
 )
 
 
@@ -56,6 +65,14 @@ class FreelanceTuitionTransactionRecord(models.Model):
             self.student_or_class.purchased_class_hours -= hours_as_decimal
         self.student_or_class.save()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['student_or_class', 'time_stamp'],
+                name='tuition_student_time_idx'
+            ),
+        ]
+
 
 class PurchasedHoursModificationRecord(models.Model):
     student_or_class = models.ForeignKey(
@@ -94,6 +111,11 @@ class PurchasedHoursModificationRecord(models.Model):
                 str(self.tuition_transaction.class_hours_purchased_or_refunded),
                 formatted_time
             )
+        elif self.modification_type == 'reconciliation_adjustment':
+            return "Reconciliation Adjustment: {} at {}".format(
+                str(self.student_or_class.student_or_class_name).title(),
+                formatted_time
+            )
         else:
             return "Class Status Modification: {} at {}".format(
                 str(self.student_or_class.student_or_class_name).title(),
@@ -128,9 +150,109 @@ class PurchasedHoursModificationRecord(models.Model):
                         )
                         & Q(tuition_transaction__isnull=False)
                     )
+                    |
+                    (
+                        Q(modification_type="reconciliation_adjustment")
+                        & Q(tuition_transaction__isnull=True)
+                        & Q(modified_scheduled_class__isnull=True)
+                    )
 
                 ),
                 name="tuition_transaction_modified_scheduled_class_null_check",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['student_or_class', 'time_stamp'],
+                name='hours_mod_student_time_idx'
+            ),
+        ]
+
+
+# the purchased class hours of an account at the as_of time, so that
+# historical balances only need the modifications made after the checkpoint
+class PurchasedHoursCheckpoint(models.Model):
+    student_or_class = models.ForeignKey(
+        StudentOrClass, on_delete=models.CASCADE,
+        related_name='purchased_hours_checkpoints',
+    )
+    as_of = models.DateTimeField()
+    purchased_class_hours = models.DecimalField(
+        max_digits=5, decimal_places=2,
+    )
+    time_stamp = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "{}: {}hrs as of {}".format(
+            self.student_or_class.student_or_class_name,
+            self.purchased_class_hours,
+            self.as_of.strftime("%Y-%m-%d %H:%M")
+        )
+
+    class Meta:
+        ordering = ('student_or_class', '-as_of')
+        unique_together = ('student_or_class', 'as_of')
+
+
+
+class EmailOutboxMessage(models.Model):
+    requested_by = models.ForeignKey(
+        UserProfile, on_delete=models.SET_NULL,
+        related_name='email_outbox_messages',
+        blank=True, null=True
+    )
+    recipient = models.EmailField(max_length=200)
+    subject = models.CharField(max_length=300)
+    body = models.TextField()
+    attachment_name = models.CharField(max_length=300, default='', blank=True)
+    attachment_content = models.BinaryField(blank=True, null=True)
+    attachment_mimetype = models.CharField(max_length=200, default='', blank=True)
+    delivery_status = models.CharField(
+        max_length=200, choices=DELIVERY_STATUS, default='pending'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(default='', blank=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    time_stamp = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
+        return "{} to {} ({}) at {}".format(
+            self.subject, self.recipient,
+            self.delivery_status, formatted_time
+        )
+
+    class Meta:
+        verbose_name_plural = 'Email Outbox Messages'
+        ordering = ('-time_stamp',)
+        indexes = [
+            models.Index(
+                fields=['delivery_status', 'next_attempt_at'],
+                name='outbox_status_next_attempt_idx'
+            ),
+        ]
+
+
+# the balance a freelance student's teacher was last notified about, so
+# that the teacher is not notified again until the balance changes
+class LowBalanceNotificationRecord(models.Model):
+    student_or_class = models.OneToOneField(
+        StudentOrClass, on_delete=models.CASCADE,
+        related_name='low_balance_notification',
+    )
+    notified_purchased_class_hours = models.DecimalField(
+        max_digits=5, decimal_places=2,
+    )
+    time_stamp = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{}: notified at {}hrs on {}".format(
+            self.student_or_class.student_or_class_name,
+            self.notified_purchased_class_hours,
+            self.time_stamp.strftime("%Y-%m-%d %H:%M")
+        )
 
+    class Meta:
+        verbose_name_plural = 'Low Balance Notification Records'
+        ordering = ('-time_stamp',)
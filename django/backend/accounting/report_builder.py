@@ -0,0 +1,308 @@
+from datetime import timedelta
+
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from class_scheduling.utils import determine_duration_of_class_time
+from .utils import (
+    get_scheduled_classes_at_school_during_date_range,
+    get_scheduled_classes_at_school_during_month_period,
+    get_scheduled_classes_during_month_period,
+)
+
+
+PAID_CLASS_STATUSES = ('completed', 'same_day_cancellation')
+
+# the columns the builder needs from each scheduled class; pulling these
+# with values_list() avoids building model instances for every class
+EARNINGS_REPORT_VALUES = (
+    'student_or_class_id',
+    'student_or_class__student_or_class_name',
+    'student_or_class__tuition_per_hour',
+    'student_or_class__school_id',
+    'student_or_class__school__school_name',
+    'start_time',
+    'finish_time',
+    'class_status',
+)
+
+
+class StudentReportRecord:
+    __slots__ = ('account_id', 'name', 'rate', 'hours')
+
+    def __init__(self, account_id, name, rate):
+        self.account_id = account_id
+        self.name = name
+        self.rate = rate
+        self.hours = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "account_id": self.account_id,
+            "rate": self.rate,
+            "hours": self.hours,
+            "total": self.rate * self.hours
+        }
+
+
+class SchoolReportRecord:
+    __slots__ = ('school_name', 'students')
+
+    def __init__(self, school_name):
+        self.school_name = school_name
+        self.students = {}
+
+    def to_dict(self):
+        students_reports = sort_student_records_by_name(self.students)
+        school_total = 0
+        for student_report in students_reports:
+            school_total += student_report["total"]
+        return {
+            "school_name": self.school_name,
+            "students_reports": students_reports,
+            "school_total": school_total
+        }
+
+
+def sort_student_records_by_name(students):
+    return sorted(
+        (student.to_dict() for student in students.values()),
+        key=lambda report: report['name']
+    )
+
+
+class EarningsReportBuilder:
+    """
+    Builds the estimated earnings report in a single pass over
+    a stream of EARNINGS_REPORT_VALUES tuples.
+
+    The classes are accumulated into one record per school and student,
+    and only the finished report is sorted and totalled in build().
+    """
+    __slots__ = ('schools', 'freelance_students')
+
+    def __init__(self):
+        self.schools = {}
+        self.freelance_students = {}
+
+    def add_class(self, class_values):
+        (
+            student_id, student_name, rate, school_id, school_name,
+            start_time, finish_time, class_status
+        ) = class_values
+        if school_id is not None:
+            school = self.schools.get(school_id)
+            if school is None:
+                school = self.schools[school_id] = SchoolReportRecord(school_name)
+            students = school.students
+        else:
+            students = self.freelance_students
+
+        student = students.get(student_id)
+        if student is None:
+            student = students[student_id] = StudentReportRecord(
+                student_id, student_name, rate
+            )
+        # unpaid classes still add the student to the report with 0 hours
+        if class_status in PAID_CLASS_STATUSES:
+            student.hours += determine_duration_of_class_time(
+                start_time, finish_time
+            )
+
+    def consume(self, class_values_stream):
+        for class_values in class_values_stream:
+            self.add_class(class_values)
+        return self
+
+    def build_school_reports(self):
+        return [
+            school.to_dict() for school in sorted(
+                self.schools.values(), key=lambda school: school.school_name
+            )
+        ]
+
+    def build(self):
+        classes_in_schools = self.build_school_reports()
+        freelance_students = sort_student_records_by_name(self.freelance_students)
+
+        overall_monthly_total = 0
+        for school_report in classes_in_schools:
+            overall_monthly_total += school_report["school_total"]
+        for student_report in freelance_students:
+            overall_monthly_total += student_report["total"]
+
+        return {
+            "classes_in_schools": classes_in_schools,
+            "freelance_students": freelance_students,
+            "overall_monthly_total": overall_monthly_total
+        }
+
+
+def iter_earnings_report_values(scheduled_classes):
+    return scheduled_classes.values_list(*EARNINGS_REPORT_VALUES).iterator()
+
+
+def build_single_school_report(scheduled_classes, school):
+    school_reports = EarningsReportBuilder().consume(
+        iter_earnings_report_values(scheduled_classes)
+    ).build_school_reports()
+    if len(school_reports) > 0:
+        return school_reports[0]
+    return {
+        "school_name": school.school_name,
+        "students_reports": [],
+        "school_total": float(0)
+    }
+
+
+# these return the same structures as the generate_estimated_* functions
+# in accounting.utils, without loading model instances or re-copying the report
+def build_estimated_earnings_report(teacher, month, year):
+    return EarningsReportBuilder().consume(
+        iter_earnings_report_values(
+            get_scheduled_classes_during_month_period(teacher, month, year)
+        )
+    ).build()
+
+
+def build_estimated_monthly_earnings_report_for_single_school(
+        teacher, school, month, year
+):
+    return build_single_school_report(
+        get_scheduled_classes_at_school_during_month_period(
+            teacher, school, month, year
+        ),
+        school
+    )
+
+
+def build_estimated_earnings_report_for_single_school_within_date_range(
+        teacher, school, start_date, finish_date
+):
+    return build_single_school_report(
+        get_scheduled_classes_at_school_during_date_range(
+            teacher=teacher, school=school,
+            start_date=start_date, finish_date=finish_date
+        ),
+        school
+    )
+
+
+# semi-month buckets are truncated to the month and split
+# on the 15th with the half annotation below
+REPORT_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'semi-month': TruncMonth,
+    'month': TruncMonth,
+}
+
+BUCKETED_REPORT_VALUES = (
+    'bucket',
+    'half',
+    'student_or_class_id',
+    'student_or_class__student_or_class_name',
+    'student_or_class__tuition_per_hour',
+    'start_time',
+    'finish_time',
+    'class_status',
+)
+
+
+def get_bucket_date_range(bucket, bucket_start):
+    # returns the first and last day (inclusive) of the bucket
+    if bucket == 'day':
+        return bucket_start, bucket_start
+    if bucket == 'week':
+        return bucket_start, bucket_start + timedelta(days=6)
+    next_month = (bucket_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if bucket == 'semi-month' and bucket_start.day == 1:
+        return bucket_start, bucket_start.replace(day=15)
+    return bucket_start, next_month - timedelta(days=1)
+
+
+def get_bucketed_class_counts(scheduled_classes, bucket):
+    """
+    Groups the classes by bucket, student, class times and status in a single
+    query, so each row carries the number of identical classes in the bucket.
+    """
+    return scheduled_classes.annotate(
+        bucket=REPORT_BUCKETS[bucket]('date'),
+        half=Case(
+            When(date__day__gt=15, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        ) if bucket == 'semi-month' else Value(0, output_field=IntegerField()),
+    ).order_by().values(
+        *BUCKETED_REPORT_VALUES
+    ).annotate(
+        number_of_classes=Count('id')
+    ).order_by('bucket', 'half')
+
+
+def build_bucketed_school_report(scheduled_classes, school, bucket, start_date, finish_date):
+    school_record = SchoolReportRecord(school.school_name)
+    bucket_records = {}
+    for class_count in get_bucketed_class_counts(scheduled_classes, bucket):
+        bucket_start = class_count['bucket']
+        if hasattr(bucket_start, 'date'):
+            bucket_start = bucket_start.date()
+        if class_count['half']:
+            bucket_start = bucket_start.replace(day=16)
+        bucket_record = bucket_records.get(bucket_start)
+        if bucket_record is None:
+            bucket_record = bucket_records[bucket_start] = SchoolReportRecord(
+                school.school_name
+            )
+
+        hours = 0
+        if class_count['class_status'] in PAID_CLASS_STATUSES:
+            hours = determine_duration_of_class_time(
+                class_count['start_time'], class_count['finish_time']
+            ) * class_count['number_of_classes']
+        # the same student record type is used for the bucket and the whole range
+        for students in (bucket_record.students, school_record.students):
+            student = students.get(class_count['student_or_class_id'])
+            if student is None:
+                student = students[class_count['student_or_class_id']] = StudentReportRecord(
+                    class_count['student_or_class_id'],
+                    class_count['student_or_class__student_or_class_name'],
+                    class_count['student_or_class__tuition_per_hour']
+                )
+            student.hours += hours
+
+    buckets = []
+    for bucket_start, bucket_record in sorted(bucket_records.items()):
+        bucket_start_date, bucket_finish_date = get_bucket_date_range(bucket, bucket_start)
+        bucket_report = bucket_record.to_dict()
+        del bucket_report['school_name']
+        # the first and last buckets are cut to the requested range, whose
+        # finish date is not included in the classes
+        buckets.append({
+            "start_date": max(start_date, bucket_start_date),
+            "finish_date": min(finish_date - timedelta(days=1), bucket_finish_date),
+            **bucket_report
+        })
+
+    school_report = school_record.to_dict()
+    if not school_record.students:
+        school_report["school_total"] = float(0)
+    school_report["bucket"] = bucket
+    school_report["buckets"] = buckets
+    return school_report
+
+
+def build_bucketed_estimated_earnings_report_for_single_school_within_date_range(
+        teacher, school, start_date, finish_date, bucket
+):
+    return build_bucketed_school_report(
+        get_scheduled_classes_at_school_during_date_range(
+            teacher=teacher, school=school,
+            start_date=start_date, finish_date=finish_date
+        ),
+        school,
+        bucket,
+        start_date,
+        finish_date
+    )
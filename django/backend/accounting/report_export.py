@@ -0,0 +1,275 @@
+import re
+import tempfile
+from itertools import groupby
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+from class_scheduling.models import ScheduledClass
+from class_scheduling.utils import determine_duration_of_class_time
+from .report_builder import PAID_CLASS_STATUSES
+from .utils import (
+    format_date_range_same_month,
+    get_month_date_range,
+    get_scheduled_classes_at_school_during_month_period,
+    get_scheduled_classes_during_month_period,
+)
+
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+REPORT_HEADERS = [
+    "", "Class", "HR per times(H)", "Times(T)",
+    "Total Hrs(TH=T*H)", "Pay per HR(P)", "Taxi(A)", "Total Pay(TP=TH*P+A*T)"
+]
+
+# only the columns needed for the report are pulled from the database,
+# so no model instances are kept alive while the workbook is written
+CLASS_REPORT_VALUES = (
+    'student_or_class__school_id',
+    'student_or_class__school__school_name',
+    'student_or_class_id',
+    'student_or_class__student_or_class_name',
+    'student_or_class__tuition_per_hour',
+    'date',
+    'start_time',
+    'finish_time',
+)
+
+INVALID_SHEET_TITLE_CHARACTERS = re.compile(r'[\\/*?:\[\]]')
+
+
+def iter_duration_rows_for_student(student_class_values):
+    # the classes of a single student/class are sub-sorted by duration
+    # to match the accounting report format used at my current job
+    classes_by_duration = {}
+    student_or_class_name = None
+    pay_rate = 0
+    for class_values in student_class_values:
+        student_or_class_name = class_values[3]
+        pay_rate = class_values[4]
+        duration = determine_duration_of_class_time(
+            class_values[6], class_values[7]
+        )
+        classes_by_duration.setdefault(duration, []).append(class_values[5])
+
+    for duration, class_dates in sorted(classes_by_duration.items()):
+        number_of_classes = len(class_dates)
+        total_hours = number_of_classes * duration
+        yield {
+            "student_or_class_name": student_or_class_name,
+            "scheduled_classes": format_date_range_same_month(class_dates),
+            "pay rate": pay_rate,
+            "class_duration": duration,
+            "total_hours": total_hours,
+            "number_of_classes": number_of_classes,
+            "payment": total_hours * pay_rate
+        }
+
+
+def iter_duration_rows(class_values):
+    # class_values must be ordered by student/class so that
+    # only one student's classes are held in memory at a time
+    for _, student_class_values in groupby(class_values, key=lambda values: values[2]):
+        yield from iter_duration_rows_for_student(student_class_values)
+
+
+def order_classes_for_excel_report(queryset):
+    return queryset.filter(
+        class_status__in=PAID_CLASS_STATUSES
+    ).order_by(
+        'student_or_class__school__school_name',
+        'student_or_class__student_or_class_name',
+        'student_or_class_id',
+        '-date',
+        'start_time',
+    ).values_list(*CLASS_REPORT_VALUES)
+
+
+def iter_school_report_rows(teacher, school, month, year):
+    queryset = order_classes_for_excel_report(
+        get_scheduled_classes_at_school_during_month_period(
+            teacher, school, month, year
+        )
+    )
+    return iter_duration_rows(queryset.iterator())
+
+
+def iter_school_report_sheets(teacher, month, year):
+    """
+    Streams the classes of every school for the month in a single query
+    and yields a (school_name, rows) pair for each school, in alphabetical order.
+    Each rows iterator must be consumed before advancing to the next school.
+    """
+    queryset = order_classes_for_excel_report(
+        get_scheduled_classes_during_month_period(
+            teacher, month, year
+        ).filter(student_or_class__school__isnull=False)
+    )
+    for (_, school_name), school_class_values in groupby(
+            queryset.iterator(), key=lambda values: (values[0], values[1])
+    ):
+        yield school_name, iter_duration_rows(school_class_values)
+
+
+def make_sheet_title(name, used_titles):
+    # excel sheet titles are limited to 31 characters without \ / * ? : [ ]
+    title = INVALID_SHEET_TITLE_CHARACTERS.sub('', name).strip()[:31] or 'Sheet'
+    candidate = title
+    suffix = 2
+    while candidate in used_titles:
+        candidate = f"{title[:31 - len(str(suffix)) - 1]} {suffix}"
+        suffix += 1
+    used_titles.add(candidate)
+    return candidate
+
+
+def write_report_sheet(
+        workbook, title, rows, date_string, teacher_name, email_address
+):
+    worksheet = workbook.create_sheet(title=title)
+    worksheet.column_dimensions['B'].width = 32.5
+
+    # write date, teacher's name, and email address
+    worksheet.append([
+        date_string, teacher_name, None, None, None, None, None, None, email_address
+    ])
+
+    headers = []
+    for header in REPORT_HEADERS:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+        headers.append(cell)
+    worksheet.append(headers)
+
+    total_pay = 0
+    total_hours = 0
+    for entry in rows:
+        worksheet.append([
+            None,
+            f"{entry['student_or_class_name']} {entry['scheduled_classes']}",
+            entry['class_duration'],
+            entry['number_of_classes'],
+            entry['total_hours'],
+            entry['pay rate'],
+            0,  # Taxi(A)
+            entry['payment'],
+        ])
+        total_pay += entry['payment']
+        total_hours += entry['total_hours']
+
+    worksheet.append(["FS", None, None, None, total_hours, None, None, total_pay])
+    return worksheet
+
+
+def save_workbook_to_temporary_file(workbook):
+    # write-only workbooks spool their rows to disk, so the finished
+    # file is also kept on disk instead of in a BytesIO buffer
+    report_file = tempfile.TemporaryFile()
+    workbook.save(report_file)
+    report_file.seek(0)
+    return report_file
+
+
+def build_school_report_workbook_file(
+        rows, month, year, teacher_name, email_address
+):
+    workbook = Workbook(write_only=True)
+    write_report_sheet(
+        workbook=workbook,
+        title=str(month),
+        rows=rows,
+        date_string=F'{month}/{year}',
+        teacher_name=teacher_name,
+        email_address=email_address,
+    )
+    return save_workbook_to_temporary_file(workbook)
+
+
+def build_all_schools_report_workbook_file(
+        teacher, month, year
+):
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    for school_name, rows in iter_school_report_sheets(teacher, month, year):
+        write_report_sheet(
+            workbook=workbook,
+            title=make_sheet_title(school_name, used_titles),
+            rows=rows,
+            date_string=F'{month}/{year}',
+            teacher_name=teacher.given_name,
+            email_address=teacher.contact_email,
+        )
+    if not used_titles:
+        # an xlsx file must contain at least one sheet
+        write_report_sheet(
+            workbook=workbook,
+            title=str(month),
+            rows=[],
+            date_string=F'{month}/{year}',
+            teacher_name=teacher.given_name,
+            email_address=teacher.contact_email,
+        )
+    return save_workbook_to_temporary_file(workbook)
+
+
+def get_class_values_for_all_teachers_during_month(month, year):
+    """
+    Pulls every paid school class of every teacher for the month in one query.
+    Each row is (teacher_id, teacher_given_name, teacher_contact_email)
+    followed by the CLASS_REPORT_VALUES columns.
+    """
+    start_date, finish_date = get_month_date_range(month, year)
+    return ScheduledClass.objects.filter(
+        date__gte=start_date,
+        date__lt=finish_date,
+        student_or_class__school__isnull=False,
+        class_status__in=PAID_CLASS_STATUSES,
+    ).order_by(
+        'teacher_id',
+        'student_or_class__school__school_name',
+        'student_or_class__student_or_class_name',
+        'student_or_class_id',
+        '-date',
+        'start_time',
+    ).values_list(
+        'teacher_id', 'teacher__given_name', 'teacher__contact_email',
+        *CLASS_REPORT_VALUES
+    )
+
+
+def partition_class_values_by_teacher_and_school(class_values):
+    """
+    Splits the rows of get_class_values_for_all_teachers_during_month into
+    one report job per (teacher, school) pair, keeping the query ordering.
+    """
+    report_jobs = {}
+    for values in class_values:
+        teacher_id, teacher_name, email_address = values[:3]
+        school_class_values = values[3:]
+        key = (teacher_id, school_class_values[0])
+        if key not in report_jobs:
+            report_jobs[key] = {
+                'teacher_id': teacher_id,
+                'teacher_name': teacher_name,
+                'email_address': email_address,
+                'school_name': school_class_values[1],
+                'class_values': [],
+            }
+        report_jobs[key]['class_values'].append(school_class_values)
+    return list(report_jobs.values())
+
+
+def render_school_report_workbook(
+        class_values, month, year, teacher_name, email_address
+):
+    # module level and free of database access so that it
+    # can be run in a worker process of a process pool
+    report_file = build_school_report_workbook_file(
+        rows=iter_duration_rows(class_values),
+        month=month, year=year,
+        teacher_name=teacher_name, email_address=email_address
+    )
+    with report_file:
+        return report_file.read()
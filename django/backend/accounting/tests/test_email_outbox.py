@@ -0,0 +1,367 @@
+import io
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from datetime import date, time, timedelta
+from unittest.mock import patch
+
+from accounting.email_utils import DELIVERY_LEASE, deliver_outbox_messages
+from accounting.models import EmailOutboxMessage
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from class_scheduling.models import ScheduledClass
+from school.models import School
+
+User = get_user_model()
+
+EMAIL_SCHOOL_REPORT_URL = '/api/accounting/email-estimated-school-earnings-by-month-year/{month}/{year}/{school_id}/'
+EMAIL_OUTBOX_STATUS_URL = '/api/accounting/email-outbox/{outbox_id}/'
+
+
+def get_test_user(username='testteacher', password='testpassword'):
+    """Helper function to create a test user"""
+    return User.objects.create_user(username, password)
+
+
+def create_test_teacher_profile(user, surname='Smith', given_name='John'):
+    """Helper function to create a teacher profile"""
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{user.username}@test.com',
+        surname=surname,
+        given_name=given_name
+    )
+
+
+def create_test_school(teacher_profile, name='Test School'):
+    """Helper function to create a school"""
+    return School.objects.create(
+        school_name=name,
+        address_line_1='123 Main St',
+        address_line_2='Suite 100',
+        contact_phone='5551234567',
+        scheduling_teacher=teacher_profile
+    )
+
+
+def create_outbox_message(recipient='teacher@test.com', **kwargs):
+    """Helper function to create a pending outbox message"""
+    return EmailOutboxMessage.objects.create(
+        recipient=recipient,
+        subject='Test School Monthly Report: 11/2024',
+        body='Test body',
+        **kwargs
+    )
+
+
+class EmailOutboxPublicApiTests(TestCase):
+    """Test the publicly available email outbox API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required_for_outbox_status(self):
+        """Test that login is required for retrieving an outbox message status"""
+        print("Test that login is required for retrieving an outbox message status")
+
+        outbox_message = create_outbox_message()
+        res = self.client.get(
+            EMAIL_OUTBOX_STATUS_URL.format(outbox_id=outbox_message.id)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class EmailOutboxPrivateApiTests(TestCase):
+    """Test queuing emailed reports and checking their delivery status"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(self.teacher_user)
+        self.client.force_authenticate(self.teacher_user)
+        self.school = create_test_school(self.teacher_profile, name='Alpha Academy')
+        student = StudentOrClass.objects.create(
+            student_or_class_name='Amy Anderson',
+            account_type='school',
+            school=self.school,
+            teacher=self.teacher_profile,
+            tuition_per_hour=900,
+        )
+        ScheduledClass.objects.create(
+            teacher=self.teacher_profile,
+            student_or_class=student,
+            date=date(2024, 11, 5),
+            start_time=time(10, 0),
+            finish_time=time(10, 59),
+            class_status='completed'
+        )
+
+    def test_email_report_is_queued_and_returns_202(self):
+        """Test that the emailed report is queued instead of sent in the request"""
+        print("Test that the emailed report is queued instead of sent in the request")
+
+        url = EMAIL_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school.id
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(mail.outbox), 0)
+        outbox_message = EmailOutboxMessage.objects.get(id=res.data['outbox_id'])
+        self.assertEqual(outbox_message.delivery_status, 'pending')
+        self.assertEqual(outbox_message.recipient, 'teacher1@test.com')
+        self.assertEqual(outbox_message.requested_by, self.teacher_profile)
+        self.assertEqual(
+            outbox_message.attachment_name, 'John_Alpha Academy_11/2024.xlsx'
+        )
+        self.assertTrue(outbox_message.attachment_content)
+
+    def test_outbox_status_reflects_delivery(self):
+        """Test that the status endpoint reports the delivery status"""
+        print("Test that the status endpoint reports the delivery status")
+
+        url = EMAIL_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school.id
+        )
+        outbox_id = self.client.get(url).data['outbox_id']
+        status_url = EMAIL_OUTBOX_STATUS_URL.format(outbox_id=outbox_id)
+
+        res = self.client.get(status_url)
+        self.assertEqual(res.data['delivery_status'], 'pending')
+
+        call_command('deliver_outbox_emails', stdout=io.StringIO())
+
+        res = self.client.get(status_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['delivery_status'], 'sent')
+        self.assertEqual(res.data['attempts'], 1)
+        self.assertIsNotNone(res.data['sent_at'])
+
+    def test_other_users_cannot_see_outbox_message(self):
+        """Test that a teacher cannot retrieve another teacher's outbox message"""
+        print("Test that a teacher cannot retrieve another teacher's outbox message")
+
+        outbox_message = create_outbox_message(requested_by=self.teacher_profile)
+        other_user = get_test_user(username='teacher2', password='testpass123')
+        create_test_teacher_profile(other_user)
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(
+            EMAIL_OUTBOX_STATUS_URL.format(outbox_id=outbox_message.id)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class DeliverOutboxMessagesTests(TestCase):
+    """Test the outbox delivery worker"""
+
+    def test_delivers_pending_messages_in_one_batch(self):
+        """Test that all pending messages are sent over one connection"""
+        print("Test that all pending messages are sent over one connection")
+
+        for index in range(3):
+            create_outbox_message(recipient=f'teacher{index}@test.com')
+
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.open'
+        ) as mock_open:
+            delivery_counts = deliver_outbox_messages(batch_size=10)
+
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(delivery_counts, {'sent': 3, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(
+            EmailOutboxMessage.objects.exclude(delivery_status='sent').exists()
+        )
+
+    def test_sent_messages_are_not_sent_again(self):
+        """Test that a delivered message is not delivered twice"""
+        print("Test that a delivered message is not delivered twice")
+
+        create_outbox_message()
+        deliver_outbox_messages()
+        delivery_counts = deliver_outbox_messages()
+
+        self.assertEqual(delivery_counts, {'sent': 0, 'retried': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_size_limits_messages_sent(self):
+        """Test that the batch size limits the number of messages per run"""
+        print("Test that the batch size limits the number of messages per run")
+
+        for index in range(3):
+            create_outbox_message(recipient=f'teacher{index}@test.com')
+
+        delivery_counts = deliver_outbox_messages(batch_size=2)
+
+        self.assertEqual(delivery_counts['sent'], 2)
+        self.assertEqual(
+            EmailOutboxMessage.objects.filter(delivery_status='pending').count(), 1
+        )
+
+    def test_failed_message_is_retried_with_backoff(self):
+        """Test that a failed send is rescheduled with exponential backoff"""
+        print("Test that a failed send is rescheduled with exponential backoff")
+
+        outbox_message = create_outbox_message()
+        before = timezone.now()
+        with patch(
+            'django.core.mail.EmailMessage.send',
+            side_effect=ConnectionError('SMTP handshake failed')
+        ):
+            delivery_counts = deliver_outbox_messages()
+
+        outbox_message.refresh_from_db()
+        self.assertEqual(delivery_counts['retried'], 1)
+        self.assertEqual(outbox_message.delivery_status, 'pending')
+        self.assertEqual(outbox_message.attempts, 1)
+        self.assertEqual(outbox_message.last_error, 'SMTP handshake failed')
+        self.assertGreaterEqual(
+            outbox_message.next_attempt_at, before + timedelta(minutes=1)
+        )
+
+        # not due yet, so the next run does not pick it up
+        self.assertEqual(deliver_outbox_messages()['sent'], 0)
+
+        EmailOutboxMessage.objects.filter(id=outbox_message.id).update(
+            next_attempt_at=timezone.now()
+        )
+        with patch(
+            'django.core.mail.EmailMessage.send',
+            side_effect=ConnectionError('SMTP handshake failed')
+        ):
+            deliver_outbox_messages()
+        outbox_message.refresh_from_db()
+        self.assertEqual(outbox_message.attempts, 2)
+        self.assertGreaterEqual(
+            outbox_message.next_attempt_at, before + timedelta(minutes=2)
+        )
+
+    def test_message_fails_after_max_attempts(self):
+        """Test that a message is marked as failed after the last attempt"""
+        print("Test that a message is marked as failed after the last attempt")
+
+        outbox_message = create_outbox_message(attempts=4)
+        with patch(
+            'django.core.mail.EmailMessage.send',
+            side_effect=ConnectionError('SMTP handshake failed')
+        ):
+            delivery_counts = deliver_outbox_messages(max_attempts=5)
+
+        outbox_message.refresh_from_db()
+        self.assertEqual(delivery_counts['failed'], 1)
+        self.assertEqual(outbox_message.delivery_status, 'failed')
+        self.assertEqual(outbox_message.attempts, 5)
+
+    def test_one_failure_does_not_block_the_batch(self):
+        """Test that the other messages in a batch are sent when one fails"""
+        print("Test that the other messages in a batch are sent when one fails")
+
+        failing_message = create_outbox_message(recipient='bad@test.com')
+        create_outbox_message(recipient='good@test.com')
+        original_send = mail.EmailMessage.send
+
+        def send_or_fail(message, *args, **kwargs):
+            if message.to == ['bad@test.com']:
+                raise ConnectionError('Recipient refused')
+            return original_send(message, *args, **kwargs)
+
+        with patch('django.core.mail.EmailMessage.send', send_or_fail):
+            delivery_counts = deliver_outbox_messages()
+
+        self.assertEqual(delivery_counts, {'sent': 1, 'retried': 1, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        failing_message.refresh_from_db()
+        self.assertEqual(failing_message.last_error, 'Recipient refused')
+
+    def test_connection_failure_reschedules_batch(self):
+        """Test that a failure to connect reschedules every message in the batch"""
+        print("Test that a failure to connect reschedules every message in the batch")
+
+        create_outbox_message()
+        create_outbox_message()
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.open',
+            side_effect=OSError('Connection refused')
+        ):
+            delivery_counts = deliver_outbox_messages()
+
+        self.assertEqual(delivery_counts['retried'], 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_stopping_mid_batch_keeps_sent_messages(self):
+        """Test that messages sent before a worker stops are not sent again"""
+        print("Test that messages sent before a worker stops are not sent again")
+
+        sent_message = create_outbox_message(recipient='first@test.com')
+        unsent_message = create_outbox_message(recipient='second@test.com')
+        original_send = mail.EmailMessage.send
+
+        def send_or_stop(message, *args, **kwargs):
+            if message.to == ['second@test.com']:
+                raise KeyboardInterrupt
+            return original_send(message, *args, **kwargs)
+
+        with patch('django.core.mail.EmailMessage.send', send_or_stop):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver_outbox_messages()
+
+        sent_message.refresh_from_db()
+        unsent_message.refresh_from_db()
+        self.assertEqual(sent_message.delivery_status, 'sent')
+        self.assertEqual(unsent_message.delivery_status, 'pending')
+        self.assertEqual(unsent_message.attempts, 1)
+
+        # the unsent message stays claimed until its lease runs out
+        self.assertEqual(deliver_outbox_messages()['sent'], 0)
+        EmailOutboxMessage.objects.filter(id=unsent_message.id).update(
+            next_attempt_at=timezone.now()
+        )
+        self.assertEqual(
+            deliver_outbox_messages(), {'sent': 1, 'retried': 0, 'failed': 0}
+        )
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['first@test.com'], ['second@test.com']]
+        )
+
+    def test_batch_is_claimed_before_sending(self):
+        """Test that the batch is leased and its attempt counted before sending"""
+        print("Test that the batch is leased and its attempt counted before sending")
+
+        outbox_message = create_outbox_message()
+        before = timezone.now()
+        claimed_states = []
+
+        def record_claimed_state(message, *args, **kwargs):
+            claimed_states.append(EmailOutboxMessage.objects.values(
+                'attempts', 'next_attempt_at'
+            ).get(id=outbox_message.id))
+            return 1
+
+        with patch('django.core.mail.EmailMessage.send', record_claimed_state):
+            deliver_outbox_messages()
+
+        self.assertEqual(claimed_states[0]['attempts'], 1)
+        self.assertGreaterEqual(
+            claimed_states[0]['next_attempt_at'], before + DELIVERY_LEASE
+        )
+
+    def test_command_reports_totals(self):
+        """Test that the management command reports the delivery totals"""
+        print("Test that the management command reports the delivery totals")
+
+        create_outbox_message()
+        create_outbox_message()
+        out = io.StringIO()
+        call_command('deliver_outbox_emails', '--batch-size', '1', stdout=out)
+
+        self.assertIn('2 sent', out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,290 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient
+from datetime import date, time
+
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from class_scheduling.models import ScheduledClass
+from school.models import School
+
+User = get_user_model()
+
+ESTIMATED_SCHOOL_EARNINGS_WITHIN_DATE_RANGE_URL = '/api/accounting/estimated-school-earnings-within-date-range/{start_date}/{finish_date}/{school_id}/'
+
+
+def get_test_user(username='testteacher', password='testpassword'):
+    """Helper function to create a test user"""
+    return User.objects.create_user(username, password)
+
+
+def create_test_teacher_profile(user, surname='Smith', given_name='John'):
+    """Helper function to create a teacher profile"""
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{user.username}@test.com',
+        surname=surname,
+        given_name=given_name
+    )
+
+
+def create_test_school(teacher_profile, name='Test School'):
+    """Helper function to create a school"""
+    return School.objects.create(
+        school_name=name,
+        address_line_1='123 Main St',
+        address_line_2='Suite 100',
+        contact_phone='5551234567',
+        scheduling_teacher=teacher_profile
+    )
+
+
+def create_test_student(teacher_profile, name, school, tuition_rate=1000):
+    """Helper function to create a school student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='school',
+        school=school,
+        teacher=teacher_profile,
+        tuition_per_hour=tuition_rate,
+    )
+
+
+def create_scheduled_class(
+        teacher, student, class_date, start_time_str='10:00',
+        finish_time_str='10:59', class_status='completed'
+):
+    """Helper function to create a scheduled class"""
+    return ScheduledClass.objects.create(
+        teacher=teacher,
+        student_or_class=student,
+        date=class_date,
+        start_time=time(*map(int, start_time_str.split(':'))),
+        finish_time=time(*map(int, finish_time_str.split(':'))),
+        class_status=class_status
+    )
+
+
+class EstimatedSchoolEarningsByBucketApiTests(TestCase):
+    """Test the per-bucket breakdown of the date range school earnings API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(self.teacher_user)
+        self.client.force_authenticate(self.teacher_user)
+        self.school = create_test_school(self.teacher_profile, name='Alpha Academy')
+        self.amy = create_test_student(
+            self.teacher_profile, 'Amy Anderson', self.school, tuition_rate=800
+        )
+        self.charlie = create_test_student(
+            self.teacher_profile, 'Charlie Davis', self.school, tuition_rate=900
+        )
+
+        # Monday 2024-11-04 and Tuesday 2024-11-05 are in the same week
+        create_scheduled_class(self.teacher_profile, self.amy, date(2024, 11, 4))
+        create_scheduled_class(self.teacher_profile, self.amy, date(2024, 11, 5))
+        create_scheduled_class(
+            self.teacher_profile, self.charlie, date(2024, 11, 5), '13:00', '14:29'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.charlie, date(2024, 11, 15), '13:00', '13:59',
+            'same_day_cancellation'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.charlie, date(2024, 11, 16), '13:00', '13:59'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.amy, date(2024, 11, 20), class_status='cancelled'
+        )
+        create_scheduled_class(self.teacher_profile, self.amy, date(2024, 12, 2))
+
+    def get_report(self, start_date, finish_date, bucket):
+        url = ESTIMATED_SCHOOL_EARNINGS_WITHIN_DATE_RANGE_URL.format(
+            start_date=start_date, finish_date=finish_date, school_id=self.school.id
+        )
+        return self.client.get(url, {'bucket': bucket})
+
+    def test_weekly_buckets(self):
+        """Test that the classes are broken down by week"""
+        print("Test that the classes are broken down by week")
+
+        res = self.get_report('2024-11-01', '2024-12-01', 'week')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['bucket'], 'week')
+        self.assertEqual(
+            [(bucket['start_date'], bucket['finish_date']) for bucket in res.data['buckets']],
+            [
+                (date(2024, 11, 4), date(2024, 11, 10)),
+                (date(2024, 11, 11), date(2024, 11, 17)),
+                (date(2024, 11, 18), date(2024, 11, 24)),
+            ]
+        )
+        first_week = res.data['buckets'][0]
+        self.assertEqual(
+            [
+                (report['name'], report['hours'], report['total'])
+                for report in first_week['students_reports']
+            ],
+            [('Amy Anderson', 2, 1600), ('Charlie Davis', 1.5, 1350)]
+        )
+        self.assertEqual(first_week['school_total'], 2950)
+        self.assertEqual(res.data['buckets'][1]['school_total'], 1800)
+        # only cancelled classes in the third week
+        self.assertEqual(res.data['buckets'][2]['school_total'], 0)
+
+    def test_bucket_totals_add_up_to_range_total(self):
+        """Test that the range total matches the sum of the bucket totals"""
+        print("Test that the range total matches the sum of the bucket totals")
+
+        for bucket in ('day', 'week', 'semi-month', 'month'):
+            res = self.get_report('2024-11-01', '2024-12-01', bucket)
+            self.assertEqual(
+                res.data['school_total'],
+                sum(bucket_report['school_total'] for bucket_report in res.data['buckets'])
+            )
+            self.assertEqual(res.data['school_total'], 2950 + 1800)
+
+    def test_lump_report_matches_bucketed_report(self):
+        """Test that the report without a bucket matches the bucketed range totals"""
+        print("Test that the report without a bucket matches the bucketed range totals")
+
+        url = ESTIMATED_SCHOOL_EARNINGS_WITHIN_DATE_RANGE_URL.format(
+            start_date='2024-11-01', finish_date='2024-12-01', school_id=self.school.id
+        )
+        lump_report = self.client.get(url).data
+        bucketed_report = self.get_report('2024-11-01', '2024-12-01', 'month').data
+
+        self.assertNotIn('buckets', lump_report)
+        self.assertEqual(lump_report['school_total'], bucketed_report['school_total'])
+        self.assertEqual(
+            lump_report['students_reports'], bucketed_report['students_reports']
+        )
+
+    def test_semi_monthly_buckets(self):
+        """Test that semi-month buckets split the month after the 15th"""
+        print("Test that semi-month buckets split the month after the 15th")
+
+        res = self.get_report('2024-11-01', '2024-12-31', 'semi-month')
+
+        self.assertEqual(
+            [
+                (bucket['start_date'], bucket['finish_date'], bucket['school_total'])
+                for bucket in res.data['buckets']
+            ],
+            [
+                (date(2024, 11, 1), date(2024, 11, 15), 2950 + 900),
+                (date(2024, 11, 16), date(2024, 11, 30), 900),
+                (date(2024, 12, 1), date(2024, 12, 15), 800),
+            ]
+        )
+
+    def test_daily_and_monthly_buckets(self):
+        """Test the number of day and month buckets"""
+        print("Test the number of day and month buckets")
+
+        daily_res = self.get_report('2024-11-01', '2024-12-31', 'day')
+        monthly_res = self.get_report('2024-11-01', '2024-12-31', 'month')
+
+        self.assertEqual(len(daily_res.data['buckets']), 6)
+        self.assertEqual(
+            [
+                (bucket['start_date'], bucket['finish_date'])
+                for bucket in monthly_res.data['buckets']
+            ],
+            [
+                (date(2024, 11, 1), date(2024, 11, 30)),
+                (date(2024, 12, 1), date(2024, 12, 30)),
+            ]
+        )
+
+    def test_buckets_are_cut_to_the_requested_range(self):
+        """Test that the first and last buckets end before the excluded finish date"""
+        print("Test that the first and last buckets end before the excluded finish date")
+
+        weekly_res = self.get_report('2024-11-05', '2024-11-16', 'week')
+        monthly_res = self.get_report('2024-11-05', '2024-12-03', 'month')
+        semi_monthly_res = self.get_report('2024-11-05', '2024-11-20', 'semi-month')
+
+        self.assertEqual(
+            [
+                (bucket['start_date'], bucket['finish_date'])
+                for bucket in weekly_res.data['buckets']
+            ],
+            [
+                (date(2024, 11, 5), date(2024, 11, 10)),
+                (date(2024, 11, 11), date(2024, 11, 15)),
+            ]
+        )
+        self.assertEqual(
+            [
+                (bucket['start_date'], bucket['finish_date'])
+                for bucket in monthly_res.data['buckets']
+            ],
+            [
+                (date(2024, 11, 5), date(2024, 11, 30)),
+                (date(2024, 12, 1), date(2024, 12, 2)),
+            ]
+        )
+        self.assertEqual(
+            [
+                (bucket['start_date'], bucket['finish_date'])
+                for bucket in semi_monthly_res.data['buckets']
+            ],
+            [
+                (date(2024, 11, 5), date(2024, 11, 15)),
+                (date(2024, 11, 16), date(2024, 11, 19)),
+            ]
+        )
+
+    def test_bucketed_report_is_built_in_one_query(self):
+        """Test that the buckets are aggregated in a single classes query"""
+        print("Test that the buckets are aggregated in a single classes query")
+
+        # authentication, teacher and school lookups plus the aggregation
+        with self.assertNumQueries(3):
+            self.get_report('2024-11-01', '2024-12-01', 'week')
+
+    def test_empty_range_with_bucket(self):
+        """Test that an empty range returns no buckets and a float zero total"""
+        print("Test that an empty range returns no buckets and a float zero total")
+
+        res = self.get_report('2024-10-01', '2024-10-31', 'week')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['buckets'], [])
+        self.assertEqual(res.data['school_total'], 0.0)
+        self.assertIsInstance(res.data['school_total'], float)
+
+    def test_invalid_bucket_returns_400(self):
+        """Test that an unknown bucket returns 400"""
+        print("Test that an unknown bucket returns 400")
+
+        res = self.get_report('2024-11-01', '2024-12-01', 'fortnight')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_start_date_after_finish_date_returns_400(self):
+        """Test that a bucketed range which starts after it finishes returns 400"""
+        print("Test that a bucketed range which starts after it finishes returns 400")
+
+        res = self.get_report('2024-12-01', '2024-11-01', 'week')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_iso_date_does_not_match_url(self):
+        """Test that dates which are not valid ISO dates do not match the url"""
+        print("Test that dates which are not valid ISO dates do not match the url")
+
+        for start_date in ('2024-02-30', '11-01-2024', 'yesterday'):
+            url = ESTIMATED_SCHOOL_EARNINGS_WITHIN_DATE_RANGE_URL.format(
+                start_date=start_date, finish_date='2024-12-01', school_id=self.school.id
+            )
+            res = self.client.get(url)
+            # unmatched paths fall through to the frontend's index.html
+            self.assertNotEqual(
+                res.resolver_match.url_name,
+                'estimated-school-earnings-within-date-range'
+            )
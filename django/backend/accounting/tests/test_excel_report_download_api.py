@@ -0,0 +1,319 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+from decimal import Decimal
+from datetime import date, time
+from openpyxl import load_workbook
+
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from class_scheduling.models import ScheduledClass
+from school.models import School
+
+User = get_user_model()
+
+DOWNLOAD_SCHOOL_REPORT_URL = '/api/accounting/download-estimated-school-earnings-by-month-year/{month}/{year}/{school_id}/'
+DOWNLOAD_ALL_SCHOOLS_REPORT_URL = '/api/accounting/download-estimated-earnings-by-month-year/{month}/{year}/'
+EMAIL_SCHOOL_REPORT_URL = '/api/accounting/email-estimated-school-earnings-by-month-year/{month}/{year}/{school_id}/'
+
+
+def get_test_user(username='testteacher', password='testpassword'):
+    """Helper function to create a test user"""
+    return User.objects.create_user(username, password)
+
+
+def create_test_teacher_profile(user, surname='Smith', given_name='John'):
+    """Helper function to create a teacher profile"""
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{user.username}@test.com',
+        surname=surname,
+        given_name=given_name
+    )
+
+
+def create_test_school(teacher_profile, name='Test School', address_line_1='123 Main St'):
+    """Helper function to create a school"""
+    return School.objects.create(
+        school_name=name,
+        address_line_1=address_line_1,
+        address_line_2='Suite 100',
+        contact_phone='5551234567',
+        scheduling_teacher=teacher_profile
+    )
+
+
+def create_test_student(
+        teacher_profile, name='Test Student', account_type='school',
+        school=None, initial_hours=None, tuition_rate=1000
+):
+    """Helper function to create a student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type=account_type,
+        school=school,
+        teacher=teacher_profile,
+        purchased_class_hours=Decimal(initial_hours) if initial_hours else None,
+        tuition_per_hour=tuition_rate,
+        comments='Test student'
+    )
+
+
+def create_scheduled_class(
+        teacher, student, class_date, start_time_str='10:00',
+        finish_time_str='10:59', class_status='completed'
+):
+    """Helper function to create a scheduled class"""
+    return ScheduledClass.objects.create(
+        teacher=teacher,
+        student_or_class=student,
+        date=class_date,
+        start_time=time(*map(int, start_time_str.split(':'))),
+        finish_time=time(*map(int, finish_time_str.split(':'))),
+        class_status=class_status
+    )
+
+
+def read_workbook(response):
+    """Helper function to load the streamed xlsx response"""
+    return load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+
+
+def sheet_rows(worksheet):
+    """Helper function to return the sheet contents as a list of tuples"""
+    return list(worksheet.iter_rows(values_only=True))
+
+
+class ExcelReportDownloadPublicApiTests(TestCase):
+    """Test the publicly available excel report download API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.test_user = get_test_user()
+        self.teacher_profile = create_test_teacher_profile(self.test_user)
+        self.school = create_test_school(self.teacher_profile, name='Test School')
+
+    def test_login_required_for_school_report_download(self):
+        """Test that login is required for downloading a school report"""
+        print("Test that login is required for downloading a school report")
+
+        url = DOWNLOAD_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school.id
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_required_for_all_schools_report_download(self):
+        """Test that login is required for downloading the all schools report"""
+        print("Test that login is required for downloading the all schools report")
+
+        url = DOWNLOAD_ALL_SCHOOLS_REPORT_URL.format(month=11, year=2024)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExcelReportDownloadPrivateApiTests(TestCase):
+    """Test the authenticated excel report download API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(
+            self.teacher_user, surname='Smith', given_name='John'
+        )
+        self.client.force_authenticate(self.teacher_user)
+
+        self.school_alpha = create_test_school(
+            self.teacher_profile, name='Alpha Academy'
+        )
+        self.school_beta = create_test_school(
+            self.teacher_profile, name='Beta School', address_line_1='456 Oak Ave'
+        )
+        self.alpha_student_1 = create_test_student(
+            self.teacher_profile, name='Charlie Davis',
+            school=self.school_alpha, tuition_rate=900
+        )
+        self.alpha_student_2 = create_test_student(
+            self.teacher_profile, name='Amy Anderson',
+            school=self.school_alpha, tuition_rate=800
+        )
+        self.beta_student = create_test_student(
+            self.teacher_profile, name='Diana Miller',
+            school=self.school_beta, tuition_rate=950
+        )
+        self.freelance_student = create_test_student(
+            self.teacher_profile, name='Alice Brown', account_type='freelance',
+            initial_hours='10.00', tuition_rate=1000
+        )
+
+        # Charlie: two 1 hour classes and one 1.5 hour class
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_1,
+            date(2024, 11, 5), '10:00', '10:59'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_1,
+            date(2024, 11, 12), '10:00', '10:59', 'same_day_cancellation'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_1,
+            date(2024, 11, 19), '10:00', '11:29'
+        )
+        # cancelled and scheduled classes are not paid
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_1,
+            date(2024, 11, 26), '10:00', '10:59', 'cancelled'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_2,
+            date(2024, 11, 27), '10:00', '10:59', 'scheduled'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.alpha_student_2,
+            date(2024, 11, 6), '13:00', '13:59'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.beta_student,
+            date(2024, 11, 7), '09:00', '09:59'
+        )
+        create_scheduled_class(
+            self.teacher_profile, self.freelance_student,
+            date(2024, 11, 8), '09:00', '09:59'
+        )
+        # outside of the month
+        create_scheduled_class(
+            self.teacher_profile, self.beta_student,
+            date(2024, 12, 2), '09:00', '09:59'
+        )
+
+    def test_download_school_report(self):
+        """Test that the school report is returned as an xlsx attachment"""
+        print("Test that the school report is returned as an xlsx attachment")
+
+        url = DOWNLOAD_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school_alpha.id
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['Content-Type'],
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        self.assertIn('attachment', res['Content-Disposition'])
+        self.assertIn('John_Alpha Academy_11-2024.xlsx', res['Content-Disposition'])
+
+    def test_school_report_rows_are_sorted_by_name_and_duration(self):
+        """Test that each student's paid classes are grouped by duration"""
+        print("Test that each student's paid classes are grouped by duration")
+
+        url = DOWNLOAD_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school_alpha.id
+        )
+        workbook = read_workbook(self.client.get(url))
+        self.assertEqual(workbook.sheetnames, ['11'])
+        rows = sheet_rows(workbook['11'])
+
+        self.assertEqual(rows[0][0], '11/2024')
+        self.assertEqual(rows[0][1], 'John')
+        self.assertEqual(rows[0][8], 'teacher1@test.com')
+        self.assertEqual(rows[1][1], 'Class')
+
+        self.assertEqual(
+            rows[2][1:8], ('Amy Anderson 11/6', 1, 1, 1, 800, 0, 800)
+        )
+        self.assertEqual(
+            rows[3][1:8], ('Charlie Davis 11/5, 12', 1, 2, 2, 900, 0, 1800)
+        )
+        self.assertEqual(
+            rows[4][1:8], ('Charlie Davis 11/19', 1.5, 1, 1.5, 900, 0, 1350)
+        )
+        self.assertEqual(rows[5][0], 'FS')
+        self.assertEqual(rows[5][4], 4.5)
+        self.assertEqual(rows[5][7], 3950)
+        self.assertEqual(len(rows), 6)
+
+    def test_school_report_with_no_classes(self):
+        """Test that a school with no classes still produces a valid workbook"""
+        print("Test that a school with no classes still produces a valid workbook")
+
+        url = DOWNLOAD_SCHOOL_REPORT_URL.format(
+            month=10, year=2024, school_id=self.school_alpha.id
+        )
+        rows = sheet_rows(read_workbook(self.client.get(url))['10'])
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[2][0], 'FS')
+        self.assertEqual(rows[2][7], 0)
+
+    def test_download_school_report_nonexistent_school_returns_404(self):
+        """Test that a nonexistent school id returns 404"""
+        print("Test that a nonexistent school id returns 404")
+
+        url = DOWNLOAD_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=99999
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_all_schools_report_has_one_sheet_per_school(self):
+        """Test that the all schools report has one sheet per school"""
+        print("Test that the all schools report has one sheet per school")
+
+        url = DOWNLOAD_ALL_SCHOOLS_REPORT_URL.format(month=11, year=2024)
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('John_11-2024.xlsx', res['Content-Disposition'])
+        workbook = read_workbook(res)
+        self.assertEqual(workbook.sheetnames, ['Alpha Academy', 'Beta School'])
+
+        beta_rows = sheet_rows(workbook['Beta School'])
+        self.assertEqual(
+            beta_rows[2][1:8], ('Diana Miller 11/7', 1, 1, 1, 950, 0, 950)
+        )
+        self.assertEqual(beta_rows[3][7], 950)
+
+    def test_all_schools_report_excludes_freelance_students(self):
+        """Test that freelance students are not included in any sheet"""
+        print("Test that freelance students are not included in any sheet")
+
+        url = DOWNLOAD_ALL_SCHOOLS_REPORT_URL.format(month=11, year=2024)
+        workbook = read_workbook(self.client.get(url))
+
+        for worksheet in workbook.worksheets:
+            for row in sheet_rows(worksheet):
+                self.assertFalse(str(row[1]).startswith('Alice Brown'))
+
+    def test_all_schools_report_with_no_classes(self):
+        """Test that a month without classes still produces a valid workbook"""
+        print("Test that a month without classes still produces a valid workbook")
+
+        url = DOWNLOAD_ALL_SCHOOLS_REPORT_URL.format(month=1, year=2024)
+        workbook = read_workbook(self.client.get(url))
+
+        self.assertEqual(workbook.sheetnames, ['1'])
+
+    def test_email_report_attaches_workbook(self):
+        """Test that the emailed report attaches the same workbook"""
+        print("Test that the emailed report attaches the same workbook")
+
+        url = EMAIL_SCHOOL_REPORT_URL.format(
+            month=11, year=2024, school_id=self.school_alpha.id
+        )
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        call_command('deliver_outbox_emails', stdout=io.StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        file_name, content, mimetype = mail.outbox[0].attachments[0]
+        self.assertEqual(file_name, 'John_Alpha Academy_11/2024.xlsx')
+        rows = sheet_rows(load_workbook(io.BytesIO(content))['11'])
+        self.assertEqual(rows[5][7], 3950)
@@ -0,0 +1,201 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient
+from decimal import Decimal
+from django.utils.timezone import make_aware, get_current_timezone
+from datetime import datetime
+
+from accounting.models import FreelanceTuitionTransactionRecord
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_YEAR_URL = '/api/accounting/tuition-transactions-summary-by-month-year/{month}/{year}/'
+TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_RANGE_URL = '/api/accounting/tuition-transactions-summary-by-month-range/{month}/{year}/{finish_month}/{finish_year}/'
+
+
+def get_test_user(username='testteacher', password='testpassword'):
+    """Helper function to create a test user"""
+    return User.objects.create_user(username, password)
+
+
+def create_test_teacher_profile(user, surname='Smith', given_name='John'):
+    """Helper function to create a teacher profile"""
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{user.username}@test.com',
+        surname=surname,
+        given_name=given_name
+    )
+
+
+def create_test_student(teacher_profile, name='Alice Johnson', initial_hours='50.00', tuition_rate=1000):
+    """Helper function to create a freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='freelance',
+        teacher=teacher_profile,
+        purchased_class_hours=Decimal(initial_hours),
+        tuition_per_hour=tuition_rate,
+        comments='Test student'
+    )
+
+
+def create_transaction_at(student, transaction_type, hours, year, month, day):
+    """Helper function to create a transaction with a specific timestamp"""
+    transaction = FreelanceTuitionTransactionRecord.objects.create(
+        student_or_class=student,
+        transaction_type=transaction_type,
+        class_hours_purchased_or_refunded=hours
+    )
+    timestamp = make_aware(datetime(year, month, day, 12, 0), get_current_timezone())
+    FreelanceTuitionTransactionRecord.objects.filter(
+        id=transaction.id
+    ).update(time_stamp=timestamp)
+    return transaction
+
+
+class FreelanceTuitionTransactionsSummaryPublicApiTests(TestCase):
+    """Test the publicly available tuition transactions summary API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required_for_summary(self):
+        """Test that login is required for the tuition transactions summary"""
+        print("Test that login is required for the tuition transactions summary")
+
+        res = self.client.get(
+            TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_YEAR_URL.format(month=6, year=2024)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class FreelanceTuitionTransactionsSummaryPrivateApiTests(TestCase):
+    """Test the per-month totals of the tuition transactions summary API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(self.teacher_user)
+        self.client.force_authenticate(self.teacher_user)
+        self.alice = create_test_student(self.teacher_profile, tuition_rate=1000)
+        self.bob = create_test_student(
+            self.teacher_profile, name='Bob Smith', tuition_rate=800
+        )
+
+        self.june_payment = create_transaction_at(self.alice, 'payment', 10, 2024, 6, 3)
+        create_transaction_at(self.bob, 'payment', 5, 2024, 6, 20)
+        create_transaction_at(self.alice, 'refund', 2, 2024, 6, 28)
+        create_transaction_at(self.bob, 'payment', 4, 2024, 8, 1)
+        create_transaction_at(self.alice, 'payment', 1, 2024, 9, 1)
+
+        other_user = get_test_user(username='teacher2', password='testpass123')
+        other_teacher = create_test_teacher_profile(other_user)
+        other_student = create_test_student(other_teacher, name='Other Student')
+        create_transaction_at(other_student, 'payment', 20, 2024, 6, 10)
+
+    def test_single_month_summary(self):
+        """Test the transactions and totals for a single month"""
+        print("Test the transactions and totals for a single month")
+
+        res = self.client.get(
+            TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_YEAR_URL.format(month=6, year=2024)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['transactions']), 3)
+        self.assertEqual(res.data['transactions'][0]['id'], self.june_payment.id)
+        self.assertEqual(
+            res.data['periods'],
+            [{
+                "month": 6, "year": 2024,
+                "payments": 10000 + 4000, "refunds": 2000, "net": 12000,
+                "hours_sold": 15, "hours_refunded": 2,
+            }]
+        )
+        self.assertEqual(res.data['totals']['net'], 12000)
+
+    def test_month_range_summary(self):
+        """Test that a month range is broken down into monthly periods"""
+        print("Test that a month range is broken down into monthly periods")
+
+        res = self.client.get(
+            TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_RANGE_URL.format(
+                month=6, year=2024, finish_month=8, finish_year=2024
+            )
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['transactions']), 4)
+        # months without transactions are left out
+        self.assertEqual(
+            [(period['month'], period['net']) for period in res.data['periods']],
+            [(6, 12000), (8, 3200)]
+        )
+        self.assertEqual(
+            res.data['totals'],
+            {
+                "payments": 17200, "refunds": 2000, "net": 15200,
+                "hours_sold": 19, "hours_refunded": 2,
+            }
+        )
+
+    def test_month_range_across_years(self):
+        """Test a month range that crosses into the next year"""
+        print("Test a month range that crosses into the next year")
+
+        create_transaction_at(self.alice, 'payment', 3, 2025, 1, 15)
+        res = self.client.get(
+            TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_RANGE_URL.format(
+                month=9, year=2024, finish_month=1, finish_year=2025
+            )
+        )
+
+        self.assertEqual(
+            [(period['month'], period['year']) for period in res.data['periods']],
+            [(9, 2024), (1, 2025)]
+        )
+
+    def test_empty_month_summary(self):
+        """Test that a month without transactions returns zero totals"""
+        print("Test that a month without transactions returns zero totals")
+
+        res = self.client.get(
+            TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_YEAR_URL.format(month=1, year=2024)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['transactions'], [])
+        self.assertEqual(res.data['periods'], [])
+        self.assertEqual(res.data['totals']['payments'], 0)
+
+    def test_invalid_month_range_returns_400(self):
+        """Test that a range ending before it starts returns 400"""
+        print("Test that a range ending before it starts returns 400")
+
+        for month, year, finish_month, finish_year in (
+                (8, 2024, 6, 2024), (1, 2025, 12, 2024), (13, 2024, 1, 2025)
+        ):
+            res = self.client.get(
+                TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_RANGE_URL.format(
+                    month=month, year=year,
+                    finish_month=finish_month, finish_year=finish_year
+                )
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_uses_two_queries(self):
+        """Test that the rows and all monthly totals take one query each"""
+        print("Test that the rows and all monthly totals take one query each")
+
+        # teacher lookup is not needed, so only the totals and rows queries run
+        with self.assertNumQueries(2):
+            self.client.get(
+                TUITION_TRANSACTIONS_SUMMARY_BY_MONTH_RANGE_URL.format(
+                    month=6, year=2024, finish_month=9, finish_year=2024
+                )
+            )
@@ -0,0 +1,203 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from accounting.balance_notifications import (
+    get_low_balance_accounts_to_notify,
+    get_scheduled_future_hours,
+)
+from accounting.models import EmailOutboxMessage, LowBalanceNotificationRecord
+from class_scheduling.models import ScheduledClass
+from school.models import School
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+
+def create_test_teacher_profile(username, given_name='John', contact_email=None):
+    """Helper function to create a user with a teacher profile"""
+    user = User.objects.create_user(username, 'testpass123')
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{username}@test.com' if contact_email is None else contact_email,
+        surname='Smith',
+        given_name=given_name
+    )
+
+
+def create_test_student(teacher_profile, name, purchased_class_hours):
+    """Helper function to create a freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='freelance',
+        teacher=teacher_profile,
+        purchased_class_hours=Decimal(purchased_class_hours),
+        tuition_per_hour=1000,
+    )
+
+
+def create_scheduled_class(
+        teacher, student, class_date, start_time, finish_time,
+        class_status='scheduled'
+):
+    """Helper function to create a scheduled class"""
+    return ScheduledClass.objects.create(
+        teacher=teacher,
+        student_or_class=student,
+        date=class_date,
+        start_time=start_time,
+        finish_time=finish_time,
+        class_status=class_status
+    )
+
+
+def run_send_low_balance_notifications():
+    """Helper function to run the command and return its output"""
+    out = io.StringIO()
+    call_command('send_low_balance_notifications', stdout=out)
+    return out.getvalue()
+
+
+class LowBalanceNotificationTests(TestCase):
+    """Test the nightly low balance digests of the freelance students"""
+
+    def setUp(self):
+        self.teacher = create_test_teacher_profile('teacher1', given_name='John')
+        self.other_teacher = create_test_teacher_profile('teacher2', given_name='Mary')
+        self.alice = create_test_student(self.teacher, 'Alice Brown', '1.50')
+        self.zack = create_test_student(self.teacher, 'Zack Brown', '2.00')
+        create_test_student(self.teacher, 'Plenty Hours', '10.00')
+        self.bob = create_test_student(self.other_teacher, 'Bob Wilson', '0.00')
+
+        tomorrow = date.today() + timedelta(days=1)
+        create_scheduled_class(self.teacher, self.alice, tomorrow, time(10, 0), time(10, 59))
+        create_scheduled_class(
+            self.teacher, self.alice, tomorrow + timedelta(days=7), time(10, 0), time(10, 59)
+        )
+        create_scheduled_class(
+            self.teacher, self.alice, tomorrow + timedelta(days=1), time(13, 0), time(14, 29)
+        )
+        # past and cancelled classes are not remaining hours
+        create_scheduled_class(
+            self.teacher, self.alice, date.today() - timedelta(days=1), time(10, 0), time(10, 59)
+        )
+        create_scheduled_class(
+            self.teacher, self.alice, tomorrow + timedelta(days=2), time(10, 0), time(10, 59),
+            'cancelled'
+        )
+
+    def test_one_digest_per_teacher(self):
+        """Test that each teacher gets a single digest of their low balance students"""
+        print("Test that each teacher gets a single digest of their low balance students")
+
+        output = run_send_low_balance_notifications()
+
+        self.assertIn('3 students, 2 teachers', output)
+        self.assertIn('2 sent', output)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ['teacher1@test.com', 'teacher2@test.com']
+        )
+        johns_digest = next(
+            message for message in mail.outbox if message.to == ['teacher1@test.com']
+        )
+        self.assertIn('Alice Brown: 1.50 hours left, 3.5 hours scheduled', johns_digest.body)
+        self.assertIn('Zack Brown: 2.00 hours left, 0 hours scheduled', johns_digest.body)
+        self.assertNotIn('Plenty Hours', johns_digest.body)
+
+    def test_students_are_not_notified_twice(self):
+        """Test that a student is not notified again until the balance changes"""
+        print("Test that a student is not notified again until the balance changes")
+
+        run_send_low_balance_notifications()
+        mail.outbox = []
+
+        self.assertIn('0 students, 0 teachers', run_send_low_balance_notifications())
+        self.assertEqual(len(mail.outbox), 0)
+
+        StudentOrClass.objects.filter(id=self.alice.id).update(
+            purchased_class_hours=Decimal('0.50')
+        )
+        run_send_low_balance_notifications()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Alice Brown', mail.outbox[0].body)
+        self.assertNotIn('Zack Brown', mail.outbox[0].body)
+
+    def test_topped_up_student_is_notified_again(self):
+        """Test that a student who was topped up is notified when they run low again"""
+        print("Test that a student who was topped up is notified when they run low again")
+
+        run_send_low_balance_notifications()
+        StudentOrClass.objects.filter(id=self.bob.id).update(
+            purchased_class_hours=Decimal('10.00')
+        )
+        run_send_low_balance_notifications()
+        self.assertFalse(
+            LowBalanceNotificationRecord.objects.filter(student_or_class=self.bob).exists()
+        )
+
+        StudentOrClass.objects.filter(id=self.bob.id).update(
+            purchased_class_hours=Decimal('0.00')
+        )
+        mail.outbox = []
+        run_send_low_balance_notifications()
+
+        self.assertEqual([message.to for message in mail.outbox], [['teacher2@test.com']])
+
+    def test_school_students_and_teachers_without_email_are_skipped(self):
+        """Test that school students and teachers without an email are left out"""
+        print("Test that school students and teachers without an email are left out")
+
+        school = School.objects.create(
+            school_name='Test School',
+            address_line_1='123 Main St',
+            address_line_2='Suite 100',
+            contact_phone='5551234567',
+            scheduling_teacher=self.teacher
+        )
+        StudentOrClass.objects.create(
+            student_or_class_name='School Class',
+            account_type='school',
+            school=school,
+            teacher=self.teacher,
+        )
+        no_email_teacher = create_test_teacher_profile('teacher3', contact_email='')
+        create_test_student(no_email_teacher, 'Carl Jones', '1.00')
+
+        self.assertEqual(
+            [values[4] for values in get_low_balance_accounts_to_notify()],
+            ['Alice Brown', 'Zack Brown', 'Bob Wilson']
+        )
+
+    def test_pipeline_queries_do_not_grow_with_accounts(self):
+        """Test that the accounts and scheduled hours take one query each"""
+        print("Test that the accounts and scheduled hours take one query each")
+
+        with self.assertNumQueries(1):
+            account_values = list(get_low_balance_accounts_to_notify())
+        with self.assertNumQueries(1):
+            scheduled_future_hours = get_scheduled_future_hours(
+                {values[3] for values in account_values}
+            )
+
+        self.assertEqual(scheduled_future_hours, {self.alice.id: 3.5})
+
+    def test_digests_are_queued_in_outbox(self):
+        """Test that the digests are stored in the outbox before they are sent"""
+        print("Test that the digests are stored in the outbox before they are sent")
+
+        run_send_low_balance_notifications()
+
+        self.assertEqual(
+            EmailOutboxMessage.objects.filter(delivery_status='sent').count(), 2
+        )
+        self.assertEqual(
+            EmailOutboxMessage.objects.get(recipient='teacher1@test.com').subject,
+            'Low Balance: 2 Freelance Students'
+        )
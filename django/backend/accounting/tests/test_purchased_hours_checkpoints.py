@@ -0,0 +1,309 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils.timezone import make_aware, get_current_timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from datetime import date, datetime
+from decimal import Decimal
+
+from accounting.models import (
+    FreelanceTuitionTransactionRecord,
+    PurchasedHoursCheckpoint,
+    PurchasedHoursModificationRecord,
+)
+from accounting.utils import (
+    create_purchased_hours_checkpoints,
+    create_purchased_hours_modification_record_for_tuition_transaction,
+    get_purchased_hours_balance_at,
+)
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSPurchasedHoursCheckpoint,
+    CSPurchasedHoursModification,
+    CSTutoringTuitionRecord,
+    CST2To1TutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from client_school_transactions.utils import (
+    create_cs_purchased_hours_checkpoints,
+    get_cs_purchased_hours_balances_at,
+)
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+PURCHASED_HOURS_BALANCE_URL = '/api/accounting/purchased-hours-balance/{account_id}/{date}/'
+
+
+def get_test_user(username='testteacher', password='testpassword'):
+    """Helper function to create a test user"""
+    return User.objects.create_user(username, password)
+
+
+def create_test_teacher_profile(user, surname='Smith', given_name='John'):
+    """Helper function to create a teacher profile"""
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{user.username}@test.com',
+        surname=surname,
+        given_name=given_name
+    )
+
+
+def create_test_student(teacher_profile, name='Alice Johnson', initial_hours='10.00'):
+    """Helper function to create a freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='freelance',
+        teacher=teacher_profile,
+        purchased_class_hours=Decimal(initial_hours),
+        tuition_per_hour=1000,
+    )
+
+
+def local_timestamp(year, month, day, hour=12):
+    """Helper function to create an aware timestamp in the current timezone"""
+    return make_aware(datetime(year, month, day, hour), get_current_timezone())
+
+
+def record_tuition_transaction(student, transaction_type, hours, timestamp):
+    """Helper function to record a transaction and its modification at a timestamp"""
+    student.refresh_from_db()
+    previous_hours = student.purchased_class_hours
+    transaction = FreelanceTuitionTransactionRecord.objects.create(
+        student_or_class=student,
+        transaction_type=transaction_type,
+        class_hours_purchased_or_refunded=hours
+    )
+    create_purchased_hours_modification_record_for_tuition_transaction(
+        previous_hours_purchased=previous_hours,
+        freelance_tuition_transaction_record=transaction
+    )
+    PurchasedHoursModificationRecord.objects.filter(
+        tuition_transaction=transaction
+    ).update(time_stamp=timestamp)
+    return transaction
+
+
+class PurchasedHoursCheckpointTests(TestCase):
+    """Test point-in-time balances read from checkpoints"""
+
+    def setUp(self):
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(self.teacher_user)
+        self.student = create_test_student(self.teacher_profile, initial_hours='10.00')
+
+        # 10 -> 20 in May, 20 -> 17 in June, 17 -> 22 in July
+        record_tuition_transaction(self.student, 'payment', 10, local_timestamp(2024, 5, 10))
+        record_tuition_transaction(self.student, 'refund', 3, local_timestamp(2024, 6, 10))
+        record_tuition_transaction(self.student, 'payment', 5, local_timestamp(2024, 7, 10))
+
+    def test_balance_without_checkpoints(self):
+        """Test that the balance is rebuilt from the modifications without a checkpoint"""
+        print("Test that the balance is rebuilt from the modifications without a checkpoint")
+
+        for timestamp, hours in (
+                (local_timestamp(2024, 5, 1), Decimal('10.00')),
+                (local_timestamp(2024, 5, 31), Decimal('20.00')),
+                (local_timestamp(2024, 6, 30), Decimal('17.00')),
+                (local_timestamp(2024, 8, 1), Decimal('22.00')),
+        ):
+            balance = get_purchased_hours_balance_at(self.student, timestamp)
+            self.assertEqual(balance['purchased_class_hours'], hours)
+            self.assertIsNone(balance['checkpoint_as_of'])
+
+    def test_checkpoints_hold_the_monthly_balances(self):
+        """Test that the checkpoints hold the balance at the start of each month"""
+        print("Test that the checkpoints hold the balance at the start of each month")
+
+        for month in (6, 7, 8):
+            create_purchased_hours_checkpoints(local_timestamp(2024, month, 1, 0))
+
+        self.assertEqual(
+            list(
+                PurchasedHoursCheckpoint.objects.filter(
+                    student_or_class=self.student
+                ).order_by('as_of').values_list('purchased_class_hours', flat=True)
+            ),
+            [Decimal('20.00'), Decimal('17.00'), Decimal('22.00')]
+        )
+
+    def test_balance_reads_checkpoint_and_tail(self):
+        """Test that only the modifications after the checkpoint are applied"""
+        print("Test that only the modifications after the checkpoint are applied")
+
+        create_purchased_hours_checkpoints(local_timestamp(2024, 6, 1, 0))
+        balance = get_purchased_hours_balance_at(
+            self.student, local_timestamp(2024, 7, 31)
+        )
+
+        self.assertEqual(balance['purchased_class_hours'], Decimal('22.00'))
+        self.assertEqual(balance['checkpoint_as_of'], local_timestamp(2024, 6, 1, 0))
+        self.assertEqual(balance['modifications_applied'], 2)
+
+    def test_balance_uses_checkpoint_value(self):
+        """Test that the balance starts from the checkpoint instead of the history"""
+        print("Test that the balance starts from the checkpoint instead of the history")
+
+        create_purchased_hours_checkpoints(local_timestamp(2024, 7, 1, 0))
+        PurchasedHoursCheckpoint.objects.update(purchased_class_hours=Decimal('30.00'))
+
+        balance = get_purchased_hours_balance_at(
+            self.student, local_timestamp(2024, 7, 31)
+        )
+
+        self.assertEqual(balance['purchased_class_hours'], Decimal('35.00'))
+        self.assertEqual(balance['modifications_applied'], 1)
+
+    def test_rerunning_checkpoints_replaces_them(self):
+        """Test that writing checkpoints twice for the same time does not duplicate them"""
+        print("Test that writing checkpoints twice for the same time does not duplicate them")
+
+        as_of = local_timestamp(2024, 7, 1, 0)
+        create_purchased_hours_checkpoints(as_of)
+        create_purchased_hours_checkpoints(as_of)
+
+        self.assertEqual(PurchasedHoursCheckpoint.objects.filter(as_of=as_of).count(), 1)
+
+    def test_checkpoints_are_grouped_queries(self):
+        """Test that the number of queries does not grow with the number of accounts"""
+        print("Test that the number of queries does not grow with the number of accounts")
+
+        for index in range(5):
+            student = create_test_student(
+                self.teacher_profile, name=f'Student {index}', initial_hours='5.00'
+            )
+            record_tuition_transaction(student, 'payment', 2, local_timestamp(2024, 5, 20))
+        create_purchased_hours_checkpoints(local_timestamp(2024, 6, 1, 0))
+
+        # previous checkpoints, checkpoint tails, full histories,
+        # then the delete and the insert inside a savepoint
+        with self.assertNumQueries(7):
+            create_purchased_hours_checkpoints(local_timestamp(2024, 7, 1, 0))
+        self.assertEqual(
+            PurchasedHoursCheckpoint.objects.filter(
+                as_of=local_timestamp(2024, 7, 1, 0)
+            ).count(),
+            6
+        )
+
+
+class PurchasedHoursBalanceApiTests(TestCase):
+    """Test the point-in-time purchased hours balance API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher_user = get_test_user(username='teacher1', password='testpass123')
+        self.teacher_profile = create_test_teacher_profile(self.teacher_user)
+        self.student = create_test_student(self.teacher_profile, initial_hours='10.00')
+        record_tuition_transaction(self.student, 'payment', 10, local_timestamp(2024, 5, 10))
+        record_tuition_transaction(self.student, 'refund', 3, local_timestamp(2024, 6, 10))
+
+    def test_login_required_for_balance(self):
+        """Test that login is required for the balance on a date"""
+        print("Test that login is required for the balance on a date")
+
+        res = self.client.get(
+            PURCHASED_HOURS_BALANCE_URL.format(account_id=self.student.id, date='2024-06-01')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_balance_at_end_of_date(self):
+        """Test that the balance includes the modifications made on the date"""
+        print("Test that the balance includes the modifications made on the date")
+
+        self.client.force_authenticate(self.teacher_user)
+        call_command('create_balance_checkpoints', '--date', '2024-06-01', stdout=io.StringIO())
+
+        res = self.client.get(
+            PURCHASED_HOURS_BALANCE_URL.format(account_id=self.student.id, date='2024-06-10')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['purchased_class_hours'], Decimal('17.00'))
+        self.assertEqual(res.data['date'], date(2024, 6, 10))
+        self.assertEqual(res.data['modifications_applied'], 1)
+
+    def test_other_teachers_account_returns_404(self):
+        """Test that a teacher cannot read another teacher's account balance"""
+        print("Test that a teacher cannot read another teacher's account balance")
+
+        other_user = get_test_user(username='teacher2', password='testpass123')
+        create_test_teacher_profile(other_user)
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(
+            PURCHASED_HOURS_BALANCE_URL.format(account_id=self.student.id, date='2024-06-10')
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ClientSchoolPurchasedHoursCheckpointTests(TestCase):
+    """Test the client school balance checkpoints written by the command"""
+
+    def setUp(self):
+        client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.primary_account = AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name='Amy Wang', client_school=client_school
+        )
+        self.shared_account = AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name='Ben Lin', client_school=client_school
+        )
+
+        tutoring = CSTutoringTuitionRecord(
+            student_account=self.primary_account,
+            class_hours_purchased_or_refunded=10,
+            administrator_name='Admin'
+        )
+        record_cs_tuition_transaction(tutoring)
+        CSPurchasedHoursModification.objects.filter(
+            tuition_transaction=tutoring
+        ).update(time_stamp=local_timestamp(2024, 5, 10))
+
+        two_to_one = CST2To1TutoringTuitionRecord(
+            student_account=self.primary_account,
+            shared_student_account=self.shared_account,
+            class_hours_purchased_or_refunded=5,
+            administrator_name='Admin'
+        )
+        record_cs_tuition_transaction(two_to_one)
+        CSPurchasedHoursModification.objects.filter(
+            tuition_transaction=two_to_one
+        ).update(time_stamp=local_timestamp(2024, 6, 10))
+
+    def test_tutoring_checkpoint_includes_two_to_one_modifications(self):
+        """Test that one-to-one and two-to-one modifications share the tutoring balance"""
+        print("Test that one-to-one and two-to-one modifications share the tutoring balance")
+
+        out = io.StringIO()
+        call_command('create_balance_checkpoints', '--date', '2024-07-01', stdout=out)
+
+        checkpoint = CSPurchasedHoursCheckpoint.objects.get(
+            student_account=self.primary_account
+        )
+        self.assertEqual(checkpoint.balance, 'purchased_tutoring_hours')
+        self.assertEqual(checkpoint.hours, Decimal('15.00'))
+        self.assertIn('1 client school', out.getvalue())
+
+    def test_balances_on_date(self):
+        """Test the client school balances before and after a checkpoint"""
+        print("Test the client school balances before and after a checkpoint")
+
+        create_cs_purchased_hours_checkpoints(local_timestamp(2024, 6, 1, 0))
+        balances = get_cs_purchased_hours_balances_at(
+            self.primary_account, local_timestamp(2024, 6, 30)
+        )
+
+        self.assertEqual(balances['purchased_tutoring_hours']['hours'], Decimal('15.00'))
+        self.assertEqual(balances['purchased_tutoring_hours']['modifications_applied'], 1)
+        self.assertIsNone(balances['purchased_online_hours']['hours'])
@@ -0,0 +1,215 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from decimal import Decimal
+
+from accounting.models import (
+    FreelanceTuitionTransactionRecord,
+    PurchasedHoursModificationRecord,
+)
+from accounting.utils import (
+    create_purchased_hours_modification_record_for_tuition_transaction,
+    get_purchased_hours_drift,
+)
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from client_school_transactions.utils import get_cs_purchased_hours_drift
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+
+def create_test_teacher_profile(username='teacher1'):
+    """Helper function to create a user with a teacher profile"""
+    user = User.objects.create_user(username, 'testpass123')
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{username}@test.com',
+        surname='Smith',
+        given_name='John'
+    )
+
+
+def create_test_student(teacher_profile, name='Alice Johnson', initial_hours='10.00'):
+    """Helper function to create a freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='freelance',
+        teacher=teacher_profile,
+        purchased_class_hours=Decimal(initial_hours),
+        tuition_per_hour=1000,
+    )
+
+
+def record_tuition_transaction(student, transaction_type, hours, previous_hours=None):
+    """Helper function to record a transaction and its modification"""
+    student.refresh_from_db()
+    if previous_hours is None:
+        previous_hours = student.purchased_class_hours
+    transaction = FreelanceTuitionTransactionRecord.objects.create(
+        student_or_class=student,
+        transaction_type=transaction_type,
+        class_hours_purchased_or_refunded=hours
+    )
+    create_purchased_hours_modification_record_for_tuition_transaction(
+        previous_hours_purchased=previous_hours,
+        freelance_tuition_transaction_record=transaction
+    )
+    return transaction
+
+
+def run_reconcile_ledgers(*args):
+    """Helper function to run the command inline and return its output"""
+    out = io.StringIO()
+    call_command('reconcile_ledgers', '--workers', '1', *args, stdout=out)
+    return out.getvalue()
+
+
+class FreelanceLedgerReconciliationTests(TestCase):
+    """Test the reconciliation of the freelance purchased hours"""
+
+    def setUp(self):
+        self.teacher_profile = create_test_teacher_profile()
+        self.student = create_test_student(self.teacher_profile)
+        self.other_student = create_test_student(
+            self.teacher_profile, name='Bob Smith', initial_hours='4.00'
+        )
+        # 10 -> 20 -> 17
+        record_tuition_transaction(self.student, 'payment', 10)
+        record_tuition_transaction(self.student, 'refund', 3)
+        # 4 -> 6
+        record_tuition_transaction(self.other_student, 'payment', 2)
+
+    def test_matching_ledgers_have_no_drift(self):
+        """Test that balances matching their histories are not reported"""
+        print("Test that balances matching their histories are not reported")
+
+        self.assertEqual(
+            get_purchased_hours_drift([self.student.id, self.other_student.id]), []
+        )
+        self.assertIn('Freelance ledger: 2 accounts, 0 drifted', run_reconcile_ledgers())
+
+    def test_changed_balance_is_reported(self):
+        """Test that a balance changed without a modification is reported"""
+        print("Test that a balance changed without a modification is reported")
+
+        StudentOrClass.objects.filter(id=self.student.id).update(
+            purchased_class_hours=Decimal('12.00')
+        )
+
+        self.assertEqual(
+            get_purchased_hours_drift([self.student.id, self.other_student.id]),
+            [{
+                "student_or_class_id": self.student.id,
+                "stored_hours": Decimal('12.00'),
+                "expected_hours": Decimal('17.00'),
+                "chain_breaks": 0,
+            }]
+        )
+
+    def test_lost_update_is_counted_as_chain_break(self):
+        """Test that a modification recorded from a stale balance is a chain break"""
+        print("Test that a modification recorded from a stale balance is a chain break")
+
+        # a payment which read the 20 hours from before the refund was saved,
+        # as a concurrent request would have, so it adds 2 hours instead of 5
+        record_tuition_transaction(self.student, 'payment', 5, previous_hours=Decimal('20.00'))
+
+        drift = get_purchased_hours_drift([self.student.id])
+
+        self.assertEqual(drift[0]['stored_hours'], Decimal('22.00'))
+        self.assertEqual(drift[0]['expected_hours'], Decimal('19.00'))
+        self.assertEqual(drift[0]['chain_breaks'], 1)
+
+    def test_fix_writes_adjustments(self):
+        """Test that --fix appends an adjustment and the next run finds no drift"""
+        print("Test that --fix appends an adjustment and the next run finds no drift")
+
+        StudentOrClass.objects.filter(id=self.student.id).update(
+            purchased_class_hours=Decimal('12.00')
+        )
+
+        output = run_reconcile_ledgers('--fix')
+
+        self.assertIn('1 drifted', output)
+        self.assertIn('1 adjustments written', output)
+        adjustment = PurchasedHoursModificationRecord.objects.get(
+            modification_type='reconciliation_adjustment'
+        )
+        self.assertEqual(adjustment.previous_purchased_class_hours, Decimal('17.00'))
+        self.assertEqual(adjustment.updated_purchased_class_hours, Decimal('12.00'))
+        self.assertIn('Freelance ledger: 2 accounts, 0 drifted', run_reconcile_ledgers())
+
+    def test_drift_is_found_in_a_fixed_number_of_queries(self):
+        """Test that the number of queries does not grow with the number of accounts"""
+        print("Test that the number of queries does not grow with the number of accounts")
+
+        for index in range(5):
+            student = create_test_student(self.teacher_profile, name=f'Student {index}')
+            record_tuition_transaction(student, 'payment', 2)
+
+        # expected balances, chain breaks and stored balances
+        with self.assertNumQueries(3):
+            get_purchased_hours_drift(
+                StudentOrClass.objects.values_list('id', flat=True)
+            )
+
+    def test_chunks_report_every_account(self):
+        """Test that accounts split across chunks are all compared"""
+        print("Test that accounts split across chunks are all compared")
+
+        StudentOrClass.objects.update(purchased_class_hours=Decimal('1.00'))
+
+        self.assertIn(
+            'Freelance ledger: 2 accounts, 2 drifted',
+            run_reconcile_ledgers('--chunk-size', '1')
+        )
+
+
+class ClientSchoolLedgerReconciliationTests(TestCase):
+    """Test the reconciliation of the client school purchased hours"""
+
+    def setUp(self):
+        client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.student_account = AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name='Amy Wang', client_school=client_school
+        )
+        record_cs_tuition_transaction(CSTutoringTuitionRecord(
+            student_account=self.student_account,
+            class_hours_purchased_or_refunded=10,
+            administrator_name='Admin'
+        ))
+
+    def test_changed_tutoring_balance_is_fixed(self):
+        """Test that a drifted tutoring balance is reported and adjusted"""
+        print("Test that a drifted tutoring balance is reported and adjusted")
+
+        AccountingClientSchoolStudentAccount.objects.filter(
+            id=self.student_account.id
+        ).update(purchased_tutoring_hours=Decimal('8.00'))
+
+        drift = get_cs_purchased_hours_drift([self.student_account.id])
+        self.assertEqual(
+            [(balance_drift['balance'], balance_drift['expected_hours']) for balance_drift in drift],
+            [('purchased_tutoring_hours', Decimal('10.00'))]
+        )
+
+        output = run_reconcile_ledgers('--fix')
+
+        self.assertIn('Client school ledger: 1 accounts, 1 drifted', output)
+        adjustment = CSPurchasedHoursModification.objects.get(
+            modification_type='reconciliation_adjustment'
+        )
+        self.assertEqual(adjustment.class_type, 'one_to_one_tutoring')
+        self.assertEqual(get_cs_purchased_hours_drift([self.student_account.id]), [])
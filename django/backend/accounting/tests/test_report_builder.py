@@ -0,0 +1,225 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from datetime import date, time
+from decimal import Decimal
+
+from accounting.report_builder import (
+    EarningsReportBuilder,
+    build_estimated_earnings_report,
+    build_estimated_earnings_report_for_single_school_within_date_range,
+    build_estimated_monthly_earnings_report_for_single_school,
+)
+from accounting.utils import (
+    generate_estimated_earnings_report,
+    generate_estimated_earnings_report_for_single_school_within_date_range,
+    generate_estimated_monthly_earnings_report_for_single_school,
+)
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from class_scheduling.models import ScheduledClass
+from school.models import School
+
+User = get_user_model()
+
+
+def create_test_teacher_profile(username='teacher1'):
+    """Helper function to create a user with a teacher profile"""
+    user = User.objects.create_user(username, 'testpass123')
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{username}@test.com',
+        surname='Smith',
+        given_name='John'
+    )
+
+
+def create_test_school(teacher_profile, name):
+    """Helper function to create a school"""
+    return School.objects.create(
+        school_name=name,
+        address_line_1='123 Main St',
+        address_line_2='Suite 100',
+        contact_phone='5551234567',
+        scheduling_teacher=teacher_profile
+    )
+
+
+def create_test_student(teacher_profile, name, school=None, tuition_rate=1000):
+    """Helper function to create a school or freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='school' if school else 'freelance',
+        school=school,
+        teacher=teacher_profile,
+        purchased_class_hours=None if school else Decimal('20.00'),
+        tuition_per_hour=tuition_rate,
+    )
+
+
+def create_scheduled_class(
+        teacher, student, class_date, start_time, finish_time,
+        class_status='completed'
+):
+    """Helper function to create a scheduled class"""
+    return ScheduledClass.objects.create(
+        teacher=teacher,
+        student_or_class=student,
+        date=class_date,
+        start_time=start_time,
+        finish_time=finish_time,
+        class_status=class_status
+    )
+
+
+class EarningsReportBuilderTests(TestCase):
+    """Test that the single pass report builder matches the original pipeline"""
+
+    def setUp(self):
+        self.teacher = create_test_teacher_profile()
+        self.school_beta = create_test_school(self.teacher, 'Beta School')
+        self.school_alpha = create_test_school(self.teacher, 'Alpha Academy')
+        self.empty_school = create_test_school(self.teacher, 'Empty School')
+
+        charlie = create_test_student(
+            self.teacher, 'Charlie Davis', school=self.school_alpha, tuition_rate=900
+        )
+        amy = create_test_student(
+            self.teacher, 'Amy Anderson', school=self.school_alpha, tuition_rate=800
+        )
+        diana = create_test_student(
+            self.teacher, 'Diana Miller', school=self.school_beta, tuition_rate=950
+        )
+        bob = create_test_student(
+            self.teacher, 'Bob Wilson', school=self.school_beta, tuition_rate=700
+        )
+        zack = create_test_student(self.teacher, 'Zack Brown', tuition_rate=1200)
+        alice = create_test_student(self.teacher, 'Alice Brown', tuition_rate=1000)
+
+        create_scheduled_class(
+            self.teacher, charlie, date(2024, 11, 5), time(10, 0), time(10, 59)
+        )
+        create_scheduled_class(
+            self.teacher, charlie, date(2024, 11, 12), time(10, 0), time(11, 29),
+            'same_day_cancellation'
+        )
+        create_scheduled_class(
+            self.teacher, amy, date(2024, 11, 6), time(13, 0), time(13, 44)
+        )
+        create_scheduled_class(
+            self.teacher, amy, date(2024, 11, 13), time(13, 0), time(13, 59),
+            'cancelled'
+        )
+        # only unpaid classes, so the student is listed with 0 hours
+        create_scheduled_class(
+            self.teacher, bob, date(2024, 11, 7), time(9, 0), time(9, 59),
+            'scheduled'
+        )
+        create_scheduled_class(
+            self.teacher, diana, date(2024, 11, 8), time(9, 0), time(10, 59)
+        )
+        create_scheduled_class(
+            self.teacher, zack, date(2024, 11, 9), time(15, 0), time(15, 59)
+        )
+        create_scheduled_class(
+            self.teacher, alice, date(2024, 11, 10), time(15, 0), time(16, 29)
+        )
+        create_scheduled_class(
+            self.teacher, alice, date(2024, 12, 1), time(15, 0), time(16, 29)
+        )
+
+    def test_monthly_report_matches_original_pipeline(self):
+        """Test that the monthly report is identical to the original pipeline"""
+        print("Test that the monthly report is identical to the original pipeline")
+
+        self.assertEqual(
+            build_estimated_earnings_report(self.teacher, 11, 2024),
+            generate_estimated_earnings_report(self.teacher, 11, 2024)
+        )
+
+    def test_monthly_report_structure(self):
+        """Test the sorting and totals of the monthly report"""
+        print("Test the sorting and totals of the monthly report")
+
+        report = build_estimated_earnings_report(self.teacher, 11, 2024)
+
+        self.assertEqual(
+            [school['school_name'] for school in report['classes_in_schools']],
+            ['Alpha Academy', 'Beta School']
+        )
+        alpha_report = report['classes_in_schools'][0]
+        self.assertEqual(
+            [student['name'] for student in alpha_report['students_reports']],
+            ['Amy Anderson', 'Charlie Davis']
+        )
+        self.assertEqual(alpha_report['students_reports'][1]['hours'], 2.5)
+        self.assertEqual(alpha_report['school_total'], 600 + 2250)
+        beta_report = report['classes_in_schools'][1]
+        self.assertEqual(beta_report['students_reports'][0]['hours'], 0)
+        self.assertEqual(
+            [student['name'] for student in report['freelance_students']],
+            ['Alice Brown', 'Zack Brown']
+        )
+        self.assertEqual(report['overall_monthly_total'], 2850 + 1900 + 1500 + 1200)
+
+    def test_single_school_report_matches_original_pipeline(self):
+        """Test that the single school report is identical to the original pipeline"""
+        print("Test that the single school report is identical to the original pipeline")
+
+        for school in (self.school_alpha, self.school_beta, self.empty_school):
+            self.assertEqual(
+                build_estimated_monthly_earnings_report_for_single_school(
+                    self.teacher, school, 11, 2024
+                ),
+                generate_estimated_monthly_earnings_report_for_single_school(
+                    self.teacher, school, 11, 2024
+                )
+            )
+
+    def test_date_range_report_matches_original_pipeline(self):
+        """Test that the date range report is identical to the original pipeline"""
+        print("Test that the date range report is identical to the original pipeline")
+
+        self.assertEqual(
+            build_estimated_earnings_report_for_single_school_within_date_range(
+                self.teacher, self.school_alpha, date(2024, 11, 1), date(2024, 11, 10)
+            ),
+            generate_estimated_earnings_report_for_single_school_within_date_range(
+                self.teacher, self.school_alpha, date(2024, 11, 1), date(2024, 11, 10)
+            )
+        )
+
+    def test_report_is_built_in_one_query(self):
+        """Test that the monthly report is built from a single query"""
+        print("Test that the monthly report is built from a single query")
+
+        with self.assertNumQueries(1):
+            build_estimated_earnings_report(self.teacher, 11, 2024)
+
+    def test_empty_builder(self):
+        """Test that a builder without classes returns an empty report"""
+        print("Test that a builder without classes returns an empty report")
+
+        self.assertEqual(
+            EarningsReportBuilder().build(),
+            {
+                "classes_in_schools": [],
+                "freelance_students": [],
+                "overall_monthly_total": 0
+            }
+        )
+
+    def test_benchmark_command_rolls_back_its_data(self):
+        """Test that the benchmark command compares both pipelines and rolls back"""
+        print("Test that the benchmark command compares both pipelines and rolls back")
+
+        class_count = ScheduledClass.objects.count()
+        out = io.StringIO()
+        call_command(
+            'benchmark_earnings_report', '--classes', '60',
+            '--schools', '2', '--students', '6', stdout=out
+        )
+
+        self.assertIn('totals match: True', out.getvalue())
+        self.assertEqual(ScheduledClass.objects.count(), class_count)
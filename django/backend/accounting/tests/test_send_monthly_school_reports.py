@@ -0,0 +1,255 @@
+import io
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from datetime import date, time
+from openpyxl import load_workbook
+from unittest.mock import patch
+
+from accounting.management.commands.send_monthly_school_reports import (
+    get_previous_month_and_year
+)
+from accounting.models import EmailOutboxMessage
+from accounting.report_export import (
+    get_class_values_for_all_teachers_during_month,
+    partition_class_values_by_teacher_and_school,
+)
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from class_scheduling.models import ScheduledClass
+from school.models import School
+
+User = get_user_model()
+
+
+def create_test_teacher_profile(username, given_name='John', contact_email=None):
+    """Helper function to create a user with a teacher profile"""
+    user = User.objects.create_user(username, 'testpass123')
+    return UserProfile.objects.create(
+        user=user,
+        contact_email=f'{username}@test.com' if contact_email is None else contact_email,
+        surname='Smith',
+        given_name=given_name
+    )
+
+
+def create_test_school(teacher_profile, name='Test School'):
+    """Helper function to create a school"""
+    return School.objects.create(
+        school_name=name,
+        address_line_1='123 Main St',
+        address_line_2='Suite 100',
+        contact_phone='5551234567',
+        scheduling_teacher=teacher_profile
+    )
+
+
+def create_test_student(teacher_profile, name, school=None, tuition_rate=1000):
+    """Helper function to create a school or freelance student"""
+    return StudentOrClass.objects.create(
+        student_or_class_name=name,
+        account_type='school' if school else 'freelance',
+        school=school,
+        teacher=teacher_profile,
+        purchased_class_hours=None if school else 10,
+        tuition_per_hour=tuition_rate,
+    )
+
+
+def create_scheduled_class(
+        teacher, student, class_date, class_status='completed'
+):
+    """Helper function to create a one hour scheduled class"""
+    return ScheduledClass.objects.create(
+        teacher=teacher,
+        student_or_class=student,
+        date=class_date,
+        start_time=time(10, 0),
+        finish_time=time(10, 59),
+        class_status=class_status
+    )
+
+
+class SendMonthlySchoolReportsTests(TestCase):
+    """Test the month-end bulk school report command"""
+
+    def setUp(self):
+        self.teacher_1 = create_test_teacher_profile('teacher1', given_name='John')
+        self.teacher_2 = create_test_teacher_profile('teacher2', given_name='Mary')
+        self.school_alpha = create_test_school(self.teacher_1, name='Alpha Academy')
+        self.school_beta = create_test_school(self.teacher_1, name='Beta School')
+
+        alpha_student = create_test_student(
+            self.teacher_1, 'Amy Anderson', school=self.school_alpha, tuition_rate=800
+        )
+        beta_student = create_test_student(
+            self.teacher_1, 'Diana Miller', school=self.school_beta, tuition_rate=950
+        )
+        other_alpha_student = create_test_student(
+            self.teacher_2, 'Brian Lee', school=self.school_alpha, tuition_rate=700
+        )
+        freelance_student = create_test_student(self.teacher_1, 'Alice Brown')
+
+        create_scheduled_class(self.teacher_1, alpha_student, date(2024, 11, 5))
+        create_scheduled_class(self.teacher_1, alpha_student, date(2024, 11, 12))
+        create_scheduled_class(self.teacher_1, beta_student, date(2024, 11, 7))
+        create_scheduled_class(self.teacher_2, other_alpha_student, date(2024, 11, 8))
+        create_scheduled_class(
+            self.teacher_2, other_alpha_student, date(2024, 11, 15), 'cancelled'
+        )
+        create_scheduled_class(self.teacher_1, freelance_student, date(2024, 11, 6))
+        create_scheduled_class(self.teacher_1, beta_student, date(2024, 12, 2))
+
+    def test_classes_are_partitioned_by_teacher_and_school(self):
+        """Test that one report job is made per teacher and school pair"""
+        print("Test that one report job is made per teacher and school pair")
+
+        report_jobs = partition_class_values_by_teacher_and_school(
+            get_class_values_for_all_teachers_during_month(11, 2024)
+        )
+
+        self.assertEqual(
+            [
+                (job['teacher_name'], job['school_name'], len(job['class_values']))
+                for job in report_jobs
+            ],
+            [('John', 'Alpha Academy', 2), ('John', 'Beta School', 1),
+             ('Mary', 'Alpha Academy', 1)]
+        )
+
+    def test_classes_are_pulled_in_one_query(self):
+        """Test that the classes of all teachers are pulled in a single query"""
+        print("Test that the classes of all teachers are pulled in a single query")
+
+        with self.assertNumQueries(1):
+            list(get_class_values_for_all_teachers_during_month(11, 2024))
+
+    def test_command_emails_one_report_per_teacher_and_school(self):
+        """Test that the command emails a report for every teacher and school"""
+        print("Test that the command emails a report for every teacher and school")
+
+        out = io.StringIO()
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', stdout=out
+        )
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            sorted((email.to[0], email.subject) for email in mail.outbox),
+            [
+                ('teacher1@test.com', 'Alpha Academy Monthly Report: 11/2024'),
+                ('teacher1@test.com', 'Beta School Monthly Report: 11/2024'),
+                ('teacher2@test.com', 'Alpha Academy Monthly Report: 11/2024'),
+            ]
+        )
+        self.assertFalse(
+            EmailOutboxMessage.objects.exclude(delivery_status='sent').exists()
+        )
+        self.assertIn('3 reports', out.getvalue())
+        self.assertIn('render:', out.getvalue())
+
+    def test_report_workbook_contents(self):
+        """Test that the emailed workbook holds the teacher's classes at the school"""
+        print("Test that the emailed workbook holds the teacher's classes at the school")
+
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', stdout=io.StringIO()
+        )
+
+        email = next(
+            email for email in mail.outbox
+            if email.to == ['teacher1@test.com'] and 'Alpha' in email.subject
+        )
+        file_name, content, _ = email.attachments[0]
+        self.assertEqual(file_name, 'John_Alpha Academy_11/2024.xlsx')
+        rows = list(load_workbook(io.BytesIO(content))['11'].iter_rows(values_only=True))
+        self.assertEqual(
+            rows[2][1:8], ('Amy Anderson 11/5, 12', 1, 2, 2, 800, 0, 1600)
+        )
+        self.assertEqual(rows[3][7], 1600)
+
+    def test_reports_are_delivered_over_one_connection(self):
+        """Test that all reports are delivered over a single mail connection"""
+        print("Test that all reports are delivered over a single mail connection")
+
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.open'
+        ) as mock_open:
+            call_command(
+                'send_monthly_school_reports', '--month', '11', '--year', '2024',
+                '--workers', '0', stdout=io.StringIO()
+            )
+
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_teacher_without_email_is_skipped(self):
+        """Test that teachers without a contact email are not sent a report"""
+        print("Test that teachers without a contact email are not sent a report")
+
+        UserProfile.objects.filter(id=self.teacher_2.id).update(contact_email='')
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', stdout=io.StringIO()
+        )
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_month_without_classes_sends_nothing(self):
+        """Test that a month without classes does not send any reports"""
+        print("Test that a month without classes does not send any reports")
+
+        call_command(
+            'send_monthly_school_reports', '--month', '1', '--year', '2024',
+            '--workers', '0', stdout=io.StringIO()
+        )
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertFalse(EmailOutboxMessage.objects.exists())
+
+    def test_second_run_skips_queued_reports(self):
+        """Test that running the command again for the month does not queue the reports again"""
+        print("Test that running the command again for the month does not queue the reports again")
+
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', stdout=io.StringIO()
+        )
+        out = io.StringIO()
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', stdout=out
+        )
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailOutboxMessage.objects.count(), 3)
+        self.assertIn('0 reports, 3 already in the outbox', out.getvalue())
+
+        call_command(
+            'send_monthly_school_reports', '--month', '11', '--year', '2024',
+            '--workers', '0', '--force', stdout=io.StringIO()
+        )
+        self.assertEqual(len(mail.outbox), 6)
+
+    def test_invalid_month_is_refused(self):
+        """Test that a month outside 1 to 12 is refused before any work"""
+        print("Test that a month outside 1 to 12 is refused before any work")
+
+        for month in ('0', '13'):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'send_monthly_school_reports', '--month', month,
+                    '--year', '2024', stdout=io.StringIO()
+                )
+        self.assertFalse(EmailOutboxMessage.objects.exists())
+
+    def test_previous_month_defaults(self):
+        """Test that the command defaults to the previous month"""
+        print("Test that the command defaults to the previous month")
+
+        self.assertEqual(get_previous_month_and_year(date(2025, 1, 3)), (12, 2024))
+        self.assertEqual(get_previous_month_and_year(date(2024, 12, 1)), (11, 2024))
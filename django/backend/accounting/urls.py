@@ -1,18 +1,27 @@
-from django.urls import path, include
+from django.urls import path, include, register_converter
 from rest_framework.routers import DefaultRouter
 
+from utilities.converters import IsoDateConverter
+
 from .views import (
+    EmailOutboxMessageStatusView,
     EstimatedEarningsByMonthAndYear,
+    EstimatedEarningsExcelDownloadByMonthAndYear,
     FreelanceTuitionTransactionsListViewByMonthAndYear,
+    FreelanceTuitionTransactionsSummaryByMonthRange,
     FreelanceTuitionTransactionViewSet,
+    PurchasedHoursBalanceOnDate,
     PurchasedHoursModificationRecordsListViewByAccountAndMonth,
     EstimatedSchoolEarningsByMonthAndYear,
     EstimatedSchoolEarningsEmailReportByMonthAndYear, 
+    EstimatedSchoolEarningsExcelDownloadByMonthAndYear,
     EstimatedSchoolEarningsWithinDateRange
 )
 
 app_name = "accounting"
 
+register_converter(IsoDateConverter, 'isodate')
+
 router = DefaultRouter()
 router.register(r'tuition-transactions', FreelanceTuitionTransactionViewSet)
 
@@ -28,16 +37,36 @@ urlpatterns = [
         EstimatedSchoolEarningsEmailReportByMonthAndYear.as_view(),
         name='email-estimated-school-earnings-by-month-year'
     ),
+    path(
+        'email-outbox/<int:outbox_id>/',
+        EmailOutboxMessageStatusView.as_view(),
+        name='email-outbox-status'
+    ),
+    path(
+        'download-estimated-earnings-by-month-year/<int:month>/<int:year>/',
+        EstimatedEarningsExcelDownloadByMonthAndYear.as_view(),
+        name='download-estimated-earnings-by-month-year'
+    ),
+    path(
+        'download-estimated-school-earnings-by-month-year/<int:month>/<int:year>/<int:school_id>/',
+        EstimatedSchoolEarningsExcelDownloadByMonthAndYear.as_view(),
+        name='download-estimated-school-earnings-by-month-year'
+    ),
     path(
         'estimated-school-earnings-by-month-year/<int:month>/<int:year>/<int:school_id>/',
         EstimatedSchoolEarningsByMonthAndYear.as_view(),
         name='estimated-school-earnings-by-month-year'
     ),
     path(
-        'estimated-school-earnings-within-date-range/<str:start_date>/<str:finish_date>/<int:school_id>/',
+        'estimated-school-earnings-within-date-range/<isodate:start_date>/<isodate:finish_date>/<int:school_id>/',
         EstimatedSchoolEarningsWithinDateRange.as_view(),
         name='estimated-school-earnings-within-date-range'
     ),
+    path(
+        'purchased-hours-balance/<int:account_id>/<isodate:date>/',
+        PurchasedHoursBalanceOnDate.as_view(),
+        name='purchased-hours-balance-on-date'
+    ),
     path(
         'purchased-hours-modifications/by-month-and-account/<int:month>/<int:year>/<int:account_id>/',
         PurchasedHoursModificationRecordsListViewByAccountAndMonth.as_view(),
@@ -48,4 +77,14 @@ urlpatterns = [
         FreelanceTuitionTransactionsListViewByMonthAndYear.as_view(),
         name='received-payments-by-month-year'
     ),
+    path(
+        'tuition-transactions-summary-by-month-year/<int:month>/<int:year>/',
+        FreelanceTuitionTransactionsSummaryByMonthRange.as_view(),
+        name='tuition-transactions-summary-by-month-year'
+    ),
+    path(
+        'tuition-transactions-summary-by-month-range/<int:month>/<int:year>/<int:finish_month>/<int:finish_year>/',
+        FreelanceTuitionTransactionsSummaryByMonthRange.as_view(),
+        name='tuition-transactions-summary-by-month-range'
+    ),
 ]
\ No newline at end of file
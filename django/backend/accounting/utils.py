@@ -1,11 +1,23 @@
+from decimal import Decimal
 from datetime import date, datetime, timedelta
-from django.db.models import Case, When, Value, IntegerField
+from django.db import transaction
+from django.db.models import (
+    Case, Count, Exists, F, When, Value, IntegerField, OuterRef, Q, Subquery, Sum,
+    Window
+)
+from django.db.models.functions import (
+    Coalesce, FirstValue, Lag, RowNumber, TruncMonth
+)
 from django.utils.timezone import make_aware, get_current_timezone
 
 from class_scheduling.models import ScheduledClass
 from class_scheduling.utils import determine_duration_of_class_time
 from student_account.models import StudentOrClass
-from .models import PurchasedHoursModificationRecord
+from .models import (
+    FreelanceTuitionTransactionRecord,
+    PurchasedHoursCheckpoint,
+    PurchasedHoursModificationRecord,
+)
  
 #from pprint import pprint
 
@@ -57,6 +69,188 @@ def create_purchased_hours_modification_record_for_tuition_transaction(
     )
 
 
+def get_change_in_purchased_hours():
+    return Coalesce(
+        Sum(
+            F('updated_purchased_class_hours') - F('previous_purchased_class_hours')
+        ),
+        Value(Decimal('0'))
+    )
+
+
+def get_purchased_hours_balance_at(student_or_class, timestamp):
+    """
+    Returns the purchased class hours of a freelance account at the timestamp,
+    read from the latest checkpoint plus the modifications made after it.
+    Without a checkpoint the balance before the first modification is used.
+    """
+    checkpoint = PurchasedHoursCheckpoint.objects.filter(
+        student_or_class=student_or_class, as_of__lte=timestamp
+    ).order_by('-as_of').first()
+    modifications = PurchasedHoursModificationRecord.objects.filter(
+        student_or_class=student_or_class, time_stamp__lte=timestamp
+    )
+    if checkpoint is not None:
+        opening_hours = checkpoint.purchased_class_hours
+        modifications = modifications.filter(time_stamp__gt=checkpoint.as_of)
+    else:
+        opening_hours = PurchasedHoursModificationRecord.objects.filter(
+            student_or_class=student_or_class
+        ).order_by('time_stamp', 'id').values_list(
+            'previous_purchased_class_hours', flat=True
+        ).first()
+        if opening_hours is None:
+            # the balance has never been modified
+            opening_hours = student_or_class.purchased_class_hours
+
+    tail = modifications.aggregate(
+        change=get_change_in_purchased_hours(), modifications_applied=Count('id')
+    )
+    return {
+        "purchased_class_hours": opening_hours + tail['change'],
+        "checkpoint_as_of": checkpoint.as_of if checkpoint else None,
+        "modifications_applied": tail['modifications_applied'],
+    }
+
+
+def create_purchased_hours_checkpoints(as_of):
+    """
+    Writes a checkpoint at as_of for every freelance account with a previous
+    checkpoint or a modification, from the previous checkpoint and the
+    grouped sum of the modifications after it. Re-running replaces the
+    checkpoints at as_of. Returns the number of checkpoints written.
+    """
+    previous_checkpoints = PurchasedHoursCheckpoint.objects.filter(
+        student_or_class=OuterRef('student_or_class'), as_of__lt=as_of
+    ).order_by('-as_of')
+    latest_checkpoints = PurchasedHoursCheckpoint.objects.filter(
+        as_of__lt=as_of,
+        as_of=Subquery(previous_checkpoints.values('as_of')[:1])
+    )
+    balances = {
+        student_or_class_id: hours for student_or_class_id, hours in
+        latest_checkpoints.values_list('student_or_class_id', 'purchased_class_hours')
+    }
+
+    modifications = PurchasedHoursModificationRecord.objects.filter(
+        time_stamp__lte=as_of
+    ).order_by()
+    # accounts with a checkpoint only add the modifications made after it
+    tail_changes = modifications.alias(
+        checkpoint_as_of=Subquery(previous_checkpoints.values('as_of')[:1])
+    ).filter(
+        time_stamp__gt=F('checkpoint_as_of')
+    ).values('student_or_class').annotate(change=get_change_in_purchased_hours())
+    for row in tail_changes:
+        balances[row['student_or_class']] += row['change']
+
+    # accounts without a checkpoint start from the hours before their first modification
+    first_modifications = PurchasedHoursModificationRecord.objects.filter(
+        student_or_class=OuterRef('student_or_class')
+    ).order_by('time_stamp', 'id')
+    full_history_changes = modifications.filter(
+        ~Exists(previous_checkpoints)
+    ).values('student_or_class').annotate(
+        change=get_change_in_purchased_hours(),
+        opening_hours=Subquery(
+            first_modifications.values('previous_purchased_class_hours')[:1]
+        )
+    )
+    for row in full_history_changes:
+        balances[row['student_or_class']] = row['opening_hours'] + row['change']
+
+    with transaction.atomic():
+        PurchasedHoursCheckpoint.objects.filter(as_of=as_of).delete()
+        PurchasedHoursCheckpoint.objects.bulk_create(
+            [
+                PurchasedHoursCheckpoint(
+                    student_or_class_id=student_or_class_id,
+                    as_of=as_of,
+                    purchased_class_hours=hours
+                ) for student_or_class_id, hours in balances.items()
+            ],
+            batch_size=500
+        )
+    return len(balances)
+
+
+def get_purchased_hours_drift(student_or_class_ids):
+    """
+    Compares the stored purchased class hours of the freelance accounts with
+    the balance expected from their modification history: the hours before the
+    first modification plus the change of all of them. Returns the accounts
+    which do not match, with the number of chain breaks in their history, where
+    a modification does not start from the hours the previous one left.
+    """
+    modifications = PurchasedHoursModificationRecord.objects.filter(
+        student_or_class_id__in=student_or_class_ids
+    ).order_by()
+    history = {
+        'partition_by': [F('student_or_class')],
+        'order_by': [F('time_stamp').asc(), F('id').asc()],
+    }
+    expected_balances = {
+        student_or_class_id: opening_hours + change
+        for student_or_class_id, opening_hours, change in modifications.annotate(
+            opening_hours=Window(
+                FirstValue('previous_purchased_class_hours'), **history
+            ),
+            change=Window(
+                Sum(
+                    F('updated_purchased_class_hours')
+                    - F('previous_purchased_class_hours')
+                ),
+                partition_by=[F('student_or_class')]
+            ),
+            position=Window(RowNumber(), **history),
+        ).filter(position=1).values_list(
+            'student_or_class_id', 'opening_hours', 'change'
+        )
+    }
+    chain_breaks = {}
+    for student_or_class_id in modifications.annotate(
+        hours_left=Window(Lag('updated_purchased_class_hours'), **history)
+    ).exclude(
+        previous_purchased_class_hours=F('hours_left')
+    ).filter(
+        hours_left__isnull=False
+    ).values_list('student_or_class_id', flat=True):
+        chain_breaks[student_or_class_id] = chain_breaks.get(student_or_class_id, 0) + 1
+
+    drift = []
+    for student_or_class_id, stored_hours in StudentOrClass.objects.filter(
+        id__in=expected_balances
+    ).values_list('id', 'purchased_class_hours'):
+        expected_hours = expected_balances[student_or_class_id]
+        if stored_hours != expected_hours:
+            drift.append({
+                "student_or_class_id": student_or_class_id,
+                "stored_hours": stored_hours,
+                "expected_hours": expected_hours,
+                "chain_breaks": chain_breaks.get(student_or_class_id, 0),
+            })
+    return drift
+
+
+def create_purchased_hours_reconciliation_adjustments(drift):
+    """
+    Appends a modification from the expected to the stored hours for every
+    account whose balance drifted, so that the history adds up to the balance
+    the teacher sees. Returns the number of adjustments written.
+    """
+    adjustments = [
+        PurchasedHoursModificationRecord(
+            student_or_class_id=account_drift['student_or_class_id'],
+            modification_type='reconciliation_adjustment',
+            previous_purchased_class_hours=account_drift['expected_hours'],
+            updated_purchased_class_hours=account_drift['stored_hours'],
+        ) for account_drift in drift
+        if account_drift['stored_hours'] is not None
+    ]
+    PurchasedHoursModificationRecord.objects.bulk_create(adjustments, batch_size=500)
+    return len(adjustments)
+
+
 def create_timestamps_for_beginning_and_end_of_month_and_year(month: int, year: int) -> dict:
     """
     Generate timestamps for the beginning and end of a specific month and year.
@@ -92,14 +286,88 @@ def create_timestamps_for_beginning_and_end_of_month_and_year(month: int, year:
     }
 
 
-def get_scheduled_classes_during_month_period(
-        teacher, month, year
+def get_freelance_tuition_transactions_during_month_range(
+        user, start_month, start_year, finish_month, finish_year
 ):
+    start_timestamp = create_timestamps_for_beginning_and_end_of_month_and_year(
+        start_month, start_year
+    )['start']
+    end_timestamp = create_timestamps_for_beginning_and_end_of_month_and_year(
+        finish_month, finish_year
+    )['end']
+    # filtering on the user id column saves joining the auth user table
+    return FreelanceTuitionTransactionRecord.objects.filter(
+        student_or_class__teacher__user_id=user.id,
+        time_stamp__range=(start_timestamp, end_timestamp)
+    )
+
+
+def sum_freelance_tuition_transactions(transaction_type, field):
+    return Coalesce(
+        Sum(field, filter=Q(transaction_type=transaction_type)), 0
+    )
+
+
+def summarize_freelance_tuition_transactions_by_month(transactions):
+    """
+    Totals the payments, refunds and hours of the transactions per month,
+    with conditional sums in a single grouped query.
+    """
+    monthly_totals = transactions.annotate(
+        period=TruncMonth('time_stamp')
+    ).order_by().values('period').annotate(
+        payments=sum_freelance_tuition_transactions('payment', 'transaction_amount'),
+        refunds=sum_freelance_tuition_transactions('refund', 'transaction_amount'),
+        hours_sold=sum_freelance_tuition_transactions(
+            'payment', 'class_hours_purchased_or_refunded'
+        ),
+        hours_refunded=sum_freelance_tuition_transactions(
+            'refund', 'class_hours_purchased_or_refunded'
+        ),
+    ).order_by('period')
+
+    periods = []
+    for totals in monthly_totals:
+        periods.append({
+            "month": totals['period'].month,
+            "year": totals['period'].year,
+            "payments": totals['payments'],
+            "refunds": totals['refunds'],
+            "net": totals['payments'] - totals['refunds'],
+            "hours_sold": totals['hours_sold'],
+            "hours_refunded": totals['hours_refunded'],
+        })
+    return periods
+
+
+def calculate_freelance_tuition_transaction_totals(periods):
+    totals = {
+        "payments": 0,
+        "refunds": 0,
+        "net": 0,
+        "hours_sold": 0,
+        "hours_refunded": 0,
+    }
+    for period in periods:
+        for key in totals:
+            totals[key] += period[key]
+    return totals
+
+
+def get_month_date_range(month, year):
+    # half-open range: start_date <= date < finish_date
     start_date = date(int(year), int(month), 1)
     if int(month) == 12:
         finish_date = date(int(year) + 1, 1, 1)
     else:
         finish_date = date(int(year), int(month) + 1, 1)
+    return start_date, finish_date
+
+
+def get_scheduled_classes_during_month_period(
+        teacher, month, year
+):
+    start_date, finish_date = get_month_date_range(month, year)
 
     queryset = ScheduledClass.objects.filter(
                 date__gte=start_date,
@@ -133,11 +401,7 @@ def get_scheduled_classes_at_school_during_date_range(
 def get_scheduled_classes_at_school_during_month_period(
         teacher, school, month, year
 ):
-    start_date = date(int(year), int(month), 1)
-    if int(month) == 12:
-        finish_date = date(int(year) + 1, 1, 1)
-    else:
-        finish_date = date(int(year), int(month) + 1, 1)
+    start_date, finish_date = get_month_date_range(month, year)
 
     queryset = ScheduledClass.objects.filter(
                 date__gte=start_date,
@@ -229,86 +493,6 @@ def organize_scheduled_classes(classes):
     return organized_data
 
 
-# this will prepare data for a school report in which 
-# each student or classes' recorded classes will be sub-sorted by 
-# duration of class time. This is to match the format of the accouning report
-# at my current school
-def organize_scheduled_classes_by_duration_for_emailed_report(organized_classes):
-    #print('inside next function')
-    school_data = organized_classes['classes_in_schools'][0]
-    reorganized_school_report = {
-        "school_name": school_data['school_name'],
-        "students_classes": []
-    }
-    students_classes = school_data['students_classes']
-    for batch_of_classes in students_classes:
-        reorganized_batch = {
-            'student_or_class_name': batch_of_classes['student_or_class_name'],
-            'scheduled_classes': {}
-        }
-        scheduled_classes = batch_of_classes['scheduled_classes']
-        scheduled_classes_sorted_by_duration = {}
-        for scheduled_class in scheduled_classes:
-            duration_of_class_time = determine_duration_of_class_time(
-                scheduled_class.start_time, scheduled_class.finish_time
-            )
-            if duration_of_class_time not in scheduled_classes_sorted_by_duration:
-                scheduled_classes_sorted_by_duration[duration_of_class_time] = [scheduled_class]
-            else: scheduled_classes_sorted_by_duration[duration_of_class_time].append(scheduled_class)
-        reorganized_batch["scheduled_classes"] = scheduled_classes_sorted_by_duration
-        reorganized_school_report['students_classes'].append(reorganized_batch)
-    return reorganized_school_report
-
-
-def organize_sorted_classes_by_durations_into_list_of_dicts_for_excel_sheet(
-        classes_data_sorted_by_duration
-    ):
-    #print("inside next function")
-    #print("this is the data:")
-    #pprint(classes_data_sorted_by_duration)
-    new_list_of_dicts = []
-    for student_or_class_data in classes_data_sorted_by_duration['students_classes']:
-        #print("iteration")
-        
-        #print(student_or_class_data)
-        for k, v in student_or_class_data['scheduled_classes'].items():
-            #print(k, v)
-            classes_with_payments = [
-                scheduled_class 
-                for scheduled_class in v
-                if scheduled_class.class_status in ['same_day_cancellation', 'completed']
-            ]
-            #print(classes_with_payments)
-
-            if len(classes_with_payments) > 0:
-                #print(":::::These are the classes with payments::::::")
-                #pprint(classes_with_payments)
-                #print("This is the pay rate")
-                #print(classes_with_payments[0])
-                pay_rate = classes_with_payments[0].student_or_class.tuition_per_hour
-                #print(pay_rate)
-                #pay_per_class = pay_rate * k
-                number_of_classes = len(classes_with_payments)
-                total_hours = number_of_classes * k
-                class_dates = [
-                    scheduled_class.date 
-                    for scheduled_class in classes_with_payments
-                ]
-                student_duration_data = {
-                    "student_or_class_name": student_or_class_data['student_or_class_name'],
-                    "scheduled_classes": format_date_range_same_month(class_dates),#classes_with_payments,
-                    "pay rate": pay_rate,
-                    "class_duration": k,
-                    "total_hours": total_hours,
-                    #"pay per class": pay_per_class,
-                    "number_of_classes": number_of_classes,
-                    "payment": total_hours * pay_rate
-                }
-                new_list_of_dicts.append(student_duration_data)
-    return sorted(
-        new_list_of_dicts, key=lambda report: report['student_or_class_name']
-    )
-
 def process_school_classes(accounting_data, organized_classes_data):
     for school_data in organized_classes_data["classes_in_schools"]:
 
@@ -545,33 +729,3 @@ def generate_estimated_monthly_earnings_report_for_single_school(
             "students_reports": [],
             "school_total": float(0)
         }
-
-# this will send an excel file with the monthly report formated
-# so that each students'/class' data will be sorted by duration
-# to match the accounting report format used at my current job
-def generate_and_email_school_monthly_earnings_report_file(
-        teacher, school, month, year
-    ):
-    classes_during_period = get_scheduled_classes_at_school_during_month_period(
-        teacher, school, month, year
-    )
-    organized_classes_data = organize_scheduled_classes(classes=classes_during_period)
-    #pprint(organized_classes_data)
-    #print('this is inside the utils function')
-    #print("**********************************************************")
-    classes_data_sorted_by_duration = organize_scheduled_classes_by_duration_for_emailed_report(
-        organized_classes_data
-    )
-    #print('___________________This is the data after sorting by duration________________')
-    #pprint(classes_data_sorted_by_duration)
-    classes_sorted_into_list_of_dicts_for_excel_prep = organize_sorted_classes_by_durations_into_list_of_dicts_for_excel_sheet(
-        classes_data_sorted_by_duration
-    )
-    #print("*******************************************************************")
-    #print("sorted_again by duration")
-    #print("**************************************************************")
-    #pprint(classes_sorted_into_list_of_dicts_for_excel_prep)
-    return classes_sorted_into_list_of_dicts_for_excel_prep
-
-
-
@@ -1,14 +1,33 @@
+import logging
+from datetime import datetime, time
+from django.http import FileResponse
+from django.utils.timezone import get_current_timezone, make_aware
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from student_account.models import StudentOrClass
 from user_profiles.models import UserProfile
 from school.models import School
-from .email_utils import send_class_data_excel_via_email
+from .email_utils import queue_class_data_excel_email
+from .report_builder import (
+    REPORT_BUCKETS,
+    build_bucketed_estimated_earnings_report_for_single_school_within_date_range,
+    build_estimated_earnings_report,
+    build_estimated_monthly_earnings_report_for_single_school,
+    build_estimated_earnings_report_for_single_school_within_date_range,
+)
+from .report_export import (
+    EXCEL_CONTENT_TYPE,
+    build_all_schools_report_workbook_file,
+    build_school_report_workbook_file,
+    iter_school_report_rows,
+)
 
 from .models import (
+    EmailOutboxMessage,
     FreelanceTuitionTransactionRecord,
     PurchasedHoursModificationRecord
     )
@@ -17,14 +36,16 @@ from .serializers import (
     PurchasedHoursModificationRecordSerializer
     )
 from .utils import (
+    calculate_freelance_tuition_transaction_totals,
     create_purchased_hours_modification_record_for_tuition_transaction,
     create_timestamps_for_beginning_and_end_of_month_and_year,
-    generate_estimated_earnings_report,
-    generate_estimated_monthly_earnings_report_for_single_school,
-    generate_estimated_earnings_report_for_single_school_within_date_range,
-    generate_and_email_school_monthly_earnings_report_file
+    get_freelance_tuition_transactions_during_month_range,
+    get_purchased_hours_balance_at,
+    summarize_freelance_tuition_transactions_by_month,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class EstimatedEarningsByMonthAndYear(APIView):
     permission_classes = (
@@ -35,7 +56,7 @@ class EstimatedEarningsByMonthAndYear(APIView):
         teacher = get_object_or_404(UserProfile, user=self.request.user)
         month = self.kwargs.get("month")
         year = self.kwargs.get("year")
-        monthly_accounting_report = generate_estimated_earnings_report(
+        monthly_accounting_report = build_estimated_earnings_report(
             teacher=teacher, month=month, year=year
         )
         
@@ -53,7 +74,7 @@ class EstimatedSchoolEarningsByMonthAndYear(APIView):
         teacher = get_object_or_404(UserProfile, user=self.request.user)
         month = self.kwargs.get("month")
         year = self.kwargs.get("year")
-        monthly_accounting_report = generate_estimated_monthly_earnings_report_for_single_school(
+        monthly_accounting_report = build_estimated_monthly_earnings_report_for_single_school(
             teacher=teacher, school=school, month=month, year=year
         )
         
@@ -63,7 +84,9 @@ class EstimatedSchoolEarningsByMonthAndYear(APIView):
 
 # this will send an excel file with the monthly report formated
 # so that each students'/class' data will be sorted by duration
-# to match the accounting report format used at my current job
+# to match the accounting report format used at my current job.
+# The email is queued in the outbox and sent by the deliver_outbox_emails
+# command, so the request does not wait on the mail server
 class EstimatedSchoolEarningsEmailReportByMonthAndYear(APIView):
     permission_classes = (
         IsAuthenticated,
@@ -76,25 +99,94 @@ class EstimatedSchoolEarningsEmailReportByMonthAndYear(APIView):
         month = self.kwargs.get("month")
         year = self.kwargs.get("year")
         try:
-            data = generate_and_email_school_monthly_earnings_report_file(
+            data = iter_school_report_rows(
                     teacher=teacher, school=school, 
                     month=month, year=year
                 )
-            teacher_name = teacher.given_name
-            school_name = school.school_name
-            email_address=teacher.contact_email
-            send_class_data_excel_via_email(
-                data, month, year, email_address, 
-                teacher_name, school_name
-            )
-            return Response({"message": "The report has been emailed to you"}
+            outbox_message = queue_class_data_excel_email(
+                data, month, year, teacher.contact_email,
+                teacher.given_name, school.school_name,
+                requested_by=teacher
             )
         except Exception as e:
+            logger.exception("Error generating the emailed report: %s", e)
             return Response(
                 {"Error": "There was an error generating the report"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        return Response(
+            {
+                "message": "The report will be emailed to you shortly",
+                "outbox_id": outbox_message.id
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class EmailOutboxMessageStatusView(APIView):
+    permission_classes = (
+        IsAuthenticated,
+    )
+
+    def get(self, *args, **kwargs):
+        outbox_message = get_object_or_404(
+            EmailOutboxMessage, id=self.kwargs.get("outbox_id"),
+            requested_by__user=self.request.user
+        )
+        return Response({
+            "outbox_id": outbox_message.id,
+            "delivery_status": outbox_message.delivery_status,
+            "attempts": outbox_message.attempts,
+            "sent_at": outbox_message.sent_at,
+        })
+
+
+# the same report as above, but downloaded directly; the workbook is
+# written in write-only mode and streamed back from a temporary file
+class EstimatedSchoolEarningsExcelDownloadByMonthAndYear(APIView):
+    permission_classes = (
+        IsAuthenticated,
+    )
+
+    def get(self, *args, **kwargs):
+        school_id = self.kwargs.get("school_id")
+        school = get_object_or_404(School, id=school_id)
+        teacher = get_object_or_404(UserProfile, user=self.request.user)
+        month = self.kwargs.get("month")
+        year = self.kwargs.get("year")
+        report_file = build_school_report_workbook_file(
+            rows=iter_school_report_rows(
+                teacher=teacher, school=school, month=month, year=year
+            ),
+            month=month, year=year,
+            teacher_name=teacher.given_name,
+            email_address=teacher.contact_email
+        )
+        return FileResponse(
+            report_file, as_attachment=True,
+            filename=F'{teacher.given_name}_{school.school_name}_{month}-{year}.xlsx',
+            content_type=EXCEL_CONTENT_TYPE
+        )
+
+
+# one sheet per school for all of the teacher's schools in the month
+class EstimatedEarningsExcelDownloadByMonthAndYear(APIView):
+    permission_classes = (
+        IsAuthenticated,
+    )
 
+    def get(self, *args, **kwargs):
+        teacher = get_object_or_404(UserProfile, user=self.request.user)
+        month = self.kwargs.get("month")
+        year = self.kwargs.get("year")
+        report_file = build_all_schools_report_workbook_file(
+            teacher=teacher, month=month, year=year
+        )
+        return FileResponse(
+            report_file, as_attachment=True,
+            filename=F'{teacher.given_name}_{month}-{year}.xlsx',
+            content_type=EXCEL_CONTENT_TYPE
+        )
 
 
 class EstimatedSchoolEarningsWithinDateRange(APIView):
@@ -108,7 +200,32 @@ class EstimatedSchoolEarningsWithinDateRange(APIView):
         teacher = get_object_or_404(UserProfile, user=self.request.user)
         start_date = self.kwargs.get("start_date")
         finish_date = self.kwargs.get("finish_date")
-        accounting_report_within_date_range = generate_estimated_earnings_report_for_single_school_within_date_range(
+        # optional ?bucket=day|week|semi-month|month adds a breakdown
+        # of the range into one report per payroll period
+        bucket = self.request.query_params.get("bucket")
+        if bucket is not None:
+            if bucket not in REPORT_BUCKETS:
+                return Response(
+                    {
+                        "message": "The bucket must be one of: {}".format(
+                            ", ".join(REPORT_BUCKETS)
+                        )
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if start_date > finish_date:
+                return Response(
+                    {"message": "The start date must not be after the finish date."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(
+                build_bucketed_estimated_earnings_report_for_single_school_within_date_range(
+                    teacher=teacher, school=school,
+                    start_date=start_date, finish_date=finish_date,
+                    bucket=bucket
+                )
+            )
+        accounting_report_within_date_range = build_estimated_earnings_report_for_single_school_within_date_range(
             teacher=teacher, school=school, 
             start_date=start_date, finish_date=finish_date
         )
@@ -154,7 +271,7 @@ class FreelanceTuitionTransactionsListViewByMonthAndYear(generics.ListAPIView):
         )
 
         queryset = self.model.objects.filter(
-            student_or_class__teacher__user=self.request.user,
+            student_or_class__teacher__user_id=self.request.user.id,
             time_stamp__range=(query_timestamps['start'], query_timestamps['end'])
         )
         return queryset.order_by(
@@ -162,6 +279,42 @@ class FreelanceTuitionTransactionsListViewByMonthAndYear(generics.ListAPIView):
         )
 
 
+# returns the transactions together with the payment, refund, net and
+# hours sold totals of each month, so the client does not add them up.
+# Without the finish month and year it covers a single month
+class FreelanceTuitionTransactionsSummaryByMonthRange(APIView):
+    permission_classes = (
+        IsAuthenticated,
+    )
+
+    def get(self, *args, **kwargs):
+        start_month = self.kwargs.get("month")
+        start_year = self.kwargs.get("year")
+        finish_month = self.kwargs.get("finish_month", start_month)
+        finish_year = self.kwargs.get("finish_year", start_year)
+        if (
+                not 1 <= start_month <= 12 or not 1 <= finish_month <= 12
+                or (finish_year, finish_month) < (start_year, start_month)
+        ):
+            return Response(
+                {"message": "Invalid month range"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        transactions = get_freelance_tuition_transactions_during_month_range(
+            self.request.user, start_month, start_year, finish_month, finish_year
+        )
+        periods = summarize_freelance_tuition_transactions_by_month(transactions)
+        serializer = FreelanceTuitionTransactionRecordSerializer(
+            transactions.order_by('time_stamp'), many=True
+        )
+        return Response({
+            "transactions": serializer.data,
+            "periods": periods,
+            "totals": calculate_freelance_tuition_transaction_totals(periods),
+        })
+
+
 class PurchasedHoursModificationRecordsListViewByAccountAndMonth(generics.ListAPIView):
     permission_classes = (
         IsAuthenticated,
@@ -186,3 +339,28 @@ class PurchasedHoursModificationRecordsListViewByAccountAndMonth(generics.ListAP
         return queryset.order_by(
             'time_stamp',
         )
+
+
+# the purchased class hours of a freelance account at the end of the date,
+# from the latest balance checkpoint and the modifications made after it
+class PurchasedHoursBalanceOnDate(APIView):
+    permission_classes = (
+        IsAuthenticated,
+    )
+
+    def get(self, *args, **kwargs):
+        student_or_class = get_object_or_404(
+            StudentOrClass,
+            id=self.kwargs.get("account_id"),
+            teacher__user=self.request.user
+        )
+        balance_date = self.kwargs.get("date")
+        end_of_day = make_aware(
+            datetime.combine(balance_date, time.max), get_current_timezone()
+        )
+        balance = get_purchased_hours_balance_at(student_or_class, end_of_day)
+        return Response({
+            "account_id": student_or_class.id,
+            "date": balance_date,
+            **balance
+        })
@@ -235,3 +235,6 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# the school of the staff admin users who are not assigned to a client school
+STAFF_ADMIN_DEFAULT_SCHOOL_NAME = "David's English Center"
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('class_scheduling', '0004_scheduledclass_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduledclass',
+            index=models.Index(fields=['student_or_class', 'date'], name='scheduled_class_student_idx'),
+        ),
+    ]
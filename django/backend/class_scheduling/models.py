@@ -165,6 +165,23 @@ class ScheduledClassManager(models.Manager):
             location_id=location_id
         )
 
+    def with_status_confirmation_accounts(self):
+        # loads the enrollment handler and every account a status change
+        # can modify along with the class, so confirming it does not look
+        # each of them up separately
+        enrollment_handler = 'student_or_class__teachers_student_or_class_record'
+        return self.get_queryset().select_related(
+            'teacher',
+            'group_class_meeting_record',
+            f'{enrollment_handler}__client_school_one_to_one_account',
+            f'{enrollment_handler}__client_school_online_account',
+            f'{enrollment_handler}__client_school_company_account',
+            f'{enrollment_handler}__client_group_class',
+        ).prefetch_related(
+            f'{enrollment_handler}__client_school_two_to_one_accounts',
+            f'{enrollment_handler}__client_group_class__client_group_class_accounts',
+        )
+
 
 class ScheduledClass(models.Model):
     custom_query = ScheduledClassManager()
@@ -204,3 +221,9 @@ class ScheduledClass(models.Model):
     class Meta:
         verbose_name_plural = 'Scheduled Classes'
         ordering = ['-date', 'teacher', 'start_time']
+        indexes = [
+            models.Index(
+                fields=['student_or_class', 'date'],
+                name='scheduled_class_student_idx'
+            ),
+        ]
@@ -1,4 +1,5 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin
 from datetime import time, timedelta, datetime
 from django import forms
 from django.contrib import admin, messages
@@ -6,7 +7,6 @@ from rangefilter.filters import DateRangeFilter
 
 from .models import ScheduledClass, CLASS_STATUS
 from .utils import class_is_double_booked
-from student_account.models import StudentOrClass
 
 
 DURATION_OPTIONS = [
@@ -127,9 +127,8 @@ class StaffScheduledClassForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_or_class'].queryset = StudentOrClass.objects.filter(
-            school__school_name="David's English Center"
-        ).order_by(
+        # limited to the staff user's schools by the admin
+        self.fields['student_or_class'].queryset = self.fields['student_or_class'].queryset.order_by(
             'teacher__surname',
             'teacher__given_name',
             'student_or_class_name'
@@ -154,12 +153,19 @@ class StaffScheduledClassForm(forms.ModelForm):
         return cleaned_data
 
 
-class StaffScheduledClassAdmin(admin.ModelAdmin):
+class StaffScheduledClassAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     form = StaffScheduledClassForm
     autocomplete_fields = ['student_or_class']
     exclude = ('teacher', 'finish_time')  # hides the field from the form
     list_display = ('teacher', 'student_or_class', 'date',
                     'start_time', 'finish_time', 'location')
+    # the related objects each column's __str__ reaches
+    list_select_related = (
+        'teacher__user',
+        'student_or_class__teacher',
+        'student_or_class__school',
+        'location__venue',
+    )
     ordering = ('-date', 'teacher__given_name', 'start_time')
     list_filter = (
         ('date', DateRangeFilter),
@@ -171,10 +177,8 @@ class StaffScheduledClassAdmin(admin.ModelAdmin):
         'teacher__user__username', 'location__space_name'
     ]
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            student_or_class__school__school_name="David's English Center"
-        )
+    staff_school_lookup = 'student_or_class__school'
+    staff_school_related_fields = {'student_or_class': ('school', None)}
 
     def save_model(self, request, obj, form, change):
         # automatically set teacher from the school's scheduling_teacher
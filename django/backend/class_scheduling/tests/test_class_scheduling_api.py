@@ -13,6 +13,20 @@ from student_account.models import StudentOrClass
 from user_profiles.models import UserProfile
 from school.models import School
 from accounting.models import PurchasedHoursModificationRecord
+from client_school.models import ClientSchool
+from client_school_accounting.models import (
+    AccountingClientSchoolGroupClass,
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
+from client_school_group_attendance.models import GroupClassStudentAttendanceRecord
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from client_school_transactions.utils import get_cs_purchased_hours_drift
+from class_scheduling.utils import apply_client_school_purchased_hours_modification
 
 
 class ClassSchedulingAPITestCase(TestCase):
@@ -584,6 +598,179 @@ class ScheduledClassStatusConfirmationTests(ClassSchedulingAPITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class ClientSchoolClassStatusConfirmationTests(ClassSchedulingAPITestCase):
+    """Test cases for confirming the status of client school classes."""
+
+    def setUp(self):
+        super().setUp()
+        self.client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.client_student_accounts = [
+            AccountingClientSchoolStudentAccount.objects.create(
+                client_student_name=name,
+                client_school=self.client_school,
+                purchased_tutoring_hours=Decimal('10.00'),
+                tutoring_hours_expiration_date=datetime.date(2099, 1, 1),
+                purchased_group_class_hours=Decimal('10.00'),
+                group_hours_expiration_date=datetime.date(2099, 1, 1),
+            )
+            for name in ('Amy Wang', 'Ben Lin', 'Carl Chen')
+        ]
+        self.url = self.base_url + 'class-status-confirmation/'
+
+    def create_client_school_class(self, class_enrollment_type, name):
+        student_or_class = StudentOrClass.objects.create(
+            student_or_class_name=name,
+            account_type='school',
+            school=self.school,
+            teacher=self.teacher1_profile,
+            tuition_per_hour=900,
+        )
+        enrollment_handler = ClientSchoolClassEnrollmentHandler.objects.create(
+            student_or_class=student_or_class,
+            class_enrollment_type=class_enrollment_type,
+        )
+        scheduled_class = ScheduledClass.objects.create(
+            student_or_class=student_or_class,
+            teacher=self.teacher1_profile,
+            date=datetime.date(2024, 12, 16),
+            start_time=datetime.time(10, 0),
+            finish_time=datetime.time(10, 59),
+            class_status='scheduled',
+        )
+        return enrollment_handler, scheduled_class
+
+    def confirm_class(self, scheduled_class, class_status='completed'):
+        return self.client.patch(self.url, {
+            'id': scheduled_class.id,
+            'class_status': class_status,
+            'teacher_notes': 'Notes',
+            'class_content': 'Content'
+        }, format='json')
+
+    def test_two_to_one_class_deducts_hours_of_both_students(self):
+        """Test that completing a two-to-one class deducts the hours of both students."""
+        self.client.force_authenticate(user=self.user1)
+        enrollment_handler, scheduled_class = self.create_client_school_class(
+            'two_to_one_tutoring', 'Amy and Ben'
+        )
+        enrollment_handler.client_school_two_to_one_accounts.set(
+            self.client_student_accounts[:2]
+        )
+
+        response = self.confirm_class(scheduled_class)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            response.data['client_school_accounting_update_message'],
+            'Client school two-to-one tutoring hours deducted'
+        )
+        for student_account in self.client_student_accounts[:2]:
+            student_account.refresh_from_db()
+            self.assertEqual(student_account.purchased_tutoring_hours, Decimal('9.00'))
+        self.assertEqual(
+            list(CSPurchasedHoursModification.objects.values_list(
+                'modification_type', 'previous_hours', 'updated_hours'
+            )),
+            [('class_status_modification_deduct', Decimal('10'), Decimal('9'))] * 2
+        )
+
+        self.confirm_class(scheduled_class, 'scheduled')
+
+        student_account = self.client_student_accounts[0]
+        student_account.refresh_from_db()
+        self.assertEqual(student_account.purchased_tutoring_hours, Decimal('10.00'))
+
+    def test_group_class_creates_meeting_and_attendance_records(self):
+        """Test that completing a group class records the attendance of each student once."""
+        self.client.force_authenticate(user=self.user1)
+        enrollment_handler, scheduled_class = self.create_client_school_class(
+            'group_class', 'Group A'
+        )
+        enrollment_handler.client_group_class = AccountingClientSchoolGroupClass.objects.create(
+            group_class_name='Group A', client_school=self.client_school
+        )
+        enrollment_handler.save()
+        enrollment_handler.client_group_class.client_group_class_accounts.set(
+            self.client_student_accounts
+        )
+
+        response = self.confirm_class(scheduled_class)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        meeting_record_id = response.data['scheduled_class']['group_class_meeting_record']
+        self.assertIsNotNone(meeting_record_id)
+        self.assertIn('with 3 students', response.data['client_school_accounting_update_message'])
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.filter(
+            group_class_meeting_record_id=meeting_record_id
+        ).count(), 3)
+
+        self.confirm_class(scheduled_class, 'cancelled')
+        response = self.confirm_class(scheduled_class)
+
+        self.assertEqual(
+            response.data['scheduled_class']['group_class_meeting_record'], meeting_record_id
+        )
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.count(), 3)
+
+    def test_payment_after_loading_the_accounts_is_kept_in_the_ledger(self):
+        """Test that a payment made while a class is confirmed starts the next modification."""
+        self.client.force_authenticate(user=self.user1)
+        enrollment_handler, scheduled_class = self.create_client_school_class(
+            'two_to_one_tutoring', 'Amy and Ben'
+        )
+        enrollment_handler.client_school_two_to_one_accounts.set(
+            self.client_student_accounts[:2]
+        )
+        # the accounts are loaded with the class before the payment lands
+        loaded_student_accounts = list(
+            enrollment_handler.client_school_two_to_one_accounts.all()
+        )
+        record_cs_tuition_transaction(CSTutoringTuitionRecord(
+            student_account=self.client_student_accounts[0],
+            class_hours_purchased_or_refunded=5,
+            administrator_name='Admin'
+        ))
+
+        apply_client_school_purchased_hours_modification(
+            loaded_student_accounts, enrollment_handler, 'two_to_one_tutoring',
+            'deduct', 1
+        )
+
+        self.assertEqual(
+            list(CSPurchasedHoursModification.objects.filter(
+                student_account=self.client_student_accounts[0]
+            ).order_by('id').values_list('previous_hours', 'updated_hours')),
+            [
+                (Decimal('10.00'), Decimal('15.00')),
+                (Decimal('15.00'), Decimal('14.00')),
+            ]
+        )
+        self.assertEqual(loaded_student_accounts[0].purchased_tutoring_hours, Decimal('14.00'))
+        self.assertEqual(get_cs_purchased_hours_drift([
+            student_account.id for student_account in self.client_student_accounts
+        ]), [])
+
+    def test_confirmation_queries_do_not_grow_with_students(self):
+        """Test that a two-to-one confirmation takes a fixed number of queries."""
+        self.client.force_authenticate(user=self.user1)
+        enrollment_handler, scheduled_class = self.create_client_school_class(
+            'two_to_one_tutoring', 'Amy, Ben and Carl'
+        )
+        enrollment_handler.client_school_two_to_one_accounts.set(
+            self.client_student_accounts
+        )
+
+        # the class with its accounts, the prefetched two-to-one accounts,
+        # the class update, then the balance lock, the balance update and
+        # the modifications within a savepoint
+        with self.assertNumQueries(8):
+            self.confirm_class(scheduled_class)
+
+
 class ScheduledClassBatchDeletionTests(ClassSchedulingAPITestCase):
     """Test cases for ScheduledClassBatchDeletionView."""
 
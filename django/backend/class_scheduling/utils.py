@@ -1,11 +1,17 @@
 from datetime import datetime, timedelta
 import decimal
+from django.db import transaction
+from django.db.models import F
 
 from accounting.models import PurchasedHoursModificationRecord
 from client_school_accounting.models import (
+    AccountingClientSchoolStudentAccount,
     ClientSchoolClassEnrollmentHandler,
 )
-from client_school_transactions.models import CSPurchasedHoursModification
+from client_school_transactions.models import (
+    CLASS_TYPE_BALANCES,
+    CSPurchasedHoursModification,
+)
 from client_school_group_attendance.utils import handle_creation_of_group_class_enrollment_records
 
 
@@ -196,28 +202,62 @@ def get_client_school_enrollment_handler(student_or_class):
 
 
 def is_client_school_account(student_or_class):
-    return (
-        hasattr(student_or_class, 'teachers_student_or_class_record')
-        and student_or_class.teachers_student_or_class_record is not None
-    )
+    return get_client_school_enrollment_handler(student_or_class) is not None
 
 
-def create_client_school_purchased_hours_modification_record(
-    student_account, enrollment_handler, class_type,
-    transaction_type, previous_hours, updated_hours
+def apply_client_school_purchased_hours_modification(
+    student_accounts, enrollment_handler, class_type, transaction_type, duration
 ):
+    """
+    Deducts or adds back the class duration on the balance of the class
+    type of each account which has purchased hours of that type, with one
+    update for all of them, and records their modifications with one
+    insert. The balances are locked and read before they are changed, so
+    the modifications start from the hours left by any payment made after
+    the accounts were loaded. Returns the number of accounts which were
+    modified.
+    """
+    balance = CLASS_TYPE_BALANCES[class_type]
+    student_accounts = {
+        student_account.id: student_account for student_account in student_accounts
+    }
+    if not student_accounts:
+        return 0
+    hours = decimal.Decimal(str(duration))
     if transaction_type == 'deduct':
+        hours = -hours
         modification_type = 'class_status_modification_deduct'
     else:
         modification_type = 'class_status_modification_add'
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        bridge=enrollment_handler,
-        class_type=class_type,
-        modification_type=modification_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
-    )
+
+    modifications = []
+    with transaction.atomic():
+        locked_balances = {
+            student_account_id: previous_hours
+            for student_account_id, previous_hours
+            in AccountingClientSchoolStudentAccount.objects.filter(
+                id__in=student_accounts
+            ).select_for_update().order_by('id').values_list('id', balance)
+            if previous_hours is not None
+        }
+        if not locked_balances:
+            return 0
+        AccountingClientSchoolStudentAccount.objects.filter(
+            id__in=locked_balances
+        ).update(**{balance: F(balance) + hours})
+        for student_account_id, previous_hours in locked_balances.items():
+            student_account = student_accounts[student_account_id]
+            setattr(student_account, balance, previous_hours + hours)
+            modifications.append(CSPurchasedHoursModification(
+                student_account=student_account,
+                bridge=enrollment_handler,
+                class_type=class_type,
+                modification_type=modification_type,
+                previous_hours=previous_hours,
+                updated_hours=previous_hours + hours,
+            ))
+        CSPurchasedHoursModification.objects.bulk_create(modifications)
+    return len(modifications)
 
 
 def format_transaction_type(transaction_type):
@@ -234,60 +274,24 @@ def handle_one_to_one_tutoring_hours_modification(
     student_account = enrollment_handler.client_school_one_to_one_account
     if student_account is None:
         return None
-    previous_hours = student_account.purchased_tutoring_hours
-    if previous_hours is None:
+    if not apply_client_school_purchased_hours_modification(
+        [student_account], enrollment_handler, 'one_to_one_tutoring',
+        transaction_type, duration
+    ):
         return None
-    duration_as_decimal = decimal.Decimal(str(duration))
-    if transaction_type == 'deduct':
-        updated_hours = previous_hours - duration_as_decimal
-    else:
-        updated_hours = previous_hours + duration_as_decimal
-    student_account.purchased_tutoring_hours = updated_hours
-    student_account.save()
-    create_client_school_purchased_hours_modification_record(
-        student_account=student_account,
-        enrollment_handler=enrollment_handler,
-        class_type='one_to_one_tutoring',
-        transaction_type=transaction_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
-    )
     return f"Client school tutoring hours {format_transaction_type(transaction_type)}"
 
 
 def handle_two_to_one_tutoring_hours_modification(
     enrollment_handler, transaction_type, duration
 ):
+    # uses the accounts prefetched with the scheduled class
     student_accounts = enrollment_handler.client_school_two_to_one_accounts.all()
-    if not student_accounts.exists():
-        return None
-
-    duration_as_decimal = decimal.Decimal(str(duration))
-    updated_accounts = []
-
-    for student_account in student_accounts:
-        previous_hours = student_account.purchased_tutoring_hours
-        if previous_hours is None:
-            continue
-        if transaction_type == 'deduct':
-            updated_hours = previous_hours - duration_as_decimal
-        else:
-            updated_hours = previous_hours + duration_as_decimal
-        student_account.purchased_tutoring_hours = updated_hours
-        student_account.save()
-        create_client_school_purchased_hours_modification_record(
-            student_account=student_account,
-            enrollment_handler=enrollment_handler,
-            class_type='two_to_one_tutoring',
-            transaction_type=transaction_type,
-            previous_hours=previous_hours,
-            updated_hours=updated_hours,
-        )
-        updated_accounts.append(student_account.client_student_name)
-
-    if not updated_accounts:
+    if not apply_client_school_purchased_hours_modification(
+        student_accounts, enrollment_handler, 'two_to_one_tutoring',
+        transaction_type, duration
+    ):
         return None
-
     return f"Client school two-to-one tutoring hours {format_transaction_type(transaction_type)}"
 
 
@@ -297,24 +301,11 @@ def handle_online_tutoring_hours_modification(
     student_account = enrollment_handler.client_school_online_account
     if student_account is None:
         return None
-    previous_hours = student_account.purchased_online_hours
-    if previous_hours is None:
+    if not apply_client_school_purchased_hours_modification(
+        [student_account], enrollment_handler, 'online_tutoring',
+        transaction_type, duration
+    ):
         return None
-    duration_as_decimal = decimal.Decimal(str(duration))
-    if transaction_type == 'deduct':
-        updated_hours = previous_hours - duration_as_decimal
-    else:
-        updated_hours = previous_hours + duration_as_decimal
-    student_account.purchased_online_hours = updated_hours
-    student_account.save()
-    create_client_school_purchased_hours_modification_record(
-        student_account=student_account,
-        enrollment_handler=enrollment_handler,
-        class_type='online_tutoring',
-        transaction_type=transaction_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
-    )
     return f"Client school online tutoring hours {format_transaction_type(transaction_type)}"
 
 
@@ -324,24 +315,11 @@ def handle_company_class_hours_modification(
     student_account = enrollment_handler.client_school_company_account
     if student_account is None:
         return None
-    previous_hours = student_account.purchased_company_hours
-    if previous_hours is None:
+    if not apply_client_school_purchased_hours_modification(
+        [student_account], enrollment_handler, 'company_class',
+        transaction_type, duration
+    ):
         return None
-    duration_as_decimal = decimal.Decimal(str(duration))
-    if transaction_type == 'deduct':
-        updated_hours = previous_hours - duration_as_decimal
-    else:
-        updated_hours = previous_hours + duration_as_decimal
-    student_account.purchased_company_hours = updated_hours
-    student_account.save()
-    create_client_school_purchased_hours_modification_record(
-        student_account=student_account,
-        enrollment_handler=enrollment_handler,
-        class_type='company_class',
-        transaction_type=transaction_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
-    )
     return f"Client company class tutoring hours {format_transaction_type(transaction_type)}"
 
 
@@ -7,6 +7,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from client_school_group_attendance.utils import (
+    delete_unconfirmed_group_class_meeting_records,
+    reschedule_unconfirmed_group_class_meeting_record,
+)
 from .models import ScheduledClass
 from .pagination import SmallSetPagination
 from .serializers import ScheduledClassSerializer, ScheduledClassGoogleCalendarSerializer
@@ -53,10 +57,13 @@ class ScheduledClassStatusConfirmationViewSet(APIView):
         class_status = request.data['class_status']
         teacher_notes = request.data['teacher_notes']
         class_content = request.data['class_content']
-        scheduled_class = get_object_or_404(ScheduledClass, id=class_id)
+        scheduled_class = get_object_or_404(
+            ScheduledClass.custom_query.with_status_confirmation_accounts(), id=class_id
+        )
 
+        previous_class_status = scheduled_class.class_status
         transaction_type = determine_transaction_type(
-            previous_class_status=scheduled_class.class_status,
+            previous_class_status=previous_class_status,
             updated_class_status=class_status
         )
         scheduled_class.class_status = class_status
@@ -75,6 +82,11 @@ class ScheduledClassStatusConfirmationViewSet(APIView):
           "student_or_class_update": None,
           "client_school_accounting_update_message": None
         }
+        # a class cancelled before it was confirmed drops the meeting
+        # record created ahead of it
+        if previous_class_status == 'scheduled' and class_status == 'cancelled':
+            if delete_unconfirmed_group_class_meeting_records([scheduled_class.id]):
+                response['scheduled_class']['group_class_meeting_record'] = None
         if is_freelance_account(scheduled_class.student_or_class) and number_of_hours_purchased_should_be_updated(transaction_type):
             response['student_or_class_update'] = handle_freelance_student_purchased_hours_modification(
                 scheduled_class=scheduled_class, 
@@ -149,6 +161,7 @@ class ScheduledClassViewSet(viewsets.ModelViewSet):
                 )
         
         new_class = serializer.save()
+        reschedule_unconfirmed_group_class_meeting_record(new_class)
         daily_classes_list = list(classes_booked_on_date_by_teacher)
         insort(daily_classes_list, new_class, key=lambda x: x.start_time)
         serialized_data = ScheduledClassSerializer(daily_classes_list, many=True).data
@@ -213,6 +226,7 @@ class ScheduledClassViewSet(viewsets.ModelViewSet):
                 )
 
         new_class = serializer.save()
+        reschedule_unconfirmed_group_class_meeting_record(new_class)
         daily_classes_list = list(classes_booked_by_teacher_on_date)
         insort(daily_classes_list, new_class, key=lambda x: x.start_time)
         serialized_data = ScheduledClassSerializer(daily_classes_list, many=True).data
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.13 on 2026-10-19 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('client_school', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientschool',
+            name='staff_users',
+            field=models.ManyToManyField(blank=True, related_name='staff_client_schools', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 
@@ -23,6 +24,11 @@ class ClientSchool(models.Model):
         ]
     )
     other_information = models.TextField(editable=True, default='', blank=True)
+    # the staff admin users who work for the school
+    staff_users = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, related_name='staff_client_schools',
+        blank=True
+    )
 
     def __str__(self):
         return self.school_name
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_accounting', '0006_remove_clientschoolclassenrollmenthandler_client_group_class_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['purchased_tutoring_hours'], name='cs_account_tutoring_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['tutoring_hours_expiration_date', 'purchased_tutoring_hours'], name='cs_account_tutoring_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['purchased_group_class_hours'], name='cs_account_group_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['group_hours_expiration_date', 'purchased_group_class_hours'], name='cs_account_group_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['purchased_online_hours'], name='cs_account_online_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['online_hours_expiration_date', 'purchased_online_hours'], name='cs_account_online_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['purchased_company_hours'], name='cs_account_company_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountingclientschoolstudentaccount',
+            index=models.Index(fields=['company_hours_expiration_date', 'purchased_company_hours'], name='cs_account_company_expiry_idx'),
+        ),
+    ]
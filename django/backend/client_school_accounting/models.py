@@ -22,17 +22,49 @@ CLASS_ENROLLMENT_TYPES = (
     ('company_class', 'Company Class'),
 )
 
-class StudentAccountBillingManager(models.Manager):
+# the balance and expiration date fields of each type of purchased hours
+HOUR_TYPE_FIELDS = {
+    'tutoring': ('purchased_tutoring_hours', 'tutoring_hours_expiration_date'),
+    'group_class': ('purchased_group_class_hours', 'group_hours_expiration_date'),
+    'online': ('purchased_online_hours', 'online_hours_expiration_date'),
+    'company': ('purchased_company_hours', 'company_hours_expiration_date'),
+}
+
+
+class StudentAccountBillingQuerySet(models.QuerySet):
+    # null balances never match, so accounts without hours of a type are left out
+
+    def low_balance(self, hours=2, hour_types=None):
+        query = Q()
+        for hour_type in hour_types or HOUR_TYPE_FIELDS:
+            hours_field, _ = HOUR_TYPE_FIELDS[hour_type]
+            query |= Q(**{f'{hours_field}__lte': hours})
+        return self.filter(query)
+
+    def expiring_by(self, expiration_date, hour_types=None):
+        query = Q()
+        for hour_type in hour_types or HOUR_TYPE_FIELDS:
+            _, expiration_field = HOUR_TYPE_FIELDS[hour_type]
+            query |= Q(**{f'{expiration_field}__lte': expiration_date})
+        return self.filter(query)
+
+    def needing_attention(self, hours, expiration_date, hour_types=None):
+        # low balance or expiring hours of any of the types, in one filter
+        query = Q()
+        for hour_type in hour_types or HOUR_TYPE_FIELDS:
+            hours_field, expiration_field = HOUR_TYPE_FIELDS[hour_type]
+            query |= Q(**{f'{hours_field}__lte': hours})
+            query |= Q(**{f'{expiration_field}__lte': expiration_date})
+        return self.filter(query)
+
     def under_two_hours(self):
-        return [
-            account for account in self.get_queryset()
-            if (
-                (account.purchased_group_class_hours is not None and account.purchased_group_class_hours <= 2) or
-                (account.purchased_tutoring_hours is not None and account.purchased_tutoring_hours <= 2) or
-                (account.purchased_online_hours is not None and account.purchased_online_hours <= 2) or
-                (account.purchased_company_hours is not None and account.purchased_company_hours <= 2)
-            )
-        ]
+        return self.low_balance(2)
+
+
+class StudentAccountBillingManager(
+    models.Manager.from_queryset(StudentAccountBillingQuerySet)
+):
+    pass
 
 
 class AccountingClientSchoolStudentAccount(models.Model):
@@ -86,6 +118,32 @@ class AccountingClientSchoolStudentAccount(models.Model):
         verbose_name_plural = 'Client School Student Accounts'
         unique_together = ('client_school', 'client_student_name')
         ordering = ('client_school__school_name', 'client_student_name')
+        # one index per balance and expiration date column, so that the
+        # OR of the needing attention filters can combine index scans; the
+        # expiration date indexes also hold the balance, so that the expiry
+        # sweep skips the balances it already zeroed without reading rows
+        indexes = [
+            models.Index(fields=['purchased_tutoring_hours'], name='cs_account_tutoring_hours_idx'),
+            models.Index(
+                fields=['tutoring_hours_expiration_date', 'purchased_tutoring_hours'],
+                name='cs_account_tutoring_expiry_idx'
+            ),
+            models.Index(fields=['purchased_group_class_hours'], name='cs_account_group_hours_idx'),
+            models.Index(
+                fields=['group_hours_expiration_date', 'purchased_group_class_hours'],
+                name='cs_account_group_expiry_idx'
+            ),
+            models.Index(fields=['purchased_online_hours'], name='cs_account_online_hours_idx'),
+            models.Index(
+                fields=['online_hours_expiration_date', 'purchased_online_hours'],
+                name='cs_account_online_expiry_idx'
+            ),
+            models.Index(fields=['purchased_company_hours'], name='cs_account_company_hours_idx'),
+            models.Index(
+                fields=['company_hours_expiration_date', 'purchased_company_hours'],
+                name='cs_account_company_expiry_idx'
+            ),
+        ]
         constraints = [
             CheckConstraint(
                 check=(
@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from .models import AccountingClientSchoolStudentAccount, HOUR_TYPE_FIELDS
+
+
+class StudentAccountNeedingAttentionSerializer(serializers.ModelSerializer):
+    client_school_name = serializers.CharField(source='client_school.school_name')
+    hours_needing_attention = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AccountingClientSchoolStudentAccount
+        fields = (
+            'id', 'client_student_name', 'client_school_name',
+            'contact_email', 'hours_needing_attention',
+        )
+
+    def get_hours_needing_attention(self, obj):
+        # the hour types which made the account match, with their balances;
+        # the thresholds are passed in by the view
+        hours_needing_attention = []
+        for hour_type in self.context['hour_types']:
+            hours_field, expiration_field = HOUR_TYPE_FIELDS[hour_type]
+            hours = getattr(obj, hours_field)
+            expiration_date = getattr(obj, expiration_field)
+            if hours is None:
+                continue
+            low_balance = hours <= self.context['low_balance_hours']
+            expiring = expiration_date <= self.context['expiring_by']
+            if low_balance or expiring:
+                hours_needing_attention.append({
+                    'hour_type': hour_type,
+                    'hours': hours,
+                    'expiration_date': expiration_date,
+                    'low_balance': low_balance,
+                    'expiring': expiring,
+                })
+        return hours_needing_attention
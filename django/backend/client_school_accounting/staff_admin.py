@@ -1,18 +1,46 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin
 from django.contrib import admin
 from django.core.exceptions import ValidationError
 from django.contrib import messages
+from datetime import date, timedelta
 
 from .models import (
+    HOUR_TYPE_FIELDS,
     AccountingClientSchoolStudentAccount,
     AccountingClientSchoolGroupClass,
     ClientSchoolClassEnrollmentHandler,
 )
 
-DAVIDS_ENGLISH = "David's English Center"
 
+class NeedsAttentionFilter(admin.SimpleListFilter):
+    title = 'needs attention'
+    parameter_name = 'needs_attention'
 
-class StaffAccountingClientSchoolStudentAccountAdmin(admin.ModelAdmin):
+    def lookups(self, request, model_admin):
+        lookups = [
+            ('low_balance', 'Any hours: 2 hours or less'),
+            ('expiring', 'Any hours: expiring within 30 days'),
+        ]
+        for hour_type in HOUR_TYPE_FIELDS:
+            label = hour_type.replace('_', ' ').capitalize()
+            lookups.append((f'low_balance:{hour_type}', f'{label}: 2 hours or less'))
+            lookups.append((f'expiring:{hour_type}', f'{label}: expiring within 30 days'))
+        return lookups
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        check, _, hour_type = self.value().partition(':')
+        hour_types = [hour_type] if hour_type in HOUR_TYPE_FIELDS else None
+        if check == 'low_balance':
+            return queryset.low_balance(2, hour_types)
+        if check == 'expiring':
+            return queryset.expiring_by(date.today() + timedelta(days=30), hour_types)
+        return queryset
+
+
+class StaffAccountingClientSchoolStudentAccountAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     list_display = (
         'client_student_name',
         'client_school',
@@ -26,43 +54,43 @@ class StaffAccountingClientSchoolStudentAccountAdmin(admin.ModelAdmin):
         'purchased_company_hours',
         'company_hours_expiration_date',
     )
+    list_select_related = ('client_school',)
     search_fields = (
         'client_student_name',
         'client_school__school_name',
     )
     list_filter = (
-        'client_school',
+        ('client_school', admin.RelatedOnlyFieldListFilter),
         'student_level',
+        NeedsAttentionFilter,
     )
     ordering = ('client_school__school_name', 'client_student_name')
-
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            client_school__school_name=DAVIDS_ENGLISH
-        )
+    staff_client_school_lookup = 'client_school'
+    staff_school_related_fields = {'client_school': (None, 'pk')}
 
 
-class StaffAccountingClientSchoolGroupClassAdmin(admin.ModelAdmin):
+class StaffAccountingClientSchoolGroupClassAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     list_display = (
         'group_class_name',
         'client_school',
         'student_level',
     )
+    list_select_related = ('client_school',)
     search_fields = (
         'group_class_name',
         'client_school__school_name',
     )
     list_filter = (
-        'client_school',
+        ('client_school', admin.RelatedOnlyFieldListFilter),
         'student_level',
     )
     ordering = ('client_school__school_name', 'group_class_name')
     filter_horizontal = ('client_group_class_accounts',)
-
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            client_school__school_name=DAVIDS_ENGLISH
-        )
+    staff_client_school_lookup = 'client_school'
+    staff_school_related_fields = {
+        'client_school': (None, 'pk'),
+        'client_group_class_accounts': (None, 'client_school'),
+    }
 
     def save_model(self, request, obj, form, change):
         try:
@@ -76,7 +104,7 @@ class StaffAccountingClientSchoolGroupClassAdmin(admin.ModelAdmin):
             )
 
 
-class StaffClientSchoolClassEnrollmentHandlerAdmin(admin.ModelAdmin):
+class StaffClientSchoolClassEnrollmentHandlerAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     list_display = (
         'student_or_class',
         'class_enrollment_type',
@@ -85,6 +113,14 @@ class StaffClientSchoolClassEnrollmentHandlerAdmin(admin.ModelAdmin):
         'client_school_company_account',
         'client_group_class',
     )
+    list_select_related = (
+        'student_or_class__teacher',
+        'student_or_class__school',
+        'client_school_one_to_one_account__client_school',
+        'client_school_online_account__client_school',
+        'client_school_company_account__client_school',
+        'client_group_class__client_school',
+    )
     autocomplete_fields = [
         'student_or_class', 'client_school_one_to_one_account',
         'client_school_online_account', 'client_school_company_account',
@@ -107,11 +143,15 @@ class StaffClientSchoolClassEnrollmentHandlerAdmin(admin.ModelAdmin):
         'class_enrollment_type',
     )
     filter_horizontal = ('client_school_two_to_one_accounts',)
-
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            student_or_class__school__school_name=DAVIDS_ENGLISH
-        )
+    staff_school_lookup = 'student_or_class__school'
+    staff_school_related_fields = {
+        'student_or_class': ('school', None),
+        'client_school_one_to_one_account': (None, 'client_school'),
+        'client_school_two_to_one_accounts': (None, 'client_school'),
+        'client_school_online_account': (None, 'client_school'),
+        'client_school_company_account': (None, 'client_school'),
+        'client_group_class': (None, 'client_school'),
+    }
 
     def save_model(self, request, obj, form, change):
         try:
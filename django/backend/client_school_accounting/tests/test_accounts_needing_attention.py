@@ -0,0 +1,307 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+
+User = get_user_model()
+
+ACCOUNTS_NEEDING_ATTENTION_URL = '/api/client-school-accounting/accounts-needing-attention/'
+
+DAVIDS_ENGLISH = "David's English Center"
+
+
+def create_test_client_school(school_name=DAVIDS_ENGLISH):
+    """Helper function to create a client school"""
+    return ClientSchool.objects.create(
+        school_name=school_name,
+        address_line_1='1 Main St',
+        address_line_2='',
+    )
+
+
+def create_test_student_account(client_school, name, hours=None, expiration_date=None):
+    """Helper function to create a student account with tutoring hours"""
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name,
+        client_school=client_school,
+        contact_email=f'{name.split()[0].lower()}@test.com',
+        purchased_tutoring_hours=hours,
+        tutoring_hours_expiration_date=expiration_date,
+    )
+
+
+class StudentAccountBillingQuerySetTests(TestCase):
+    """Test the low balance and expiring hours filters of the student accounts"""
+
+    def setUp(self):
+        self.today = date.today()
+        self.expiring_by = self.today + timedelta(days=30)
+        client_school = create_test_client_school()
+        self.no_hours = create_test_student_account(client_school, 'No Hours')
+        self.at_threshold = create_test_student_account(
+            client_school, 'At Threshold', Decimal('2.00'), self.expiring_by
+        )
+        self.above_threshold = create_test_student_account(
+            client_school, 'Above Threshold', Decimal('2.01'),
+            self.expiring_by + timedelta(days=1)
+        )
+        self.group_hours_only = AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name='Group Hours Only',
+            client_school=client_school,
+            purchased_group_class_hours=Decimal('1.00'),
+            group_hours_expiration_date=self.expiring_by + timedelta(days=1),
+        )
+
+    def get_names(self, queryset):
+        return sorted(queryset.values_list('client_student_name', flat=True))
+
+    def test_low_balance_includes_the_threshold(self):
+        """Test that a balance equal to the threshold is low and null balances are not"""
+        print("Test that a balance equal to the threshold is low and null balances are not")
+
+        accounts = AccountingClientSchoolStudentAccount.custom_query
+
+        self.assertEqual(
+            self.get_names(accounts.low_balance(Decimal('2'), ['tutoring'])),
+            ['At Threshold']
+        )
+        self.assertEqual(
+            self.get_names(accounts.low_balance(Decimal('2'))),
+            ['At Threshold', 'Group Hours Only']
+        )
+        self.assertEqual(
+            self.get_names(accounts.under_two_hours()),
+            ['At Threshold', 'Group Hours Only']
+        )
+
+    def test_expiring_by_includes_the_date(self):
+        """Test that hours expiring on the date are expiring and null dates are not"""
+        print("Test that hours expiring on the date are expiring and null dates are not")
+
+        accounts = AccountingClientSchoolStudentAccount.custom_query
+
+        self.assertEqual(
+            self.get_names(accounts.expiring_by(self.expiring_by)),
+            ['At Threshold']
+        )
+        self.assertEqual(
+            self.get_names(accounts.expiring_by(
+                self.expiring_by + timedelta(days=1), ['group_class']
+            )),
+            ['Group Hours Only']
+        )
+
+    def test_needing_attention_combines_both_checks(self):
+        """Test that accounts with low or expiring hours both need attention"""
+        print("Test that accounts with low or expiring hours both need attention")
+
+        accounts = AccountingClientSchoolStudentAccount.custom_query
+
+        self.assertEqual(
+            self.get_names(accounts.needing_attention(
+                Decimal('1'), self.expiring_by + timedelta(days=1), ['tutoring']
+            )),
+            ['Above Threshold', 'At Threshold']
+        )
+        self.assertEqual(
+            self.get_names(accounts.needing_attention(Decimal('0'), self.today)),
+            []
+        )
+
+
+class StudentAccountsNeedingAttentionApiTests(TestCase):
+    """Test the accounts needing attention API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = User.objects.create_user(
+            'staff1', password='testpass123', is_staff=True
+        )
+        self.client.force_authenticate(self.staff_user)
+        self.today = date.today()
+        self.client_school = create_test_client_school()
+        for index in range(5):
+            create_test_student_account(
+                self.client_school, f'Student {index}',
+                Decimal(index), self.today + timedelta(days=365)
+            )
+        self.other_school = create_test_client_school('Other School')
+        create_test_student_account(
+            self.other_school, 'Other Student',
+            Decimal('0.50'), self.today + timedelta(days=365)
+        )
+
+    def test_login_required(self):
+        """Test that login is required for the accounts needing attention"""
+        print("Test that login is required for the accounts needing attention")
+
+        self.client.force_authenticate(None)
+        res = self.client.get(ACCOUNTS_NEEDING_ATTENTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_non_staff_users_are_refused(self):
+        """Test that teachers who are not staff cannot list the accounts"""
+        print("Test that teachers who are not staff cannot list the accounts")
+
+        self.client.force_authenticate(
+            User.objects.create_user('teacher1', password='testpass123')
+        )
+        res = self.client.get(ACCOUNTS_NEEDING_ATTENTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_accounts_are_limited_to_the_staff_schools(self):
+        """Test that staff users only see the accounts of their own schools"""
+        print("Test that staff users only see the accounts of their own schools")
+
+        res = self.client.get(ACCOUNTS_NEEDING_ATTENTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [account['client_student_name'] for account in res.data['results']],
+            ['Student 0', 'Student 1', 'Student 2']
+        )
+        self.assertEqual(res.data['results'][2]['hours_needing_attention'], [{
+            'hour_type': 'tutoring',
+            'hours': Decimal('2.00'),
+            'expiration_date': self.today + timedelta(days=365),
+            'low_balance': True,
+            'expiring': False,
+        }])
+
+        self.other_school.staff_users.add(self.staff_user)
+        res = self.client.get(ACCOUNTS_NEEDING_ATTENTION_URL)
+        self.assertEqual(
+            [account['client_student_name'] for account in res.data['results']],
+            ['Other Student']
+        )
+        res = self.client.get(
+            ACCOUNTS_NEEDING_ATTENTION_URL, {'school': self.client_school.id}
+        )
+        self.assertEqual(res.data['results'], [])
+
+    def test_thresholds_are_read_from_the_parameters(self):
+        """Test that the low balance and expiry thresholds can be changed"""
+        print("Test that the low balance and expiry thresholds can be changed")
+
+        res = self.client.get(
+            ACCOUNTS_NEEDING_ATTENTION_URL, {'low_balance_hours': '0.5'}
+        )
+        self.assertEqual(
+            [account['client_student_name'] for account in res.data['results']],
+            ['Student 0']
+        )
+
+        res = self.client.get(
+            ACCOUNTS_NEEDING_ATTENTION_URL,
+            {'low_balance_hours': '0', 'expiring_within_days': '365'}
+        )
+        self.assertEqual(res.data['count'], 5)
+
+        res = self.client.get(
+            ACCOUNTS_NEEDING_ATTENTION_URL, {'hour_type': 'group_class'}
+        )
+        self.assertEqual(res.data['count'], 0)
+
+    def test_invalid_parameters_return_400(self):
+        """Test that unknown hour types and non-numeric thresholds return 400"""
+        print("Test that unknown hour types and non-numeric thresholds return 400")
+
+        for params in (
+            {'hour_type': 'evening'},
+            {'low_balance_hours': 'two'},
+            {'expiring_within_days': '1.5'},
+            {'school': 'all'},
+        ):
+            res = self.client.get(ACCOUNTS_NEEDING_ATTENTION_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_accounts_are_paginated(self):
+        """Test that the accounts are returned a page at a time"""
+        print("Test that the accounts are returned a page at a time")
+
+        res = self.client.get(
+            ACCOUNTS_NEEDING_ATTENTION_URL,
+            {'low_balance_hours': '10', 'page_size': 2, 'page': 2}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(
+            [account['client_student_name'] for account in res.data['results']],
+            ['Student 2', 'Student 3']
+        )
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNotNone(res.data['previous'])
+
+
+class NeedsAttentionFilterTests(TestCase):
+    """Test the needs attention filter of the staff admin student accounts"""
+
+    def setUp(self):
+        self.client.force_login(
+            User.objects.create_superuser('staff1', password='testpass123')
+        )
+        self.today = date.today()
+        client_school = create_test_client_school()
+        create_test_student_account(
+            client_school, 'Low Balance', Decimal('2.00'),
+            self.today + timedelta(days=365)
+        )
+        create_test_student_account(
+            client_school, 'Expiring', Decimal('10.00'),
+            self.today + timedelta(days=30)
+        )
+        create_test_student_account(
+            client_school, 'Healthy', Decimal('10.00'),
+            self.today + timedelta(days=31)
+        )
+        AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name='Low Group Hours',
+            client_school=client_school,
+            purchased_group_class_hours=Decimal('1.00'),
+            group_hours_expiration_date=self.today + timedelta(days=365),
+        )
+
+    def get_filtered_names(self, needs_attention=None):
+        params = {'needs_attention': needs_attention} if needs_attention else {}
+        res = self.client.get(
+            reverse(
+                'staff_admin:client_school_accounting_'
+                'accountingclientschoolstudentaccount_changelist'
+            ),
+            params
+        )
+        self.assertEqual(res.status_code, 200)
+        return sorted(
+            account.client_student_name for account in res.context['cl'].result_list
+        )
+
+    def test_filter_by_any_hour_type(self):
+        """Test that the filter matches low or expiring hours of any type"""
+        print("Test that the filter matches low or expiring hours of any type")
+
+        self.assertEqual(len(self.get_filtered_names()), 4)
+        self.assertEqual(
+            self.get_filtered_names('low_balance'), ['Low Balance', 'Low Group Hours']
+        )
+        self.assertEqual(self.get_filtered_names('expiring'), ['Expiring'])
+
+    def test_filter_by_one_hour_type(self):
+        """Test that the filter can be limited to one type of hours"""
+        print("Test that the filter can be limited to one type of hours")
+
+        self.assertEqual(
+            self.get_filtered_names('low_balance:tutoring'), ['Low Balance']
+        )
+        self.assertEqual(
+            self.get_filtered_names('low_balance:group_class'), ['Low Group Hours']
+        )
+        self.assertEqual(self.get_filtered_names('expiring:group_class'), [])
@@ -1,5 +1,7 @@
 from django.urls import path
 
+from .views import StudentAccountsNeedingAttentionView
+
 
 app_name = "client_school_accounting"
 
@@ -8,5 +10,9 @@ urlpatterns = [
     #path(
     #    'users-schools/', SchoolListView.as_view(), name="users-schools"
     #),
-   
-]
\ No newline at end of file
+    path(
+        'accounts-needing-attention/',
+        StudentAccountsNeedingAttentionView.as_view(),
+        name='accounts-needing-attention'
+    ),
+]
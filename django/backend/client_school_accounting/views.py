@@ -1,3 +1,68 @@
-from django.shortcuts import render
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
 
-# Create your views here.
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+from staff_admin.tenancy import get_staff_schools
+from utilities.permissions import IsClientSchoolStaff
+from .models import AccountingClientSchoolStudentAccount, HOUR_TYPE_FIELDS
+from .pagination import AccountsNeedingAttentionPagination
+from .serializers import StudentAccountNeedingAttentionSerializer
+
+LOW_BALANCE_HOURS = Decimal('2')
+EXPIRING_WITHIN_DAYS = 30
+
+
+class StudentAccountsNeedingAttentionView(generics.ListAPIView):
+    permission_classes = (IsAuthenticated, IsClientSchoolStaff)
+    serializer_class = StudentAccountNeedingAttentionSerializer
+    pagination_class = AccountsNeedingAttentionPagination
+
+    def get_filters(self):
+        # ?hour_type=tutoring&low_balance_hours=2&expiring_within_days=30&school=1
+        if not hasattr(self, '_filters'):
+            params = self.request.query_params
+            hour_types = params.getlist('hour_type') or list(HOUR_TYPE_FIELDS)
+            if any(hour_type not in HOUR_TYPE_FIELDS for hour_type in hour_types):
+                raise ValidationError({
+                    "message": "The hour type must be one of: {}".format(
+                        ", ".join(HOUR_TYPE_FIELDS)
+                    )
+                })
+            try:
+                low_balance_hours = Decimal(
+                    params.get('low_balance_hours', LOW_BALANCE_HOURS)
+                )
+                expiring_within_days = int(
+                    params.get('expiring_within_days', EXPIRING_WITHIN_DAYS)
+                )
+                school_id = int(params['school']) if params.get('school') else None
+            except (InvalidOperation, ValueError):
+                raise ValidationError({
+                    "message": "The low balance hours, expiring within days and school must be numbers"
+                })
+            self._filters = {
+                'hour_types': hour_types,
+                'low_balance_hours': low_balance_hours,
+                'expiring_by': date.today() + timedelta(days=expiring_within_days),
+                'school_id': school_id,
+            }
+        return self._filters
+
+    def get_queryset(self):
+        filters = self.get_filters()
+        queryset = AccountingClientSchoolStudentAccount.custom_query.needing_attention(
+            filters['low_balance_hours'], filters['expiring_by'], filters['hour_types']
+        ).filter(
+            client_school_id__in=get_staff_schools(self.request).client_school_ids
+        ).select_related('client_school')
+        if filters['school_id'] is not None:
+            queryset = queryset.filter(client_school_id=filters['school_id'])
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.get_filters())
+        return context
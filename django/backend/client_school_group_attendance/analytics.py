@@ -0,0 +1,85 @@
+from decimal import Decimal
+from django.db.models import Count, Q, Sum
+
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from .models import GroupClassStudentAttendanceRecord
+
+ATTENDANCE_COUNTS = {
+    'attended': 'completed',
+    'cancelled': 'cancelled',
+    'same_day_cancelled': 'same_day_cancellation',
+    'scheduled': 'scheduled',
+}
+
+
+def get_group_class_attendance_by_student(group_class_id, start_date, finish_date):
+    """
+    Counts the attended, cancelled, same day cancelled and still scheduled
+    meetings of each student of the group class between the dates, with the
+    hours of the attended and same day cancelled ones, in one grouped query.
+    """
+    meeting_duration = 'group_class_meeting_record__class_duration'
+    return list(GroupClassStudentAttendanceRecord.objects.filter(
+        group_class_meeting_record__group_class_id=group_class_id,
+        group_class_meeting_record__class_date__gte=start_date,
+        group_class_meeting_record__class_date__lte=finish_date,
+    ).values(
+        'student_account_id', 'student_account__client_student_name'
+    ).annotate(
+        **{
+            label: Count('id', filter=Q(attendance_status=attendance_status))
+            for label, attendance_status in ATTENDANCE_COUNTS.items()
+        },
+        attended_hours=Sum(
+            meeting_duration, filter=Q(attendance_status='completed'), default=Decimal('0')
+        ),
+        same_day_cancelled_hours=Sum(
+            meeting_duration, filter=Q(attendance_status='same_day_cancellation'),
+            default=Decimal('0')
+        ),
+    ).order_by('student_account__client_student_name', 'student_account_id'))
+
+
+def calculate_attendance_rate(figures):
+    confirmed = figures['attended'] + figures['cancelled'] + figures['same_day_cancelled']
+    if not confirmed:
+        return None
+    return round(figures['attended'] / confirmed, 4)
+
+
+def get_group_class_attendance_analytics(group_class_id, start_date, finish_date):
+    """
+    Returns the attendance figures of each student of the group class
+    between the dates and their totals, with the students' current group
+    class balances as their remaining hours, in two queries.
+    """
+    students = get_group_class_attendance_by_student(
+        group_class_id, start_date, finish_date
+    )
+
+    remaining_hours = dict(AccountingClientSchoolStudentAccount.objects.filter(
+        id__in=[figures['student_account_id'] for figures in students]
+    ).values_list('id', 'purchased_group_class_hours'))
+    totals = {
+        label: sum(figures[label] for figures in students)
+        for label in (*ATTENDANCE_COUNTS, 'attended_hours', 'same_day_cancelled_hours')
+    }
+    totals['remaining_hours'] = sum(
+        hours for hours in remaining_hours.values() if hours is not None
+    )
+    totals['attendance_rate'] = calculate_attendance_rate(totals)
+    return {
+        'totals': totals,
+        'students': [
+            {
+                'student_account_id': figures['student_account_id'],
+                'student_name': figures['student_account__client_student_name'],
+                **{
+                    label: figures[label]
+                    for label in (*ATTENDANCE_COUNTS, 'attended_hours', 'same_day_cancelled_hours')
+                },
+                'remaining_hours': remaining_hours.get(figures['student_account_id']),
+                'attendance_rate': calculate_attendance_rate(figures),
+            } for figures in students
+        ],
+    }
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.13 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_group_attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupclassmeetingrecord',
+            index=models.Index(fields=['group_class', 'class_date'], name='meeting_group_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupclassstudentattendancerecord',
+            index=models.Index(fields=['student_account', 'group_class_meeting_record'], name='attendance_student_meeting_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.core.validators import MaxLengthValidator
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from class_scheduling.models import ScheduledClass
 from client_school_accounting.models import (
     AccountingClientSchoolGroupClass,
@@ -13,6 +15,9 @@ CLASS_STATUS = (
     ('same_day_cancellation', 'Same_Day_Cancellation'),
 )
 
+# the attendance statuses which deduct the student's group class hours
+CHARGED_ATTENDANCE_STATUSES = ('completed', 'same_day_cancellation')
+
 
 class GroupClassMeetingRecord(models.Model):
     scheduled_class = models.OneToOneField(
@@ -39,6 +44,12 @@ class GroupClassMeetingRecord(models.Model):
     class Meta:
         verbose_name_plural = 'Group Class Meeting Records'
         ordering = ('-class_date', 'group_class__group_class_name')
+        indexes = [
+            models.Index(
+                fields=['group_class', 'class_date'],
+                name='meeting_group_class_date_idx'
+            ),
+        ]
 
 
 class GroupClassStudentAttendanceRecord(models.Model):
@@ -71,3 +82,18 @@ class GroupClassStudentAttendanceRecord(models.Model):
         unique_together = (
             'group_class_meeting_record', 'student_account'
         )
+        indexes = [
+            models.Index(
+                fields=['student_account', 'group_class_meeting_record'],
+                name='attendance_student_meeting_idx'
+            ),
+        ]
+
+
+@receiver(pre_delete, sender=ScheduledClass)
+def pre_delete_unconfirmed_group_class_meeting_record(sender, **kwargs):
+    # a meeting record created ahead of the class is deleted with it, unless
+    # a student's attendance was already charged
+    from .utils import delete_unconfirmed_group_class_meeting_records
+
+    delete_unconfirmed_group_class_meeting_records([kwargs['instance'].id])
@@ -1,4 +1,5 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin
 from django.contrib import admin
 from django.contrib import messages
 from rangefilter.filters import DateRangeFilter
@@ -12,7 +13,7 @@ from client_school_group_attendance.utils import (
 )
 
 
-class StaffGroupClassMeetingRecordAdmin(admin.ModelAdmin):
+class StaffGroupClassMeetingRecordAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     readonly_fields = (
         'scheduled_class',
         'group_class',
@@ -28,6 +29,8 @@ class StaffGroupClassMeetingRecordAdmin(admin.ModelAdmin):
         'class_duration',
         'time_stamp',
     )
+    list_select_related = ('group_class__client_school',)
+    staff_client_school_lookup = 'group_class__client_school'
     ordering = ('-class_date',)
     search_fields = [
         'group_class__group_class_name',
@@ -47,7 +50,7 @@ class StaffGroupClassMeetingRecordAdmin(admin.ModelAdmin):
         return False
 
 
-class StaffGroupClassStudentAttendanceRecordAdmin(admin.ModelAdmin):
+class StaffGroupClassStudentAttendanceRecordAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     readonly_fields = (
         'group_class_meeting_record',
         'student_account',
@@ -59,6 +62,11 @@ class StaffGroupClassStudentAttendanceRecordAdmin(admin.ModelAdmin):
         'attendance_status',
         'time_stamp',
     )
+    list_select_related = (
+        'group_class_meeting_record__group_class',
+        'student_account__client_school',
+    )
+    staff_client_school_lookup = 'student_account__client_school'
     ordering = (
         '-group_class_meeting_record__class_date',
         'student_account__client_student_name',
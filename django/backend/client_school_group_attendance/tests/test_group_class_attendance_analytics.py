@@ -0,0 +1,127 @@
+from decimal import Decimal
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_group_attendance.models import GroupClassStudentAttendanceRecord
+from client_school_group_attendance.utils import (
+    handle_creation_of_group_class_enrollment_records,
+)
+from .test_group_class_meeting_records import (
+    BULK_UPDATE_URL,
+    GroupClassAttendanceTestCase,
+)
+
+
+class GroupClassAttendanceAnalyticsTests(GroupClassAttendanceTestCase):
+    """Test the attendance analytics of a group class"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.group_class = self.enrollment_handler.client_group_class
+        meeting_record_id = handle_creation_of_group_class_enrollment_records(
+            self.scheduled_class, self.enrollment_handler, 1.5
+        )['meeting_record_id']
+        self.attendance_records = list(GroupClassStudentAttendanceRecord.objects.filter(
+            group_class_meeting_record_id=meeting_record_id
+        ).order_by('id'))
+        self.url = (
+            '/api/client-school-group-attendance/group-class-attendance-analytics/'
+            f'{self.group_class.id}/2025-01-01/2025-01-31/'
+        )
+
+    def confirm_attendance(self, statuses):
+        return self.client.patch(BULK_UPDATE_URL, {'attendance_records': [
+            {'id': attendance_record.id, 'attendance_status': attendance_status}
+            for attendance_record, attendance_status in zip(self.attendance_records, statuses)
+        ]}, format='json')
+
+    def test_analytics_count_attendance_of_each_student(self):
+        """Test that the analytics count the attendance of each student and in total"""
+        print("Test that the analytics count the attendance of each student and in total")
+
+        self.confirm_attendance(
+            ['completed'] * 20 + ['cancelled'] * 6 + ['same_day_cancellation'] * 4
+        )
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['group_class_name'], 'Group A')
+        self.assertEqual(len(res.data['students']), 30)
+        totals = res.data['totals']
+        self.assertEqual(totals['attended'], 20)
+        self.assertEqual(totals['cancelled'], 6)
+        self.assertEqual(totals['same_day_cancelled'], 4)
+        self.assertEqual(totals['scheduled'], 0)
+        self.assertEqual(totals['attended_hours'], Decimal('30.00'))
+        self.assertEqual(totals['same_day_cancelled_hours'], Decimal('6.00'))
+        self.assertEqual(totals['remaining_hours'], Decimal('264.00'))
+        self.assertEqual(totals['attendance_rate'], round(20 / 30, 4))
+        student = res.data['students'][0]
+        self.assertEqual(student['student_name'], 'Student 0')
+        self.assertEqual(student['attended'], 1)
+        self.assertEqual(student['remaining_hours'], Decimal('8.50'))
+
+    def test_analytics_take_a_fixed_number_of_queries(self):
+        """Test that the analytics of 30 students take three queries"""
+        print("Test that the analytics of 30 students take three queries")
+
+        # the group class, the grouped attendance and the remaining hours
+        with self.assertNumQueries(3):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.data['totals']['scheduled'], 30)
+
+    def test_attendance_changes_are_reflected_at_once(self):
+        """Test that the analytics follow every attendance change, however it is written"""
+        print("Test that the analytics follow every attendance change, however it is written")
+
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['totals']['attended'], 0)
+
+        self.confirm_attendance(['completed'] * 10)
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['totals']['attended'], 10)
+
+        attendance_record = self.attendance_records[0]
+        attendance_record.refresh_from_db()
+        attendance_record.attendance_status = 'cancelled'
+        attendance_record.save()
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['totals']['attended'], 9)
+
+        # a write from another process, which sends no signals
+        GroupClassStudentAttendanceRecord.objects.filter(
+            id__in=[attendance_record.id for attendance_record in self.attendance_records[1:4]]
+        ).update(attendance_status='same_day_cancellation')
+        res = self.client.get(self.url)
+        self.assertEqual(res.data['totals']['attended'], 6)
+        self.assertEqual(res.data['totals']['same_day_cancelled'], 3)
+
+    def test_remaining_hours_follow_payments(self):
+        """Test that the remaining hours are the current balances"""
+        print("Test that the remaining hours are the current balances")
+
+        self.client.get(self.url)
+        AccountingClientSchoolStudentAccount.objects.filter(
+            id=self.attendance_records[0].student_account_id
+        ).update(purchased_group_class_hours=Decimal('20.00'))
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.data['students'][0]['remaining_hours'], Decimal('20.00'))
+        self.assertEqual(res.data['totals']['remaining_hours'], Decimal('310.00'))
+
+    def test_dates_out_of_order_return_400(self):
+        """Test that a start date after the finish date returns 400"""
+        print("Test that a start date after the finish date returns 400")
+
+        res = self.client.get(
+            '/api/client-school-group-attendance/group-class-attendance-analytics/'
+            f'{self.group_class.id}/2025-02-01/2025-01-01/'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,553 @@
+import datetime
+import io
+from decimal import Decimal
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from class_scheduling.models import ScheduledClass
+from client_school.models import ClientSchool
+from client_school_accounting.models import (
+    AccountingClientSchoolGroupClass,
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
+from client_school_group_attendance.models import (
+    GroupClassMeetingRecord,
+    GroupClassStudentAttendanceRecord,
+)
+from client_school_group_attendance.utils import (
+    create_group_class_meeting_records_ahead,
+    handle_creation_of_group_class_enrollment_records,
+    handle_group_class_attendance_hours_modifications,
+)
+from client_school_transactions.models import (
+    CSGroupClassTuitionRecord,
+    CSPurchasedHoursModification,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from client_school_transactions.utils import get_cs_purchased_hours_drift
+from school.models import School
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+BULK_UPDATE_URL = '/api/client-school-group-attendance/group-class-attendance-bulk-update/'
+
+
+def create_test_group_class(client_school, number_of_students):
+    """Helper function to create a group class with enrolled student accounts"""
+    group_class = AccountingClientSchoolGroupClass.objects.create(
+        group_class_name='Group A', client_school=client_school
+    )
+    group_class.client_group_class_accounts.set([
+        AccountingClientSchoolStudentAccount.objects.create(
+            client_student_name=f'Student {index}',
+            client_school=client_school,
+            purchased_group_class_hours=Decimal('10.00'),
+            group_hours_expiration_date=datetime.date(2099, 1, 1),
+        )
+        for index in range(number_of_students)
+    ])
+    return group_class
+
+
+class GroupClassAttendanceTestCase(TestCase):
+    """Set up a group class of 30 students with a scheduled class"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('teacher1', 'testpass123')
+        teacher = UserProfile.objects.create(
+            user=self.user, given_name='John', surname='Teacher',
+            contact_email='teacher1@test.com'
+        )
+        school = School.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+            scheduling_teacher=teacher,
+            contact_phone='1234567890',
+        )
+        client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        student_or_class = StudentOrClass.objects.create(
+            student_or_class_name='Group A',
+            account_type='school',
+            school=school,
+            teacher=teacher,
+            tuition_per_hour=900,
+        )
+        self.enrollment_handler = ClientSchoolClassEnrollmentHandler.objects.create(
+            student_or_class=student_or_class,
+            class_enrollment_type='group_class',
+            client_group_class=create_test_group_class(client_school, 30),
+        )
+        self.scheduled_class = ScheduledClass.objects.create(
+            student_or_class=student_or_class,
+            teacher=teacher,
+            date=datetime.date(2025, 1, 15),
+            start_time=datetime.time(10, 0),
+            finish_time=datetime.time(10, 59),
+            class_status='completed',
+        )
+
+
+class GroupClassMeetingRecordCreationTests(GroupClassAttendanceTestCase):
+    """Test creating the meeting and attendance records of a group class"""
+
+    def test_thirty_students_take_a_handful_of_queries(self):
+        """Test that the records of a 30 student group class take a fixed number of queries"""
+        print("Test that the records of a 30 student group class take a fixed number of queries")
+
+        # the meeting record lookup and insert, the enrolled students and
+        # one insert of every attendance record, within savepoints
+        with self.assertNumQueries(8):
+            response = handle_creation_of_group_class_enrollment_records(
+                self.scheduled_class, self.enrollment_handler, 1.0
+            )
+
+        self.assertIn('with 30 students', response['message'])
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.filter(
+            group_class_meeting_record_id=response['meeting_record_id'],
+            attendance_status='scheduled',
+        ).count(), 30)
+
+    def test_second_call_keeps_the_existing_records(self):
+        """Test that a second call returns the existing meeting record without new rows"""
+        print("Test that a second call returns the existing meeting record without new rows")
+
+        first_response = handle_creation_of_group_class_enrollment_records(
+            self.scheduled_class, self.enrollment_handler, 1.0
+        )
+        scheduled_class = ScheduledClass.objects.get(id=self.scheduled_class.id)
+        second_response = handle_creation_of_group_class_enrollment_records(
+            scheduled_class, self.enrollment_handler, 1.0
+        )
+
+        self.assertEqual(
+            second_response['meeting_record_id'], first_response['meeting_record_id']
+        )
+        self.assertIn('already exists', second_response['message'])
+        self.assertEqual(GroupClassMeetingRecord.objects.count(), 1)
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.count(), 30)
+
+
+class GroupClassAttendanceBulkUpdateTests(GroupClassAttendanceTestCase):
+    """Test confirming the attendance of a group class in bulk"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        meeting_record_id = handle_creation_of_group_class_enrollment_records(
+            self.scheduled_class, self.enrollment_handler, 1.0
+        )['meeting_record_id']
+        self.attendance_records = list(GroupClassStudentAttendanceRecord.objects.filter(
+            group_class_meeting_record_id=meeting_record_id
+        ).order_by('id'))
+
+    def confirm_attendance(self, statuses):
+        return self.client.patch(BULK_UPDATE_URL, {'attendance_records': [
+            {'id': attendance_record.id, 'attendance_status': attendance_status}
+            for attendance_record, attendance_status in zip(self.attendance_records, statuses)
+        ]}, format='json')
+
+    def test_completed_attendance_deducts_hours_of_each_student(self):
+        """Test that completed attendance deducts the hours and records a modification each"""
+        print("Test that completed attendance deducts the hours and records a modification each")
+
+        res = self.confirm_attendance(['completed'] * 25 + ['cancelled'] * 5)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['updated_records']), 30)
+        self.assertEqual(len(res.data['hours_modification_messages']), 25)
+        self.assertEqual(
+            res.data['hours_modification_messages'][0],
+            'Group class hours deduct for Student 0: 10.00 → 9.00'
+        )
+        self.assertEqual(AccountingClientSchoolStudentAccount.objects.filter(
+            purchased_group_class_hours=Decimal('9.00')
+        ).count(), 25)
+        self.assertEqual(CSPurchasedHoursModification.objects.filter(
+            bridge=self.enrollment_handler,
+            modification_type='class_status_modification_deduct',
+        ).count(), 25)
+
+        res = self.confirm_attendance(['cancelled'] * 30)
+
+        self.assertEqual(len(res.data['hours_modification_messages']), 25)
+        self.assertFalse(AccountingClientSchoolStudentAccount.objects.exclude(
+            purchased_group_class_hours=Decimal('10.00')
+        ).exists())
+
+    def test_invalid_statuses_are_reported_with_207(self):
+        """Test that invalid statuses are reported while the valid ones are applied"""
+        print("Test that invalid statuses are reported while the valid ones are applied")
+
+        res = self.confirm_attendance(['completed', 'scheduled'])
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [error['id'] for error in res.data['errors']],
+            [self.attendance_records[1].id]
+        )
+        self.assertEqual(len(res.data['updated_records']), 1)
+        self.attendance_records[0].refresh_from_db()
+        self.assertEqual(self.attendance_records[0].attendance_status, 'completed')
+
+    def test_unknown_record_changes_nothing(self):
+        """Test that an unknown record id returns 404 before any record is changed"""
+        print("Test that an unknown record id returns 404 before any record is changed")
+
+        res = self.client.patch(BULK_UPDATE_URL, {'attendance_records': [
+            {'id': self.attendance_records[0].id, 'attendance_status': 'completed'},
+            {'id': 99999, 'attendance_status': 'completed'},
+        ]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(CSPurchasedHoursModification.objects.exists())
+
+    def test_payment_after_loading_the_records_is_kept_in_the_ledger(self):
+        """Test that a payment made after the records were loaded starts the modification"""
+        print("Test that a payment made after the records were loaded starts the modification")
+
+        attendance_records = list(GroupClassStudentAttendanceRecord.objects.filter(
+            id__in=[attendance_record.id for attendance_record in self.attendance_records[:2]]
+        ).select_related(
+            'student_account', 'group_class_meeting_record'
+        ).order_by('id'))
+        record_cs_tuition_transaction(CSGroupClassTuitionRecord(
+            student_account_id=attendance_records[0].student_account_id,
+            class_hours_purchased_or_refunded=5,
+            administrator_name='Admin'
+        ))
+
+        messages = handle_group_class_attendance_hours_modifications([
+            (attendance_record, 'scheduled', 'completed')
+            for attendance_record in attendance_records
+        ])
+
+        self.assertEqual(messages, [
+            'Group class hours deduct for Student 0: 15.00 → 14.00',
+            'Group class hours deduct for Student 1: 10.00 → 9.00',
+        ])
+        self.assertEqual(
+            list(CSPurchasedHoursModification.objects.filter(
+                student_account_id=attendance_records[0].student_account_id
+            ).order_by('id').values_list('previous_hours', 'updated_hours')),
+            [
+                (Decimal('10.00'), Decimal('15.00')),
+                (Decimal('15.00'), Decimal('14.00')),
+            ]
+        )
+        self.assertEqual(
+            attendance_records[0].student_account.purchased_group_class_hours,
+            Decimal('14.00')
+        )
+        self.assertEqual(get_cs_purchased_hours_drift([
+            attendance_record.student_account_id for attendance_record in attendance_records
+        ]), [])
+
+    def test_bulk_update_queries_do_not_grow_with_students(self):
+        """Test that confirming the attendance of 25 students takes a handful of queries"""
+        print("Test that confirming the attendance of 25 students takes a handful of queries")
+
+        # the records, the status update, the balance lock, the enrollment
+        # handler, the balance update and the modifications, within two
+        # savepoints
+        with self.assertNumQueries(10):
+            self.confirm_attendance(['completed'] * 25)
+
+
+class GroupClassMeetingRecordsAheadTests(GroupClassAttendanceTestCase):
+    """Test creating the meeting records of group classes ahead of confirmation"""
+
+    def setUp(self):
+        super().setUp()
+        self.scheduled_class.class_status = 'scheduled'
+        self.scheduled_class.save()
+        for day in (16, 17, 28):
+            ScheduledClass.objects.create(
+                student_or_class=self.scheduled_class.student_or_class,
+                teacher=self.scheduled_class.teacher,
+                date=datetime.date(2025, 1, day),
+                start_time=datetime.time(10, 0),
+                finish_time=datetime.time(11, 29),
+            )
+
+    def test_records_are_created_in_bulk(self):
+        """Test that the records of every group class in the range take a fixed number of queries"""
+        print("Test that the records of every group class in the range take a fixed number of queries")
+
+        # the classes, their students, the existing meeting ids, the meeting
+        # insert, the meeting ids and one insert of every attendance record,
+        # within a savepoint
+        with self.assertNumQueries(8):
+            created_records = create_group_class_meeting_records_ahead(
+                datetime.date(2025, 1, 15), datetime.date(2025, 1, 17)
+            )
+
+        self.assertEqual(
+            created_records, {'meeting_records': 3, 'attendance_records': 90}
+        )
+        self.assertEqual(
+            GroupClassMeetingRecord.objects.get(
+                scheduled_class__date=datetime.date(2025, 1, 16)
+            ).class_duration,
+            Decimal('1.50')
+        )
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.filter(
+            attendance_status='scheduled'
+        ).count(), 90)
+
+    def test_existing_records_are_skipped(self):
+        """Test that classes which already have a meeting record are skipped"""
+        print("Test that classes which already have a meeting record are skipped")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 15)
+        )
+        call_command(
+            'create_group_class_meeting_records', '--start-date', '2025-01-15',
+            '--days', '3', stdout=io.StringIO()
+        )
+
+        self.assertEqual(GroupClassMeetingRecord.objects.count(), 3)
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.count(), 90)
+
+    def test_counts_leave_out_existing_records(self):
+        """Test that only the records created by the run are counted"""
+        print("Test that only the records created by the run are counted")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 15)
+        )
+        created_records = create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 17)
+        )
+
+        self.assertEqual(
+            created_records, {'meeting_records': 2, 'attendance_records': 60}
+        )
+        self.assertEqual(
+            create_group_class_meeting_records_ahead(
+                datetime.date(2025, 1, 15), datetime.date(2025, 1, 17)
+            ),
+            {'meeting_records': 0, 'attendance_records': 0}
+        )
+
+    def test_cancelled_class_drops_its_records(self):
+        """Test that cancelling a class before confirmation deletes its records"""
+        print("Test that cancelling a class before confirmation deletes its records")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 16)
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.patch('/api/scheduling/class-status-confirmation/', {
+            'id': self.scheduled_class.id,
+            'class_status': 'cancelled',
+            'teacher_notes': '',
+            'class_content': '',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIsNone(res.data['scheduled_class']['group_class_meeting_record'])
+        self.assertFalse(GroupClassMeetingRecord.objects.filter(
+            class_date=datetime.date(2025, 1, 15)
+        ).exists())
+        self.assertEqual(GroupClassMeetingRecord.objects.count(), 1)
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.count(), 30)
+
+    def test_deleted_class_drops_its_records(self):
+        """Test that deleting a class deletes its records unless attendance was charged"""
+        print("Test that deleting a class deletes its records unless attendance was charged")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 16)
+        )
+        charged_meeting_record = GroupClassMeetingRecord.objects.get(
+            class_date=datetime.date(2025, 1, 16)
+        )
+        charged_meeting_record.student_attendance_records.filter(
+            student_account__client_student_name='Student 0'
+        ).update(attendance_status='completed')
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.delete('/api/scheduling/classes/batch-delete/', {
+            'obsolete_class_ids': list(ScheduledClass.objects.filter(
+                date__lte=datetime.date(2025, 1, 16)
+            ).values_list('id', flat=True)),
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(GroupClassMeetingRecord.objects.values_list('id', 'scheduled_class')),
+            [(charged_meeting_record.id, None)]
+        )
+        self.assertEqual(GroupClassStudentAttendanceRecord.objects.count(), 30)
+
+    def test_confirmation_reuses_the_records(self):
+        """Test that the confirmation keeps absences marked in advance and adds new students"""
+        print("Test that the confirmation keeps absences marked in advance and adds new students")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 15)
+        )
+        absent_record = GroupClassStudentAttendanceRecord.objects.order_by('id').first()
+        absent_record.attendance_status = 'cancelled'
+        absent_record.save()
+        group_class = self.enrollment_handler.client_group_class
+        group_class.client_group_class_accounts.add(
+            AccountingClientSchoolStudentAccount.objects.create(
+                client_student_name='New Student',
+                client_school=group_class.client_school,
+                purchased_group_class_hours=Decimal('10.00'),
+                group_hours_expiration_date=datetime.date(2099, 1, 1),
+            )
+        )
+
+        scheduled_class = ScheduledClass.custom_query.select_related(
+            'group_class_meeting_record'
+        ).get(id=self.scheduled_class.id)
+        response = handle_creation_of_group_class_enrollment_records(
+            scheduled_class, self.enrollment_handler, 1.0
+        )
+
+        meeting_record = GroupClassMeetingRecord.objects.get()
+        self.assertEqual(response['meeting_record_id'], meeting_record.id)
+        self.assertEqual(meeting_record.class_duration, Decimal('1.00'))
+        self.assertEqual(meeting_record.student_attendance_records.count(), 31)
+        absent_record.refresh_from_db()
+        self.assertEqual(absent_record.attendance_status, 'cancelled')
+
+    def test_confirmation_drops_students_who_left(self):
+        """Test that students who left the group class before confirmation are not charged"""
+        print("Test that students who left the group class before confirmation are not charged")
+
+        create_group_class_meeting_records_ahead(
+            datetime.date(2025, 1, 15), datetime.date(2025, 1, 15)
+        )
+        group_class = self.enrollment_handler.client_group_class
+        left_student, absent_student = group_class.client_group_class_accounts.filter(
+            client_student_name__in=('Student 0', 'Student 1')
+        ).order_by('client_student_name')
+        GroupClassStudentAttendanceRecord.objects.filter(
+            student_account=absent_student
+        ).update(attendance_status='cancelled')
+        group_class.client_group_class_accounts.remove(left_student, absent_student)
+
+        scheduled_class = ScheduledClass.custom_query.select_related(
+            'group_class_meeting_record'
+        ).get(id=self.scheduled_class.id)
+        handle_creation_of_group_class_enrollment_records(
+            scheduled_class, self.enrollment_handler, 1.0
+        )
+
+        meeting_record = GroupClassMeetingRecord.objects.get()
+        self.assertEqual(meeting_record.student_attendance_records.count(), 29)
+        self.assertFalse(meeting_record.student_attendance_records.filter(
+            student_account=left_student
+        ).exists())
+        self.assertEqual(
+            meeting_record.student_attendance_records.get(
+                student_account=absent_student
+            ).attendance_status,
+            'cancelled'
+        )
+
+    def test_endpoint_creates_the_records_of_the_teacher(self):
+        """Test that the endpoint creates the records of the classes of the teacher"""
+        print("Test that the endpoint creates the records of the classes of the teacher")
+
+        client = APIClient()
+        other_user = User.objects.create_user('teacher2', 'testpass123')
+        client.force_authenticate(other_user)
+        url = '/api/client-school-group-attendance/group-class-meeting-records/create-ahead/2025-01-01/2025-01-31/'
+
+        res = client.post(url)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created_meeting_records'], 0)
+
+        client.force_authenticate(self.user)
+        res = client.post(url)
+        self.assertEqual(res.data['created_meeting_records'], 4)
+        self.assertEqual(res.data['created_attendance_records'], 120)
+
+        res = client.post(
+            '/api/client-school-group-attendance/group-class-meeting-records/create-ahead/2025-02-01/2025-01-01/'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GroupClassAttendanceLookupTests(GroupClassAttendanceTestCase):
+    """Test looking up the confirmed attendance of a student of a group class"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        meeting_record_id = handle_creation_of_group_class_enrollment_records(
+            self.scheduled_class, self.enrollment_handler, 1.0
+        )['meeting_record_id']
+        GroupClassStudentAttendanceRecord.objects.filter(
+            group_class_meeting_record_id=meeting_record_id
+        ).update(attendance_status='completed')
+        self.group_class = self.enrollment_handler.client_group_class
+        self.student_account = self.group_class.client_group_class_accounts.get(
+            client_student_name='Student 0'
+        )
+        # a group class and a student of the same names at another school
+        other_group_class = create_test_group_class(
+            ClientSchool.objects.create(
+                school_name='Other School', address_line_1='2 Main St', address_line_2=''
+            ),
+            1
+        )
+        other_meeting_record = GroupClassMeetingRecord.objects.create(
+            group_class=other_group_class, teacher_name='Jane Teacher',
+            class_date=datetime.date(2025, 1, 20), class_duration=Decimal('1.00')
+        )
+        GroupClassStudentAttendanceRecord.objects.create(
+            group_class_meeting_record=other_meeting_record,
+            student_account=other_group_class.client_group_class_accounts.get(),
+            attendance_status='completed',
+        )
+
+    def test_lookup_by_ids_returns_the_student_only(self):
+        """Test that the lookup by ids returns the attendance of the one student"""
+        print("Test that the lookup by ids returns the attendance of the one student")
+
+        res = self.client.get(
+            '/api/client-school-group-attendance/group-classes/confirmed-since-date/'
+            f'by-student-account-id/2025-01-01/{self.group_class.id}/{self.student_account.id}/'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['student_account'], self.student_account.id)
+
+    def test_lookup_by_names_matches_every_school(self):
+        """Test that the lookup by names still returns the records of every matching name"""
+        print("Test that the lookup by names still returns the records of every matching name")
+
+        # the group class ids, the student account ids and the records
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                '/api/client-school-group-attendance/group-classes/confirmed-since-date/'
+                'by-student-account/2025-01-01/Group A/Student 0/'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [record['class_date'] for record in res.data], ['2025-01-15', '2025-01-20']
+        )
@@ -1,24 +1,45 @@
-from django.urls import path
+from django.urls import path, register_converter
+from utilities.converters import IsoDateConverter
 from client_school_group_attendance.views import (
+    GroupClassAttendanceAnalyticsView,
     GroupClassMeetingRecordRetrieveView,
+    GroupClassMeetingRecordsAheadCreateView,
     GroupClassStudentAttendanceBulkUpdateView,
+    GroupClassAttendanceByStudentAndClassIdFromDateView,
     GroupClassAttendanceByStudentAndClassNameFromDateViewSet,
 )
 
+register_converter(IsoDateConverter, 'isodate')
+
 urlpatterns = [
     path(
         'group-class-meeting-record/<int:scheduled_class_id>/',
         GroupClassMeetingRecordRetrieveView.as_view(),
         name='group-class-meeting-record-retrieve',
     ),
+    path(
+        'group-class-meeting-records/create-ahead/<isodate:start_date>/<isodate:finish_date>/',
+        GroupClassMeetingRecordsAheadCreateView.as_view(),
+        name='group-class-meeting-records-create-ahead',
+    ),
     path(
         'group-class-attendance-bulk-update/',
         GroupClassStudentAttendanceBulkUpdateView.as_view(),
         name='group-class-attendance-bulk-update',
     ),
+    path(
+        'group-class-attendance-analytics/<int:group_class_id>/<isodate:start_date>/<isodate:finish_date>/',
+        GroupClassAttendanceAnalyticsView.as_view(),
+        name='group-class-attendance-analytics',
+    ),
     path(
         'group-classes/confirmed-since-date/by-student-account/<str:date>/<str:group_class_name>/<str:client_student_name>/',
         GroupClassAttendanceByStudentAndClassNameFromDateViewSet.as_view(),
         name='group-class-attendance-by-student-from-date'
     ),
+    path(
+        'group-classes/confirmed-since-date/by-student-account-id/<isodate:date>/<int:group_class_id>/<int:student_account_id>/',
+        GroupClassAttendanceByStudentAndClassIdFromDateView.as_view(),
+        name='group-class-attendance-by-student-id-from-date'
+    ),
 ]
@@ -1,6 +1,14 @@
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
 
+from class_scheduling.models import ScheduledClass
+from client_school_accounting.models import (
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
 from client_school_group_attendance.models import (
+    CHARGED_ATTENDANCE_STATUSES,
     GroupClassMeetingRecord,
     GroupClassStudentAttendanceRecord,
 )
@@ -14,104 +22,330 @@ def handle_creation_of_group_class_enrollment_records(
     if group_class is None:
         return None
 
-    # Check if a meeting record already exists for this scheduled class
-    if GroupClassMeetingRecord.objects.filter(
-        scheduled_class=scheduled_class
-    ).exists():
-        existing_record = GroupClassMeetingRecord.objects.get(
-            scheduled_class=scheduled_class
-        )
+    teacher = scheduled_class.teacher
+    teacher_name = f"{teacher.given_name} {teacher.surname}"
+
+    # the meeting record, if any, is usually loaded with the scheduled class
+    meeting_record = None
+    if ScheduledClass.group_class_meeting_record.is_cached(scheduled_class):
+        meeting_record = getattr(scheduled_class, 'group_class_meeting_record', None)
+
+    with transaction.atomic():
+        created = False
+        if meeting_record is None:
+            # the one-to-one scheduled class keeps a second confirmation from
+            # creating another meeting record
+            meeting_record, created = GroupClassMeetingRecord.objects.get_or_create(
+                scheduled_class=scheduled_class,
+                defaults={
+                    'group_class': group_class,
+                    'teacher_name': teacher_name,
+                    'class_date': scheduled_class.date,
+                    'class_duration': duration,
+                }
+            )
+        if created:
+            enrolled_students = group_class.client_group_class_accounts.all()
+            GroupClassStudentAttendanceRecord.objects.bulk_create([
+                GroupClassStudentAttendanceRecord(
+                    group_class_meeting_record=meeting_record,
+                    student_account=student_account,
+                    attendance_status='scheduled',
+                )
+                for student_account in enrolled_students
+            ])
+        else:
+            # a record created ahead of the class follows any change made
+            # to the class or to the students of its group class since then
+            refresh_group_class_meeting_record(
+                meeting_record, scheduled_class, teacher_name, duration
+            )
+
+    if not created:
         return {
             'message': f"Group class meeting record already exists for {group_class.group_class_name}",
-            'meeting_record_id': existing_record.id,
+            'meeting_record_id': meeting_record.id,
         }
+    return {
+        'message': f"Group class meeting record created for {group_class.group_class_name} with {len(enrolled_students)} students",
+        'meeting_record_id': meeting_record.id,
+    }
 
-    teacher = scheduled_class.teacher
-    teacher_name = f"{teacher.given_name} {teacher.surname}"
 
-    meeting_record = GroupClassMeetingRecord.objects.create(
-        scheduled_class=scheduled_class,
-        group_class=group_class,
-        teacher_name=teacher_name,
-        class_date=scheduled_class.date,
-        class_duration=duration,
-    )
+def refresh_group_class_meeting_record(
+    meeting_record, scheduled_class, teacher_name, duration
+):
+    class_details = {
+        'teacher_name': teacher_name,
+        'class_date': scheduled_class.date,
+        'class_duration': Decimal(str(duration)),
+    }
+    changed_fields = [
+        field for field, value in class_details.items()
+        if getattr(meeting_record, field) != value
+    ]
+    if changed_fields:
+        for field in changed_fields:
+            setattr(meeting_record, field, class_details[field])
+        meeting_record.save(update_fields=changed_fields)
 
-    enrolled_students = group_class.client_group_class_accounts.all()
-    for student_account in enrolled_students:
-        GroupClassStudentAttendanceRecord.objects.create(
+    # students who left the group class since the record was created are
+    # taken off the roster unless their attendance was already confirmed,
+    # and students enrolled since then are added; the existing attendance
+    # records, with any absence marked in advance, are kept
+    enrolled_student_ids = list(AccountingClientSchoolStudentAccount.objects.filter(
+        group_class_accounts=meeting_record.group_class_id
+    ).values_list('id', flat=True))
+    GroupClassStudentAttendanceRecord.objects.filter(
+        group_class_meeting_record=meeting_record,
+        attendance_status='scheduled',
+    ).exclude(student_account_id__in=enrolled_student_ids).delete()
+    GroupClassStudentAttendanceRecord.objects.bulk_create([
+        GroupClassStudentAttendanceRecord(
             group_class_meeting_record=meeting_record,
-            student_account=student_account,
+            student_account_id=student_account_id,
             attendance_status='scheduled',
         )
+        for student_account_id in enrolled_student_ids
+    ], ignore_conflicts=True)
+
+
+def create_group_class_meeting_records_ahead(start_date, finish_date, user=None):
+    """
+    Creates the meeting record and the scheduled attendance records of each
+    scheduled group class between the dates, inclusive, which has no meeting
+    record yet, optionally only the classes of one teacher's user. The
+    classes and the students of their group classes are read with one query
+    each and the records are written with bulk inserts, so staff can mark
+    known absences before the class and the confirmation reuses the records.
+    Returns the numbers of meeting and attendance records created, leaving
+    out the records of classes confirmed or created ahead in the meantime.
+    """
+    from class_scheduling.utils import determine_duration_of_class_time
+
+    enrollment_handler = 'student_or_class__teachers_student_or_class_record'
+    scheduled_classes = ScheduledClass.custom_query.filter(
+        date__gte=start_date,
+        date__lte=finish_date,
+        class_status='scheduled',
+        group_class_meeting_record__isnull=True,
+        **{
+            f'{enrollment_handler}__class_enrollment_type': 'group_class',
+            f'{enrollment_handler}__client_group_class__isnull': False,
+        }
+    )
+    if user is not None:
+        scheduled_classes = scheduled_classes.filter(teacher__user=user)
+    scheduled_classes = list(scheduled_classes.select_related('teacher').annotate(
+        group_class_id=F(f'{enrollment_handler}__client_group_class_id')
+    ).order_by())
+    if not scheduled_classes:
+        return {'meeting_records': 0, 'attendance_records': 0}
+
+    group_class_ids = {
+        scheduled_class.group_class_id for scheduled_class in scheduled_classes
+    }
+    enrolled_students = {}
+    for group_class_id, student_account_id in AccountingClientSchoolStudentAccount.objects.filter(
+        group_class_accounts__in=group_class_ids
+    ).values_list('group_class_accounts', 'id').order_by():
+        enrolled_students.setdefault(group_class_id, []).append(student_account_id)
+
+    with transaction.atomic():
+        # a record created by a confirmation or another run in the meantime
+        # is left as it is, and so are its attendance records
+        existing_meeting_record_ids = set(GroupClassMeetingRecord.objects.filter(
+            scheduled_class__in=scheduled_classes
+        ).values_list('id', flat=True).order_by())
+        GroupClassMeetingRecord.objects.bulk_create([
+            GroupClassMeetingRecord(
+                scheduled_class=scheduled_class,
+                group_class_id=scheduled_class.group_class_id,
+                teacher_name=f"{scheduled_class.teacher.given_name} {scheduled_class.teacher.surname}",
+                class_date=scheduled_class.date,
+                class_duration=determine_duration_of_class_time(
+                    scheduled_class.start_time, scheduled_class.finish_time
+                ),
+            )
+            for scheduled_class in scheduled_classes
+        ], ignore_conflicts=True)
+        # bulk inserts do not return the ids on every database
+        meeting_records = [
+            (meeting_record_id, group_class_id)
+            for meeting_record_id, group_class_id in GroupClassMeetingRecord.objects.filter(
+                scheduled_class__in=scheduled_classes
+            ).values_list('id', 'group_class_id').order_by()
+            if meeting_record_id not in existing_meeting_record_ids
+        ]
+        attendance_records = GroupClassStudentAttendanceRecord.objects.bulk_create([
+            GroupClassStudentAttendanceRecord(
+                group_class_meeting_record_id=meeting_record_id,
+                student_account_id=student_account_id,
+                attendance_status='scheduled',
+            )
+            for meeting_record_id, group_class_id in meeting_records
+            for student_account_id in enrolled_students.get(group_class_id, [])
+        ], ignore_conflicts=True)
 
     return {
-        'message': f"Group class meeting record created for {group_class.group_class_name} with {enrolled_students.count()} students",
-        'meeting_record_id': meeting_record.id,
+        'meeting_records': len(meeting_records),
+        'attendance_records': len(attendance_records),
     }
 
 
-def create_group_class_purchased_hours_modification_record(
-    student_account, attendance_record, transaction_type,
-    previous_hours, updated_hours
-):
-    if transaction_type == 'deduct':
-        modification_type = 'class_status_modification_deduct'
-    else:
-        modification_type = 'class_status_modification_add'
-    meeting_record = attendance_record.group_class_meeting_record
-    enrollment_handler = meeting_record.group_class.group_class_account_enrollment.filter(
-        student_or_class__isnull=False
-    ).first()
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        bridge=enrollment_handler,
-        class_type='group_class',
-        modification_type=modification_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
+def delete_unconfirmed_group_class_meeting_records(scheduled_class_ids):
+    """
+    Deletes the meeting records of the scheduled classes, with their
+    attendance records, unless a student's attendance was confirmed and
+    charged. Used when classes are cancelled or deleted before they were
+    confirmed, so records created ahead do not outlive their class.
+    Returns the number of meeting records deleted.
+    """
+    _, deleted = GroupClassMeetingRecord.objects.filter(
+        scheduled_class_id__in=scheduled_class_ids
+    ).exclude(
+        student_attendance_records__attendance_status__in=CHARGED_ATTENDANCE_STATUSES
+    ).delete()
+    return deleted.get(GroupClassMeetingRecord._meta.label, 0)
+
+
+def reschedule_unconfirmed_group_class_meeting_record(scheduled_class):
+    """
+    Moves the meeting record created ahead of a class which is still
+    scheduled to the class's new date and duration. Returns the number of
+    meeting records updated.
+    """
+    from class_scheduling.utils import determine_duration_of_class_time
+
+    if scheduled_class.class_status != 'scheduled':
+        return 0
+    return GroupClassMeetingRecord.objects.filter(
+        scheduled_class=scheduled_class
+    ).update(
+        class_date=scheduled_class.date,
+        class_duration=Decimal(str(determine_duration_of_class_time(
+            scheduled_class.start_time, scheduled_class.finish_time
+        ))),
     )
 
 
-def handle_group_class_attendance_hours_modification(
-    attendance_record, previous_status
-):
+def get_group_class_enrollment_handlers(group_class_ids):
+    # the enrollment handler recorded on the modifications of each group
+    # class, the first one by id with a student or class, read in one query
+    enrollment_handlers = {}
+    for enrollment_handler in ClientSchoolClassEnrollmentHandler.objects.filter(
+        client_group_class_id__in=group_class_ids,
+        student_or_class__isnull=False,
+    ).order_by('client_group_class_id', 'id'):
+        enrollment_handlers.setdefault(
+            enrollment_handler.client_group_class_id, enrollment_handler
+        )
+    return enrollment_handlers
+
+
+def handle_group_class_attendance_hours_modifications(attendance_changes):
+    """
+    Deducts or adds back the group class hours for each (attendance record,
+    previous status, updated status) change, in order. The accounts are
+    locked and their current hours read in one query, so the modifications
+    start from the hours left by any payment made after the attendance
+    records were loaded. The balance of each account is changed with one
+    F() update per distinct change in hours, the enrollment handlers are
+    read once for all meetings and the modifications are written with one
+    insert. The attendance records need their student account and meeting
+    record loaded. Returns a message for each modified balance.
+    """
     from class_scheduling.utils import determine_transaction_type
-    updated_status = attendance_record.attendance_status
-    transaction_type = determine_transaction_type(
-        previous_class_status=previous_status,
-        updated_class_status=updated_status,
-    )
 
-    if transaction_type == 'unchanged':
-        return None
+    changes = []
+    for attendance_record, previous_status, updated_status in attendance_changes:
+        transaction_type = determine_transaction_type(
+            previous_class_status=previous_status,
+            updated_class_status=updated_status,
+        )
+        if transaction_type == 'unchanged':
+            continue
+        changes.append((attendance_record, transaction_type))
+    if not changes:
+        return []
 
-    student_account = attendance_record.student_account
-    if student_account.purchased_group_class_hours is None:
-        return None
+    with transaction.atomic():
+        locked_hours = dict(
+            AccountingClientSchoolStudentAccount.objects.filter(id__in={
+                attendance_record.student_account_id
+                for attendance_record, _ in changes
+            }).select_for_update().order_by('id').values_list(
+                'id', 'purchased_group_class_hours'
+            )
+        )
+        changes = [
+            (attendance_record, transaction_type)
+            for attendance_record, transaction_type in changes
+            if locked_hours.get(attendance_record.student_account_id) is not None
+        ]
+        if not changes:
+            return []
 
-    meeting_record = attendance_record.group_class_meeting_record
-    duration_as_decimal = Decimal(str(meeting_record.class_duration))
-    previous_hours = student_account.purchased_group_class_hours
+        enrollment_handlers = get_group_class_enrollment_handlers({
+            attendance_record.group_class_meeting_record.group_class_id
+            for attendance_record, _ in changes
+        })
+        # the hours of each account as the changes are applied one by one
+        current_hours = {}
+        modifications = []
+        messages = []
+        for attendance_record, transaction_type in changes:
+            student_account = attendance_record.student_account
+            meeting_record = attendance_record.group_class_meeting_record
+            duration_as_decimal = Decimal(str(meeting_record.class_duration))
+            previous_hours = current_hours.setdefault(
+                student_account.id, locked_hours[student_account.id]
+            )
+            if transaction_type == 'deduct':
+                updated_hours = previous_hours - duration_as_decimal
+                modification_type = 'class_status_modification_deduct'
+            else:
+                updated_hours = previous_hours + duration_as_decimal
+                modification_type = 'class_status_modification_add'
+            current_hours[student_account.id] = updated_hours
+            modifications.append(CSPurchasedHoursModification(
+                student_account=student_account,
+                bridge=enrollment_handlers.get(meeting_record.group_class_id),
+                class_type='group_class',
+                modification_type=modification_type,
+                previous_hours=previous_hours,
+                updated_hours=updated_hours,
+            ))
+            messages.append(
+                f"Group class hours {transaction_type} for "
+                f"{student_account.client_student_name}: "
+                f"{previous_hours} → {updated_hours}"
+            )
 
-    if transaction_type == 'deduct':
-        updated_hours = previous_hours - duration_as_decimal
-    else:
-        updated_hours = previous_hours + duration_as_decimal
+        # accounts whose hours change by the same amount share one update
+        accounts_by_change = {}
+        for student_account_id, updated_hours in current_hours.items():
+            change_in_hours = updated_hours - locked_hours[student_account_id]
+            accounts_by_change.setdefault(change_in_hours, set()).add(student_account_id)
+        for change_in_hours, student_account_ids in accounts_by_change.items():
+            AccountingClientSchoolStudentAccount.objects.filter(
+                id__in=student_account_ids
+            ).update(
+                purchased_group_class_hours=F('purchased_group_class_hours') + change_in_hours
+            )
+        CSPurchasedHoursModification.objects.bulk_create(modifications)
 
-    student_account.purchased_group_class_hours = updated_hours
-    student_account.save()
+    for attendance_record, _ in changes:
+        attendance_record.student_account.purchased_group_class_hours = (
+            current_hours[attendance_record.student_account_id]
+        )
+    return messages
 
-    create_group_class_purchased_hours_modification_record(
-        student_account=student_account,
-        attendance_record=attendance_record,
-        transaction_type=transaction_type,
-        previous_hours=previous_hours,
-        updated_hours=updated_hours,
-    )
 
-    return (
-        f"Group class hours {transaction_type} for "
-        f"{student_account.client_student_name}: "
-        f"{previous_hours} → {updated_hours}"
-    )
+def handle_group_class_attendance_hours_modification(
+    attendance_record, previous_status
+):
+    messages = handle_group_class_attendance_hours_modifications([
+        (attendance_record, previous_status, attendance_record.attendance_status)
+    ])
+    return messages[0] if messages else None
@@ -1,12 +1,20 @@
 import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import transaction
+from django.http import Http404
 from rest_framework import generics
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from class_scheduling.models import ScheduledClass
+from client_school_accounting.models import (
+    AccountingClientSchoolGroupClass,
+    AccountingClientSchoolStudentAccount,
+)
+from client_school_group_attendance.analytics import (
+    get_group_class_attendance_analytics,
+)
 from client_school_group_attendance.models import (
     GroupClassMeetingRecord,
     GroupClassStudentAttendanceRecord,
@@ -17,7 +25,8 @@ from client_school_group_attendance.serializers import (
     GroupClassStudentAttendanceRecordSerializer,
 )
 from client_school_group_attendance.utils import (
-    handle_group_class_attendance_hours_modification,
+    create_group_class_meeting_records_ahead,
+    handle_group_class_attendance_hours_modifications,
 )
 
 
@@ -47,27 +56,40 @@ class GroupClassStudentAttendanceBulkUpdateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # every record with its meeting and student account in one query;
+        # an unknown id fails the request before anything is changed
+        attendance_records = {
+            str(record_id): attendance_record
+            for record_id, attendance_record in GroupClassStudentAttendanceRecord.objects.select_related(
+                'group_class_meeting_record',
+                'student_account',
+            ).in_bulk([
+                record_data.get('id') for record_data in attendance_records_data
+            ]).items()
+        }
+        for record_data in attendance_records_data:
+            if str(record_data.get('id')) not in attendance_records:
+                raise Http404(
+                    'No GroupClassStudentAttendanceRecord matches the given query.'
+                )
+
         updated_records = []
         errors = []
-        hours_modification_messages = []
+        attendance_changes = []
 
         for record_data in attendance_records_data:
             record_id = record_data.get('id')
-            attendance_record = get_object_or_404(
-                GroupClassStudentAttendanceRecord, id=record_id
-            )
+            attendance_record = attendance_records[str(record_id)]
             previous_status = attendance_record.attendance_status
             serializer = GroupClassStudentAttendanceRecordUpdateSerializer(
                 attendance_record, data=record_data, partial=True
             )
             if serializer.is_valid():
-                serializer.save()
-                modification_message = handle_group_class_attendance_hours_modification(
-                    attendance_record=attendance_record,
-                    previous_status=previous_status,
+                for field, value in serializer.validated_data.items():
+                    setattr(attendance_record, field, value)
+                attendance_changes.append(
+                    (attendance_record, previous_status, attendance_record.attendance_status)
                 )
-                if modification_message:
-                    hours_modification_messages.append(modification_message)
                 updated_records.append(serializer.data)
             else:
                 errors.append({
@@ -75,6 +97,18 @@ class GroupClassStudentAttendanceBulkUpdateView(APIView):
                     'errors': serializer.errors
                 })
 
+        with transaction.atomic():
+            GroupClassStudentAttendanceRecord.objects.bulk_update(
+                {
+                    attendance_record.id: attendance_record
+                    for attendance_record, _, _ in attendance_changes
+                }.values(),
+                ['attendance_status']
+            )
+            hours_modification_messages = handle_group_class_attendance_hours_modifications(
+                attendance_changes
+            )
+
         if errors:
             return Response(
                 {
@@ -94,29 +128,78 @@ class GroupClassStudentAttendanceBulkUpdateView(APIView):
         )
 
 
-class GroupClassAttendanceByStudentAndClassNameFromDateViewSet(generics.ListAPIView):
+class GroupClassMeetingRecordsAheadCreateView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, start_date, finish_date, *args, **kwargs):
+        if start_date > finish_date:
+            return Response(
+                {'error': 'The start date must not be after the finish date.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        created_records = create_group_class_meeting_records_ahead(
+            start_date, finish_date, user=request.user
+        )
+        return Response(
+            {
+                'start_date': start_date,
+                'finish_date': finish_date,
+                'created_meeting_records': created_records['meeting_records'],
+                'created_attendance_records': created_records['attendance_records'],
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class GroupClassAttendanceAnalyticsView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, group_class_id, start_date, finish_date, *args, **kwargs):
+        group_class = get_object_or_404(
+            AccountingClientSchoolGroupClass, id=group_class_id
+        )
+        if start_date > finish_date:
+            return Response(
+                {'error': 'The start date must not be after the finish date.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {
+                'group_class_id': group_class.id,
+                'group_class_name': group_class.group_class_name,
+                'start_date': start_date,
+                'finish_date': finish_date,
+                **get_group_class_attendance_analytics(
+                    group_class.id, start_date, finish_date
+                ),
+            },
+            status=status.HTTP_200_OK
+        )
+
+
+class GroupClassAttendanceByStudentAndClassIdFromDateView(generics.ListAPIView):
     permission_classes = (
         IsAuthenticated,
     )
-    queryset = GroupClassStudentAttendanceRecord.objects.all()
     serializer_class = GroupClassStudentAttendanceRecordSerializer
-    lookup_field = 'id'
     model = serializer_class.Meta.model
 
-    def get_queryset(self):
-        date_str = self.kwargs.get("date")
-        group_class_name = self.kwargs.get("group_class_name")
-        client_student_name = self.kwargs.get("client_student_name")
+    def get_lookup_ids(self):
+        return [self.kwargs['group_class_id']], [self.kwargs['student_account_id']]
 
-        date_list = date_str.split('-')
-        date = datetime.date(int(date_list[0]), int(date_list[1]), int(date_list[2]))
+    def get_start_date(self):
+        return self.kwargs['date']
+
+    def get_queryset(self):
+        group_class_ids, student_account_ids = self.get_lookup_ids()
 
+        # the student's records are found through the student account and
+        # meeting record index, their meetings through the primary key
         queryset = self.model.objects.filter(
-            group_class_meeting_record__class_date__gt=date,
-            group_class_meeting_record__group_class__group_class_name=group_class_name,
-            student_account__client_student_name=client_student_name,
-        ).filter(
-            Q(attendance_status='completed') | Q(attendance_status='same_day_cancellation')
+            student_account_id__in=student_account_ids,
+            group_class_meeting_record__group_class_id__in=group_class_ids,
+            group_class_meeting_record__class_date__gt=self.get_start_date(),
+            attendance_status__in=('completed', 'same_day_cancellation'),
         )
 
         return queryset.select_related(
@@ -126,3 +209,28 @@ class GroupClassAttendanceByStudentAndClassNameFromDateViewSet(generics.ListAPIV
         ).order_by(
             'group_class_meeting_record__class_date',
         )
+
+
+class GroupClassAttendanceByStudentAndClassNameFromDateViewSet(
+    GroupClassAttendanceByStudentAndClassIdFromDateView
+):
+    # kept for the clients which look the attendance up by names, which are
+    # not unique across client schools; the names are resolved to the ids
+    # of every match once and the lookup by ids is used from there
+    queryset = GroupClassStudentAttendanceRecord.objects.all()
+    lookup_field = 'id'
+
+    def get_lookup_ids(self):
+        group_class_ids = list(AccountingClientSchoolGroupClass.objects.filter(
+            group_class_name=self.kwargs.get("group_class_name")
+        ).values_list('id', flat=True))
+        student_account_ids = list(AccountingClientSchoolStudentAccount.objects.filter(
+            client_student_name=self.kwargs.get("client_student_name")
+        ).values_list('id', flat=True))
+        return group_class_ids, student_account_ids
+
+    def get_start_date(self):
+        date_str = self.kwargs.get("date")
+
+        date_list = date_str.split('-')
+        return datetime.date(int(date_list[0]), int(date_list[1]), int(date_list[2]))
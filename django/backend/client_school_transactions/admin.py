@@ -1,5 +1,4 @@
 from django import forms
-from decimal import Decimal
 from django.contrib import admin
 from django.contrib import messages
 from rangefilter.filters import DateRangeFilter
@@ -12,15 +11,15 @@ from client_school_transactions.models import (
     CSOnlineTuitionRecord,
     CSGroupClassTuitionRecord,
     CSCompanyClassTuitionRecord,
-    CSPurchasedHoursModification
+    CSTuitionTransaction,
+    GROUP_CLASS_EXPIRATION_PERIODS,
+    TUTORING_EXPIRATION_PERIODS,
+    CSPurchasedHoursModification,
+    CSPurchasedHoursCheckpoint,
 )
 
-from client_school_transactions.utils import (
-    create_modification_record_for_tutoring_transaction,
-    create_modification_record_for_two_to_one_transaction,
-    create_modification_record_for_online_transaction,
-    create_modification_record_for_group_transaction,
-    create_modification_record_for_company_transaction,
+from client_school_transactions.tuition_transactions import (
+    record_cs_tuition_transaction,
 )
 
 
@@ -36,9 +35,13 @@ def davids_english_student_accounts():
 # ── Forms ──────────────────────────────────────────────────────────────────────
 
 class ClientSchoolTutoringTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CSTutoringTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -46,19 +49,26 @@ class ClientSchoolTutoringTuitionTransactionForm(forms.ModelForm):
 
 
 class ClientSchool2to1TutoringTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CST2To1TutoringTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type',)
+        labels = {'student_account': 'Primary student account'}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         accounts = davids_english_student_accounts()
-        self.fields['primary_student_account'].queryset = accounts
+        self.fields['student_account'].queryset = accounts
         self.fields['shared_student_account'].queryset = accounts
+        self.fields['shared_student_account'].required = True
+        self.fields['transaction_amount'].initial = 16500
 
     def clean(self):
         cleaned_data = super().clean()
-        primary = cleaned_data.get('primary_student_account')
+        primary = cleaned_data.get('student_account')
         shared = cleaned_data.get('shared_student_account')
         if primary and shared and primary == shared:
             raise forms.ValidationError(
@@ -68,19 +78,28 @@ class ClientSchool2to1TutoringTuitionTransactionForm(forms.ModelForm):
 
 
 class ClientSchoolOnlineTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CSOnlineTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['transaction_amount'].initial = None
         self.fields['student_account'].queryset = davids_english_student_accounts()
 
 
 class ClientSchoolGroupClassesTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=GROUP_CLASS_EXPIRATION_PERIODS, initial='12_weeks'
+    )
+
     class Meta:
         model = CSGroupClassTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -90,7 +109,7 @@ class ClientSchoolGroupClassesTuitionTransactionForm(forms.ModelForm):
 class ClientSchoolCompanyClassesTuitionTransactionForm(forms.ModelForm):
     class Meta:
         model = CSCompanyClassTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -100,7 +119,23 @@ class ClientSchoolCompanyClassesTuitionTransactionForm(forms.ModelForm):
 
 # ── Model Admins ───────────────────────────────────────────────────────────────
 
-class ClientSchoolTutoringTuitionTransactionAdmin(admin.ModelAdmin):
+class ClientSchoolTuitionRecordAdmin(admin.ModelAdmin):
+    # saved transactions are corrected with a refund, not edited, so they
+    # are shown read-only with a plain form instead of the class type's
+
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request)
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is not None:
+            kwargs['form'] = forms.ModelForm
+        return super().get_form(request, obj, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        record_cs_tuition_transaction(obj)
+
+
+class ClientSchoolTutoringTuitionTransactionAdmin(ClientSchoolTuitionRecordAdmin):
     form = ClientSchoolTutoringTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -119,26 +154,18 @@ class ClientSchoolTutoringTuitionTransactionAdmin(admin.ModelAdmin):
         'expiration_period'
         )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_tutoring_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_tutoring_transaction(
-            previous_hours_purchased=previous_hours,
-            tutoring_transaction=obj,
-        )
-
 
-class ClientSchool2to1TutoringTuitionTransactionAdmin(admin.ModelAdmin):
+class ClientSchool2to1TutoringTuitionTransactionAdmin(ClientSchoolTuitionRecordAdmin):
     form = ClientSchool2to1TutoringTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
-        'primary_student_account', 'shared_student_account', 'transaction_type',
+        'student_account', 'shared_student_account', 'transaction_type',
         'transaction_amount', 'class_hours_purchased_or_refunded',
         'expiration_period', 'administrator_name', 'time_stamp'
     )
     ordering = ('-time_stamp',)
     search_fields = [
-        'primary_student_account__client_student_name',
+        'student_account__client_student_name',
         'shared_student_account__client_student_name',
         'administrator_name',
     ]
@@ -147,16 +174,8 @@ class ClientSchool2to1TutoringTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
         )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.primary_student_account.purchased_tutoring_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_two_to_one_transaction(
-            previous_hours_purchased=previous_hours,
-            two_to_one_transaction=obj,
-        )
 
-
-class ClientSchoolOnlineTuitionTransactionAdmin(admin.ModelAdmin):
+class ClientSchoolOnlineTuitionTransactionAdmin(ClientSchoolTuitionRecordAdmin):
     form = ClientSchoolOnlineTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -174,16 +193,8 @@ class ClientSchoolOnlineTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_online_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_online_transaction(
-            previous_hours_purchased=previous_hours,
-            online_transaction=obj,
-        )
-
 
-class ClientSchoolGroupClassesTuitionTransactionAdmin(admin.ModelAdmin):
+class ClientSchoolGroupClassesTuitionTransactionAdmin(ClientSchoolTuitionRecordAdmin):
     form = ClientSchoolGroupClassesTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -201,16 +212,8 @@ class ClientSchoolGroupClassesTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_group_class_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_group_transaction(
-            previous_hours_purchased=previous_hours,
-            group_transaction=obj,
-        )
 
-
-class ClientSchoolCompanyClassesTuitionTransactionAdmin(admin.ModelAdmin):
+class ClientSchoolCompanyClassesTuitionTransactionAdmin(ClientSchoolTuitionRecordAdmin):
     form = ClientSchoolCompanyClassesTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -228,13 +231,36 @@ class ClientSchoolCompanyClassesTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type',
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_company_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_company_transaction(
-            previous_hours_purchased=previous_hours,
-            company_transaction=obj,
-        )
+
+class ClientSchoolTuitionTransactionAdmin(admin.ModelAdmin):
+    # every class type in one list; transactions are entered through the
+    # admins of each class type above, which also record the modifications
+    list_display = (
+        'student_account', 'class_type', 'transaction_type',
+        'transaction_amount', 'class_hours_purchased_or_refunded',
+        'administrator_name', 'time_stamp'
+    )
+    list_select_related = ('student_account',)
+    ordering = ('-time_stamp',)
+    search_fields = [
+        'student_account__client_student_name',
+        'shared_student_account__client_student_name',
+        'administrator_name',
+    ]
+    list_filter = (
+        ('time_stamp', DateRangeFilter),
+        'class_type',
+        'transaction_type',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class ClientSchoolPurchasedHoursModificationRecordAdmin(admin.ModelAdmin):
@@ -243,11 +269,7 @@ class ClientSchoolPurchasedHoursModificationRecordAdmin(admin.ModelAdmin):
         'bridge',
         'class_type',
         'modification_type',
-        'tutoring_transaction',
-        'two_to_one_transaction',
-        'online_transaction',
-        'group_transaction',
-        'company_transaction',
+        'tuition_transaction',
         'previous_hours',
         'updated_hours',
         'time_stamp',
@@ -281,6 +303,19 @@ class ClientSchoolPurchasedHoursModificationRecordAdmin(admin.ModelAdmin):
         return False
 
 
+class ClientSchoolPurchasedHoursCheckpointAdmin(admin.ModelAdmin):
+    # checkpoints are written by the create_balance_checkpoints command
+    list_display = ('student_account', 'balance', 'hours', 'as_of')
+    list_filter = ('balance', ('as_of', DateRangeFilter))
+    search_fields = ('student_account__client_student_name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # ── Registration ───────────────────────────────────────────────────────────────
 
 admin.site.register(
@@ -303,7 +338,15 @@ admin.site.register(
     CSCompanyClassTuitionRecord,
     ClientSchoolCompanyClassesTuitionTransactionAdmin
 )
+admin.site.register(
+    CSTuitionTransaction,
+    ClientSchoolTuitionTransactionAdmin
+)
 admin.site.register(
     CSPurchasedHoursModification,
     ClientSchoolPurchasedHoursModificationRecordAdmin
 )
+admin.site.register(
+    CSPurchasedHoursCheckpoint,
+    ClientSchoolPurchasedHoursCheckpointAdmin
+)
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_accounting', '0006_remove_clientschoolclassenrollmenthandler_client_group_class_and_more'),
+        ('client_school_transactions', '0002_alter_cscompanyclasstuitionrecord_transaction_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSPurchasedHoursCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance', models.CharField(choices=[('purchased_tutoring_hours', 'Tutoring Hours'), ('purchased_online_hours', 'Online Hours'), ('purchased_group_class_hours', 'Group Class Hours'), ('purchased_company_hours', 'Company Hours')], max_length=200)),
+                ('as_of', models.DateTimeField()),
+                ('hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('time_stamp', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Client School Purchased Hours Checkpoints',
+                'ordering': ('student_account', 'balance', '-as_of'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cspurchasedhoursmodification',
+            index=models.Index(fields=['student_account', 'class_type', 'time_stamp'], name='cs_hours_mod_account_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='cspurchasedhourscheckpoint',
+            name='student_account',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchased_hours_checkpoints', to='client_school_accounting.accountingclientschoolstudentaccount'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cspurchasedhourscheckpoint',
+            unique_together={('student_account', 'balance', 'as_of')},
+        ),
+    ]
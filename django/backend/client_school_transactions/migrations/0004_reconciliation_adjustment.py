@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_transactions', '0003_purchased_hours_checkpoints'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='cspurchasedhoursmodification',
+            name='client_school_modification_type_consistency_check',
+        ),
+        migrations.AlterField(
+            model_name='cspurchasedhoursmodification',
+            name='modification_type',
+            field=models.CharField(choices=[('tuition_payment_add', 'Tuition Payment'), ('tuition_refund_deduct', 'Tuition Refund'), ('class_status_modification_add', 'Class Status Modification: Hours Added'), ('class_status_modification_deduct', 'Class Status Modification: Hours Deducted'), ('reconciliation_adjustment', 'Reconciliation Adjustment')], default='class_status_modification_deduct', max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='cspurchasedhoursmodification',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('class_type', 'one_to_one_tutoring'), ('tutoring_transaction__isnull', False), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True)), models.Q(('class_type', 'two_to_one_tutoring'), ('two_to_one_transaction__isnull', False), ('tutoring_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True)), models.Q(('class_type', 'online_tutoring'), ('online_transaction__isnull', False), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True)), models.Q(('class_type', 'group_class'), ('group_transaction__isnull', False), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('company_transaction__isnull', True)), models.Q(('class_type', 'company_class'), ('company_transaction__isnull', False), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True)), models.Q(('modification_type', 'class_status_modification_add'), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True), ('bridge__isnull', False)), models.Q(('modification_type', 'class_status_modification_deduct'), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True), ('bridge__isnull', False)), models.Q(('modification_type', 'reconciliation_adjustment'), ('tutoring_transaction__isnull', True), ('two_to_one_transaction__isnull', True), ('online_transaction__isnull', True), ('group_transaction__isnull', True), ('company_transaction__isnull', True), ('bridge__isnull', True)), _connector='OR'), name='client_school_modification_type_consistency_check'),
+        ),
+    ]
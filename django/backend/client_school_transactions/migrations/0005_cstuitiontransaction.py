@@ -0,0 +1,108 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:57
+
+import accounting.validation
+import client_school_transactions.validation
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# (old record model, its student account field, class type, modification field)
+TUITION_RECORD_MODELS = (
+    ('CSTutoringTuitionRecord', 'student_account', 'one_to_one_tutoring', 'tutoring_transaction'),
+    ('CST2To1TutoringTuitionRecord', 'primary_student_account', 'two_to_one_tutoring', 'two_to_one_transaction'),
+    ('CSOnlineTuitionRecord', 'student_account', 'online_tutoring', 'online_transaction'),
+    ('CSGroupClassTuitionRecord', 'student_account', 'group_class', 'group_transaction'),
+    ('CSCompanyClassTuitionRecord', 'student_account', 'company_class', 'company_transaction'),
+)
+
+
+def copy_tuition_records_into_transactions(apps, schema_editor):
+    CSTuitionTransaction = apps.get_model('client_school_transactions', 'CSTuitionTransaction')
+    CSPurchasedHoursModification = apps.get_model(
+        'client_school_transactions', 'CSPurchasedHoursModification'
+    )
+    # keep the original time stamps of the copied records
+    CSTuitionTransaction._meta.get_field('time_stamp').auto_now_add = False
+
+    for model_name, account_field, class_type, modification_field in TUITION_RECORD_MODELS:
+        # saved one by one, as bulk_create does not return the ids on MySQL
+        transaction_ids = {}
+        for record in apps.get_model('client_school_transactions', model_name).objects.all():
+            transaction_ids[record.id] = CSTuitionTransaction.objects.create(
+                class_type=class_type,
+                student_account_id=getattr(record, f'{account_field}_id'),
+                shared_student_account_id=getattr(
+                    record, 'shared_student_account_id', None
+                ),
+                transaction_amount=record.transaction_amount,
+                transaction_type=record.transaction_type,
+                class_hours_purchased_or_refunded=record.class_hours_purchased_or_refunded,
+                expiration_period=record.expiration_period,
+                comments=record.comments,
+                administrator_name=record.administrator_name,
+                time_stamp=record.time_stamp,
+            ).id
+        modifications = list(
+            CSPurchasedHoursModification.objects.filter(
+                **{f'{modification_field}__isnull': False}
+            )
+        )
+        for modification in modifications:
+            modification.tuition_transaction_id = transaction_ids[
+                getattr(modification, f'{modification_field}_id')
+            ]
+        CSPurchasedHoursModification.objects.bulk_update(
+            modifications, ['tuition_transaction'], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_accounting', '0007_student_account_balance_indexes'),
+        ('client_school_transactions', '0004_reconciliation_adjustment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSTuitionTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_type', models.CharField(choices=[('one_to_one_tutoring', 'One-to-one Tutoring'), ('two_to_one_tutoring', 'Two-to-one Tutoring'), ('online_tutoring', 'Online Tutoring'), ('group_class', 'Group Class'), ('company_class', 'Company Class')], max_length=200)),
+                ('transaction_amount', models.PositiveIntegerField(default=33000, validators=[client_school_transactions.validation.validate_tuition_transaction_amount])),
+                ('transaction_type', models.CharField(choices=[('payment', 'Payment'), ('refund', 'Refund')], default='payment', max_length=200)),
+                ('class_hours_purchased_or_refunded', models.PositiveSmallIntegerField(validators=[accounting.validation.validate_number_of_hours_purchased])),
+                ('expiration_period', models.CharField(blank=True, default='', max_length=200)),
+                ('comments', models.TextField(blank=True, default='', validators=[django.core.validators.MaxLengthValidator(700)])),
+                ('administrator_name', models.CharField(max_length=200)),
+                ('time_stamp', models.DateTimeField(auto_now_add=True)),
+                ('shared_student_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shared_tuition_transactions', to='client_school_accounting.accountingclientschoolstudentaccount')),
+                ('student_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tuition_transactions', to='client_school_accounting.accountingclientschoolstudentaccount')),
+            ],
+            options={
+                'verbose_name_plural': 'Client School Tuition Transactions',
+                'ordering': ('-time_stamp',),
+            },
+        ),
+        migrations.AddField(
+            model_name='cspurchasedhoursmodification',
+            name='tuition_transaction',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='purchased_hours_modification', to='client_school_transactions.cstuitiontransaction'),
+        ),
+        migrations.AddIndex(
+            model_name='cstuitiontransaction',
+            index=models.Index(fields=['student_account', 'time_stamp'], name='cs_tuition_account_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cstuitiontransaction',
+            index=models.Index(fields=['class_type', 'time_stamp'], name='cs_tuition_type_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cstuitiontransaction',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('class_type', 'two_to_one_tutoring'), ('shared_student_account__isnull', False)), models.Q(models.Q(('class_type', 'two_to_one_tutoring'), _negated=True), ('shared_student_account__isnull', True)), _connector='OR'), name='tuition_transaction_shared_account_check'),
+        ),
+        migrations.RunPython(
+            copy_tuition_records_into_transactions, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,145 @@
+# Generated by Django 4.2.13 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_transactions', '0005_cstuitiontransaction'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cscompanyclasstuitionrecord',
+            name='student_account',
+        ),
+        migrations.RemoveField(
+            model_name='csgroupclasstuitionrecord',
+            name='student_account',
+        ),
+        migrations.RemoveField(
+            model_name='csonlinetuitionrecord',
+            name='student_account',
+        ),
+        migrations.RemoveField(
+            model_name='cst2to1tutoringtuitionrecord',
+            name='primary_student_account',
+        ),
+        migrations.RemoveField(
+            model_name='cst2to1tutoringtuitionrecord',
+            name='shared_student_account',
+        ),
+        migrations.RemoveField(
+            model_name='cstutoringtuitionrecord',
+            name='student_account',
+        ),
+        migrations.RemoveConstraint(
+            model_name='cspurchasedhoursmodification',
+            name='client_school_modification_type_consistency_check',
+        ),
+        migrations.RemoveField(
+            model_name='cspurchasedhoursmodification',
+            name='company_transaction',
+        ),
+        migrations.RemoveField(
+            model_name='cspurchasedhoursmodification',
+            name='group_transaction',
+        ),
+        migrations.RemoveField(
+            model_name='cspurchasedhoursmodification',
+            name='online_transaction',
+        ),
+        migrations.RemoveField(
+            model_name='cspurchasedhoursmodification',
+            name='tutoring_transaction',
+        ),
+        migrations.RemoveField(
+            model_name='cspurchasedhoursmodification',
+            name='two_to_one_transaction',
+        ),
+        migrations.AddConstraint(
+            model_name='cspurchasedhoursmodification',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('tuition_transaction__isnull', False), models.Q(('modification_type', 'tuition_payment_add'), ('modification_type', 'tuition_refund_deduct'), _connector='OR')), models.Q(('tuition_transaction__isnull', True), models.Q(('modification_type', 'class_status_modification_add'), ('modification_type', 'class_status_modification_deduct'), _connector='OR'), ('bridge__isnull', False)), models.Q(('modification_type', 'reconciliation_adjustment'), ('tuition_transaction__isnull', True), ('bridge__isnull', True)), _connector='OR'), name='client_school_modification_type_consistency_check'),
+        ),
+        migrations.DeleteModel(
+            name='CSCompanyClassTuitionRecord',
+        ),
+        migrations.DeleteModel(
+            name='CSGroupClassTuitionRecord',
+        ),
+        migrations.DeleteModel(
+            name='CSOnlineTuitionRecord',
+        ),
+        migrations.DeleteModel(
+            name='CST2To1TutoringTuitionRecord',
+        ),
+        migrations.DeleteModel(
+            name='CSTutoringTuitionRecord',
+        ),
+        migrations.CreateModel(
+            name='CSCompanyClassTuitionRecord',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Company Classes Tuition Transaction Records',
+                'ordering': ('-time_stamp',),
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('client_school_transactions.cstuitiontransaction',),
+        ),
+        migrations.CreateModel(
+            name='CSGroupClassTuitionRecord',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Group Classes Tuition Transaction Records',
+                'ordering': ('-time_stamp',),
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('client_school_transactions.cstuitiontransaction',),
+        ),
+        migrations.CreateModel(
+            name='CSOnlineTuitionRecord',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Online Tuition Transaction Records',
+                'ordering': ('-time_stamp',),
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('client_school_transactions.cstuitiontransaction',),
+        ),
+        migrations.CreateModel(
+            name='CST2To1TutoringTuitionRecord',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Two-to-one Tutoring Tuition Transaction Records',
+                'ordering': ('-time_stamp',),
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('client_school_transactions.cstuitiontransaction',),
+        ),
+        migrations.CreateModel(
+            name='CSTutoringTuitionRecord',
+            fields=[
+            ],
+            options={
+                'verbose_name_plural': 'Tutoring Tuition Transaction Records',
+                'ordering': ('-time_stamp',),
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('client_school_transactions.cstuitiontransaction',),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_transactions', '0006_tuition_record_proxies'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='cspurchasedhoursmodification',
+            name='client_school_modification_type_consistency_check',
+        ),
+        migrations.AlterField(
+            model_name='cspurchasedhoursmodification',
+            name='modification_type',
+            field=models.CharField(choices=[('tuition_payment_add', 'Tuition Payment'), ('tuition_refund_deduct', 'Tuition Refund'), ('class_status_modification_add', 'Class Status Modification: Hours Added'), ('class_status_modification_deduct', 'Class Status Modification: Hours Deducted'), ('reconciliation_adjustment', 'Reconciliation Adjustment'), ('hours_expiration_deduct', 'Expired Hours Deducted')], default='class_status_modification_deduct', max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='cspurchasedhoursmodification',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('tuition_transaction__isnull', False), models.Q(('modification_type', 'tuition_payment_add'), ('modification_type', 'tuition_refund_deduct'), _connector='OR')), models.Q(('tuition_transaction__isnull', True), models.Q(('modification_type', 'class_status_modification_add'), ('modification_type', 'class_status_modification_deduct'), _connector='OR'), ('bridge__isnull', False)), models.Q(models.Q(('modification_type', 'reconciliation_adjustment'), ('modification_type', 'hours_expiration_deduct'), _connector='OR'), ('tuition_transaction__isnull', True), ('bridge__isnull', True)), _connector='OR'), name='client_school_modification_type_consistency_check'),
+        ),
+    ]
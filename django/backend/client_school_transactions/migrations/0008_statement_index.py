@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client_school_transactions', '0007_hours_expiration_deduct'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cspurchasedhoursmodification',
+            index=models.Index(fields=['student_account', 'time_stamp'], name='cs_hours_mod_statement_idx'),
+        ),
+    ]
@@ -1,13 +1,11 @@
 from django.db import models
 from django.db.models import CheckConstraint, Q
-from decimal import Decimal
 from django.core.validators import MaxLengthValidator
 from client_school_accounting.models import (
     AccountingClientSchoolStudentAccount,
     CLASS_ENROLLMENT_TYPES,
     ClientSchoolClassEnrollmentHandler,
 )
-from client_school_accounting.utils import calculate_expiration_date
 from .validation import validate_tuition_transaction_amount
 from accounting.validation import validate_number_of_hours_purchased
 
@@ -22,6 +20,8 @@ ACCOUNT_BALANCE_ALTERATION_TYPE = (
     ('tuition_refund_deduct', 'Tuition Refund'),
     ('class_status_modification_add', "Class Status Modification: Hours Added"),
     ('class_status_modification_deduct', "Class Status Modification: Hours Deducted"),
+    ('reconciliation_adjustment', "Reconciliation Adjustment"),
+    ('hours_expiration_deduct', "Expired Hours Deducted"),
 )
 
 GROUP_CLASS_EXPIRATION_PERIODS = (
@@ -30,17 +30,88 @@ GROUP_CLASS_EXPIRATION_PERIODS = (
     ('60_weeks', '60 Weeks'),
 )
 
+PURCHASED_HOURS_BALANCES = (
+    ('purchased_tutoring_hours', 'Tutoring Hours'),
+    ('purchased_online_hours', 'Online Hours'),
+    ('purchased_group_class_hours', 'Group Class Hours'),
+    ('purchased_company_hours', 'Company Hours'),
+)
+
+# the student account balance changed by the modifications of each
+# class type; one-to-one and two-to-one tutoring share the tutoring hours
+CLASS_TYPE_BALANCES = {
+    'one_to_one_tutoring': 'purchased_tutoring_hours',
+    'two_to_one_tutoring': 'purchased_tutoring_hours',
+    'online_tutoring': 'purchased_online_hours',
+    'group_class': 'purchased_group_class_hours',
+    'company_class': 'purchased_company_hours',
+}
+
+# the class type recorded on reconciliation adjustments of each balance
+BALANCE_CLASS_TYPES = {
+    'purchased_tutoring_hours': 'one_to_one_tutoring',
+    'purchased_online_hours': 'online_tutoring',
+    'purchased_group_class_hours': 'group_class',
+    'purchased_company_hours': 'company_class',
+}
+
 TUTORING_EXPIRATION_PERIODS = (
     ('6_months', '6 Months'),
     ('12_months', '12 Months'),
     ('24_months', '24 Months'),
 )
 
+# the expiration date of each balance, set again by every payment
+BALANCE_EXPIRATION_DATES = {
+    'purchased_tutoring_hours': 'tutoring_hours_expiration_date',
+    'purchased_online_hours': 'online_hours_expiration_date',
+    'purchased_group_class_hours': 'group_hours_expiration_date',
+    'purchased_company_hours': 'company_hours_expiration_date',
+}
+
+# the expiration periods offered for each class type; company classes
+# have free-text expiration periods
+CLASS_TYPE_EXPIRATION_PERIODS = {
+    'one_to_one_tutoring': TUTORING_EXPIRATION_PERIODS,
+    'two_to_one_tutoring': TUTORING_EXPIRATION_PERIODS,
+    'online_tutoring': TUTORING_EXPIRATION_PERIODS,
+    'group_class': GROUP_CLASS_EXPIRATION_PERIODS,
+}
+
+DEFAULT_EXPIRATION_PERIODS = {
+    'one_to_one_tutoring': '6_months',
+    'two_to_one_tutoring': '6_months',
+    'online_tutoring': '6_months',
+    'group_class': '12_weeks',
+    'company_class': '',
+}
+
+TUITION_TRANSACTION_LABELS = {
+    'one_to_one_tutoring': 'Tutoring',
+    'two_to_one_tutoring': '2-to-1 Tutoring',
+    'online_tutoring': 'Online Tutoring',
+    'group_class': 'Group Classes',
+    'company_class': 'Company Classes',
+}
+
+
+# every client school tuition payment and refund, whatever the class type;
+# for two-to-one tutoring the student account is the primary student
+class CSTuitionTransaction(models.Model):
+    # set by the proxy models of each class type
+    CLASS_TYPE = None
 
-class CSTutoringTuitionRecord(models.Model):
+    class_type = models.CharField(
+        max_length=200, choices=CLASS_ENROLLMENT_TYPES
+    )
     student_account = models.ForeignKey(
         AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='tutoring_tuition_transactions',
+        related_name='tuition_transactions',
+    )
+    shared_student_account = models.ForeignKey(
+        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
+        related_name='shared_tuition_transactions',
+        blank=True, null=True
     )
     transaction_amount = models.PositiveIntegerField(
         validators=[validate_tuition_transaction_amount], default=33000
@@ -51,8 +122,10 @@ class CSTutoringTuitionRecord(models.Model):
     class_hours_purchased_or_refunded = models.PositiveSmallIntegerField(
         validators=[validate_number_of_hours_purchased]
     )
+    # the choices depend on the class type, so they are set by the forms;
+    # company classes have free-text expiration periods
     expiration_period = models.CharField(
-        max_length=200, choices=TUTORING_EXPIRATION_PERIODS, default='6_months'
+        max_length=200, blank=True, default=''
     )
     comments = models.TextField(
         editable=True, validators=[MaxLengthValidator(700)],
@@ -66,253 +139,115 @@ class CSTutoringTuitionRecord(models.Model):
     def __str__(self):
         formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
         formatted_amount = "${:,}".format(self.transaction_amount)
-        return "Tutoring {}: {} for {} at {}".format(
+        student_names = self.student_account.client_student_name
+        if self.shared_student_account_id:
+            student_names = "{} with {}".format(
+                student_names, self.shared_student_account.client_student_name
+            )
+        return "{} {}: {} for {} at {}".format(
+            TUITION_TRANSACTION_LABELS[self.class_type],
             self.transaction_type.capitalize(),
-            self.student_account.client_student_name,
+            student_names,
             formatted_amount,
             formatted_time
         )
 
     def save(self, *args, **kwargs):
+        # the purchased hours are updated by record_cs_tuition_transaction
+        if self.CLASS_TYPE is not None:
+            self.class_type = self.CLASS_TYPE
+        if not self.expiration_period:
+            self.expiration_period = DEFAULT_EXPIRATION_PERIODS[self.class_type]
         super().save(*args, **kwargs)
-        hours_as_decimal = Decimal(str(self.class_hours_purchased_or_refunded))
-        if self.student_account.purchased_tutoring_hours is None:
-            self.student_account.purchased_tutoring_hours = Decimal('0')
-        if self.transaction_type == 'payment':
-            self.student_account.purchased_tutoring_hours += hours_as_decimal
-            self.student_account.tutoring_hours_expiration_date = calculate_expiration_date(
-                self.expiration_period
-            )
-        else:
-            self.student_account.purchased_tutoring_hours -= hours_as_decimal
-        self.student_account.save()
 
     class Meta:
-        verbose_name_plural = 'Tutoring Tuition Transaction Records'
+        verbose_name_plural = 'Client School Tuition Transactions'
         ordering = ('-time_stamp',)
+        constraints = [
+            CheckConstraint(
+                check=(
+                    (
+                        Q(class_type='two_to_one_tutoring')
+                        & Q(shared_student_account__isnull=False)
+                    )
+                    |
+                    (
+                        ~Q(class_type='two_to_one_tutoring')
+                        & Q(shared_student_account__isnull=True)
+                    )
+                ),
+                name='tuition_transaction_shared_account_check'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['student_account', 'time_stamp'],
+                name='cs_tuition_account_time_idx'
+            ),
+            models.Index(
+                fields=['class_type', 'time_stamp'],
+                name='cs_tuition_type_time_idx'
+            ),
+        ]
 
 
-class CST2To1TutoringTuitionRecord(models.Model):
-    primary_student_account = models.ForeignKey(
-        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='two_to_one_tutoring_tuition_transactions',
-    )
-    shared_student_account = models.ForeignKey(
-        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='two_to_one_shared_tutoring_tuition_transactions',
-    )
-    transaction_amount = models.PositiveIntegerField(
-        validators=[validate_tuition_transaction_amount], default=16500
-    )
-    transaction_type = models.CharField(
-        max_length=200, choices=TRANSACTION_TYPE, default='payment'
-    )
-    class_hours_purchased_or_refunded = models.PositiveSmallIntegerField(
-        validators=[validate_number_of_hours_purchased]
-    )
-    expiration_period = models.CharField(
-        max_length=200, choices=TUTORING_EXPIRATION_PERIODS, default='6_months'
-    )
-    comments = models.TextField(
-        editable=True, validators=[MaxLengthValidator(700)],
-        default='', blank=True
-    )
-    administrator_name = models.CharField(
-        max_length=200,
-    )
-    time_stamp = models.DateTimeField(auto_now_add=True)
+class CSTuitionTransactionTypeManager(models.Manager):
+    # the transactions of one class type, for the proxy models below
 
-    def __str__(self):
-        formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
-        formatted_amount = "${:,}".format(self.transaction_amount)
-        return "2-to-1 Tutoring {}: {} with {} for {} at {}".format(
-            self.transaction_type.capitalize(),
-            self.primary_student_account.client_student_name,
-            self.shared_student_account.client_student_name,
-            formatted_amount,
-            formatted_time
-        )
+    def __init__(self, class_type):
+        super().__init__()
+        self.class_type = class_type
+
+    def get_queryset(self):
+        return super().get_queryset().filter(class_type=self.class_type)
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        hours_as_decimal = Decimal(str(self.class_hours_purchased_or_refunded))
-        if self.primary_student_account.purchased_tutoring_hours is None:
-            self.primary_student_account.purchased_tutoring_hours = Decimal('0')
-        if self.transaction_type == 'payment':
-            self.primary_student_account.purchased_tutoring_hours += hours_as_decimal
-            self.primary_student_account.tutoring_hours_expiration_date = calculate_expiration_date(
-                self.expiration_period
-            )
-        else:
-            self.primary_student_account.purchased_tutoring_hours -= hours_as_decimal
-        self.primary_student_account.save()
+
+class CSTutoringTuitionRecord(CSTuitionTransaction):
+    CLASS_TYPE = 'one_to_one_tutoring'
+    objects = CSTuitionTransactionTypeManager(CLASS_TYPE)
 
     class Meta:
-        verbose_name_plural = 'Two-to-one Tutoring Tuition Transaction Records'
+        proxy = True
+        verbose_name_plural = 'Tutoring Tuition Transaction Records'
         ordering = ('-time_stamp',)
 
 
-class CSOnlineTuitionRecord(models.Model):
-    student_account = models.ForeignKey(
-        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='online_tuition_transactions',
-    )
-    transaction_amount = models.PositiveIntegerField(
-        validators=[validate_tuition_transaction_amount],
-    )
-    transaction_type = models.CharField(
-        max_length=200, choices=TRANSACTION_TYPE, default='payment'
-    )
-    class_hours_purchased_or_refunded = models.PositiveSmallIntegerField(
-        validators=[validate_number_of_hours_purchased]
-    )
-    expiration_period = models.CharField(
-        max_length=200, choices=TUTORING_EXPIRATION_PERIODS, default='6_months'
-    )
-    comments = models.TextField(
-        editable=True, validators=[MaxLengthValidator(700)],
-        default='', blank=True
-    )
-    administrator_name = models.CharField(
-        max_length=200,
-    )
-    time_stamp = models.DateTimeField(auto_now_add=True)
+class CST2To1TutoringTuitionRecord(CSTuitionTransaction):
+    CLASS_TYPE = 'two_to_one_tutoring'
+    objects = CSTuitionTransactionTypeManager(CLASS_TYPE)
 
-    def __str__(self):
-        formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
-        formatted_amount = "${:,}".format(self.transaction_amount)
-        return "Online Tutoring {}: {} for {} at {}".format(
-            self.transaction_type.capitalize(),
-            self.student_account.client_student_name,
-            formatted_amount,
-            formatted_time
-        )
+    class Meta:
+        proxy = True
+        verbose_name_plural = 'Two-to-one Tutoring Tuition Transaction Records'
+        ordering = ('-time_stamp',)
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        hours_as_decimal = Decimal(str(self.class_hours_purchased_or_refunded))
-        if self.student_account.purchased_online_hours is None:
-            self.student_account.purchased_online_hours = Decimal('0')
-        if self.transaction_type == 'payment':
-            self.student_account.purchased_online_hours += hours_as_decimal
-            self.student_account.online_hours_expiration_date = calculate_expiration_date(
-                self.expiration_period
-            )
-        else:
-            self.student_account.purchased_online_hours -= hours_as_decimal
-        self.student_account.save()
+
+class CSOnlineTuitionRecord(CSTuitionTransaction):
+    CLASS_TYPE = 'online_tutoring'
+    objects = CSTuitionTransactionTypeManager(CLASS_TYPE)
 
     class Meta:
+        proxy = True
         verbose_name_plural = 'Online Tuition Transaction Records'
         ordering = ('-time_stamp',)
 
 
-class CSGroupClassTuitionRecord(models.Model):
-    student_account = models.ForeignKey(
-        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='group_class_tuition_transactions',
-    )
-    transaction_amount = models.PositiveIntegerField(
-        validators=[validate_tuition_transaction_amount], default=33000
-    )
-    transaction_type = models.CharField(
-        max_length=200, choices=TRANSACTION_TYPE, default='payment'
-    )
-    class_hours_purchased_or_refunded = models.PositiveSmallIntegerField(
-        validators=[validate_number_of_hours_purchased]
-    )
-    expiration_period = models.CharField(
-        max_length=200, choices=GROUP_CLASS_EXPIRATION_PERIODS, default='12_weeks'
-    )
-    comments = models.TextField(
-        editable=True, validators=[MaxLengthValidator(700)],
-        default='', blank=True
-    )
-    administrator_name = models.CharField(
-        max_length=200,
-    )
-    time_stamp = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
-        formatted_amount = "${:,}".format(self.transaction_amount)
-        return "Group Classes {}: {} for {} at {}".format(
-            self.transaction_type.capitalize(),
-            self.student_account.client_student_name,
-            formatted_amount,
-            formatted_time
-        )
-
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        hours_as_decimal = Decimal(str(self.class_hours_purchased_or_refunded))
-        if self.student_account.purchased_group_class_hours is None:
-            self.student_account.purchased_group_class_hours = Decimal('0')
-        if self.transaction_type == 'payment':
-            self.student_account.purchased_group_class_hours += hours_as_decimal
-            self.student_account.group_hours_expiration_date = calculate_expiration_date(
-                self.expiration_period
-            )
-        else:
-            self.student_account.purchased_group_class_hours -= hours_as_decimal
-        self.student_account.save()
+class CSGroupClassTuitionRecord(CSTuitionTransaction):
+    CLASS_TYPE = 'group_class'
+    objects = CSTuitionTransactionTypeManager(CLASS_TYPE)
 
     class Meta:
+        proxy = True
         verbose_name_plural = 'Group Classes Tuition Transaction Records'
         ordering = ('-time_stamp',)
 
 
-class CSCompanyClassTuitionRecord(models.Model):
-    student_account = models.ForeignKey(
-        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
-        related_name='company_class_tuition_transactions',
-    )
-    transaction_amount = models.PositiveIntegerField(
-        validators=[validate_tuition_transaction_amount], default=33000
-    )
-    transaction_type = models.CharField(
-        max_length=200, choices=TRANSACTION_TYPE, default='payment'
-    )
-    class_hours_purchased_or_refunded = models.PositiveSmallIntegerField(
-        validators=[validate_number_of_hours_purchased]
-    )
-    expiration_period = models.CharField(
-        max_length=200, blank=True, default=''
-    )
-    comments = models.TextField(
-        editable=True, validators=[MaxLengthValidator(700)],
-        default='', blank=True
-    )
-    administrator_name = models.CharField(
-        max_length=200,
-    )
-    time_stamp = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
-        formatted_amount = "${:,}".format(self.transaction_amount)
-        return "Company Classes {}: {} for {} at {}".format(
-            self.transaction_type.capitalize(),
-            self.student_account.client_student_name,
-            formatted_amount,
-            formatted_time
-        )
-
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        hours_as_decimal = Decimal(str(self.class_hours_purchased_or_refunded))
-        if self.student_account.purchased_company_hours is None:
-            self.student_account.purchased_company_hours = Decimal('0')
-        if self.transaction_type == 'payment':
-            self.student_account.purchased_company_hours += hours_as_decimal
-            self.student_account.company_hours_expiration_date = calculate_expiration_date(
-                self.expiration_period
-            )
-        else:
-            self.student_account.purchased_company_hours -= hours_as_decimal
-        self.student_account.save()
+class CSCompanyClassTuitionRecord(CSTuitionTransaction):
+    CLASS_TYPE = 'company_class'
+    objects = CSTuitionTransactionTypeManager(CLASS_TYPE)
 
     class Meta:
+        proxy = True
         verbose_name_plural = 'Company Classes Tuition Transaction Records'
         ordering = ('-time_stamp',)
 
@@ -334,28 +269,8 @@ class CSPurchasedHoursModification(models.Model):
         max_length=200, choices=ACCOUNT_BALANCE_ALTERATION_TYPE,
         default='class_status_modification_deduct'
     )
-    tutoring_transaction = models.OneToOneField(
-        CSTutoringTuitionRecord, on_delete=models.CASCADE,
-        related_name='purchased_hours_modification',
-        blank=True, null=True
-    )
-    two_to_one_transaction = models.OneToOneField(
-        CST2To1TutoringTuitionRecord, on_delete=models.CASCADE,
-        related_name='purchased_hours_modification',
-        blank=True, null=True
-    )
-    online_transaction = models.OneToOneField(
-        CSOnlineTuitionRecord, on_delete=models.CASCADE,
-        related_name='purchased_hours_modification',
-        blank=True, null=True
-    )
-    group_transaction = models.OneToOneField(
-        CSGroupClassTuitionRecord, on_delete=models.CASCADE,
-        related_name='purchased_hours_modification',
-        blank=True, null=True
-    )
-    company_transaction = models.OneToOneField(
-        CSCompanyClassTuitionRecord, on_delete=models.CASCADE,
+    tuition_transaction = models.OneToOneField(
+        CSTuitionTransaction, on_delete=models.CASCADE,
         related_name='purchased_hours_modification',
         blank=True, null=True
     )
@@ -365,25 +280,22 @@ class CSPurchasedHoursModification(models.Model):
 
     def __str__(self):
         formatted_time = self.time_stamp.strftime("%Y-%m-%d %H:%M")
-        if self.tutoring_transaction:
-            return "Tutoring Modification: {} at {}".format(
-                self.student_account.client_student_name, formatted_time
-            )
-        elif self.two_to_one_transaction:
-            return "2-to-1 Tutoring Modification: {} at {}".format(
+        if self.tuition_transaction_id:
+            return "{} Modification: {} at {}".format(
+                TUITION_TRANSACTION_LABELS[self.class_type],
                 self.student_account.client_student_name, formatted_time
             )
-        elif self.online_transaction:
-            return "Online Modification: {} at {}".format(
-                self.student_account.client_student_name, formatted_time
-            )
-        elif self.group_transaction:
-            return "Group Class Modification: {} at {}".format(
-                self.student_account.client_student_name, formatted_time
+        elif self.modification_type == 'reconciliation_adjustment':
+            return "Reconciliation Adjustment ({}): {} at {}".format(
+                self.get_class_type_display(),
+                self.student_account.client_student_name,
+                formatted_time
             )
-        elif self.company_transaction:
-            return "Company Class Modification: {} at {}".format(
-                self.student_account.client_student_name, formatted_time
+        elif self.modification_type == 'hours_expiration_deduct':
+            return "Expired Hours ({}): {} at {}".format(
+                self.get_class_type_display(),
+                self.student_account.client_student_name,
+                formatted_time
             )
         else:
             return "Class Status Modification ({}): {} at {}".format(
@@ -399,70 +311,68 @@ class CSPurchasedHoursModification(models.Model):
             CheckConstraint(
                 check=(
                     (
-                        Q(class_type='one_to_one_tutoring')
-                        & Q(tutoring_transaction__isnull=False)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
+                        Q(tuition_transaction__isnull=False)
+                        & (
+                            Q(modification_type='tuition_payment_add')
+                            | Q(modification_type='tuition_refund_deduct')
+                        )
                     )
                     |
                     (
-                        Q(class_type='two_to_one_tutoring')
-                        & Q(two_to_one_transaction__isnull=False)
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
-                    )
-                    |
-                    (
-                        Q(class_type='online_tutoring')
-                        & Q(online_transaction__isnull=False)
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
-                    )
-                    |
-                    (
-                        Q(class_type='group_class')
-                        & Q(group_transaction__isnull=False)
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
-                    )
-                    |
-                    (
-                        Q(class_type='company_class')
-                        & Q(company_transaction__isnull=False)
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                    )
-                    |
-                    (
-                        Q(modification_type='class_status_modification_add')
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
+                        Q(tuition_transaction__isnull=True)
+                        & (
+                            Q(modification_type='class_status_modification_add')
+                            | Q(modification_type='class_status_modification_deduct')
+                        )
                         & Q(bridge__isnull=False)
                     )
                     |
                     (
-                        Q(modification_type='class_status_modification_deduct')
-                        & Q(tutoring_transaction__isnull=True)
-                        & Q(two_to_one_transaction__isnull=True)
-                        & Q(online_transaction__isnull=True)
-                        & Q(group_transaction__isnull=True)
-                        & Q(company_transaction__isnull=True)
-                        & Q(bridge__isnull=False)
+                        (
+                            Q(modification_type='reconciliation_adjustment')
+                            | Q(modification_type='hours_expiration_deduct')
+                        )
+                        & Q(tuition_transaction__isnull=True)
+                        & Q(bridge__isnull=True)
                     )
                 ),
                 name='client_school_modification_type_consistency_check'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['student_account', 'class_type', 'time_stamp'],
+                name='cs_hours_mod_account_time_idx'
+            ),
+            # monthly statements read an account's modifications of every class type
+            models.Index(
+                fields=['student_account', 'time_stamp'],
+                name='cs_hours_mod_statement_idx'
+            ),
+        ]
+
+
+class CSPurchasedHoursCheckpoint(models.Model):
+    student_account = models.ForeignKey(
+        AccountingClientSchoolStudentAccount, on_delete=models.CASCADE,
+        related_name='purchased_hours_checkpoints'
+    )
+    balance = models.CharField(
+        max_length=200, choices=PURCHASED_HOURS_BALANCES
+    )
+    as_of = models.DateTimeField()
+    hours = models.DecimalField(max_digits=5, decimal_places=2)
+    time_stamp = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return "{} ({}): {}hrs as of {}".format(
+            self.student_account.client_student_name,
+            self.get_balance_display(),
+            self.hours,
+            self.as_of.strftime("%Y-%m-%d %H:%M")
+        )
+
+    class Meta:
+        verbose_name_plural = 'Client School Purchased Hours Checkpoints'
+        ordering = ('student_account', 'balance', '-as_of')
+        unique_together = ('student_account', 'balance', 'as_of')
@@ -2,56 +2,13 @@ from rest_framework import serializers
 from client_school_accounting.models import (
     AccountingClientSchoolStudentAccount,
 )
-from .models import CSPurchasedHoursModification
-
-
-class CSTransactionSummarySerializer(serializers.Serializer):
-    transaction_amount = serializers.SerializerMethodField()
-    transaction_type = serializers.SerializerMethodField()
-    class_hours_purchased_or_refunded = serializers.SerializerMethodField()
-    administrator_name = serializers.SerializerMethodField()
-    transaction_time_stamp = serializers.SerializerMethodField()
-    # Only non-null for two_to_one transactions
-    shared_student_name = serializers.SerializerMethodField()
-
-    def _get_transaction(self, obj):
-        for attr in (
-            'tutoring_transaction',
-            'two_to_one_transaction',
-            'online_transaction',
-            'group_transaction',
-            'company_transaction',
-        ):
-            tx = getattr(obj, attr, None)
-            if tx is not None:
-                return tx
-        return None
-
-    def get_transaction_amount(self, obj):
-        tx = self._get_transaction(obj)
-        return tx.transaction_amount if tx else None
-
-    def get_transaction_type(self, obj):
-        tx = self._get_transaction(obj)
-        return tx.transaction_type if tx else None
-
-    def get_class_hours_purchased_or_refunded(self, obj):
-        tx = self._get_transaction(obj)
-        return tx.class_hours_purchased_or_refunded if tx else None
-
-    def get_administrator_name(self, obj):
-        tx = self._get_transaction(obj)
-        return tx.administrator_name if tx else None
-
-    def get_transaction_time_stamp(self, obj):
-        tx = self._get_transaction(obj)
-        return tx.time_stamp if tx else None
-
-    def get_shared_student_name(self, obj):
-        tx = obj.two_to_one_transaction
-        if tx is not None:
-            return tx.shared_student_account.client_student_name
-        return None
+from .models import (
+    CLASS_TYPE_EXPIRATION_PERIODS,
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+)
+from .tuition_transactions import record_cs_tuition_transaction
+from .utils import TRANSACTION_SUMMARY_FIELDS
 
 
 class CSPurchasedHoursModificationSerializer(serializers.ModelSerializer):
@@ -83,14 +40,62 @@ class CSPurchasedHoursModificationSerializer(serializers.ModelSerializer):
         return float(obj.updated_hours - obj.previous_hours)
 
     def get_transaction_summary(self, obj):
-        has_transaction = any([
-            obj.tutoring_transaction_id,
-            obj.two_to_one_transaction_id,
-            obj.online_transaction_id,
-            obj.group_transaction_id,
-            obj.company_transaction_id,
-        ])
-        if not has_transaction:
+        # reads the transaction columns annotated on the modification by
+        # annotate_cs_transaction_summary instead of loading the transaction
+        if not obj.tuition_transaction_id:
             return None
-        return CSTransactionSummarySerializer(obj).data
+        return {
+            field: getattr(obj, field) for field in TRANSACTION_SUMMARY_FIELDS
+        }
+
+
+
+class CSTuitionTransactionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CSTuitionTransaction
+        fields = (
+            'id',
+            'class_type',
+            'student_account',
+            'shared_student_account',
+            'transaction_amount',
+            'transaction_type',
+            'class_hours_purchased_or_refunded',
+            'expiration_period',
+            'comments',
+            'administrator_name',
+            'time_stamp',
+        )
+        read_only_fields = ('administrator_name', 'time_stamp')
+
+    def validate(self, data):
+        class_type = data['class_type']
+        shared_student_account = data.get('shared_student_account')
+        if class_type == 'two_to_one_tutoring':
+            if shared_student_account is None:
+                raise serializers.ValidationError(
+                    'Two-to-one tutoring requires a shared student account.'
+                )
+            if shared_student_account == data['student_account']:
+                raise serializers.ValidationError(
+                    'Primary and shared student accounts must be different students.'
+                )
+        elif shared_student_account is not None:
+            raise serializers.ValidationError(
+                'Only two-to-one tutoring has a shared student account.'
+            )
+        expiration_periods = CLASS_TYPE_EXPIRATION_PERIODS.get(class_type)
+        expiration_period = data.get('expiration_period')
+        if expiration_periods and expiration_period and \
+                expiration_period not in dict(expiration_periods):
+            raise serializers.ValidationError({
+                'expiration_period': 'Must be one of: {}'.format(
+                    ', '.join(dict(expiration_periods))
+                )
+            })
+        return data
 
+    def create(self, validated_data):
+        tuition_transaction = CSTuitionTransaction(**validated_data)
+        record_cs_tuition_transaction(tuition_transaction)
+        return tuition_transaction
@@ -1,11 +1,14 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin, get_staff_schools
 from django import forms
-from decimal import Decimal
 from django.contrib import admin
 from django.contrib import messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.template.response import TemplateResponse
+from django.urls import path
 from rangefilter.filters import DateRangeFilter
 
-from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school.models import ClientSchool
 
 from client_school_transactions.models import (
     CSTutoringTuitionRecord,
@@ -13,53 +16,63 @@ from client_school_transactions.models import (
     CSOnlineTuitionRecord,
     CSGroupClassTuitionRecord,
     CSCompanyClassTuitionRecord,
+    CSTuitionTransaction,
+    GROUP_CLASS_EXPIRATION_PERIODS,
+    TUTORING_EXPIRATION_PERIODS,
     CSPurchasedHoursModification
 )
 
-from client_school_transactions.utils import (
-    create_modification_record_for_tutoring_transaction,
-    create_modification_record_for_two_to_one_transaction,
-    create_modification_record_for_online_transaction,
-    create_modification_record_for_group_transaction,
-    create_modification_record_for_company_transaction,
+from client_school_transactions.tuition_import import (
+    TUITION_IMPORT_COLUMNS,
+    import_cs_tuition_transactions,
+    read_tuition_import_rows,
+)
+from client_school_transactions.tuition_transactions import (
+    record_cs_tuition_transaction,
 )
 
 
-DAVIDS_ENGLISH = "David's English Center"
-
-
-def davids_english_student_accounts():
-    return AccountingClientSchoolStudentAccount.objects.filter(
-        client_school__school_name=DAVIDS_ENGLISH
-    ).order_by('client_student_name')
+def order_student_accounts(field):
+    # the accounts are limited to the staff user's schools by the admin
+    field.queryset = field.queryset.order_by('client_student_name')
 
 
 # ── Forms ──────────────────────────────────────────────────────────────────────
 
 class StaffClientSchoolTutoringTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CSTutoringTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_account'].queryset = davids_english_student_accounts()
+        order_student_accounts(self.fields['student_account'])
 
 
 class StaffClientSchool2to1TutoringTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CST2To1TutoringTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type',)
+        labels = {'student_account': 'Primary student account'}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        accounts = davids_english_student_accounts()
-        self.fields['primary_student_account'].queryset = accounts
-        self.fields['shared_student_account'].queryset = accounts
+        order_student_accounts(self.fields['student_account'])
+        order_student_accounts(self.fields['shared_student_account'])
+        self.fields['shared_student_account'].required = True
+        self.fields['transaction_amount'].initial = 16500
 
     def clean(self):
         cleaned_data = super().clean()
-        primary = cleaned_data.get('primary_student_account')
+        primary = cleaned_data.get('student_account')
         shared = cleaned_data.get('shared_student_account')
         if primary and shared and primary == shared:
             raise forms.ValidationError(
@@ -69,38 +82,152 @@ class StaffClientSchool2to1TutoringTuitionTransactionForm(forms.ModelForm):
 
 
 class StaffClientSchoolOnlineTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=TUTORING_EXPIRATION_PERIODS, initial='6_months'
+    )
+
     class Meta:
         model = CSOnlineTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_account'].queryset = davids_english_student_accounts()
+        self.fields['transaction_amount'].initial = None
+        order_student_accounts(self.fields['student_account'])
 
 
 class StaffClientSchoolGroupClassesTuitionTransactionForm(forms.ModelForm):
+    expiration_period = forms.ChoiceField(
+        choices=GROUP_CLASS_EXPIRATION_PERIODS, initial='12_weeks'
+    )
+
     class Meta:
         model = CSGroupClassTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_account'].queryset = davids_english_student_accounts()
+        order_student_accounts(self.fields['student_account'])
 
 
 class StaffClientSchoolCompanyClassesTuitionTransactionForm(forms.ModelForm):
     class Meta:
         model = CSCompanyClassTuitionRecord
-        fields = '__all__'
+        exclude = ('class_type', 'shared_student_account')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_account'].queryset = davids_english_student_accounts()
+        order_student_accounts(self.fields['student_account'])
+
+
+class StaffClientSchoolTuitionImportForm(forms.Form):
+    spreadsheet = forms.FileField(
+        help_text='An XLSX or CSV file with one transaction per row'
+    )
+    administrator_name = forms.CharField(max_length=200)
+
+    def __init__(self, *args, client_school_ids=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client_school_ids = client_school_ids
+        # staff of several client schools choose the school of the students
+        if len(client_school_ids) > 1:
+            self.fields['client_school'] = forms.ModelChoiceField(
+                queryset=ClientSchool.objects.filter(id__in=client_school_ids)
+            )
+
+    def clean_spreadsheet(self):
+        spreadsheet = self.cleaned_data['spreadsheet']
+        if not spreadsheet.name.lower().endswith(('.xlsx', '.csv')):
+            raise forms.ValidationError('Upload an XLSX or CSV file.')
+        return spreadsheet
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if 'client_school' not in self.fields:
+            cleaned_data['client_school'] = ClientSchool.objects.filter(
+                id__in=self.client_school_ids
+            ).first()
+            if cleaned_data['client_school'] is None:
+                raise forms.ValidationError(
+                    'There is no client school to import the transactions for.'
+                )
+        return cleaned_data
 
 
 
 # ── Model Admins ───────────────────────────────────────────────────────────────
-class StaffClientSchoolTutoringTuitionTransactionAdmin(admin.ModelAdmin):
+class StaffClientSchoolTuitionRecordAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
+    change_list_template = 'admin/client_school_transactions/tuition_record_change_list.html'
+    list_select_related = ('student_account__client_school',)
+    staff_client_school_lookup = 'student_account__client_school'
+    staff_school_related_fields = {
+        'student_account': (None, 'client_school'),
+        'shared_student_account': (None, 'client_school'),
+    }
+
+    # saved transactions are corrected with a refund, not edited, so they
+    # are shown read-only with a plain form instead of the class type's
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request)
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is not None:
+            kwargs['form'] = forms.ModelForm
+        return super().get_form(request, obj, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        record_cs_tuition_transaction(obj)
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='%s_%s_import' % info
+            ),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        # term start payments for many students, read from a spreadsheet
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        request.current_app = self.admin_site.name
+        rejected_rows = []
+        form = StaffClientSchoolTuitionImportForm(
+            request.POST or None, request.FILES or None,
+            client_school_ids=get_staff_schools(request).client_school_ids
+        )
+        if request.method == 'POST' and form.is_valid():
+            try:
+                imported_count, rejected_rows = import_cs_tuition_transactions(
+                    read_tuition_import_rows(form.cleaned_data['spreadsheet']),
+                    class_type=self.model.CLASS_TYPE,
+                    administrator_name=form.cleaned_data['administrator_name'],
+                    client_school=form.cleaned_data['client_school'],
+                )
+            except ValidationError as e:
+                form.add_error('spreadsheet', e)
+            else:
+                self.message_user(
+                    request,
+                    f"{imported_count} transactions imported, {len(rejected_rows)} rows rejected.",
+                    level=messages.WARNING if rejected_rows else messages.SUCCESS
+                )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Import {self.model._meta.verbose_name_plural}',
+            'form': form,
+            'columns': TUITION_IMPORT_COLUMNS,
+            'rejected_rows': rejected_rows,
+        }
+        return TemplateResponse(
+            request, 'admin/client_school_transactions/tuition_import.html', context
+        )
+
+
+class StaffClientSchoolTutoringTuitionTransactionAdmin(StaffClientSchoolTuitionRecordAdmin):
     form = StaffClientSchoolTutoringTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -119,26 +246,22 @@ class StaffClientSchoolTutoringTuitionTransactionAdmin(admin.ModelAdmin):
         'expiration_period'
         )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_tutoring_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_tutoring_transaction(
-            previous_hours_purchased=previous_hours,
-            tutoring_transaction=obj,
-        )
-
 
-class StaffClientSchool2to1TutoringTuitionTransactionAdmin(admin.ModelAdmin):
+class StaffClientSchool2to1TutoringTuitionTransactionAdmin(StaffClientSchoolTuitionRecordAdmin):
     form = StaffClientSchool2to1TutoringTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
-        'primary_student_account', 'shared_student_account', 'transaction_type',
+        'student_account', 'shared_student_account', 'transaction_type',
         'transaction_amount', 'class_hours_purchased_or_refunded',
         'expiration_period', 'administrator_name', 'time_stamp'
     )
+    list_select_related = (
+        'student_account__client_school',
+        'shared_student_account__client_school',
+    )
     ordering = ('-time_stamp',)
     search_fields = [
-        'primary_student_account__client_student_name',
+        'student_account__client_student_name',
         'shared_student_account__client_student_name',
         'administrator_name',
     ]
@@ -147,16 +270,8 @@ class StaffClientSchool2to1TutoringTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
         )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.primary_student_account.purchased_tutoring_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_two_to_one_transaction(
-            previous_hours_purchased=previous_hours,
-            two_to_one_transaction=obj,
-        )
 
-
-class StaffClientSchoolOnlineTuitionTransactionAdmin(admin.ModelAdmin):
+class StaffClientSchoolOnlineTuitionTransactionAdmin(StaffClientSchoolTuitionRecordAdmin):
     form = StaffClientSchoolOnlineTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -174,16 +289,8 @@ class StaffClientSchoolOnlineTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_online_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_online_transaction(
-            previous_hours_purchased=previous_hours,
-            online_transaction=obj,
-        )
 
-
-class StaffClientSchoolGroupClassesTuitionTransactionAdmin(admin.ModelAdmin):
+class StaffClientSchoolGroupClassesTuitionTransactionAdmin(StaffClientSchoolTuitionRecordAdmin):
     form = StaffClientSchoolGroupClassesTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -201,16 +308,8 @@ class StaffClientSchoolGroupClassesTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type', 'expiration_period'
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_group_class_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_group_transaction(
-            previous_hours_purchased=previous_hours,
-            group_transaction=obj,
-        )
-
 
-class StaffClientSchoolCompanyClassesTuitionTransactionAdmin(admin.ModelAdmin):
+class StaffClientSchoolCompanyClassesTuitionTransactionAdmin(StaffClientSchoolTuitionRecordAdmin):
     form = StaffClientSchoolCompanyClassesTuitionTransactionForm
     readonly_fields = ('time_stamp',)
     list_display = (
@@ -228,26 +327,46 @@ class StaffClientSchoolCompanyClassesTuitionTransactionAdmin(admin.ModelAdmin):
         'transaction_type',
     )
 
-    def save_model(self, request, obj, form, change):
-        previous_hours = obj.student_account.purchased_company_hours or Decimal('0')
-        super().save_model(request, obj, form, change)
-        create_modification_record_for_company_transaction(
-            previous_hours_purchased=previous_hours,
-            company_transaction=obj,
-        )
 
+class StaffClientSchoolTuitionTransactionAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
+    # every class type in one list; transactions are entered through the
+    # admins of each class type above, which also record the modifications
+    list_display = (
+        'student_account', 'class_type', 'transaction_type',
+        'transaction_amount', 'class_hours_purchased_or_refunded',
+        'administrator_name', 'time_stamp'
+    )
+    list_select_related = ('student_account__client_school',)
+    staff_client_school_lookup = 'student_account__client_school'
+    ordering = ('-time_stamp',)
+    search_fields = [
+        'student_account__client_student_name',
+        'shared_student_account__client_student_name',
+        'administrator_name',
+    ]
+    list_filter = (
+        ('time_stamp', DateRangeFilter),
+        'class_type',
+        'transaction_type',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
-class StaffClientSchoolPurchasedHoursModificationRecordAdmin(admin.ModelAdmin):
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class StaffClientSchoolPurchasedHoursModificationRecordAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     readonly_fields = (
         'student_account',
         'bridge',
         'class_type',
         'modification_type',
-        'tutoring_transaction',
-        'two_to_one_transaction',
-        'online_transaction',
-        'group_transaction',
-        'company_transaction',
+        'tuition_transaction',
         'previous_hours',
         'updated_hours',
         'time_stamp',
@@ -260,6 +379,8 @@ class StaffClientSchoolPurchasedHoursModificationRecordAdmin(admin.ModelAdmin):
         'updated_hours',
         'time_stamp',
     )
+    list_select_related = ('student_account__client_school',)
+    staff_client_school_lookup = 'student_account__client_school'
     ordering = ('-time_stamp',)
     search_fields = [
         'student_account__client_student_name',
@@ -303,6 +424,10 @@ staff_admin_site.register(
     CSCompanyClassTuitionRecord,
     StaffClientSchoolCompanyClassesTuitionTransactionAdmin
 )
+staff_admin_site.register(
+    CSTuitionTransaction,
+    StaffClientSchoolTuitionTransactionAdmin
+)
 staff_admin_site.register(
     CSPurchasedHoursModification,
     StaffClientSchoolPurchasedHoursModificationRecordAdmin
@@ -0,0 +1,167 @@
+import json
+import tempfile
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import slugify
+from django.utils.timezone import localtime
+from openpyxl import Workbook
+
+from accounting.report_export import make_sheet_title, save_workbook_to_temporary_file
+from class_scheduling.serializers import ScheduledClassGoogleCalendarSerializer
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_group_attendance.serializers import (
+    GroupClassStudentAttendanceRecordSerializer,
+)
+from .serializers import CSPurchasedHoursModificationSerializer
+from .utils import get_cs_monthly_statement_records
+
+STATEMENT_PACK_FILE_TYPES = ('zip', 'xlsx')
+
+BALANCE_LABELS = [
+    ('purchased_tutoring_hours', 'tutoring_hours_expiration_date', 'tutoring'),
+    ('purchased_group_class_hours', 'group_hours_expiration_date', 'group_class'),
+    ('purchased_online_hours', 'online_hours_expiration_date', 'online'),
+    ('purchased_company_hours', 'company_hours_expiration_date', 'company'),
+]
+
+
+def serialize_student_monthly_report(student_account, year, month, records):
+    # records are the account's entry of get_cs_monthly_statement_records
+    balances = {}
+    expirations = {}
+    for balance, expiration_date, label in BALANCE_LABELS:
+        if getattr(student_account, balance) is not None:
+            balances[label] = float(getattr(student_account, balance))
+        if getattr(student_account, expiration_date) is not None:
+            expirations[label] = str(getattr(student_account, expiration_date))
+
+    return {
+        'account_id': student_account.id,
+        'student_name': student_account.client_student_name,
+        'report_period': {
+            'year': year,
+            'month': month,
+        },
+        'current_balances': balances,
+        'expiration_dates': expirations,
+        'account_activity': CSPurchasedHoursModificationSerializer(
+            records['modifications'], many=True
+        ).data,
+        'group_class_attendance': GroupClassStudentAttendanceRecordSerializer(
+            records['group_attendance'], many=True
+        ).data,
+        'individual_class_attendance': ScheduledClassGoogleCalendarSerializer(
+            records['individual_classes'], many=True
+        ).data,
+    }
+
+
+def iter_school_monthly_statement_records(client_school, year, month):
+    """
+    Reads the month's records of every student account of the client school
+    in one pass, with the same fixed number of queries for any number of
+    students, and yields a (student_account, records) pair for each account
+    in alphabetical order.
+    """
+    student_accounts = list(AccountingClientSchoolStudentAccount.objects.filter(
+        client_school=client_school
+    ).order_by('client_student_name', 'id'))
+    records = get_cs_monthly_statement_records(student_accounts, year, month)
+    for student_account in student_accounts:
+        yield student_account, records.pop(student_account.id)
+
+
+def build_statement_pack_zip_file(client_school, year, month):
+    # each statement is written to the archive as soon as it is rendered,
+    # and the archive is kept on disk for FileResponse to stream
+    pack_file = tempfile.TemporaryFile()
+    with zipfile.ZipFile(pack_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for student_account, records in iter_school_monthly_statement_records(
+                client_school, year, month
+        ):
+            archive.writestr(
+                '{}-{}.json'.format(
+                    slugify(student_account.client_student_name) or 'student',
+                    student_account.id
+                ),
+                json.dumps(
+                    serialize_student_monthly_report(
+                        student_account, year, month, records
+                    ),
+                    cls=DjangoJSONEncoder, ensure_ascii=False, indent=2
+                )
+            )
+    pack_file.seek(0)
+    return pack_file
+
+
+def write_statement_sheet(workbook, title, student_account, year, month, records):
+    worksheet = workbook.create_sheet(title=title)
+    worksheet.append([student_account.client_student_name, f'{month}/{year}'])
+
+    worksheet.append([])
+    worksheet.append(['Balance', 'Hours', 'Expiration Date'])
+    for balance, expiration_date, label in BALANCE_LABELS:
+        if getattr(student_account, balance) is not None:
+            worksheet.append([
+                label,
+                getattr(student_account, balance),
+                getattr(student_account, expiration_date),
+            ])
+
+    worksheet.append([])
+    worksheet.append([
+        'Account Activity', 'Class Type', 'Modification',
+        'Previous Hours', 'Updated Hours'
+    ])
+    for modification in records['modifications']:
+        # excel does not store time zones
+        worksheet.append([
+            localtime(modification.time_stamp).strftime('%Y-%m-%d %H:%M'),
+            modification.get_class_type_display(),
+            modification.get_modification_type_display(),
+            modification.previous_hours,
+            modification.updated_hours,
+        ])
+
+    worksheet.append([])
+    worksheet.append(['Group Class Attendance', 'Group Class', 'Duration', 'Status'])
+    for attendance_record in records['group_attendance']:
+        meeting_record = attendance_record.group_class_meeting_record
+        worksheet.append([
+            meeting_record.class_date,
+            meeting_record.group_class.group_class_name,
+            meeting_record.class_duration,
+            attendance_record.get_attendance_status_display(),
+        ])
+
+    worksheet.append([])
+    worksheet.append(['Individual Classes', 'Class', 'Start', 'Finish', 'Status'])
+    for scheduled_class in records['individual_classes']:
+        worksheet.append([
+            scheduled_class.date,
+            scheduled_class.student_or_class.student_or_class_name,
+            scheduled_class.start_time,
+            scheduled_class.finish_time,
+            scheduled_class.get_class_status_display(),
+        ])
+    return worksheet
+
+
+def build_statement_pack_workbook_file(client_school, year, month):
+    # write-only workbooks keep no more than the current row in memory
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    for student_account, records in iter_school_monthly_statement_records(
+            client_school, year, month
+    ):
+        write_statement_sheet(
+            workbook,
+            make_sheet_title(student_account.client_student_name, used_titles),
+            student_account, year, month, records
+        )
+    if not used_titles:
+        # an xlsx file must contain at least one sheet
+        workbook.create_sheet(title=f'{month}-{year}')
+    return save_workbook_to_temporary_file(workbook)
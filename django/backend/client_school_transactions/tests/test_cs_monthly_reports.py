@@ -0,0 +1,249 @@
+import datetime
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils.timezone import get_current_timezone, make_aware
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from class_scheduling.models import ScheduledClass
+from client_school.models import ClientSchool
+from client_school_accounting.models import (
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CST2To1TutoringTuitionRecord,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from school.models import School
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+
+User = get_user_model()
+
+REPORTS_URL = '/api/client-school-transactions/report/'
+
+
+def create_test_student_account(client_school, name):
+    """Helper function to create a client school student account"""
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name, client_school=client_school
+    )
+
+
+def create_test_scheduled_class(student_or_class, teacher, class_date):
+    """Helper function to create a completed scheduled class on the date"""
+    return ScheduledClass.objects.create(
+        student_or_class=student_or_class,
+        teacher=teacher,
+        date=class_date,
+        start_time=datetime.time(10, 0),
+        finish_time=datetime.time(10, 59),
+        class_status='completed',
+    )
+
+
+def record_payment_at(student_account, timestamp):
+    """Helper function to record a tutoring payment with the given time stamp"""
+    modification = record_cs_tuition_transaction(CSTutoringTuitionRecord(
+        student_account=student_account,
+        class_hours_purchased_or_refunded=10,
+        administrator_name='Admin'
+    ))
+    CSPurchasedHoursModification.objects.filter(
+        id=modification.id
+    ).update(time_stamp=timestamp)
+
+
+class CSMonthlyReportTests(TestCase):
+    """Test the id-based and school-wide monthly statements"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('teacher1', 'testpass123')
+        self.staff_user = User.objects.create_user(
+            'admin1', 'testpass123', is_staff=True
+        )
+        self.client.force_authenticate(self.staff_user)
+        self.teacher = UserProfile.objects.create(
+            user=self.user, given_name='John', surname='Teacher',
+            contact_email='teacher1@test.com'
+        )
+        self.client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.client_school.staff_users.add(self.staff_user)
+        self.amy = create_test_student_account(self.client_school, 'Amy Wang')
+        self.ben = create_test_student_account(self.client_school, 'Ben Lin')
+        school = School.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+            scheduling_teacher=self.teacher,
+            contact_phone='1234567890',
+        )
+        self.student_or_class = StudentOrClass.objects.create(
+            student_or_class_name='Amy and Ben',
+            account_type='school',
+            school=school,
+            teacher=self.teacher,
+            tuition_per_hour=900,
+        )
+        enrollment_handler = ClientSchoolClassEnrollmentHandler.objects.create(
+            student_or_class=self.student_or_class,
+            class_enrollment_type='two_to_one_tutoring',
+        )
+        enrollment_handler.client_school_two_to_one_accounts.set([self.amy, self.ben])
+
+    def test_statement_covers_the_whole_month_and_nothing_after(self):
+        """Test that the statement includes the last moment and day of the month only"""
+        print("Test that the statement includes the last moment and day of the month only")
+
+        current_timezone = get_current_timezone()
+        record_payment_at(self.amy, make_aware(
+            datetime.datetime(2025, 1, 31, 23, 59, 59, 500000), current_timezone
+        ))
+        record_payment_at(self.amy, make_aware(
+            datetime.datetime(2025, 2, 1), current_timezone
+        ))
+        last_day_class = create_test_scheduled_class(
+            self.student_or_class, self.teacher, datetime.date(2025, 1, 31)
+        )
+        create_test_scheduled_class(
+            self.student_or_class, self.teacher, datetime.date(2025, 2, 1)
+        )
+
+        res = self.client.get(f'{REPORTS_URL}account/{self.amy.id}/2025/1/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['account_id'], self.amy.id)
+        self.assertEqual(len(res.data['account_activity']), 1)
+        self.assertEqual(
+            [scheduled_class['id'] for scheduled_class in res.data['individual_class_attendance']],
+            [last_day_class.id]
+        )
+
+    def test_invalid_month_and_unknown_account(self):
+        """Test that an invalid month returns 400 and an unknown account 404"""
+        print("Test that an invalid month returns 400 and an unknown account 404")
+
+        res = self.client.get(f'{REPORTS_URL}account/{self.amy.id}/2025/13/')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(f'{REPORTS_URL}account/99999/2025/1/')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_statements_are_limited_to_the_school_staff(self):
+        """Test that teachers and staff of another school cannot read the statements"""
+        print("Test that teachers and staff of another school cannot read the statements")
+
+        self.client_school.staff_users.add(self.user)
+        self.client.force_authenticate(self.user)
+        for url in (
+            f'{REPORTS_URL}account/{self.amy.id}/2025/1/',
+            f'{REPORTS_URL}school/{self.client_school.id}/2025/1/',
+        ):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        other_staff_user = User.objects.create_user(
+            'admin2', 'testpass123', is_staff=True
+        )
+        ClientSchool.objects.create(
+            school_name='Other School', address_line_1='2 Main St', address_line_2=''
+        ).staff_users.add(other_staff_user)
+        self.client.force_authenticate(other_staff_user)
+        for url in (
+            f'{REPORTS_URL}account/{self.amy.id}/2025/1/',
+            f'{REPORTS_URL}school/{self.client_school.id}/2025/1/',
+        ):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_school_statements_share_two_to_one_classes(self):
+        """Test that a two-to-one class appears on the statement of both students"""
+        print("Test that a two-to-one class appears on the statement of both students")
+
+        scheduled_class = create_test_scheduled_class(
+            self.student_or_class, self.teacher, datetime.date(2025, 1, 15)
+        )
+
+        res = self.client.get(f'{REPORTS_URL}school/{self.client_school.id}/2025/1/')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [statement['student_name'] for statement in res.data['statements']],
+            ['Amy Wang', 'Ben Lin']
+        )
+        for statement in res.data['statements']:
+            self.assertEqual(
+                [item['id'] for item in statement['individual_class_attendance']],
+                [scheduled_class.id]
+            )
+
+        res = self.client.get(
+            f'{REPORTS_URL}school/{self.client_school.id}/2025/1/',
+            {'account_ids': str(self.ben.id)}
+        )
+        self.assertEqual(
+            [statement['account_id'] for statement in res.data['statements']],
+            [self.ben.id]
+        )
+
+    def test_school_statement_queries_do_not_grow_with_students(self):
+        """Test that the statements of a school take a fixed number of queries"""
+        print("Test that the statements of a school take a fixed number of queries")
+
+        for index in range(10):
+            student_account = create_test_student_account(
+                self.client_school, f'Student {index}'
+            )
+            record_payment_at(student_account, make_aware(
+                datetime.datetime(2025, 1, 10), get_current_timezone()
+            ))
+        create_test_scheduled_class(
+            self.student_or_class, self.teacher, datetime.date(2025, 1, 15)
+        )
+
+        # the schools of the staff user, the school, its accounts, then the
+        # modifications, attendance, enrollments and classes of every
+        # account at once
+        with self.assertNumQueries(8):
+            res = self.client.get(f'{REPORTS_URL}school/{self.client_school.id}/2025/1/')
+
+        self.assertEqual(len(res.data['statements']), 12)
+
+    def test_activity_summarizes_transactions_without_extra_queries(self):
+        """Test that the account activity carries each transaction's summary in one query"""
+        print("Test that the account activity carries each transaction's summary in one query")
+
+        for _ in range(5):
+            record_cs_tuition_transaction(CST2To1TutoringTuitionRecord(
+                student_account=self.amy,
+                shared_student_account=self.ben,
+                transaction_amount=16500,
+                class_hours_purchased_or_refunded=5,
+                administrator_name='Front Desk'
+            ))
+        today = datetime.date.today()
+
+        # the schools of the staff user, the account, then the
+        # modifications with their transactions, attendance, enrollments
+        # and classes
+        with self.assertNumQueries(7):
+            res = self.client.get(
+                f'{REPORTS_URL}account/{self.amy.id}/{today.year}/{today.month}/'
+            )
+
+        self.assertEqual(len(res.data['account_activity']), 5)
+        transaction_summary = res.data['account_activity'][0]['transaction_summary']
+        self.assertEqual(transaction_summary['transaction_amount'], 16500)
+        self.assertEqual(transaction_summary['transaction_type'], 'payment')
+        self.assertEqual(transaction_summary['class_hours_purchased_or_refunded'], 5)
+        self.assertEqual(transaction_summary['administrator_name'], 'Front Desk')
+        self.assertEqual(transaction_summary['shared_student_name'], 'Ben Lin')
+        self.assertIsNotNone(transaction_summary['transaction_time_stamp'])
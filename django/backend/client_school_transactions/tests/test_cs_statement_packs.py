@@ -0,0 +1,156 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date, datetime
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils.timezone import get_current_timezone, make_aware
+from openpyxl import load_workbook
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+
+User = get_user_model()
+
+
+def create_test_student_account(client_school, name):
+    """Helper function to create a client school student account"""
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name, client_school=client_school
+    )
+
+
+def record_payment_in_january(student_account):
+    """Helper function to record a tutoring payment dated January 10th, 2025"""
+    modification = record_cs_tuition_transaction(CSTutoringTuitionRecord(
+        student_account=student_account,
+        class_hours_purchased_or_refunded=10,
+        administrator_name='Admin'
+    ))
+    CSPurchasedHoursModification.objects.filter(id=modification.id).update(
+        time_stamp=make_aware(datetime(2025, 1, 10, 9, 30), get_current_timezone())
+    )
+
+
+def read_response_content(response):
+    """Helper function to read the content of a streamed file response"""
+    return b''.join(response.streaming_content)
+
+
+class CSStatementPackTests(TestCase):
+    """Test the monthly statement packs of a client school"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('admin1', 'testpass123', is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.client_school = ClientSchool.objects.create(
+            school_name="David's English Center",
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.client_school.staff_users.add(self.user)
+        self.other_school = ClientSchool.objects.create(
+            school_name='Other School',
+            address_line_1='2 Main St',
+            address_line_2='',
+        )
+        for name in ('Amy Wang', 'Ben Lin'):
+            record_payment_in_january(create_test_student_account(self.client_school, name))
+        create_test_student_account(self.other_school, 'Carl Chen')
+        self.url = f'/api/client-school-transactions/report/school/{self.client_school.id}/2025/1/statement-pack/'
+
+    def test_zip_pack_has_one_statement_per_student(self):
+        """Test that the ZIP pack holds one JSON statement for each student of the school"""
+        print("Test that the ZIP pack holds one JSON statement for each student of the school")
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(read_response_content(res))) as archive:
+            statements = [json.loads(archive.read(name)) for name in archive.namelist()]
+        self.assertEqual(
+            [statement['student_name'] for statement in statements],
+            ['Amy Wang', 'Ben Lin']
+        )
+        for statement in statements:
+            self.assertEqual(len(statement['account_activity']), 1)
+            self.assertEqual(statement['current_balances'], {'tutoring': 10.0})
+
+    def test_xlsx_pack_has_one_sheet_per_student(self):
+        """Test that the XLSX pack holds one sheet for each student of the school"""
+        print("Test that the XLSX pack holds one sheet for each student of the school")
+
+        res = self.client.get(self.url, {'file_type': 'xlsx'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(io.BytesIO(read_response_content(res)))
+        self.assertEqual(workbook.sheetnames, ['Amy Wang', 'Ben Lin'])
+        rows = list(workbook['Amy Wang'].iter_rows(values_only=True))
+        self.assertIn('2025-01-10 09:30', [row[0] for row in rows])
+
+    def test_invalid_file_type_returns_400(self):
+        """Test that only ZIP and XLSX packs can be requested"""
+        print("Test that only ZIP and XLSX packs can be requested")
+
+        res = self.client.get(self.url, {'file_type': 'pdf'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pack_is_limited_to_the_school_staff(self):
+        """Test that teachers and staff of another school cannot download the pack"""
+        print("Test that teachers and staff of another school cannot download the pack")
+
+        teacher_user = User.objects.create_user('teacher1', 'testpass123')
+        self.client_school.staff_users.add(teacher_user)
+        self.client.force_authenticate(teacher_user)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        other_staff_user = User.objects.create_user('admin2', 'testpass123', is_staff=True)
+        self.other_school.staff_users.add(other_staff_user)
+        self.client.force_authenticate(other_staff_user)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pack_queries_do_not_grow_with_students(self):
+        """Test that the pack of a school takes a fixed number of queries"""
+        print("Test that the pack of a school takes a fixed number of queries")
+
+        for index in range(10):
+            record_payment_in_january(
+                create_test_student_account(self.client_school, f'Student {index}')
+            )
+
+        # the schools of the staff user, the school, its accounts, then the
+        # modifications and attendance of every account at once; no
+        # enrollments means no class query
+        with self.assertNumQueries(7):
+            res = self.client.get(self.url)
+            read_response_content(res)
+
+    def test_command_writes_a_pack_per_school(self):
+        """Test that the command writes the pack of each client school"""
+        print("Test that the command writes the pack of each client school")
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command(
+                'create_statement_packs', '--month', '2025-01',
+                '--file-type', 'xlsx', '--output-dir', output_dir,
+                stdout=io.StringIO()
+            )
+            self.assertEqual(sorted(os.listdir(output_dir)), [
+                f'{self.client_school.id}_statements_2025-01.xlsx',
+                f'{self.other_school.id}_statements_2025-01.xlsx',
+            ])
@@ -0,0 +1,244 @@
+import io
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from decimal import Decimal
+from openpyxl import Workbook
+
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+)
+from client_school_transactions.tuition_import import (
+    import_cs_tuition_transactions,
+    read_tuition_import_rows,
+)
+
+User = get_user_model()
+
+DAVIDS_ENGLISH = "David's English Center"
+
+TUTORING_IMPORT_URL = '/staff-admin/client_school_transactions/cstutoringtuitionrecord/import/'
+
+
+def create_test_student_account(name, school_name=DAVIDS_ENGLISH):
+    """Helper function to create a client school student account"""
+    client_school, _ = ClientSchool.objects.get_or_create(
+        school_name=school_name,
+        address_line_1='1 Main St',
+        address_line_2='',
+    )
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name, client_school=client_school
+    )
+
+
+def csv_upload(lines, name='payments.csv'):
+    """Helper function to create an uploaded CSV file"""
+    return SimpleUploadedFile(name, "\n".join(lines).encode('utf-8'))
+
+
+def xlsx_upload(rows, name='payments.xlsx'):
+    """Helper function to create an uploaded XLSX file"""
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    content = io.BytesIO()
+    workbook.save(content)
+    return SimpleUploadedFile(name, content.getvalue())
+
+
+def import_upload(upload, class_type='one_to_one_tutoring', client_school=None):
+    """Helper function to import an upload for David's English Center"""
+    return import_cs_tuition_transactions(
+        read_tuition_import_rows(upload),
+        class_type=class_type,
+        administrator_name='Admin',
+        client_school=client_school or ClientSchool.objects.get(school_name=DAVIDS_ENGLISH),
+    )
+
+
+class CSTuitionImportTests(TestCase):
+    """Test importing client school tuition transactions from spreadsheets"""
+
+    def setUp(self):
+        self.amy = create_test_student_account('Amy Wang')
+        self.ben = create_test_student_account('Ben Lin')
+        create_test_student_account('Carl Chen', school_name='Other School')
+
+    def test_csv_import_updates_balances_and_modifications(self):
+        """Test that imported rows of the same student build on each other"""
+        print("Test that imported rows of the same student build on each other")
+
+        imported_count, rejected_rows = import_upload(csv_upload([
+            'student_name,transaction_type,transaction_amount,class_hours_purchased_or_refunded,expiration_period',
+            'Amy Wang,payment,33000,10,12_months',
+            'Ben Lin,,"16,500",5,',
+            'Amy Wang,refund,6600,2,',
+        ]))
+
+        self.assertEqual((imported_count, rejected_rows), (3, []))
+        self.amy.refresh_from_db()
+        self.ben.refresh_from_db()
+        self.assertEqual(self.amy.purchased_tutoring_hours, Decimal('8.00'))
+        self.assertEqual(self.ben.purchased_tutoring_hours, Decimal('5.00'))
+        self.assertIsNotNone(self.ben.tutoring_hours_expiration_date)
+        self.assertEqual(
+            list(CSPurchasedHoursModification.objects.filter(
+                student_account=self.amy
+            ).order_by('id').values_list(
+                'modification_type', 'previous_hours', 'updated_hours'
+            )),
+            [
+                ('tuition_payment_add', Decimal('0'), Decimal('10')),
+                ('tuition_refund_deduct', Decimal('10'), Decimal('8')),
+            ]
+        )
+        self.assertFalse(CSPurchasedHoursModification.objects.filter(
+            tuition_transaction__isnull=True
+        ).exists())
+        self.assertEqual(
+            CSTuitionTransaction.objects.get(student_account=self.ben).expiration_period,
+            '6_months'
+        )
+
+    def test_invalid_rows_are_reported_and_valid_rows_imported(self):
+        """Test that rejected rows are listed with their errors"""
+        print("Test that rejected rows are listed with their errors")
+
+        imported_count, rejected_rows = import_upload(csv_upload([
+            'student_name,transaction_type,transaction_amount,class_hours_purchased_or_refunded,expiration_period',
+            'Amy Wang,payment,33000,10,',
+            'Nobody,payment,33000,10,',
+            'Carl Chen,payment,33000,10,',
+            'Ben Lin,payment,200000,121,',
+            'Ben Lin,payment,33000,2.5,30_weeks',
+            'Ben Lin,refund,33000,2,',
+            '',
+            ',payment,33000,1,',
+        ]))
+
+        self.assertEqual(imported_count, 1)
+        self.assertEqual([row_number for row_number, _, _ in rejected_rows], [3, 4, 5, 6, 7, 9])
+        errors = {row_number: errors for row_number, _, errors in rejected_rows}
+        self.assertIn("No student account named Nobody at David's English Center.", errors[3])
+        self.assertIn("No student account named Carl Chen at David's English Center.", errors[4])
+        self.assertEqual(len(errors[5]), 2)
+        self.assertEqual(len(errors[6]), 2)
+        self.assertIn(
+            'The student has no purchased hours of this class type to refund.', errors[7]
+        )
+        self.assertEqual(CSTuitionTransaction.objects.count(), 1)
+
+    def test_xlsx_two_to_one_import(self):
+        """Test that an XLSX import of two-to-one tutoring resolves both students"""
+        print("Test that an XLSX import of two-to-one tutoring resolves both students")
+
+        imported_count, rejected_rows = import_upload(xlsx_upload([
+            ('Student Name', 'Shared Student Name', 'Transaction Amount',
+             'Class Hours Purchased Or Refunded'),
+            ('Amy Wang', 'Ben Lin', 16500, 5),
+            ('Amy Wang', None, 16500, 5),
+            (None, None, None, None),
+            ('Ben Lin', 'Ben Lin', 16500, 5),
+        ]), class_type='two_to_one_tutoring')
+
+        self.assertEqual(imported_count, 1)
+        self.assertEqual([row_number for row_number, _, _ in rejected_rows], [3, 5])
+        tuition_transaction = CSTuitionTransaction.objects.get()
+        self.assertEqual(tuition_transaction.class_type, 'two_to_one_tutoring')
+        self.assertEqual(tuition_transaction.shared_student_account, self.ben)
+
+    def test_missing_columns_reject_the_file(self):
+        """Test that a file without the required columns is rejected"""
+        print("Test that a file without the required columns is rejected")
+
+        with self.assertRaises(ValidationError):
+            import_upload(csv_upload(['student_name,transaction_amount', 'Amy Wang,33000']))
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        """Test that the number of queries does not depend on the number of rows"""
+        print("Test that the number of queries does not depend on the number of rows")
+
+        names = [f'Student {index}' for index in range(20)]
+        for name in names:
+            create_test_student_account(name)
+        lines = ['student_name,transaction_amount,class_hours_purchased_or_refunded']
+        lines += [f'{name},33000,10' for name in names]
+        client_school = ClientSchool.objects.get(school_name=DAVIDS_ENGLISH)
+
+        # accounts, transactions, balances and modifications, within a savepoint
+        with self.assertNumQueries(6):
+            import_upload(csv_upload(lines), client_school=client_school)
+
+    def test_ids_are_read_back_without_bulk_insert_returning(self):
+        """Test that modifications are linked when bulk inserts return no ids, as on MySQL"""
+        print("Test that modifications are linked when bulk inserts return no ids, as on MySQL")
+
+        with mock.patch.object(
+                type(connection.features), 'can_return_rows_from_bulk_insert',
+                new_callable=mock.PropertyMock, return_value=False
+        ):
+            import_upload(csv_upload([
+                'student_name,transaction_amount,class_hours_purchased_or_refunded',
+                'Amy Wang,33000,10',
+                'Ben Lin,33000,4',
+            ]))
+
+        for modification in CSPurchasedHoursModification.objects.select_related(
+                'tuition_transaction'
+        ):
+            self.assertEqual(
+                modification.tuition_transaction.student_account_id,
+                modification.student_account_id
+            )
+            self.assertEqual(
+                modification.updated_hours,
+                modification.tuition_transaction.class_hours_purchased_or_refunded
+            )
+
+
+class CSTuitionImportStaffAdminTests(TestCase):
+    """Test the tuition import page of the staff admin"""
+
+    def setUp(self):
+        self.amy = create_test_student_account('Amy Wang')
+        self.user = User.objects.create_superuser('admin1', 'testpass123')
+        self.client.force_login(self.user)
+
+    def test_import_page_reports_rejected_rows(self):
+        """Test that the import page imports the file and lists the rejected rows"""
+        print("Test that the import page imports the file and lists the rejected rows")
+
+        res = self.client.post(TUTORING_IMPORT_URL, {
+            'administrator_name': 'Front Desk',
+            'spreadsheet': csv_upload([
+                'student_name,transaction_amount,class_hours_purchased_or_refunded',
+                'Amy Wang,33000,10',
+                'Nobody,33000,10',
+            ]),
+        })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, '1 transactions imported, 1 rows rejected.')
+        self.assertContains(res, 'No student account named Nobody')
+        self.assertEqual(
+            CSTuitionTransaction.objects.get().administrator_name, 'Front Desk'
+        )
+
+    def test_import_page_rejects_other_file_types(self):
+        """Test that only XLSX and CSV files can be imported"""
+        print("Test that only XLSX and CSV files can be imported")
+
+        res = self.client.post(TUTORING_IMPORT_URL, {
+            'administrator_name': 'Front Desk',
+            'spreadsheet': SimpleUploadedFile('payments.txt', b'student_name'),
+        })
+
+        self.assertContains(res, 'Upload an XLSX or CSV file.')
+        self.assertFalse(CSTuitionTransaction.objects.exists())
@@ -0,0 +1,271 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework import status
+from rest_framework.test import APIClient
+from decimal import Decimal
+
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSGroupClassTuitionRecord,
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+
+User = get_user_model()
+
+TUITION_TRANSACTIONS_URL = '/api/client-school-transactions/tuition-transactions/'
+
+
+def create_test_student_account(name='Amy Wang', school_name="David's English Center"):
+    """Helper function to create a client school student account"""
+    client_school, _ = ClientSchool.objects.get_or_create(
+        school_name=school_name,
+        address_line_1='1 Main St',
+        address_line_2='',
+    )
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name, client_school=client_school
+    )
+
+
+def record_tutoring_transaction(student_account_id, transaction_type='payment', hours=1):
+    """Helper function to record a tutoring transaction through the service"""
+    return record_cs_tuition_transaction(CSTutoringTuitionRecord(
+        student_account_id=student_account_id,
+        transaction_type=transaction_type,
+        class_hours_purchased_or_refunded=hours,
+        administrator_name='Admin'
+    ))
+
+
+def record_tutoring_payments_in_thread(student_account_id, number_of_payments):
+    """Helper function to record payments on the thread's own connection"""
+    try:
+        for _ in range(number_of_payments):
+            record_tutoring_transaction(student_account_id)
+    finally:
+        connection.close()
+
+
+class CSTuitionTransactionServiceTests(TestCase):
+    """Test recording client school tuition transactions"""
+
+    def setUp(self):
+        self.student_account = create_test_student_account()
+
+    def test_payment_updates_balance_and_records_modification(self):
+        """Test that a payment adds the hours, sets the expiration and is recorded"""
+        print("Test that a payment adds the hours, sets the expiration and is recorded")
+
+        modification = record_tutoring_transaction(self.student_account.id, hours=10)
+
+        self.student_account.refresh_from_db()
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('10.00'))
+        self.assertIsNotNone(self.student_account.tutoring_hours_expiration_date)
+        self.assertEqual(modification.modification_type, 'tuition_payment_add')
+        self.assertEqual(modification.class_type, 'one_to_one_tutoring')
+        self.assertEqual(modification.previous_hours, Decimal('0'))
+        self.assertEqual(modification.updated_hours, Decimal('10'))
+        self.assertEqual(
+            modification.tuition_transaction.expiration_period, '6_months'
+        )
+
+    def test_refund_and_payment_chain_modifications(self):
+        """Test that each modification starts from the previous updated hours"""
+        print("Test that each modification starts from the previous updated hours")
+
+        record_tutoring_transaction(self.student_account.id, hours=10)
+        record_tutoring_transaction(self.student_account.id, 'refund', hours=3)
+        record_cs_tuition_transaction(CSGroupClassTuitionRecord(
+            student_account_id=self.student_account.id,
+            class_hours_purchased_or_refunded=20,
+            administrator_name='Admin'
+        ))
+
+        self.student_account.refresh_from_db()
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('7.00'))
+        self.assertEqual(self.student_account.purchased_group_class_hours, Decimal('20.00'))
+        self.assertEqual(
+            list(CSPurchasedHoursModification.objects.filter(
+                class_type='one_to_one_tutoring'
+            ).order_by('id').values_list('previous_hours', 'updated_hours')),
+            [(Decimal('0'), Decimal('10')), (Decimal('10'), Decimal('7'))]
+        )
+
+    def test_transaction_is_recorded_in_four_queries(self):
+        """Test that the lock, transaction, balance and modification take one query each"""
+        print("Test that the lock, transaction, balance and modification take one query each")
+
+        # plus the savepoint and its release inside the test case transaction
+        with self.assertNumQueries(6):
+            record_tutoring_transaction(self.student_account.id)
+
+    def test_loaded_student_account_is_updated(self):
+        """Test that the student account of the transaction reflects the new balance"""
+        print("Test that the student account of the transaction reflects the new balance")
+
+        tuition_transaction = CSTutoringTuitionRecord(
+            student_account=self.student_account,
+            class_hours_purchased_or_refunded=4,
+            administrator_name='Admin'
+        )
+        record_cs_tuition_transaction(tuition_transaction)
+
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('4'))
+
+
+class CSTuitionTransactionApiTests(TestCase):
+    """Test the client school tuition transactions API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            'admin1', password='testpass123', is_staff=True,
+            first_name='Alice', last_name='Chen'
+        )
+        self.client.force_authenticate(self.user)
+        self.student_account = create_test_student_account()
+        self.shared_student_account = create_test_student_account('Ben Lin')
+        self.student_account.client_school.staff_users.add(self.user)
+
+    def post_payment(self, student_account, **payload):
+        return self.client.post(TUITION_TRANSACTIONS_URL, {
+            'class_type': 'one_to_one_tutoring',
+            'student_account': student_account.id,
+            'transaction_amount': 9000,
+            'class_hours_purchased_or_refunded': 5,
+            **payload,
+        })
+
+    def test_login_required(self):
+        """Test that login is required to record a tuition transaction"""
+        print("Test that login is required to record a tuition transaction")
+
+        res = APIClient().post(TUITION_TRANSACTIONS_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_create_two_to_one_payment(self):
+        """Test that a two-to-one payment updates the primary student's tutoring hours"""
+        print("Test that a two-to-one payment updates the primary student's tutoring hours")
+
+        res = self.client.post(TUITION_TRANSACTIONS_URL, {
+            'class_type': 'two_to_one_tutoring',
+            'student_account': self.student_account.id,
+            'shared_student_account': self.shared_student_account.id,
+            'transaction_amount': 16500,
+            'class_hours_purchased_or_refunded': 5,
+            'expiration_period': '12_months',
+            'administrator_name': 'Admin',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.student_account.refresh_from_db()
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('5.00'))
+        self.assertTrue(CSPurchasedHoursModification.objects.filter(
+            tuition_transaction_id=res.data['id'], class_type='two_to_one_tutoring'
+        ).exists())
+
+    def test_administrator_name_is_the_staff_user(self):
+        """Test that the administrator name is set from the user and cannot be posted"""
+        print("Test that the administrator name is set from the user and cannot be posted")
+
+        res = self.post_payment(self.student_account, administrator_name='Someone Else')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['administrator_name'], 'Alice Chen')
+        self.assertEqual(
+            CSTuitionTransaction.objects.get(id=res.data['id']).administrator_name,
+            'Alice Chen'
+        )
+
+    def test_non_staff_users_are_refused(self):
+        """Test that teachers who are not staff cannot record tuition transactions"""
+        print("Test that teachers who are not staff cannot record tuition transactions")
+
+        teacher_user = User.objects.create_user('teacher1', password='testpass123')
+        self.student_account.client_school.staff_users.add(teacher_user)
+        self.client.force_authenticate(teacher_user)
+
+        res = self.post_payment(self.student_account)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(CSTuitionTransaction.objects.exists())
+
+    def test_staff_of_another_school_are_refused(self):
+        """Test that staff cannot record transactions for another school's students"""
+        print("Test that staff cannot record transactions for another school's students")
+
+        other_student_account = create_test_student_account(
+            'Cara Hsu', school_name='Other School'
+        )
+
+        res = self.post_payment(other_student_account)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.post_payment(
+            self.student_account,
+            class_type='two_to_one_tutoring',
+            shared_student_account=other_student_account.id,
+        )
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.assertFalse(CSTuitionTransaction.objects.exists())
+        other_student_account.refresh_from_db()
+        self.assertIsNone(other_student_account.purchased_tutoring_hours)
+
+    def test_invalid_transactions_return_400(self):
+        """Test that missing shared accounts and unknown expiration periods return 400"""
+        print("Test that missing shared accounts and unknown expiration periods return 400")
+
+        for payload in (
+            {'class_type': 'two_to_one_tutoring'},
+            {'class_type': 'one_to_one_tutoring',
+             'shared_student_account': self.shared_student_account.id},
+            {'class_type': 'group_class', 'expiration_period': '6_months'},
+        ):
+            res = self.client.post(TUITION_TRANSACTIONS_URL, {
+                'student_account': self.student_account.id,
+                'class_hours_purchased_or_refunded': 5,
+                'administrator_name': 'Admin',
+                **payload,
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(CSTuitionTransaction.objects.exists())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class CSTuitionTransactionConcurrencyTests(TransactionTestCase):
+    """Test recording tuition transactions for one student from several threads"""
+
+    def test_concurrent_payments_are_not_lost(self):
+        """Test that payments entered at the same time all reach the balance"""
+        print("Test that payments entered at the same time all reach the balance")
+
+        student_account = create_test_student_account()
+        number_of_threads, payments_per_thread = 8, 5
+
+        with ThreadPoolExecutor(max_workers=number_of_threads) as executor:
+            list(executor.map(
+                record_tutoring_payments_in_thread,
+                [student_account.id] * number_of_threads,
+                [payments_per_thread] * number_of_threads,
+            ))
+
+        student_account.refresh_from_db()
+        self.assertEqual(
+            student_account.purchased_tutoring_hours,
+            Decimal(number_of_threads * payments_per_thread)
+        )
+        modifications = list(CSPurchasedHoursModification.objects.order_by(
+            'id'
+        ).values_list('previous_hours', 'updated_hours'))
+        self.assertEqual(len(modifications), number_of_threads * payments_per_thread)
+        for (_, updated_hours), (previous_hours, _) in zip(modifications, modifications[1:]):
+            self.assertEqual(previous_hours, updated_hours)
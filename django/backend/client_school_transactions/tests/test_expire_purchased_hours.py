@@ -0,0 +1,131 @@
+import io
+from django.test import TestCase
+from django.core.management import call_command
+from datetime import date, timedelta
+from decimal import Decimal
+
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_transactions.models import (
+    CSGroupClassTuitionRecord,
+    CSPurchasedHoursModification,
+    CSTutoringTuitionRecord,
+)
+from client_school_transactions.tuition_transactions import record_cs_tuition_transaction
+from client_school_transactions.utils import (
+    expire_cs_purchased_hours,
+    get_cs_purchased_hours_drift,
+)
+
+
+def create_test_student_account(name='Amy Wang'):
+    """Helper function to create a client school student account"""
+    client_school, _ = ClientSchool.objects.get_or_create(
+        school_name="David's English Center",
+        address_line_1='1 Main St',
+        address_line_2='',
+    )
+    return AccountingClientSchoolStudentAccount.objects.create(
+        client_student_name=name, client_school=client_school
+    )
+
+
+def record_payment(student_account, tuition_record_model, hours):
+    """Helper function to record a payment through the tuition service"""
+    record_cs_tuition_transaction(tuition_record_model(
+        student_account=student_account,
+        class_hours_purchased_or_refunded=hours,
+        administrator_name='Admin'
+    ))
+
+
+def run_expire_purchased_hours(*args):
+    """Helper function to run the command and return its output"""
+    out = io.StringIO()
+    call_command('expire_purchased_hours', *args, stdout=out)
+    return out.getvalue()
+
+
+class ExpirePurchasedHoursTests(TestCase):
+    """Test the sweep of expired client school purchased hours"""
+
+    def setUp(self):
+        self.yesterday = date.today() - timedelta(days=1)
+        self.student_account = create_test_student_account()
+        record_payment(self.student_account, CSTutoringTuitionRecord, 5)
+        record_payment(self.student_account, CSGroupClassTuitionRecord, 3)
+        # the tutoring hours expired yesterday, the group class hours are current
+        AccountingClientSchoolStudentAccount.objects.filter(
+            id=self.student_account.id
+        ).update(tutoring_hours_expiration_date=self.yesterday)
+
+    def test_expired_balance_is_zeroed_and_recorded(self):
+        """Test that only the expired balance is zeroed, with a modification"""
+        print("Test that only the expired balance is zeroed, with a modification")
+
+        output = run_expire_purchased_hours()
+
+        self.assertIn('Tutoring Hours: 1 balances expired', output)
+        self.assertIn('Group Class Hours: 0 balances expired', output)
+        self.student_account.refresh_from_db()
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('0.00'))
+        self.assertEqual(self.student_account.purchased_group_class_hours, Decimal('3.00'))
+        self.assertEqual(self.student_account.tutoring_hours_expiration_date, self.yesterday)
+        modification = CSPurchasedHoursModification.objects.get(
+            modification_type='hours_expiration_deduct'
+        )
+        self.assertEqual(modification.class_type, 'one_to_one_tutoring')
+        self.assertEqual(modification.previous_hours, Decimal('5.00'))
+        self.assertEqual(modification.updated_hours, Decimal('0'))
+        # the modification keeps the ledger in line with the balance
+        self.assertEqual(get_cs_purchased_hours_drift([self.student_account.id]), [])
+
+    def test_sweep_can_run_repeatedly(self):
+        """Test that a second run finds nothing left to expire"""
+        print("Test that a second run finds nothing left to expire")
+
+        expire_cs_purchased_hours()
+
+        self.assertEqual(set(expire_cs_purchased_hours().values()), {0})
+        self.assertEqual(
+            CSPurchasedHoursModification.objects.filter(
+                modification_type='hours_expiration_deduct'
+            ).count(),
+            1
+        )
+
+    def test_dry_run_changes_nothing(self):
+        """Test that a dry run reports the expired hours without zeroing them"""
+        print("Test that a dry run reports the expired hours without zeroing them")
+
+        output = run_expire_purchased_hours('--dry-run')
+
+        self.assertIn('Tutoring Hours: 1 expired balances', output)
+        self.student_account.refresh_from_db()
+        self.assertEqual(self.student_account.purchased_tutoring_hours, Decimal('5.00'))
+
+    def test_date_option_sweeps_future_expirations(self):
+        """Test that --date sweeps the hours expiring before that day"""
+        print("Test that --date sweeps the hours expiring before that day")
+
+        output = run_expire_purchased_hours('--date', '2099-01-01')
+
+        self.assertIn('Group Class Hours: 1 balances expired', output)
+
+    def test_sweep_queries_do_not_grow_with_accounts(self):
+        """Test that each hour type is swept in a fixed number of queries"""
+        print("Test that each hour type is swept in a fixed number of queries")
+
+        for index in range(10):
+            student_account = create_test_student_account(f'Student {index}')
+            record_payment(student_account, CSTutoringTuitionRecord, 2)
+        AccountingClientSchoolStudentAccount.objects.update(
+            tutoring_hours_expiration_date=self.yesterday
+        )
+
+        # a lookup per hour type and an update and insert for the tutoring
+        # hours, each hour type inside its own savepoint
+        with self.assertNumQueries(4 * 3 + 2):
+            expired_counts = expire_cs_purchased_hours()
+
+        self.assertEqual(expired_counts['purchased_tutoring_hours'], 11)
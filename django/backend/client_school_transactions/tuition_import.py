@@ -0,0 +1,263 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from openpyxl import load_workbook
+
+from accounting.validation import validate_number_of_hours_purchased
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_accounting.utils import calculate_expiration_date
+from .models import (
+    BALANCE_EXPIRATION_DATES,
+    CLASS_TYPE_BALANCES,
+    CLASS_TYPE_EXPIRATION_PERIODS,
+    DEFAULT_EXPIRATION_PERIODS,
+    TRANSACTION_TYPE,
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+)
+from .validation import validate_tuition_transaction_amount
+
+TUITION_IMPORT_COLUMNS = (
+    'student_name',
+    'shared_student_name',
+    'transaction_type',
+    'transaction_amount',
+    'class_hours_purchased_or_refunded',
+    'expiration_period',
+    'comments',
+)
+
+REQUIRED_TUITION_IMPORT_COLUMNS = (
+    'student_name',
+    'transaction_amount',
+    'class_hours_purchased_or_refunded',
+)
+
+
+def read_tuition_import_rows(uploaded_file):
+    """
+    Yields the row number and the values by column of each row of an XLSX
+    or CSV upload, one row at a time, so that large files are never held
+    in memory whole. The first row names the columns; blank rows are
+    skipped.
+    """
+    workbook = None
+    if uploaded_file.name.lower().endswith('.xlsx'):
+        workbook = load_workbook(uploaded_file.file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    else:
+        rows = csv.reader(
+            io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+        )
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise ValidationError('The file is empty.')
+        # 'Student Name' and 'student_name' name the same column
+        columns = [
+            str(column or '').strip().lower().replace(' ', '_') for column in header
+        ]
+        missing_columns = [
+            column for column in REQUIRED_TUITION_IMPORT_COLUMNS
+            if column not in columns
+        ]
+        if missing_columns:
+            raise ValidationError(
+                'The file is missing the columns: {}'.format(', '.join(missing_columns))
+            )
+        for row_number, values in enumerate(rows, start=2):
+            if all(value in (None, '') for value in values):
+                continue
+            yield row_number, {
+                column: value for column, value in zip(columns, values)
+                if column in TUITION_IMPORT_COLUMNS
+            }
+    finally:
+        # read-only workbooks keep the file open until they are closed
+        if workbook is not None:
+            workbook.close()
+
+
+def parse_whole_number(value, label):
+    # spreadsheets return numbers as floats or ints, CSV files as text
+    if value in (None, ''):
+        raise ValidationError(f'The {label} is required.')
+    try:
+        number = Decimal(str(value).strip().replace(',', ''))
+    except InvalidOperation:
+        raise ValidationError(f'The {label} must be a whole number.')
+    if number < 0 or number != number.to_integral_value():
+        raise ValidationError(f'The {label} must be a whole number.')
+    return int(number)
+
+
+def clean_tuition_import_row(values, class_type):
+    """
+    Validates the values of one row with the rules of the transaction
+    forms and returns them converted, raising a ValidationError with
+    every problem of the row.
+    """
+    errors = []
+    cleaned_row = {
+        'student_name': str(values.get('student_name') or '').strip(),
+        'shared_student_name': str(values.get('shared_student_name') or '').strip(),
+        'transaction_type': str(values.get('transaction_type') or 'payment').strip().lower(),
+        'expiration_period': (
+            str(values.get('expiration_period') or '').strip()
+            or DEFAULT_EXPIRATION_PERIODS[class_type]
+        ),
+        'comments': str(values.get('comments') or '').strip(),
+    }
+    if not cleaned_row['student_name']:
+        errors.append('The student name is required.')
+    if class_type == 'two_to_one_tutoring' and not cleaned_row['shared_student_name']:
+        errors.append('Two-to-one tutoring requires a shared student name.')
+    elif class_type != 'two_to_one_tutoring' and cleaned_row['shared_student_name']:
+        errors.append('Only two-to-one tutoring has a shared student.')
+    if cleaned_row['transaction_type'] not in dict(TRANSACTION_TYPE):
+        errors.append('The transaction type must be payment or refund.')
+    for column, label, validator in (
+            ('transaction_amount', 'transaction amount', validate_tuition_transaction_amount),
+            ('class_hours_purchased_or_refunded', 'class hours', validate_number_of_hours_purchased),
+    ):
+        try:
+            cleaned_row[column] = validator(parse_whole_number(values.get(column), label))
+        except ValidationError as e:
+            errors.extend(e.messages)
+    expiration_periods = CLASS_TYPE_EXPIRATION_PERIODS.get(class_type)
+    if expiration_periods and cleaned_row['expiration_period'] not in dict(expiration_periods):
+        errors.append('The expiration period must be one of: {}'.format(
+            ', '.join(dict(expiration_periods))
+        ))
+    if len(cleaned_row['comments']) > 700:
+        errors.append('The comments must be 700 characters or fewer.')
+    if errors:
+        raise ValidationError(errors)
+    return cleaned_row
+
+
+def bulk_create_tuition_transactions(tuition_transactions, student_account_ids):
+    # MySQL does not return the ids of bulk inserted rows, which the
+    # modifications need. The student accounts are locked, so the new
+    # transactions of these accounts are the ones after the latest id
+    # read before the insert, in the order they were inserted.
+    if connection.features.can_return_rows_from_bulk_insert:
+        CSTuitionTransaction.objects.bulk_create(tuition_transactions, batch_size=500)
+        return
+    account_transactions = CSTuitionTransaction.objects.filter(
+        student_account_id__in=student_account_ids
+    )
+    latest_id = account_transactions.aggregate(latest_id=Max('id'))['latest_id'] or 0
+    CSTuitionTransaction.objects.bulk_create(tuition_transactions, batch_size=500)
+    new_ids = account_transactions.filter(
+        id__gt=latest_id
+    ).order_by('id').values_list('id', flat=True)
+    for tuition_transaction, new_id in zip(tuition_transactions, new_ids):
+        tuition_transaction.id = new_id
+        tuition_transaction._state.adding = False
+
+
+def import_cs_tuition_transactions(rows, class_type, administrator_name, client_school):
+    """
+    Records the tuition transactions of the rows read by
+    read_tuition_import_rows for one class type and client school. The student
+    names are resolved and their accounts locked in one query, and the
+    transactions, balances and modifications are then written in bulk
+    inside one database transaction. Rows which fail validation are left
+    out and returned, with their errors, as (row number, student name,
+    errors), next to the number of imported transactions.
+    """
+    balance = CLASS_TYPE_BALANCES[class_type]
+    expiration_date_field = BALANCE_EXPIRATION_DATES[balance]
+    cleaned_rows = []
+    rejected_rows = []
+    for row_number, values in rows:
+        try:
+            cleaned_rows.append((row_number, clean_tuition_import_row(values, class_type)))
+        except ValidationError as e:
+            rejected_rows.append((row_number, values.get('student_name'), e.messages))
+    student_names = {
+        name for _, cleaned_row in cleaned_rows
+        for name in (cleaned_row['student_name'], cleaned_row['shared_student_name'])
+        if name
+    }
+
+    tuition_transactions = []
+    modifications = []
+    with transaction.atomic():
+        student_accounts = {
+            student_account.client_student_name: student_account
+            for student_account in AccountingClientSchoolStudentAccount.objects.filter(
+                client_school_id=client_school.id,
+                client_student_name__in=student_names,
+            ).select_for_update().only(
+                'id', 'client_student_name', balance, expiration_date_field
+            # without the ordering by school name, only the accounts are locked
+            ).order_by()
+        }
+        changed_accounts = {}
+        for row_number, cleaned_row in cleaned_rows:
+            student_account = student_accounts.get(cleaned_row['student_name'])
+            shared_student_account = student_accounts.get(cleaned_row['shared_student_name'])
+            errors = [
+                f'No student account named {name} at {client_school.school_name}.'
+                for name in (cleaned_row['student_name'], cleaned_row['shared_student_name'])
+                if name and name not in student_accounts
+            ]
+            if student_account and student_account == shared_student_account:
+                errors.append('The primary and shared students must be different students.')
+            if student_account and cleaned_row['transaction_type'] == 'refund' \
+                    and getattr(student_account, balance) is None:
+                errors.append('The student has no purchased hours of this class type to refund.')
+            if errors:
+                rejected_rows.append((row_number, cleaned_row['student_name'], errors))
+                continue
+
+            # rows of the same student build on each other in file order
+            previous_hours = getattr(student_account, balance) or Decimal('0')
+            hours = Decimal(cleaned_row['class_hours_purchased_or_refunded'])
+            if cleaned_row['transaction_type'] == 'payment':
+                modification_type = 'tuition_payment_add'
+                setattr(
+                    student_account, expiration_date_field,
+                    calculate_expiration_date(cleaned_row['expiration_period'])
+                )
+            else:
+                modification_type = 'tuition_refund_deduct'
+                hours = -hours
+            setattr(student_account, balance, previous_hours + hours)
+            changed_accounts[student_account.id] = student_account
+            tuition_transactions.append(CSTuitionTransaction(
+                class_type=class_type,
+                student_account=student_account,
+                shared_student_account=shared_student_account,
+                transaction_amount=cleaned_row['transaction_amount'],
+                transaction_type=cleaned_row['transaction_type'],
+                class_hours_purchased_or_refunded=cleaned_row['class_hours_purchased_or_refunded'],
+                expiration_period=cleaned_row['expiration_period'],
+                comments=cleaned_row['comments'],
+                administrator_name=administrator_name,
+            ))
+            modifications.append(CSPurchasedHoursModification(
+                student_account=student_account,
+                class_type=class_type,
+                modification_type=modification_type,
+                previous_hours=previous_hours,
+                updated_hours=previous_hours + hours,
+            ))
+
+        if tuition_transactions:
+            bulk_create_tuition_transactions(tuition_transactions, list(changed_accounts))
+            for tuition_transaction, modification in zip(tuition_transactions, modifications):
+                modification.tuition_transaction = tuition_transaction
+            AccountingClientSchoolStudentAccount.objects.bulk_update(
+                changed_accounts.values(), [balance, expiration_date_field],
+                batch_size=500
+            )
+            CSPurchasedHoursModification.objects.bulk_create(modifications, batch_size=500)
+
+    rejected_rows.sort(key=lambda rejected_row: rejected_row[0])
+    return len(tuition_transactions), rejected_rows
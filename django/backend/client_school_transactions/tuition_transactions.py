@@ -0,0 +1,61 @@
+from decimal import Decimal
+from django.db import transaction
+
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from client_school_accounting.utils import calculate_expiration_date
+from .models import (
+    BALANCE_EXPIRATION_DATES,
+    CLASS_TYPE_BALANCES,
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+)
+
+
+def record_cs_tuition_transaction(tuition_transaction):
+    """
+    Saves a new client school tuition transaction, applies it to the
+    purchased hours of its student account and records the modification,
+    all in one database transaction. The student account row is locked
+    before its balance is read, so payments entered at the same time for
+    the same student are applied one after the other instead of
+    overwriting each other. Takes four queries: the lock, the transaction,
+    the balance update and the modification. Returns the modification.
+    """
+    class_type = tuition_transaction.CLASS_TYPE or tuition_transaction.class_type
+    balance = CLASS_TYPE_BALANCES[class_type]
+    hours = Decimal(str(tuition_transaction.class_hours_purchased_or_refunded))
+    if tuition_transaction.transaction_type != 'payment':
+        hours = -hours
+    student_accounts = AccountingClientSchoolStudentAccount.objects.filter(
+        id=tuition_transaction.student_account_id
+    )
+
+    with transaction.atomic():
+        previous_hours = student_accounts.select_for_update().values_list(
+            balance, flat=True
+        ).get() or Decimal('0')
+        tuition_transaction.save()
+        account_updates = {balance: previous_hours + hours}
+        if tuition_transaction.transaction_type == 'payment':
+            account_updates[BALANCE_EXPIRATION_DATES[balance]] = calculate_expiration_date(
+                tuition_transaction.expiration_period
+            )
+        student_accounts.update(**account_updates)
+        modification = CSPurchasedHoursModification.objects.create(
+            student_account_id=tuition_transaction.student_account_id,
+            tuition_transaction=tuition_transaction,
+            class_type=tuition_transaction.class_type,
+            modification_type=(
+                'tuition_payment_add'
+                if tuition_transaction.transaction_type == 'payment'
+                else 'tuition_refund_deduct'
+            ),
+            previous_hours=previous_hours,
+            updated_hours=previous_hours + hours,
+        )
+
+    # keeps an account loaded by the caller, such as the admin form's, current
+    if CSTuitionTransaction.student_account.is_cached(tuition_transaction):
+        for field, value in account_updates.items():
+            setattr(tuition_transaction.student_account, field, value)
+    return modification
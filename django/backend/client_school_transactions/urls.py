@@ -1,9 +1,20 @@
-from django.urls import path
-from .views import StudentMonthlyReportView
+from django.urls import path, register_converter
+
+from utilities.converters import IsoDateConverter
+from .views import (
+    CSTuitionTransactionCreateView,
+    SchoolMonthlyReportsView,
+    SchoolMonthlyStatementPackView,
+    StudentMonthlyReportByIdView,
+    StudentMonthlyReportView,
+    StudentPurchasedHoursBalancesOnDateView,
+)
 
 
 app_name = "client_school_transactions"
 
+register_converter(IsoDateConverter, 'isodate')
+
 
 urlpatterns = [
     path(
@@ -11,4 +22,29 @@ urlpatterns = [
         StudentMonthlyReportView.as_view(),
         name='student-monthly-report'
     ),
+    path(
+        'report/account/<int:account_id>/<int:year>/<int:month>/',
+        StudentMonthlyReportByIdView.as_view(),
+        name='student-monthly-report-by-id'
+    ),
+    path(
+        'report/school/<int:school_id>/<int:year>/<int:month>/',
+        SchoolMonthlyReportsView.as_view(),
+        name='school-monthly-reports'
+    ),
+    path(
+        'report/school/<int:school_id>/<int:year>/<int:month>/statement-pack/',
+        SchoolMonthlyStatementPackView.as_view(),
+        name='school-monthly-statement-pack'
+    ),
+    path(
+        'purchased-hours-balances/<int:account_id>/<isodate:date>/',
+        StudentPurchasedHoursBalancesOnDateView.as_view(),
+        name='student-purchased-hours-balances-on-date'
+    ),
+    path(
+        'tuition-transactions/',
+        CSTuitionTransactionCreateView.as_view(),
+        name='tuition-transactions'
+    ),
 ]
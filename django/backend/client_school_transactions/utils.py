@@ -1,104 +1,377 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, Exists, F, OuterRef, Q, Subquery, Sum, Value, When,
+    Window
+)
+from django.db.models.functions import Coalesce, FirstValue, Lag, RowNumber
+from django.utils.timezone import get_current_timezone, make_aware
+
+from accounting.utils import get_month_date_range
 from .models import (
+    BALANCE_CLASS_TYPES,
+    BALANCE_EXPIRATION_DATES,
+    CLASS_TYPE_BALANCES,
+    PURCHASED_HOURS_BALANCES,
+    CSPurchasedHoursCheckpoint,
     CSPurchasedHoursModification,
 )
-from client_school_accounting.models import AccountingClientSchoolStudentAccount
-
-
-def create_modification_record_for_tutoring_transaction(
-    previous_hours_purchased, tutoring_transaction
-):
-    if tutoring_transaction.transaction_type == 'payment':
-        modification_type = 'tuition_payment_add'
-    else:
-        modification_type = 'tuition_refund_deduct'
-    student_account = AccountingClientSchoolStudentAccount.objects.get(
-        id=tutoring_transaction.student_account.id
-    )
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        tutoring_transaction=tutoring_transaction,
-        class_type='one_to_one_tutoring',
-        modification_type=modification_type,
-        previous_hours=previous_hours_purchased,
-        updated_hours=student_account.purchased_tutoring_hours,
-    )
+from class_scheduling.models import ScheduledClass
+from client_school_accounting.models import (
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
+from client_school_group_attendance.models import GroupClassStudentAttendanceRecord
 
 
-def create_modification_record_for_two_to_one_transaction(
-    previous_hours_purchased, two_to_one_transaction
-):
-    if two_to_one_transaction.transaction_type == 'payment':
-        modification_type = 'tuition_payment_add'
-    else:
-        modification_type = 'tuition_refund_deduct'
-    student_account = AccountingClientSchoolStudentAccount.objects.get(
-        id=two_to_one_transaction.primary_student_account.id
-    )
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        two_to_one_transaction=two_to_one_transaction,
-        class_type='two_to_one_tutoring',
-        modification_type=modification_type,
-        previous_hours=previous_hours_purchased,
-        updated_hours=student_account.purchased_tutoring_hours,
-    )
+# the columns of the tuition transaction, if any, of a modification, named
+# as they are annotated on it by annotate_cs_transaction_summary
+TRANSACTION_SUMMARY_FIELDS = {
+    'transaction_amount': 'tuition_transaction__transaction_amount',
+    'transaction_type': 'tuition_transaction__transaction_type',
+    'class_hours_purchased_or_refunded': 'tuition_transaction__class_hours_purchased_or_refunded',
+    'administrator_name': 'tuition_transaction__administrator_name',
+    'transaction_time_stamp': 'tuition_transaction__time_stamp',
+    # only set for two-to-one transactions
+    'shared_student_name': 'tuition_transaction__shared_student_account__client_student_name',
+}
+
 
+def annotate_cs_transaction_summary(modifications):
+    # the transaction columns are joined into the modification rows, so
+    # serializing a history needs neither the transaction instances nor
+    # a query per row
+    return modifications.annotate(**{
+        field: F(lookup) for field, lookup in TRANSACTION_SUMMARY_FIELDS.items()
+    })
 
-def create_modification_record_for_online_transaction(
-    previous_hours_purchased, online_transaction
-):
-    if online_transaction.transaction_type == 'payment':
-        modification_type = 'tuition_payment_add'
-    else:
-        modification_type = 'tuition_refund_deduct'
-    student_account = AccountingClientSchoolStudentAccount.objects.get(
-        id=online_transaction.student_account.id
+
+def get_modification_balance():
+    # maps the class type of a modification to the balance it changes
+    return Case(
+        *[
+            When(class_type=class_type, then=Value(balance))
+            for class_type, balance in CLASS_TYPE_BALANCES.items()
+        ],
+        output_field=CharField()
     )
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        online_transaction=online_transaction,
-        class_type='online_tutoring',
-        modification_type=modification_type,
-        previous_hours=previous_hours_purchased,
-        updated_hours=student_account.purchased_online_hours,
+
+
+def get_change_in_hours():
+    return Coalesce(
+        Sum(F('updated_hours') - F('previous_hours')), Value(Decimal('0'))
     )
 
 
-def create_modification_record_for_group_transaction(
-    previous_hours_purchased, group_transaction
-):
-    if group_transaction.transaction_type == 'payment':
-        modification_type = 'tuition_payment_add'
-    else:
-        modification_type = 'tuition_refund_deduct'
-    student_account = AccountingClientSchoolStudentAccount.objects.get(
-        id=group_transaction.student_account.id
+def get_cs_purchased_hours_balances_at(student_account, timestamp):
+    """
+    Returns each purchased hours balance of a client school student account at
+    the timestamp, read from the latest checkpoint of the balance plus the
+    modifications made after it.
+    """
+    balances = {}
+    for balance, _ in PURCHASED_HOURS_BALANCES:
+        checkpoint = CSPurchasedHoursCheckpoint.objects.filter(
+            student_account=student_account, balance=balance, as_of__lte=timestamp
+        ).order_by('-as_of').first()
+        balance_modifications = CSPurchasedHoursModification.objects.alias(
+            balance=get_modification_balance()
+        ).filter(student_account=student_account, balance=balance)
+        modifications = balance_modifications.filter(time_stamp__lte=timestamp)
+        if checkpoint is not None:
+            opening_hours = checkpoint.hours
+            modifications = modifications.filter(time_stamp__gt=checkpoint.as_of)
+        else:
+            opening_hours = balance_modifications.order_by(
+                'time_stamp', 'id'
+            ).values_list('previous_hours', flat=True).first()
+            if opening_hours is None:
+                # the balance has never been modified
+                opening_hours = getattr(student_account, balance)
+
+        tail = modifications.aggregate(
+            change=get_change_in_hours(), modifications_applied=Count('id')
+        )
+        balances[balance] = {
+            "hours": (
+                None if opening_hours is None
+                else opening_hours + tail['change']
+            ),
+            "checkpoint_as_of": checkpoint.as_of if checkpoint else None,
+            "modifications_applied": tail['modifications_applied'],
+        }
+    return balances
+
+
+def create_cs_purchased_hours_checkpoints(as_of):
+    """
+    Writes a checkpoint at as_of for every client school student account
+    balance with a previous checkpoint or a modification. Re-running replaces
+    the checkpoints at as_of. Returns the number of checkpoints written.
+    """
+    previous_checkpoints = CSPurchasedHoursCheckpoint.objects.filter(
+        student_account=OuterRef('student_account'),
+        balance=OuterRef('balance'),
+        as_of__lt=as_of
+    ).order_by('-as_of')
+    latest_checkpoints = CSPurchasedHoursCheckpoint.objects.filter(
+        as_of__lt=as_of,
+        as_of=Subquery(previous_checkpoints.values('as_of')[:1])
     )
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        group_transaction=group_transaction,
-        class_type='group_class',
-        modification_type=modification_type,
-        previous_hours=previous_hours_purchased,
-        updated_hours=student_account.purchased_group_class_hours,
+    balances = {
+        (student_account_id, balance): hours
+        for student_account_id, balance, hours in latest_checkpoints.values_list(
+            'student_account_id', 'balance', 'hours'
+        )
+    }
+
+    modifications = CSPurchasedHoursModification.objects.filter(
+        time_stamp__lte=as_of
+    ).annotate(balance=get_modification_balance()).order_by()
+    tail_changes = modifications.alias(
+        checkpoint_as_of=Subquery(previous_checkpoints.values('as_of')[:1])
+    ).filter(
+        time_stamp__gt=F('checkpoint_as_of')
+    ).values('student_account', 'balance').annotate(change=get_change_in_hours())
+    for row in tail_changes:
+        balances[(row['student_account'], row['balance'])] += row['change']
+
+    first_modifications = CSPurchasedHoursModification.objects.annotate(
+        balance=get_modification_balance()
+    ).filter(
+        student_account=OuterRef('student_account'), balance=OuterRef('balance')
+    ).order_by('time_stamp', 'id')
+    full_history_changes = modifications.filter(
+        ~Exists(previous_checkpoints)
+    ).values('student_account', 'balance').annotate(
+        change=get_change_in_hours(),
+        opening_hours=Subquery(first_modifications.values('previous_hours')[:1])
     )
+    for row in full_history_changes:
+        balances[(row['student_account'], row['balance'])] = (
+            row['opening_hours'] + row['change']
+        )
 
+    with transaction.atomic():
+        CSPurchasedHoursCheckpoint.objects.filter(as_of=as_of).delete()
+        CSPurchasedHoursCheckpoint.objects.bulk_create(
+            [
+                CSPurchasedHoursCheckpoint(
+                    student_account_id=student_account_id,
+                    balance=balance,
+                    as_of=as_of,
+                    hours=hours
+                ) for (student_account_id, balance), hours in balances.items()
+            ],
+            batch_size=500
+        )
+    return len(balances)
 
-def create_modification_record_for_company_transaction(
-    previous_hours_purchased, company_transaction
-):
-    if company_transaction.transaction_type == 'payment':
-        modification_type = 'tuition_payment_add'
-    else:
-        modification_type = 'tuition_refund_deduct'
-    student_account = AccountingClientSchoolStudentAccount.objects.get(
-        id=company_transaction.student_account.id
+
+def get_cs_purchased_hours_drift(student_account_ids):
+    """
+    Compares each stored purchased hours balance of the client school student
+    accounts with the balance expected from its modification history. Returns
+    the balances which do not match, with the number of chain breaks in their
+    history, where a modification does not start from the hours the previous
+    one left.
+    """
+    modifications = CSPurchasedHoursModification.objects.filter(
+        student_account_id__in=student_account_ids
+    ).annotate(balance=get_modification_balance()).order_by()
+    history = {
+        'partition_by': [F('student_account'), F('balance')],
+        'order_by': [F('time_stamp').asc(), F('id').asc()],
+    }
+    expected_balances = {
+        (student_account_id, balance): opening_hours + change
+        for student_account_id, balance, opening_hours, change in modifications.annotate(
+            opening_hours=Window(FirstValue('previous_hours'), **history),
+            change=Window(
+                Sum(F('updated_hours') - F('previous_hours')),
+                partition_by=[F('student_account'), F('balance')]
+            ),
+            position=Window(RowNumber(), **history),
+        ).filter(position=1).values_list(
+            'student_account_id', 'balance', 'opening_hours', 'change'
+        )
+    }
+    chain_breaks = {}
+    for key in modifications.annotate(
+        hours_left=Window(Lag('updated_hours'), **history)
+    ).exclude(
+        previous_hours=F('hours_left')
+    ).filter(
+        hours_left__isnull=False
+    ).values_list('student_account_id', 'balance'):
+        chain_breaks[key] = chain_breaks.get(key, 0) + 1
+
+    drift = []
+    for account in AccountingClientSchoolStudentAccount.objects.filter(
+        id__in={student_account_id for student_account_id, _ in expected_balances}
+    ).values('id', *dict(PURCHASED_HOURS_BALANCES)):
+        for balance, _ in PURCHASED_HOURS_BALANCES:
+            key = (account['id'], balance)
+            if key in expected_balances and account[balance] != expected_balances[key]:
+                drift.append({
+                    "student_account_id": account['id'],
+                    "balance": balance,
+                    "stored_hours": account[balance],
+                    "expected_hours": expected_balances[key],
+                    "chain_breaks": chain_breaks.get(key, 0),
+                })
+    return drift
+
+
+def create_cs_purchased_hours_reconciliation_adjustments(drift):
+    """
+    Appends a modification from the expected to the stored hours for every
+    client school balance which drifted. Returns the number of adjustments
+    written.
+    """
+    adjustments = [
+        CSPurchasedHoursModification(
+            student_account_id=balance_drift['student_account_id'],
+            class_type=BALANCE_CLASS_TYPES[balance_drift['balance']],
+            modification_type='reconciliation_adjustment',
+            previous_hours=balance_drift['expected_hours'],
+            updated_hours=balance_drift['stored_hours'],
+        ) for balance_drift in drift
+        if balance_drift['stored_hours'] is not None
+    ]
+    CSPurchasedHoursModification.objects.bulk_create(adjustments, batch_size=500)
+    return len(adjustments)
+
+
+def get_expired_cs_purchased_hours(balance, today=None):
+    """
+    Returns the client school student accounts whose hours of the balance
+    expired before today and are not used up yet, read through the
+    expiration date index of the balance.
+    """
+    if today is None:
+        today = date.today()
+    return AccountingClientSchoolStudentAccount.objects.filter(**{
+        f'{BALANCE_EXPIRATION_DATES[balance]}__lt': today,
+        f'{balance}__gt': 0,
+    })
+
+
+def expire_cs_purchased_hours(today=None, chunk_size=500):
+    """
+    Sets every expired client school balance to zero and records a
+    modification for each, one hour type at a time: one query finds and
+    locks the expired balances of the type, the balances are zeroed and
+    the modifications written in bulk. Zeroed balances are no longer
+    found, so the sweep can run again at any time. Returns the number of
+    expired balances by balance.
+    """
+    expired_counts = {}
+    for balance, _ in PURCHASED_HOURS_BALANCES:
+        with transaction.atomic():
+            expired_balances = list(
+                get_expired_cs_purchased_hours(
+                    balance, today
+                ).select_for_update().order_by('id').values_list('id', balance)
+            )
+            for chunk_start in range(0, len(expired_balances), chunk_size):
+                AccountingClientSchoolStudentAccount.objects.filter(id__in=[
+                    student_account_id for student_account_id, _
+                    in expired_balances[chunk_start:chunk_start + chunk_size]
+                ]).update(**{balance: Decimal('0')})
+            CSPurchasedHoursModification.objects.bulk_create(
+                [
+                    CSPurchasedHoursModification(
+                        student_account_id=student_account_id,
+                        class_type=BALANCE_CLASS_TYPES[balance],
+                        modification_type='hours_expiration_deduct',
+                        previous_hours=expired_hours,
+                        updated_hours=Decimal('0'),
+                    ) for student_account_id, expired_hours in expired_balances
+                ],
+                batch_size=chunk_size
+            )
+        expired_counts[balance] = len(expired_balances)
+    return expired_counts
+
+
+def get_cs_monthly_statement_records(student_accounts, year, month):
+    """
+    Returns the hours modifications, group class attendance and completed or
+    same day cancelled individual classes of the month for each of the client
+    school student accounts, by account id. The records of every account are
+    read in the same four queries and grouped in memory, so the number of
+    queries does not grow with the number of accounts.
+    """
+    first_day, next_first_day = get_month_date_range(month, year)
+    current_timezone = get_current_timezone()
+    month_start, next_month_start = (
+        make_aware(datetime.combine(day, time.min), current_timezone)
+        for day in (first_day, next_first_day)
     )
-    CSPurchasedHoursModification.objects.create(
-        student_account=student_account,
-        company_transaction=company_transaction,
-        class_type='company_class',
-        modification_type=modification_type,
-        previous_hours=previous_hours_purchased,
-        updated_hours=student_account.purchased_company_hours,
-    )
\ No newline at end of file
+    student_account_ids = [student_account.id for student_account in student_accounts]
+    records = {
+        student_account_id: {
+            'modifications': [],
+            'group_attendance': [],
+            'individual_classes': [],
+        } for student_account_id in student_account_ids
+    }
+
+    for modification in annotate_cs_transaction_summary(
+        CSPurchasedHoursModification.objects.filter(
+            student_account_id__in=student_account_ids,
+            time_stamp__gte=month_start,
+            time_stamp__lt=next_month_start,
+        )
+    ).order_by('time_stamp', 'id'):
+        records[modification.student_account_id]['modifications'].append(modification)
+
+    for attendance_record in GroupClassStudentAttendanceRecord.objects.filter(
+        student_account_id__in=student_account_ids,
+        group_class_meeting_record__class_date__gte=first_day,
+        group_class_meeting_record__class_date__lt=next_first_day,
+    ).select_related(
+        'group_class_meeting_record',
+        'group_class_meeting_record__group_class',
+        'student_account',
+    ).order_by('group_class_meeting_record__class_date', 'id'):
+        records[attendance_record.student_account_id]['group_attendance'].append(
+            attendance_record
+        )
+
+    # the teacher's student or class records each account is enrolled in;
+    # a two-to-one class is shared by both of its accounts
+    enrolled_account_ids = {}
+    for student_or_class_id, *account_ids in ClientSchoolClassEnrollmentHandler.objects.filter(
+        Q(client_school_one_to_one_account_id__in=student_account_ids)
+        | Q(client_school_two_to_one_accounts__in=student_account_ids)
+        | Q(client_school_online_account_id__in=student_account_ids)
+        | Q(client_school_company_account_id__in=student_account_ids),
+        student_or_class__isnull=False,
+    ).values_list(
+        'student_or_class_id',
+        'client_school_one_to_one_account_id',
+        'client_school_two_to_one_accounts',
+        'client_school_online_account_id',
+        'client_school_company_account_id',
+    ).order_by():
+        enrolled_account_ids.setdefault(student_or_class_id, set()).update(
+            account_id for account_id in account_ids if account_id in records
+        )
+
+    for scheduled_class in ScheduledClass.objects.filter(
+        student_or_class_id__in=enrolled_account_ids,
+        date__gte=first_day,
+        date__lt=next_first_day,
+        class_status__in=('completed', 'same_day_cancellation'),
+    ).select_related(
+        'teacher__user',
+        'student_or_class__school',
+        'location__venue',
+    ).order_by('date', 'start_time'):
+        for student_account_id in enrolled_account_ids[scheduled_class.student_or_class_id]:
+            records[student_account_id]['individual_classes'].append(scheduled_class)
+
+    return records
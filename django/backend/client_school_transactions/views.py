@@ -1,146 +1,212 @@
 import datetime
+from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.utils.timezone import get_current_timezone, make_aware
 
-from accounting.utils import create_timestamps_for_beginning_and_end_of_month_and_year
-from client_school_accounting.models import (
-    AccountingClientSchoolStudentAccount,
-    ClientSchoolClassEnrollmentHandler,
+from accounting.report_export import EXCEL_CONTENT_TYPE
+from client_school.models import ClientSchool
+from client_school_accounting.models import AccountingClientSchoolStudentAccount
+from staff_admin.tenancy import get_staff_schools
+from utilities.permissions import IsClientSchoolStaff
+from .serializers import CSTuitionTransactionSerializer
+from .statement_packs import (
+    STATEMENT_PACK_FILE_TYPES,
+    build_statement_pack_workbook_file,
+    build_statement_pack_zip_file,
+    serialize_student_monthly_report,
 )
-from client_school_group_attendance.serializers import (
-    GroupClassStudentAttendanceRecordSerializer,
-)
-from client_school_group_attendance.models import GroupClassStudentAttendanceRecord
-from class_scheduling.models import ScheduledClass
-from class_scheduling.serializers import ScheduledClassGoogleCalendarSerializer
-from .models import CSPurchasedHoursModification
-from .serializers import (
-    CSPurchasedHoursModificationSerializer,
+from .utils import (
+    get_cs_monthly_statement_records,
+    get_cs_purchased_hours_balances_at,
 )
 
 
+def is_valid_report_period(year, month):
+    try:
+        datetime.date(int(year), int(month), 1)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
 class StudentMonthlyReportView(APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, client_student_name, year, month):
-        # --- Validate year/month ---
-        try:
-            year = int(year)
-            month = int(month)
-            # Confirm it's a real month
-            datetime.date(year, month, 1)
-        except (ValueError, TypeError):
+        if not is_valid_report_period(year, month):
             return Response(
                 {'error': 'Invalid year or month.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        year, month = int(year), int(month)
 
-        # --- Resolve the student account ---
-        # If you want to scope by school, add &client_school=... as a query param
-        # or add school_id to the URL. For now, match on name alone.
+        # matches on the name alone; StudentMonthlyReportByIdView looks the
+        # account up by id
         student_account = get_object_or_404(
             AccountingClientSchoolStudentAccount,
             client_student_name=client_student_name,
         )
+        records = get_cs_monthly_statement_records([student_account], year, month)
+        return Response(serialize_student_monthly_report(
+            student_account, year, month, records[student_account.id]
+        ))
 
-        query_timestamps = create_timestamps_for_beginning_and_end_of_month_and_year(
-            month=month,
-            year=year
-        )
 
-        # --- Account activity: all hours modifications for this month ---
-        modifications = CSPurchasedHoursModification.objects.filter(
-            student_account=student_account,
-            time_stamp__range=(query_timestamps['start'], query_timestamps['end']),
-        ).select_related(
-            'bridge',
-            'tutoring_transaction',
-            'two_to_one_transaction',
-            'online_transaction',
-            'group_transaction',
-            'company_transaction',
-        ).order_by('time_stamp')
-
-        # --- Group class attendance for this month ---
-        group_attendance = GroupClassStudentAttendanceRecord.objects.filter(
-            student_account=student_account,
-            group_class_meeting_record__class_date__year=year,
-            group_class_meeting_record__class_date__month=month,
-        ).select_related(
-            'group_class_meeting_record',
-            'group_class_meeting_record__group_class',
-            'student_account',
-        ).order_by('group_class_meeting_record__class_date')
-
-        # --- Individual class attendance (tutoring, online, company) ---
-        # Navigate: student_account -> enrollment handlers -> StudentOrClass -> ScheduledClass
-        enrollment_handlers = ClientSchoolClassEnrollmentHandler.objects.filter(
-            Q(client_school_one_to_one_account=student_account)
-            | Q(client_school_two_to_one_accounts=student_account)
-            | Q(client_school_online_account=student_account)
-            | Q(client_school_company_account=student_account)
-        ).select_related('student_or_class')
-
-        student_or_class_ids = enrollment_handlers.values_list(
-            'student_or_class_id', flat=True
+class StudentMonthlyReportByIdView(APIView):
+    permission_classes = (IsAuthenticated, IsClientSchoolStaff)
+
+    def get(self, request, account_id, year, month):
+        # only the accounts of the staff user's client schools are found
+        if not is_valid_report_period(year, month):
+            return Response(
+                {'error': 'Invalid year or month.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        student_account = get_object_or_404(
+            AccountingClientSchoolStudentAccount.objects.filter(
+                client_school_id__in=get_staff_schools(request).client_school_ids
+            ),
+            id=account_id
         )
+        records = get_cs_monthly_statement_records([student_account], year, month)
+        return Response(serialize_student_monthly_report(
+            student_account, year, month, records[student_account.id]
+        ))
+
 
-        individual_classes = ScheduledClass.objects.filter(
-            student_or_class_id__in=student_or_class_ids,
-            date__year=year,
-            date__month=month,
-        ).filter(
-            Q(class_status='completed') | Q(class_status='same_day_cancellation')
-        ).select_related(
-            'teacher',
-            'student_or_class',
-            'location',
-        ).order_by('date', 'start_time')
-
-        # --- Current balances snapshot ---
-        balances = {}
-        for field, label in [
-            ('purchased_tutoring_hours', 'tutoring'),
-            ('purchased_group_class_hours', 'group_class'),
-            ('purchased_online_hours', 'online'),
-            ('purchased_company_hours', 'company'),
-        ]:
-            val = getattr(student_account, field)
-            if val is not None:
-                balances[label] = float(val)
-
-        # --- Current expirations snapshot ---
-        expirations = {}
-        for field, label in [
-            ('tutoring_hours_expiration_date', 'tutoring'),
-            ('group_hours_expiration_date', 'group_class'),
-            ('online_hours_expiration_date', 'online'),
-            ('company_hours_expiration_date', 'company'),
-        ]:
-            val = getattr(student_account, field)
-            if val is not None:
-                expirations[label] = str(val)
-
-        # --- Serialize and return ---
+class SchoolMonthlyReportsView(APIView):
+    permission_classes = (IsAuthenticated, IsClientSchoolStaff)
+
+    def get(self, request, school_id, year, month):
+        # the statements of every student account of the school, or of the
+        # accounts listed in ?account_ids=1,2,3, in a fixed number of
+        # queries; only for the staff of the school
+        if not is_valid_report_period(year, month):
+            return Response(
+                {'error': 'Invalid year or month.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        client_school = get_object_or_404(
+            ClientSchool.objects.filter(
+                id__in=get_staff_schools(request).client_school_ids
+            ),
+            id=school_id
+        )
+        student_accounts = AccountingClientSchoolStudentAccount.objects.filter(
+            client_school=client_school
+        ).order_by('client_student_name')
+        account_ids = request.query_params.get('account_ids')
+        if account_ids:
+            try:
+                student_accounts = student_accounts.filter(
+                    id__in=[int(account_id) for account_id in account_ids.split(',')]
+                )
+            except ValueError:
+                return Response(
+                    {'error': 'account_ids must be a comma separated list of ids.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        student_accounts = list(student_accounts)
+        records = get_cs_monthly_statement_records(student_accounts, year, month)
         return Response({
-            'student_name': student_account.client_student_name,
+            'school_id': client_school.id,
+            'school_name': client_school.school_name,
             'report_period': {
                 'year': year,
                 'month': month,
             },
-            'current_balances': balances,
-            'expiration_dates': expirations,
-            'account_activity': CSPurchasedHoursModificationSerializer(
-                modifications, many=True
-            ).data,
-            'group_class_attendance': GroupClassStudentAttendanceRecordSerializer(
-                group_attendance, many=True
-            ).data,
-            'individual_class_attendance': ScheduledClassGoogleCalendarSerializer(
-                individual_classes, many=True
-            ).data,
+            'statements': [
+                serialize_student_monthly_report(
+                    student_account, year, month, records[student_account.id]
+                ) for student_account in student_accounts
+            ],
+        })
+
+
+class SchoolMonthlyStatementPackView(APIView):
+    permission_classes = (IsAuthenticated, IsClientSchoolStaff)
+
+    def get(self, request, school_id, year, month):
+        # every student's statement as one JSON file each in a ZIP archive,
+        # or with ?file_type=xlsx as one sheet each in a workbook; only for
+        # the staff of the school
+        if not is_valid_report_period(year, month):
+            return Response(
+                {'error': 'Invalid year or month.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        file_type = request.query_params.get('file_type', 'zip')
+        if file_type not in STATEMENT_PACK_FILE_TYPES:
+            return Response(
+                {'error': 'The file type must be one of: {}'.format(
+                    ', '.join(STATEMENT_PACK_FILE_TYPES)
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        client_school = get_object_or_404(
+            ClientSchool.objects.filter(
+                id__in=get_staff_schools(request).client_school_ids
+            ),
+            id=school_id
+        )
+        filename = F'{client_school.school_name}_statements_{month}-{year}.{file_type}'
+        if file_type == 'xlsx':
+            return FileResponse(
+                build_statement_pack_workbook_file(client_school, year, month),
+                as_attachment=True, filename=filename,
+                content_type=EXCEL_CONTENT_TYPE
+            )
+        return FileResponse(
+            build_statement_pack_zip_file(client_school, year, month),
+            as_attachment=True, filename=filename,
+            content_type='application/zip'
+        )
+
+
+class StudentPurchasedHoursBalancesOnDateView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, account_id, date):
+        # each purchased hours balance at the end of the date, read from the
+        # latest balance checkpoint and the modifications made after it
+        student_account = get_object_or_404(
+            AccountingClientSchoolStudentAccount, id=account_id
+        )
+        end_of_day = make_aware(
+            datetime.datetime.combine(date, datetime.time.max),
+            get_current_timezone()
+        )
+        return Response({
+            'account_id': student_account.id,
+            'client_student_name': student_account.client_student_name,
+            'date': date,
+            'balances': get_cs_purchased_hours_balances_at(
+                student_account, end_of_day
+            ),
         })
+
+
+class CSTuitionTransactionCreateView(generics.CreateAPIView):
+    # the balance and modification are recorded by the serializer
+    permission_classes = (IsAuthenticated, IsClientSchoolStaff)
+    serializer_class = CSTuitionTransactionSerializer
+
+    def perform_create(self, serializer):
+        # only the staff of the students' client school can record their
+        # payments, under the name of the staff user who recorded them
+        for student_account in (
+            serializer.validated_data['student_account'],
+            serializer.validated_data.get('shared_student_account'),
+        ):
+            if student_account is not None:
+                self.check_object_permissions(self.request, student_account)
+        serializer.save(
+            administrator_name=(
+                self.request.user.get_full_name() or self.request.user.get_username()
+            )
+        )
@@ -1,10 +1,10 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin
 from datetime import time, timedelta, datetime
 from django import forms
 from django.contrib import admin
 from django.contrib import messages
 
-from student_account.models import StudentOrClass
 from .models import RecurringScheduledClass, RecurringClassAppliedMonthly
 from .utils import (
     create_date_list,
@@ -120,9 +120,8 @@ class StaffRecurringScheduledClassForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['student_or_class'].queryset = StudentOrClass.objects.filter(
-            school__school_name="David's English Center"
-        ).order_by(
+        # limited to the staff user's schools by the admin
+        self.fields['student_or_class'].queryset = self.fields['student_or_class'].queryset.order_by(
             'teacher__surname',
             'teacher__given_name',
             'student_or_class_name'
@@ -150,12 +149,19 @@ class StaffRecurringScheduledClassForm(forms.ModelForm):
         return cleaned_data
 
 
-class StaffRecurringScheduledClassAdmin(admin.ModelAdmin):
+class StaffRecurringScheduledClassAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     form = StaffRecurringScheduledClassForm
     exclude = ('teacher', 'recurring_finish_time')  # hides the field from the form
     autocomplete_fields = ['student_or_class']
     list_display = ('teacher', 'student_or_class', 'day_of_week_string',
                     'recurring_start_time', 'recurring_finish_time', 'recurring_location')
+    # the related objects each column's __str__ reaches
+    list_select_related = (
+        'teacher__user',
+        'student_or_class__teacher',
+        'student_or_class__school',
+        'recurring_location__venue',
+    )
     ordering = ('teacher__given_name', 'recurring_day_of_week', 'recurring_start_time')
 
     list_filter = (
@@ -167,10 +173,8 @@ class StaffRecurringScheduledClassAdmin(admin.ModelAdmin):
         'teacher__user__username', 'recurring_location__space_name'
     ]
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            student_or_class__school__school_name="David's English Center"
-        )
+    staff_school_lookup = 'student_or_class__school'
+    staff_school_related_fields = {'student_or_class': ('school', None)}
 
     def save_model(self, request, obj, form, change):
         if not change:
@@ -238,9 +242,8 @@ class StaffRecurringClassAppliedMonthlyForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if 'recurring_class' in self.fields:
-            self.fields['recurring_class'].queryset = RecurringScheduledClass.objects.filter(
-                student_or_class__school__school_name="David's English Center"
-            ).order_by(
+            # limited to the staff user's schools by the admin
+            self.fields['recurring_class'].queryset = self.fields['recurring_class'].queryset.order_by(
                 'teacher__surname',
                 'teacher__given_name',
                 'recurring_day_of_week',
@@ -248,11 +251,16 @@ class StaffRecurringClassAppliedMonthlyForm(forms.ModelForm):
             )
 
 
-class StaffRecurringClassAppliedMonthlyAdmin(admin.ModelAdmin):
+class StaffRecurringClassAppliedMonthlyAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     form = StaffRecurringClassAppliedMonthlyForm
     autocomplete_fields = ['recurring_class']
     list_display = ('recurring_class', 'get_teacher', 'get_student_or_class',
                     'scheduling_month', 'scheduling_year',)
+    list_select_related = (
+        'recurring_class__teacher__user',
+        'recurring_class__student_or_class__teacher',
+        'recurring_class__student_or_class__school',
+    )
     list_filter = ('scheduling_month', 'scheduling_year',
                    'recurring_class__recurring_day_of_week',)
     search_fields = [
@@ -260,10 +268,8 @@ class StaffRecurringClassAppliedMonthlyAdmin(admin.ModelAdmin):
         'recurring_class__teacher__user__username'
     ]
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            recurring_class__student_or_class__school__school_name="David's English Center"
-        )
+    staff_school_lookup = 'recurring_class__student_or_class__school'
+    staff_school_related_fields = {'recurring_class': ('student_or_class__school', None)}
 
     def get_teacher(self, obj):
         return obj.recurring_class.teacher
@@ -1,5 +1,7 @@
 from django.contrib.admin import AdminSite
 
+from staff_admin.tenancy import get_staff_schools
+
 
 class StaffAdminSite(AdminSite):
     site_header = "David's English Center Staff Admin"
@@ -8,5 +10,14 @@ class StaffAdminSite(AdminSite):
     def has_permission(self, request):
         return request.user.is_active and request.user.is_staff
 
+    def each_context(self, request):
+        context = super().each_context(request)
+        if self.has_permission(request):
+            # each client school's staff see their own school's site
+            context['site_header'] = '{} Staff Admin'.format(
+                ', '.join(get_staff_schools(request).school_names)
+            )
+        return context
+
 
 staff_admin_site = StaffAdminSite(name='staff_admin')
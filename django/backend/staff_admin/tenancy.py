@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+from django.conf import settings
+
+from client_school.models import ClientSchool
+from school.models import School
+
+StaffSchools = namedtuple(
+    'StaffSchools', ('client_school_ids', 'school_ids', 'school_names')
+)
+
+
+def get_staff_schools(request):
+    """
+    Resolves the client schools of the staff user to their ids once per
+    request, with the ids of the schools which the teachers keep their
+    classes for those client schools under, which share the client school's
+    name. Staff users who are not assigned to any client school work for
+    the default school of the staff site.
+    """
+    if not hasattr(request, '_staff_schools'):
+        client_schools = dict(ClientSchool.objects.filter(
+            staff_users=request.user
+        ).values_list('id', 'school_name'))
+        if not client_schools:
+            client_schools = dict(ClientSchool.objects.filter(
+                school_name=settings.STAFF_ADMIN_DEFAULT_SCHOOL_NAME
+            ).values_list('id', 'school_name'))
+        school_names = sorted(
+            set(client_schools.values()) or {settings.STAFF_ADMIN_DEFAULT_SCHOOL_NAME}
+        )
+        request._staff_schools = StaffSchools(
+            client_school_ids=sorted(client_schools),
+            school_ids=list(School.objects.filter(
+                school_name__in=school_names
+            ).values_list('id', flat=True)),
+            school_names=school_names,
+        )
+    return request._staff_schools
+
+
+def filter_by_staff_schools(queryset, request, school_lookup=None, client_school_lookup=None):
+    # the lookups lead to the School and ClientSchool foreign keys, which
+    # are compared by id without joining the school tables
+    staff_schools = get_staff_schools(request)
+    if school_lookup is not None:
+        queryset = queryset.filter(**{
+            f'{school_lookup}__in': staff_schools.school_ids
+        })
+    if client_school_lookup is not None:
+        queryset = queryset.filter(**{
+            f'{client_school_lookup}__in': staff_schools.client_school_ids
+        })
+    return queryset
+
+
+class StaffSchoolScopedAdminMixin:
+    """
+    Limits a staff admin to the schools of the staff user. The school and
+    client school lookups lead from the admin's model to its schools, and
+    staff_school_related_fields holds the same (school lookup, client school
+    lookup) pair for the model of each related field of the admin's form.
+    """
+    staff_school_lookup = None
+    staff_client_school_lookup = None
+    staff_school_related_fields = {}
+
+    def get_queryset(self, request):
+        return filter_by_staff_schools(
+            super().get_queryset(request), request,
+            self.staff_school_lookup, self.staff_client_school_lookup
+        )
+
+    def get_staff_school_field_queryset(self, db_field, request):
+        return filter_by_staff_schools(
+            db_field.remote_field.model._default_manager.all(), request,
+            *self.staff_school_related_fields[db_field.name]
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.staff_school_related_fields and 'queryset' not in kwargs:
+            kwargs['queryset'] = self.get_staff_school_field_queryset(db_field, request)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name in self.staff_school_related_fields and 'queryset' not in kwargs:
+            kwargs['queryset'] = self.get_staff_school_field_queryset(db_field, request)
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
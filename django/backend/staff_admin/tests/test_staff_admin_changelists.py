@@ -0,0 +1,272 @@
+import datetime
+from decimal import Decimal
+from django.test import RequestFactory, TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from class_scheduling.models import ScheduledClass
+from client_school.models import ClientSchool
+from client_school_accounting.models import (
+    AccountingClientSchoolGroupClass,
+    AccountingClientSchoolStudentAccount,
+    ClientSchoolClassEnrollmentHandler,
+)
+from client_school_group_attendance.models import (
+    GroupClassMeetingRecord,
+    GroupClassStudentAttendanceRecord,
+)
+from client_school_transactions.models import (
+    CSPurchasedHoursModification,
+    CSTuitionTransaction,
+)
+from recurring_scheduling.models import (
+    RecurringClassAppliedMonthly,
+    RecurringScheduledClass,
+)
+from school.models import School
+from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import get_staff_schools
+from student_account.models import StudentOrClass
+from user_profiles.models import UserProfile
+from venues.models import Venue, VenueSpace
+
+User = get_user_model()
+
+DAVIDS_ENGLISH = "David's English Center"
+
+TUITION_CLASS_TYPES = (
+    'one_to_one_tutoring', 'two_to_one_tutoring', 'online_tutoring',
+    'group_class', 'company_class',
+)
+
+
+def create_test_teacher(username):
+    """Helper function to create a teacher with a user profile"""
+    return UserProfile.objects.create(
+        user=User.objects.create_user(username, 'testpass123'),
+        given_name=username.title(), surname='Teacher',
+        contact_email=f'{username}@test.com'
+    )
+
+
+class StaffAdminChangelistTests(TestCase):
+    """Test the query counts of the staff admin changelists"""
+
+    def setUp(self):
+        staff_user = User.objects.create_superuser('staff1', password='testpass123')
+        self.client.force_login(staff_user)
+        self.client_school = ClientSchool.objects.create(
+            school_name=DAVIDS_ENGLISH,
+            address_line_1='1 Main St',
+            address_line_2='',
+        )
+        self.venue = Venue.objects.create(
+            venue_name='Main Venue', address_line_1='1 Main St', address_line_2=''
+        )
+        self.rows = 0
+
+    def add_rows(self, number_of_rows):
+        # one row of every staff admin changelist, each with its own
+        # teacher, school and accounts so nothing is shared between rows
+        for index in range(self.rows, self.rows + number_of_rows):
+            teacher = create_test_teacher(f'teacher{index}')
+            school = School.objects.create(
+                school_name=DAVIDS_ENGLISH,
+                address_line_1='1 Main St',
+                address_line_2='',
+                scheduling_teacher=teacher,
+                contact_phone='1234567890',
+            )
+            student_or_class = StudentOrClass.objects.create(
+                student_or_class_name=f'Class {index}',
+                account_type='school',
+                school=school,
+                teacher=teacher,
+                tuition_per_hour=900,
+            )
+            location = VenueSpace.objects.create(
+                venue=self.venue, space_name=f'Room {index}'
+            )
+            ScheduledClass.objects.create(
+                student_or_class=student_or_class,
+                teacher=teacher,
+                location=location,
+                date=datetime.date(2025, 1, 15),
+                start_time=datetime.time(10, 0),
+                finish_time=datetime.time(10, 59),
+            )
+            recurring_class = RecurringScheduledClass.objects.create(
+                student_or_class=student_or_class,
+                teacher=teacher,
+                recurring_location=location,
+                recurring_day_of_week=index % 7,
+                recurring_start_time=datetime.time(10, 0),
+                recurring_finish_time=datetime.time(10, 59),
+            )
+            RecurringClassAppliedMonthly.objects.create(
+                recurring_class=recurring_class,
+                scheduling_month=1,
+                scheduling_year=2025,
+            )
+            student_account = AccountingClientSchoolStudentAccount.objects.create(
+                client_student_name=f'Student {index}',
+                client_school=self.client_school,
+                purchased_tutoring_hours=Decimal('10.00'),
+                tutoring_hours_expiration_date=datetime.date(2099, 1, 1),
+                purchased_group_class_hours=Decimal('10.00'),
+                group_hours_expiration_date=datetime.date(2099, 1, 1),
+            )
+            shared_student_account = AccountingClientSchoolStudentAccount.objects.create(
+                client_student_name=f'Shared Student {index}',
+                client_school=self.client_school,
+            )
+            group_class = AccountingClientSchoolGroupClass.objects.create(
+                group_class_name=f'Group {index}', client_school=self.client_school
+            )
+            ClientSchoolClassEnrollmentHandler.objects.create(
+                student_or_class=student_or_class,
+                class_enrollment_type='one_to_one_tutoring',
+                client_school_one_to_one_account=student_account,
+                client_group_class=group_class,
+            )
+            for class_type in TUITION_CLASS_TYPES:
+                tuition_transaction = CSTuitionTransaction.objects.create(
+                    class_type=class_type,
+                    student_account=student_account,
+                    shared_student_account=(
+                        shared_student_account
+                        if class_type == 'two_to_one_tutoring' else None
+                    ),
+                    class_hours_purchased_or_refunded=10,
+                    administrator_name='Admin',
+                )
+                CSPurchasedHoursModification.objects.create(
+                    student_account=student_account,
+                    class_type=class_type,
+                    modification_type='tuition_payment_add',
+                    tuition_transaction=tuition_transaction,
+                    previous_hours=Decimal('0.00'),
+                    updated_hours=Decimal('10.00'),
+                )
+            meeting_record = GroupClassMeetingRecord.objects.create(
+                group_class=group_class,
+                teacher_name='Jane Teacher',
+                class_date=datetime.date(2025, 1, 15),
+                class_duration=Decimal('1.00'),
+            )
+            GroupClassStudentAttendanceRecord.objects.create(
+                group_class_meeting_record=meeting_record,
+                student_account=student_account,
+            )
+        self.rows += number_of_rows
+
+    def count_changelist_queries(self):
+        query_counts = {}
+        for model, model_admin in staff_admin_site._registry.items():
+            url = reverse('staff_admin:{}_{}_changelist'.format(
+                model._meta.app_label, model._meta.model_name
+            ))
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, url)
+            query_counts[model_admin.__class__.__name__] = len(queries)
+        return query_counts
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Test that every staff admin changelist takes the same number of queries for more rows"""
+        print("Test that every staff admin changelist takes the same number of queries for more rows")
+
+        self.add_rows(2)
+        query_counts = self.count_changelist_queries()
+        self.add_rows(8)
+
+        self.assertEqual(self.count_changelist_queries(), query_counts)
+
+
+class StaffAdminTenancyTests(TestCase):
+    """Test limiting the staff admin to the schools of the staff user"""
+
+    def setUp(self):
+        self.staff_user = User.objects.create_superuser('staff1', password='testpass123')
+        self.client.force_login(self.staff_user)
+        for school_name in (DAVIDS_ENGLISH, 'Other School'):
+            client_school = ClientSchool.objects.create(
+                school_name=school_name,
+                address_line_1='1 Main St',
+                address_line_2='',
+            )
+            AccountingClientSchoolStudentAccount.objects.create(
+                client_student_name=f'{school_name} Student',
+                client_school=client_school,
+            )
+            teacher = create_test_teacher(f'teacher{client_school.id}')
+            ScheduledClass.objects.create(
+                student_or_class=StudentOrClass.objects.create(
+                    student_or_class_name=f'{school_name} Class',
+                    account_type='school',
+                    school=School.objects.create(
+                        school_name=school_name,
+                        address_line_1='1 Main St',
+                        address_line_2='',
+                        scheduling_teacher=teacher,
+                        contact_phone='1234567890',
+                    ),
+                    teacher=teacher,
+                    tuition_per_hour=900,
+                ),
+                teacher=teacher,
+                date=datetime.date(2025, 1, 15),
+                start_time=datetime.time(10, 0),
+                finish_time=datetime.time(10, 59),
+            )
+        self.other_school = ClientSchool.objects.get(school_name='Other School')
+
+    def get_changelist_rows(self, model):
+        res = self.client.get(reverse('staff_admin:{}_{}_changelist'.format(
+            model._meta.app_label, model._meta.model_name
+        )))
+        return [str(obj) for obj in res.context['cl'].result_list]
+
+    def test_unassigned_staff_work_for_the_default_school(self):
+        """Test that staff users without a client school see the default school"""
+        print("Test that staff users without a client school see the default school")
+
+        self.assertEqual(
+            self.get_changelist_rows(AccountingClientSchoolStudentAccount),
+            [f"{DAVIDS_ENGLISH} Student, {DAVIDS_ENGLISH}"]
+        )
+        self.assertEqual(len(self.get_changelist_rows(ScheduledClass)), 1)
+
+    def test_assigned_staff_see_their_own_school(self):
+        """Test that staff users assigned to a client school only see that school"""
+        print("Test that staff users assigned to a client school only see that school")
+
+        self.other_school.staff_users.add(self.staff_user)
+
+        self.assertEqual(
+            self.get_changelist_rows(AccountingClientSchoolStudentAccount),
+            ['Other School Student, Other School']
+        )
+        self.assertIn('Other School Class', self.get_changelist_rows(ScheduledClass)[0])
+        res = self.client.get(reverse('staff_admin:index'))
+        self.assertContains(res, 'Other School Staff Admin')
+
+    def test_schools_are_resolved_once_per_request(self):
+        """Test that the schools of the staff user are read once per request"""
+        print("Test that the schools of the staff user are read once per request")
+
+        self.other_school.staff_users.add(self.staff_user)
+        request = RequestFactory().get('/staff-admin/')
+        request.user = self.staff_user
+
+        # the client schools of the user and the schools of the same names
+        with self.assertNumQueries(2):
+            get_staff_schools(request)
+            staff_schools = get_staff_schools(request)
+
+        self.assertEqual(staff_schools.client_school_ids, [self.other_school.id])
+        self.assertEqual(staff_schools.school_ids, list(School.objects.filter(
+            school_name='Other School'
+        ).values_list('id', flat=True)))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-19 11:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_account', '0009_alter_studentorclass_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentorclass',
+            index=models.Index(fields=['account_type', 'purchased_class_hours'], name='student_type_hours_idx'),
+        ),
+    ]
@@ -15,12 +15,20 @@ ACCOUNT_TYPE = (
     )
 
 
-class StudentBillingManager(models.Manager):
+class StudentBillingQuerySet(models.QuerySet):
+
+    def low_balance(self, hours=2):
+        # school accounts have no purchased class hours, so only freelance match
+        return self.filter(
+            account_type='freelance', purchased_class_hours__lte=hours
+        )
+
     def under_two_hours(self):
-        return [
-            account for account in self.get_queryset()
-            if account.purchased_class_hours is not None and account.purchased_class_hours <= 2
-        ]
+        return self.low_balance(2)
+
+
+class StudentBillingManager(models.Manager.from_queryset(StudentBillingQuerySet)):
+    pass
 
 
 class StudentOrClass(models.Model):
@@ -98,6 +106,12 @@ class StudentOrClass(models.Model):
                 name="school_freelance_null_check",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['account_type', 'purchased_class_hours'],
+                name='student_type_hours_idx'
+            ),
+        ]
 
 
 @receiver(pre_save, sender=StudentOrClass)
@@ -1,9 +1,9 @@
 from staff_admin.sites import staff_admin_site
+from staff_admin.tenancy import StaffSchoolScopedAdminMixin
 from django import forms
 from django.contrib import admin, messages
 
 from .models import StudentOrClass
-from school.models import School
 
 
 class StaffStudentOrClassForm(forms.ModelForm):
@@ -13,22 +13,22 @@ class StaffStudentOrClassForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['school'].queryset = School.objects.filter(
-            school_name="David's English Center"
-        ).order_by(
+        # limited to the staff user's schools by the admin
+        self.fields['school'].queryset = self.fields['school'].queryset.order_by(
             'scheduling_teacher__surname',
             'scheduling_teacher__given_name',
         )
         self.fields['school'].label = 'Teacher / School'
 
 
-class StaffStudentOrClassAdmin(admin.ModelAdmin):
+class StaffStudentOrClassAdmin(StaffSchoolScopedAdminMixin, admin.ModelAdmin):
     form = StaffStudentOrClassForm
     exclude = ('teacher', 'account_type', 'purchased_class_hours')  # hides the field from the form
 
     list_display = (
         'teacher', 'student_or_class_name', 'school',
     )
+    list_select_related = ('teacher__user', 'school__scheduling_teacher__user')
 
     search_fields = (
         'student_or_class_name',
@@ -36,10 +36,8 @@ class StaffStudentOrClassAdmin(admin.ModelAdmin):
         'teacher__given_name','school__school_name'
     )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).filter(
-            school__school_name="David's English Center"
-        )
+    staff_school_lookup = 'school'
+    staff_school_related_fields = {'school': ('pk', None)}
 
     def save_model(self, request, obj, form, change):
         if not change:
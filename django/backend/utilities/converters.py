@@ -0,0 +1,16 @@
+from datetime import date
+
+
+class IsoDateConverter:
+    # matches YYYY-MM-DD and hands the view a datetime.date, so the
+    # date is validated once in the url instead of in every query;
+    # impossible dates such as 2024-02-30 resolve to a 404
+    regex = r'\d{4}-\d{2}-\d{2}'
+
+    def to_python(self, value):
+        return date.fromisoformat(value)
+
+    def to_url(self, value):
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
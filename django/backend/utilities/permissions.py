@@ -1,8 +1,22 @@
 from rest_framework import permissions
 
+from staff_admin.tenancy import get_staff_schools
+
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj.user == request.user
+
+
+class IsClientSchoolStaff(permissions.BasePermission):
+    # the same staff users as the staff admin site, who may only work
+    # with the client schools they are assigned to
+    def has_permission(self, request, view):
+        return bool(
+            request.user and request.user.is_active and request.user.is_staff
+        )
+
+    def has_object_permission(self, request, view, obj):
+        return obj.client_school_id in get_staff_schools(request).client_school_ids